@@ -18,6 +18,13 @@ from app.config import settings
 # Import all models to ensure they're registered with Base
 from app.models.bot import Bot, BotStatus
 from app.models.claim import User, ClaimRequest, BotAccessGrant, ClaimType, ClaimStatus
+from app.models.activity import BotActivity, BotActivityRollup
+from app.models.task import Task, TaskStatus, TaskPriority
+from app.models.webhook import WebhookDelivery, DeliveryStatus
+from app.models.skill import Skill, SkillDailyStats
+from app.models.json_blob import JsonBlob
+from app.models.status_history import BotStatusRun
+from app.models.bus import BusSubscription, BusMessage
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -0,0 +1,38 @@
+"""Add bot_activity_rollups table
+
+Revision ID: 3e980b8b72a2
+Revises: 8b5717e54a86
+Create Date: 2026-10-19 10:03:11.874512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3e980b8b72a2'
+down_revision: Union[str, Sequence[str], None] = '8b5717e54a86'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('bot_activity_rollups',
+    sa.Column('bot_id', sa.Uuid(), nullable=False),
+    sa.Column('granularity', sa.String(length=8), nullable=False),
+    sa.Column('bucket_start', sa.DateTime(), nullable=False),
+    sa.Column('activity_count', sa.BigInteger(), nullable=False),
+    sa.Column('tokens_used', sa.BigInteger(), nullable=False),
+    sa.ForeignKeyConstraint(['bot_id'], ['bots.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('bot_id', 'granularity', 'bucket_start')
+    )
+    op.create_index('ix_bot_activity_rollups_granularity_bucket', 'bot_activity_rollups', ['granularity', 'bucket_start'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_bot_activity_rollups_granularity_bucket', table_name='bot_activity_rollups')
+    op.drop_table('bot_activity_rollups')
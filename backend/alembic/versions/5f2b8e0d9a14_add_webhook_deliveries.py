@@ -0,0 +1,51 @@
+"""Add webhook_deliveries table and bots.webhook_secret
+
+Revision ID: 5f2b8e0d9a14
+Revises: c41d7a9e2f63
+Create Date: 2026-10-19 12:48:05.104733
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5f2b8e0d9a14'
+down_revision: Union[str, Sequence[str], None] = 'c41d7a9e2f63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('bots', sa.Column('webhook_secret', sa.String(length=128), nullable=True))
+    op.create_table('webhook_deliveries',
+    sa.Column('id', sa.Uuid(), nullable=False),
+    sa.Column('event_id', sa.String(length=64), nullable=False),
+    sa.Column('event_type', sa.String(length=64), nullable=False),
+    sa.Column('bot_id', sa.Uuid(), nullable=False),
+    sa.Column('payload', sa.JSON(), nullable=False),
+    sa.Column('status', sa.Enum('PENDING', 'DELIVERED', 'DEAD', name='deliverystatus'), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+    sa.Column('last_status_code', sa.Integer(), nullable=True),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('delivered_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['bot_id'], ['bots.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('event_id')
+    )
+    op.create_index(op.f('ix_webhook_deliveries_bot_id'), 'webhook_deliveries', ['bot_id'], unique=False)
+    op.create_index('ix_webhook_deliveries_status_next_attempt', 'webhook_deliveries', ['status', 'next_attempt_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_webhook_deliveries_status_next_attempt', table_name='webhook_deliveries')
+    op.drop_index(op.f('ix_webhook_deliveries_bot_id'), table_name='webhook_deliveries')
+    op.drop_table('webhook_deliveries')
+    sa.Enum(name='deliverystatus').drop(op.get_bind(), checkfirst=True)
+    op.drop_column('bots', 'webhook_secret')
@@ -0,0 +1,43 @@
+"""Add bot_activities table partitioned by day
+
+Revision ID: 8b5717e54a86
+Revises: 54385acfcc47
+Create Date: 2026-10-19 09:12:40.318206
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b5717e54a86'
+down_revision: Union[str, Sequence[str], None] = '54385acfcc47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Daily partitions are created ahead of time by the application
+    # (app.services.activities.PartitionManager)
+    op.create_table('bot_activities',
+    sa.Column('id', sa.Uuid(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('bot_id', sa.Uuid(), nullable=False),
+    sa.Column('activity_type', sa.String(length=50), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('metadata', sa.JSON(), nullable=True),
+    sa.Column('tokens_used', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['bot_id'], ['bots.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id', 'created_at'),
+    postgresql_partition_by='RANGE (created_at)'
+    )
+    op.create_index('ix_bot_activities_bot_id_created_at', 'bot_activities', ['bot_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_bot_activities_bot_id_created_at', table_name='bot_activities')
+    op.drop_table('bot_activities')
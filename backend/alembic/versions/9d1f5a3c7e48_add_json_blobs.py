@@ -0,0 +1,92 @@
+"""Add json_blobs and move skill content out of the skills table
+
+Revision ID: 9d1f5a3c7e48
+Revises: e2d64f1c8b37
+Create Date: 2026-10-19 16:02:41.518307
+
+"""
+import hashlib
+import json
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d1f5a3c7e48'
+down_revision: Union[str, Sequence[str], None] = 'e2d64f1c8b37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _canonical(data) -> bytes:
+    # 与 app/services/json_blobs.canonical_json 保持一致
+    return json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('json_blobs',
+    sa.Column('hash', sa.String(length=64), nullable=False),
+    sa.Column('data', sa.JSON(), nullable=False),
+    sa.Column('size', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('hash')
+    )
+    op.add_column('skills', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.create_foreign_key('fk_skills_content_hash', 'skills', 'json_blobs', ['content_hash'], ['hash'])
+    op.add_column('bots', sa.Column('capabilities_ref', sa.String(length=64), nullable=True))
+    op.create_foreign_key('fk_bots_capabilities_ref', 'bots', 'json_blobs', ['capabilities_ref'], ['hash'])
+
+    # 已有技能内容按哈希去重写入 json_blobs；大的能力描述在下次更新时外存
+    if context.is_offline_mode():
+        _backfill_offline()
+    else:
+        _backfill_online(op.get_bind())
+    op.drop_column('skills', 'content')
+
+
+def _backfill_online(conn) -> None:
+    skills = sa.table('skills', sa.column('id', sa.Uuid()), sa.column('content', sa.JSON()),
+                      sa.column('content_hash', sa.String()))
+    blobs = sa.table('json_blobs', sa.column('hash', sa.String()), sa.column('data', sa.JSON()),
+                     sa.column('size', sa.Integer()), sa.column('created_at', sa.DateTime()))
+    seen = set()
+    for skill_id, content in conn.execute(sa.select(skills.c.id, skills.c.content).where(skills.c.content.isnot(None))):
+        raw = _canonical(content)
+        digest = hashlib.sha256(raw).hexdigest()
+        if digest not in seen:
+            conn.execute(blobs.insert().values(hash=digest, data=content, size=len(raw), created_at=sa.func.now()))
+            seen.add(digest)
+        conn.execute(skills.update().where(skills.c.id == skill_id).values(content_hash=digest))
+
+
+def _backfill_offline() -> None:
+    # --sql 时读不到已有数据，只能用 SQL 在数据库里算哈希（PostgreSQL 11+）。
+    # 这里哈希的是存储的 JSON 文本而不是规范化 JSON，之后写入的相同内容会另存一份，不影响读取
+    if context.get_context().dialect.name != 'postgresql':
+        raise RuntimeError(
+            'Offline SQL for this migration is only supported on PostgreSQL; run it online to backfill json_blobs'
+        )
+    digest = "encode(sha256(convert_to(content::text, 'UTF8')), 'hex')"
+    op.execute(
+        'INSERT INTO json_blobs (hash, data, size, created_at) '
+        'SELECT DISTINCT ON (hash) hash, content, size, now() FROM ('
+        f'SELECT {digest} AS hash, content, octet_length(content::text) AS size '
+        'FROM skills WHERE content IS NOT NULL) AS s'
+    )
+    op.execute(f'UPDATE skills SET content_hash = {digest} WHERE content IS NOT NULL')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.add_column('skills', sa.Column('content', sa.JSON(), nullable=True))
+    op.execute(
+        'UPDATE skills SET content = (SELECT data FROM json_blobs WHERE json_blobs.hash = skills.content_hash)'
+    )
+    op.drop_constraint('fk_bots_capabilities_ref', 'bots', type_='foreignkey')
+    op.drop_column('bots', 'capabilities_ref')
+    op.drop_constraint('fk_skills_content_hash', 'skills', type_='foreignkey')
+    op.drop_column('skills', 'content_hash')
+    op.drop_table('json_blobs')
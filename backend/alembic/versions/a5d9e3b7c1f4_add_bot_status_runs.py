@@ -0,0 +1,41 @@
+"""Add bot_status_runs table
+
+Revision ID: a5d9e3b7c1f4
+Revises: f3a8d1e6c205
+Create Date: 2026-10-19 21:02:37.418265
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a5d9e3b7c1f4'
+down_revision: Union[str, Sequence[str], None] = 'f3a8d1e6c205'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('bot_status_runs',
+    sa.Column('id', sa.Uuid(), nullable=False),
+    sa.Column('bot_id', sa.Uuid(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('started_at', sa.DateTime(), nullable=False),
+    sa.Column('last_seen_at', sa.DateTime(), nullable=False),
+    sa.Column('ended_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['bot_id'], ['bots.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_bot_status_runs_bot_id_started_at', 'bot_status_runs', ['bot_id', 'started_at'], unique=False)
+    op.create_index('ix_bot_status_runs_bot_id_ended_at', 'bot_status_runs', ['bot_id', 'ended_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_bot_status_runs_bot_id_ended_at', table_name='bot_status_runs')
+    op.drop_index('ix_bot_status_runs_bot_id_started_at', table_name='bot_status_runs')
+    op.drop_table('bot_status_runs')
@@ -0,0 +1,65 @@
+"""Add skills and skill_daily_stats tables
+
+Revision ID: a7c3e91b5d20
+Revises: 5f2b8e0d9a14
+Create Date: 2026-10-19 14:02:51.660218
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c3e91b5d20'
+down_revision: Union[str, Sequence[str], None] = '5f2b8e0d9a14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('skills',
+    sa.Column('id', sa.Uuid(), nullable=False),
+    sa.Column('skill_id', sa.String(length=100), nullable=False),
+    sa.Column('name', sa.String(length=200), nullable=False),
+    sa.Column('author_bot_id', sa.Uuid(), nullable=True),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('tags', sa.JSON(), nullable=False),
+    sa.Column('version', sa.String(length=50), nullable=True),
+    sa.Column('icon_url', sa.String(length=500), nullable=True),
+    sa.Column('downloads', sa.Integer(), nullable=False),
+    sa.Column('rating', sa.Numeric(precision=3, scale=2), nullable=False),
+    sa.Column('rating_count', sa.Integer(), nullable=False),
+    sa.Column('content', sa.JSON(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['author_bot_id'], ['bots.id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_skills_author_bot_id'), 'skills', ['author_bot_id'], unique=False)
+    op.create_index('ix_skills_downloads', 'skills', ['downloads'], unique=False)
+    op.create_index('ix_skills_rating', 'skills', ['rating'], unique=False)
+    op.create_index(op.f('ix_skills_skill_id'), 'skills', ['skill_id'], unique=True)
+    op.create_table('skill_daily_stats',
+    sa.Column('skill_id', sa.Uuid(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('downloads', sa.Integer(), nullable=False),
+    sa.Column('rating_sum', sa.Integer(), nullable=False),
+    sa.Column('rating_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['skill_id'], ['skills.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('skill_id', 'day')
+    )
+    op.create_index('ix_skill_daily_stats_day', 'skill_daily_stats', ['day'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_skill_daily_stats_day', table_name='skill_daily_stats')
+    op.drop_table('skill_daily_stats')
+    op.drop_index(op.f('ix_skills_skill_id'), table_name='skills')
+    op.drop_index('ix_skills_rating', table_name='skills')
+    op.drop_index('ix_skills_downloads', table_name='skills')
+    op.drop_index(op.f('ix_skills_author_bot_id'), table_name='skills')
+    op.drop_table('skills')
@@ -0,0 +1,28 @@
+"""Add composite index for access grant permission lookups
+
+Revision ID: b6e0c2d94f71
+Revises: 9d1f5a3c7e48
+Create Date: 2026-10-19 16:40:12.730955
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6e0c2d94f71'
+down_revision: Union[str, Sequence[str], None] = '9d1f5a3c7e48'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_bot_access_grants_user_bot_active', 'bot_access_grants', ['user_id', 'bot_id', 'is_active'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_bot_access_grants_user_bot_active', table_name='bot_access_grants')
@@ -0,0 +1,66 @@
+"""Add tasks table
+
+Revision ID: c41d7a9e2f63
+Revises: 3e980b8b72a2
+Create Date: 2026-10-19 11:26:40.318205
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41d7a9e2f63'
+down_revision: Union[str, Sequence[str], None] = '3e980b8b72a2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('tasks',
+    sa.Column('id', sa.Uuid(), nullable=False),
+    sa.Column('task_id', sa.String(length=100), nullable=False),
+    sa.Column('title', sa.String(length=200), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('requester_id', sa.Uuid(), nullable=True),
+    sa.Column('target_bot_id', sa.Uuid(), nullable=True),
+    sa.Column('assigned_bot_id', sa.Uuid(), nullable=True),
+    sa.Column('status', sa.Enum('PENDING', 'RUNNING', 'COMPLETED', 'FAILED', 'CANCELLED', name='taskstatus'), nullable=False),
+    sa.Column('priority', sa.Enum('LOW', 'NORMAL', 'HIGH', 'URGENT', name='taskpriority'), nullable=False),
+    sa.Column('priority_rank', sa.Integer(), nullable=False),
+    sa.Column('required_capabilities', sa.JSON(), nullable=False),
+    sa.Column('params', sa.JSON(), nullable=True),
+    sa.Column('result', sa.JSON(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('max_attempts', sa.Integer(), nullable=False),
+    sa.Column('lease_expires_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('completed_at', sa.DateTime(), nullable=True),
+    sa.Column('deadline', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['assigned_bot_id'], ['bots.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['requester_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['target_bot_id'], ['bots.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_tasks_assigned_bot_id'), 'tasks', ['assigned_bot_id'], unique=False)
+    op.create_index(op.f('ix_tasks_requester_id'), 'tasks', ['requester_id'], unique=False)
+    op.create_index('ix_tasks_status_lease_expires', 'tasks', ['status', 'lease_expires_at'], unique=False)
+    op.create_index('ix_tasks_status_priority_created', 'tasks', ['status', 'priority_rank', 'created_at'], unique=False)
+    op.create_index(op.f('ix_tasks_task_id'), 'tasks', ['task_id'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_tasks_task_id'), table_name='tasks')
+    op.drop_index('ix_tasks_status_priority_created', table_name='tasks')
+    op.drop_index('ix_tasks_status_lease_expires', table_name='tasks')
+    op.drop_index(op.f('ix_tasks_requester_id'), table_name='tasks')
+    op.drop_index(op.f('ix_tasks_assigned_bot_id'), table_name='tasks')
+    op.drop_table('tasks')
+    sa.Enum(name='taskpriority').drop(op.get_bind(), checkfirst=True)
+    sa.Enum(name='taskstatus').drop(op.get_bind(), checkfirst=True)
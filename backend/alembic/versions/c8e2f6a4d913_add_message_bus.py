@@ -0,0 +1,54 @@
+"""Add message bus tables
+
+Revision ID: c8e2f6a4d913
+Revises: a5d9e3b7c1f4
+Create Date: 2026-10-19 22:41:09.530217
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8e2f6a4d913'
+down_revision: Union[str, Sequence[str], None] = 'a5d9e3b7c1f4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('bus_subscriptions',
+    sa.Column('bot_id', sa.Uuid(), nullable=False),
+    sa.Column('topic', sa.String(length=128), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['bot_id'], ['bots.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('bot_id', 'topic')
+    )
+    op.create_index('ix_bus_subscriptions_topic', 'bus_subscriptions', ['topic'], unique=False)
+    op.create_table('bus_messages',
+    sa.Column('id', sa.Uuid(), nullable=False),
+    sa.Column('recipient_id', sa.Uuid(), nullable=False),
+    sa.Column('topic', sa.String(length=128), nullable=True),
+    sa.Column('sender', sa.String(length=255), nullable=False),
+    sa.Column('payload', sa.JSON(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.Column('visible_at', sa.DateTime(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['recipient_id'], ['bots.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_bus_messages_recipient_visible_at', 'bus_messages', ['recipient_id', 'visible_at'], unique=False)
+    op.create_index('ix_bus_messages_expires_at', 'bus_messages', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_bus_messages_expires_at', table_name='bus_messages')
+    op.drop_index('ix_bus_messages_recipient_visible_at', table_name='bus_messages')
+    op.drop_table('bus_messages')
+    op.drop_index('ix_bus_subscriptions_topic', table_name='bus_subscriptions')
+    op.drop_table('bus_subscriptions')
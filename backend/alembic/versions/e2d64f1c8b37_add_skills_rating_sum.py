@@ -0,0 +1,30 @@
+"""Add skills.rating_sum for buffered rating counters
+
+Revision ID: e2d64f1c8b37
+Revises: a7c3e91b5d20
+Create Date: 2026-10-19 15:10:27.402186
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2d64f1c8b37'
+down_revision: Union[str, Sequence[str], None] = 'a7c3e91b5d20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('skills', sa.Column('rating_sum', sa.BigInteger(), server_default='0', nullable=False))
+    # 已有评分按平均分还原总和
+    op.execute('UPDATE skills SET rating_sum = ROUND(rating * rating_count)')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('skills', 'rating_sum')
@@ -0,0 +1,28 @@
+"""Add access grant expiry index
+
+Revision ID: f3a8d1e6c205
+Revises: b6e0c2d94f71
+Create Date: 2026-10-19 17:18:55.204613
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a8d1e6c205'
+down_revision: Union[str, Sequence[str], None] = 'b6e0c2d94f71'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_bot_access_grants_active_valid_until', 'bot_access_grants', ['is_active', 'valid_until'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_bot_access_grants_active_valid_until', table_name='bot_access_grants')
@@ -0,0 +1,48 @@
+"""
+BotHub 活动日志 - API 路由
+高频上报接口：只做校验和入队，立即返回 202
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+
+from app.database import get_db
+from app.schemas.activity import ActivityBatch, ActivityBatchAccepted
+from app.services.activities import activity_ingestor
+
+router = APIRouter(tags=["activities"])
+
+
+@router.post(
+    "/bots/{bot_id}/activities",
+    response_model=ActivityBatchAccepted,
+    status_code=status.HTTP_202_ACCEPTED
+)
+def ingest_activities(
+    bot_id: str,
+    batch: ActivityBatch,
+    db: Session = Depends(get_db)
+):
+    """
+    批量上报机器人活动日志
+
+    事件先进入内存缓冲区，由后台任务批量写入数据库；
+    缓冲区已满时返回 503 和 Retry-After，客户端应稍后重试；
+    created_at 太旧或太远的未来时返回 422，整批都不接收。
+    """
+    bot_uuid = activity_ingestor.resolve_bot(db, bot_id)
+    if bot_uuid is None:
+        raise HTTPException(404, f"Bot with bot_id '{bot_id}' not found")
+
+    try:
+        accepted = activity_ingestor.submit(bot_uuid, batch.activities)
+    except ValueError as e:
+        raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY, str(e))
+    if not accepted:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Activity buffer is full, retry later",
+            headers={"Retry-After": "1"}
+        )
+
+    return ActivityBatchAccepted(accepted=len(batch.activities))
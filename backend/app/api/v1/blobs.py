@@ -0,0 +1,213 @@
+"""
+BotHub Blob 服务 - API 路由
+头像等静态文件的下载，支持零拷贝发送、Range 请求和条件请求
+"""
+
+from pathlib import Path
+from typing import Optional, Tuple
+
+import anyio
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import Response
+from starlette.types import Receive, Scope, Send
+
+from app.services.storage import LocalBlobStore, get_blob_store
+
+router = APIRouter(prefix="/blobs", tags=["blobs"])
+
+# blob 按内容寻址、永不改变，可以让浏览器和 CDN 缓存一年
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+# blob 和 API 同源：禁止浏览器猜测类型，也不允许其中的内容执行脚本或加载资源
+SECURITY_HEADERS = {
+    "x-content-type-options": "nosniff",
+    "content-security-policy": "default-src 'none'",
+}
+ZEROCOPY_EXTENSION = "http.response.zerocopysend"
+
+
+class BlobFileResponse(Response):
+    """
+    文件响应
+
+    服务器支持 ASGI zero-copy 扩展时直接交给 sendfile 发送，
+    否则在线程池中分块读取，不会阻塞事件循环。
+    """
+
+    chunk_size = 64 * 1024
+
+    def __init__(
+        self,
+        path: Path,
+        start: int,
+        end: int,
+        status_code: int,
+        headers: dict,
+        media_type: str,
+        send_body: bool = True,
+    ):
+        super().__init__(status_code=status_code, headers=headers, media_type=media_type)
+        self.path = path
+        self.start = start
+        self.count = end - start + 1
+        self.send_body = send_body
+        self.headers["content-length"] = str(self.count)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers,
+        })
+        if not self.send_body:
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        if ZEROCOPY_EXTENSION in scope.get("extensions", {}):
+            with open(self.path, "rb") as f:
+                await send({
+                    "type": ZEROCOPY_EXTENSION,
+                    "file": f,
+                    "offset": self.start,
+                    "count": self.count,
+                    "more_body": False,
+                })
+            return
+
+        async with await anyio.open_file(self.path, mode="rb") as f:
+            await f.seek(self.start)
+            remaining = self.count
+            while remaining > 0:
+                chunk = await f.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({
+                    "type": "http.response.body",
+                    "body": chunk,
+                    "more_body": remaining > 0,
+                })
+        if remaining > 0:
+            # 文件在发送过程中被截断，结束响应体
+            await send({"type": "http.response.body", "body": b""})
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    解析单段 Range 头，返回 (start, end)，两端均包含
+
+    没有 Range 头或格式不支持（如多段）时返回 None，按完整响应处理；
+    范围无法满足时抛出 416。
+    """
+    if not header or not header.startswith("bytes="):
+        return None
+    spec = header[len("bytes="):].strip()
+    if "," in spec or "-" not in spec:
+        return None
+
+    first, last = spec.split("-", 1)
+    try:
+        if first == "":
+            # bytes=-N 表示最后 N 个字节
+            suffix = int(last)
+            if suffix <= 0:
+                raise ValueError
+            start, end = max(size - suffix, 0), size - 1
+        else:
+            start = int(first)
+            end = int(last) if last else size - 1
+            end = min(end, size - 1)
+    except ValueError:
+        return None
+
+    if start >= size or start > end:
+        raise HTTPException(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+    return start, end
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    """If-None-Match 比较（弱比较）"""
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return etag in candidates
+
+
+@router.api_route("/{blob_id}", methods=["GET", "HEAD"])
+async def get_blob(
+    blob_id: str,
+    request: Request,
+    store: LocalBlobStore = Depends(get_blob_store)
+):
+    """
+    下载 blob
+
+    - 响应带基于内容哈希的 ETag 和 immutable 缓存头
+    - 支持 If-None-Match（304）和单段 Range（206）
+    - 小文件热点走内存缓存
+    - 带 nosniff 和 default-src 'none' 的 CSP，上传的内容不能在 API 源上执行
+    """
+    found = store.stat(blob_id)
+    if not found:
+        raise HTTPException(404, "Blob not found")
+    path, size = found
+
+    etag = store.etag(blob_id)
+    headers = {
+        "etag": etag,
+        "cache-control": CACHE_CONTROL,
+        "accept-ranges": "bytes",
+        **SECURITY_HEADERS,
+    }
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    byte_range = None
+    if_range = request.headers.get("if-range")
+    if if_range is None or if_range.strip() == etag:
+        byte_range = parse_range(request.headers.get("range"), size)
+
+    status_code = status.HTTP_200_OK
+    start, end = 0, size - 1
+    if byte_range:
+        start, end = byte_range
+        status_code = status.HTTP_206_PARTIAL_CONTENT
+        headers["content-range"] = f"bytes {start}-{end}/{size}"
+
+    media_type = store.media_type(blob_id)
+    send_body = request.method != "HEAD"
+
+    cache = store.hot_cache
+    if cache is not None and size > 0:
+        data = cache.get(blob_id)
+        if data is None and cache.should_admit(blob_id, size):
+            data = await anyio.to_thread.run_sync(path.read_bytes)
+            cache.put(blob_id, data)
+        if data is not None:
+            body = data[start:end + 1] if send_body else b""
+            response = Response(
+                content=body,
+                status_code=status_code,
+                headers=headers,
+                media_type=media_type,
+            )
+            response.headers["content-length"] = str(end - start + 1)
+            return response
+
+    if size == 0:
+        return Response(status_code=status_code, headers=headers, media_type=media_type)
+
+    return BlobFileResponse(
+        path=path,
+        start=start,
+        end=end,
+        status_code=status_code,
+        headers=headers,
+        media_type=media_type,
+        send_body=send_body,
+    )
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
@@ -12,11 +12,30 @@ from app.schemas.bot import (
     BotCreate,
     BotUpdate,
     BotHeartbeat,
+    BotHeartbeatResponse,
     BotResponse,
     BotListResponse,
+    BotPermissionsResponse,
+    BotStatsResponse,
+    BotSearchResponse,
+    FacetCount,
     BotFilterParams
 )
+from app.schemas.task import TaskLease
 from app.core.deps import get_current_user_id_optional, get_current_user_id
+from app.core.metrics import heartbeats
+from app.core.plugins import plugins
+from app.services.activities import activity_ingestor
+from app.services.bot_search import bot_search
+from app.services.bot_stats import bot_stats
+from app.services.heartbeats import apply_heartbeat
+from app.services.json_blobs import set_capabilities
+from app.services.permissions import permission_engine
+from app.services.presence import record_heartbeat, remove_bot
+from app.services.routing import bot_index
+from app.services.status_history import record_status
+from app.services.tasks import lease_tasks, renew_leases
+from app.services.webhooks import generate_webhook_secret
 
 router = APIRouter(prefix="/bots", tags=["bots"])
 
@@ -52,11 +71,12 @@ def register_bot(
         bot_name=bot_data.bot_name,
         owner_id=bot_data.owner_id,
         description=bot_data.description,
-        capabilities=bot_data.capabilities,
         endpoint=bot_data.endpoint,
+        webhook_secret=generate_webhook_secret(),
         version=bot_data.version,
         status="offline"
     )
+    set_capabilities(db, db_bot, bot_data.capabilities)
 
     db.add(db_bot)
     db.commit()
@@ -65,16 +85,25 @@ def register_bot(
     return db_bot
 
 
-@router.post("/{bot_id}/heartbeat", response_model=BotResponse)
+@router.post("/{bot_id}/heartbeat", response_model=BotHeartbeatResponse)
 def bot_heartbeat(
     bot_id: str,
     heartbeat: BotHeartbeat,
-    db: Session = Depends(get_db)
-) -> Bot:
+    db: Session = Depends(get_db),
+    current_user_id: Optional[UUID] = Depends(get_current_user_id_optional)
+) -> BotHeartbeatResponse:
     """
     Report bot heartbeat.
 
-    Updates the bot's status and last heartbeat timestamp.
+    Updates the bot's last heartbeat timestamp, and its status, capabilities
+    and version when they differ from the stored ones, refreshes the
+    routing index with **current_load** / **active_tasks**, and renews the
+    leases of tasks the bot is running. With **max_tasks** > 0 an online bot
+    also leases up to that many pending tasks, returned in **pending_tasks**,
+    so bots do not need to poll for work separately; leasing requires the
+    bot owner's token. Status changes are
+    appended to the bot's status history, served by the uptime endpoints.
+    Installed plugins' heartbeat hooks run after the heartbeat is committed.
     """
     db_bot = db.query(Bot).filter(Bot.bot_id == bot_id).first()
 
@@ -83,21 +112,42 @@ def bot_heartbeat(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Bot with bot_id '{bot_id}' not found"
         )
+    if heartbeat.max_tasks and db_bot.owner_id != current_user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only bot owner can lease tasks as this bot"
+        )
 
-    # Update bot status and heartbeat
-    db_bot.status = heartbeat.status
-    db_bot.last_heartbeat_at = datetime.utcnow()
+    heartbeats.labels(heartbeat.status).inc()
 
-    if heartbeat.capabilities is not None:
-        db_bot.capabilities = heartbeat.capabilities
+    # Status history reads the previous status and heartbeat time off the bot
+    now = datetime.utcnow()
+    record_status(db, db_bot, heartbeat.status, now)
 
-    if heartbeat.version is not None:
-        db_bot.version = heartbeat.version
+    # Only fields that actually changed are written; otherwise just the liveness timestamp
+    changed = apply_heartbeat(db, db_bot, heartbeat.status, heartbeat.capabilities, heartbeat.version, now)
+
+    renew_leases(db, db_bot)
+
+    # Leasing commits the heartbeat together with the leased tasks
+    leased = []
+    if heartbeat.max_tasks and heartbeat.status == "online":
+        leased = lease_tasks(db, db_bot, heartbeat.max_tasks)
+    else:
+        db.commit()
 
-    db.commit()
     db.refresh(db_bot)
+    active_tasks = heartbeat.active_tasks
+    if active_tasks is not None:
+        active_tasks += len(leased)
+    record_heartbeat(db_bot.id, heartbeat.status, db_bot.capabilities, heartbeat.current_load, active_tasks)
+    if active_tasks is None and leased:
+        bot_index.note_assigned(db_bot.id, len(leased))
+    plugins.run_heartbeat_hooks(db_bot, changed)
 
-    return db_bot
+    response = BotHeartbeatResponse.model_validate(db_bot)
+    response.pending_tasks = [TaskLease.model_validate(task) for task in leased]
+    return response
 
 
 @router.get("", response_model=BotListResponse)
@@ -154,14 +204,89 @@ def list_bots(
     }
 
 
+@router.get("/search", response_model=BotSearchResponse)
+def search_bots(
+    q: Optional[str] = Query(None, max_length=200, description="Search in bot_name and description"),
+    status: Optional[str] = Query(None, description="Filter by status"),
+    owner_id: Optional[UUID] = Query(None, description="Filter by owner"),
+    version: Optional[str] = Query(None, description="Filter by version"),
+    capability: List[str] = Query([], description="Require every listed capability"),
+    page: int = Query(1, ge=1, description="Page number"),
+    page_size: int = Query(20, ge=1, le=100, description="Items per page"),
+    facet_size: int = Query(10, ge=1, le=100, description="Values returned per facet"),
+    db: Session = Depends(get_db),
+    current_user_id: Optional[UUID] = Depends(get_current_user_id_optional)
+) -> dict:
+    """
+    Search bots and count the matches per facet.
+
+    Returns a page of matching bots in registration order, plus counts for
+    the **status**, **owner**, **version** and **capability** facets. The
+    status, owner and version counts ignore that facet's own filter, so a
+    client can show the alternatives next to the selected value; capability
+    counts are within the current matches. Filtering and counting run on an
+    in-memory bitmap index; only the returned page is read from the database.
+    """
+    filters = {}
+    if status:
+        filters["status"] = status
+    if owner_id:
+        filters["owner"] = str(owner_id)
+    if version:
+        filters["version"] = version
+    result = bot_search.search(
+        db,
+        query=q,
+        filters=filters,
+        capabilities=capability,
+        offset=(page - 1) * page_size,
+        limit=page_size,
+        facet_size=facet_size,
+    )
+
+    bots = {}
+    if result.bot_uuids:
+        bots = {bot.id: bot for bot in db.query(Bot).filter(Bot.id.in_(result.bot_uuids))}
+
+    return {
+        "items": [bots[bot_uuid] for bot_uuid in result.bot_uuids if bot_uuid in bots],
+        "total": result.total,
+        "page": page,
+        "page_size": page_size,
+        "pages": (result.total + page_size - 1) // page_size,
+        "facets": {
+            facet: [FacetCount(value=value, count=count) for value, count in counts]
+            for facet, counts in result.facets.items()
+        },
+    }
+
+
+@router.get("/stats", response_model=BotStatsResponse)
+def get_bot_stats(
+    top_owners: int = Query(20, ge=0, le=100, description="Number of owners listed in by_owner"),
+    db: Session = Depends(get_db)
+) -> dict:
+    """
+    Get bot counts by status, owner, version and claim state.
+
+    Counts are loaded with one grouped query and then kept up to date by
+    registrations, heartbeats, claims and deletions; they are reloaded
+    from the database at most every BOT_STATS_CACHE_TTL seconds.
+    """
+    return bot_stats.snapshot(db, top_owners)
+
+
 @router.get("/{bot_id}", response_model=BotResponse)
 def get_bot(
     bot_id: str,
     db: Session = Depends(get_db),
     current_user_id: Optional[UUID] = Depends(get_current_user_id_optional)
-) -> Bot:
+) -> BotResponse:
     """
     Get bot details by bot_id.
+
+    Unlike list responses, large capabilities stored out of line are
+    loaded here and returned in full.
     """
     db_bot = db.query(Bot).filter(Bot.bot_id == bot_id).first()
 
@@ -171,7 +296,37 @@ def get_bot(
             detail=f"Bot with bot_id '{bot_id}' not found"
         )
 
-    return db_bot
+    response = BotResponse.model_validate(db_bot)
+    if db_bot.capabilities_ref is not None:
+        response.capabilities = db_bot.full_capabilities
+    return response
+
+
+@router.get("/{bot_id}/permissions", response_model=BotPermissionsResponse)
+def get_bot_permissions(
+    bot_id: str,
+    db: Session = Depends(get_db),
+    current_user_id: UUID = Depends(get_current_user_id)
+) -> BotPermissionsResponse:
+    """
+    Get the current user's effective permissions on a bot.
+
+    Owners have every permission; other users get the union of their
+    active, unexpired access grants.
+    """
+    db_bot = db.query(Bot).filter(Bot.bot_id == bot_id).first()
+
+    if not db_bot:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Bot with bot_id '{bot_id}' not found"
+        )
+
+    return BotPermissionsResponse(
+        bot_id=db_bot.bot_id,
+        is_owner=db_bot.owner_id == current_user_id,
+        permissions=sorted(permission_engine.effective_permissions(db, current_user_id, db_bot))
+    )
 
 
 @router.patch("/{bot_id}", response_model=BotResponse)
@@ -194,6 +349,8 @@ def update_bot(
 
     # Update fields
     update_data = bot_update.model_dump(exclude_unset=True)
+    if "capabilities" in update_data:
+        set_capabilities(db, db_bot, update_data.pop("capabilities"))
     for field, value in update_data.items():
         setattr(db_bot, field, value)
 
@@ -222,5 +379,9 @@ def delete_bot(
             detail=f"Bot with bot_id '{bot_id}' not found"
         )
 
+    bot_uuid = db_bot.id
     db.delete(db_bot)
     db.commit()
+
+    activity_ingestor.forget_bot(bot_id)
+    remove_bot(bot_uuid)
@@ -0,0 +1,191 @@
+"""
+BotHub 消息总线 - API 路由
+机器人订阅主题、向主题发布或直接发给其他机器人，长轮询取出消息并确认
+
+所有接口都以路径中的机器人身份操作，只有该机器人的所有者可以调用；
+消息的发送方就是这个机器人。直接发送还需要对接收方有调用权限（所有者或 can_invoke 授权）。
+"""
+
+import json
+from typing import Any, List
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.core.deps import get_current_user_id
+from app.database import SessionLocal, get_db
+from app.models.bot import Bot
+from app.schemas.bus import (
+    BusMessageResponse,
+    MessageAccepted,
+    MessageAck,
+    MessageAckResult,
+    MessagePublish,
+    MessageSend,
+    SubscriptionList,
+    SubscriptionRequest,
+)
+from app.services.message_bus import get_bus, new_envelope
+from app.services.permissions import PERMISSION_INVOKE, permission_engine
+
+router = APIRouter(prefix="/bus", tags=["bus"])
+
+
+def _get_bot(db: Session, bot_id: str) -> Bot:
+    bot = db.query(Bot).filter(Bot.bot_id == bot_id).first()
+    if not bot:
+        raise HTTPException(404, f"Bot with bot_id '{bot_id}' not found")
+    return bot
+
+
+def _acting_bot(db: Session, bot_id: str, user_id: UUID) -> Bot:
+    """当前用户以 bot_id 的身份操作，必须是它的所有者"""
+    bot = _get_bot(db, bot_id)
+    if bot.owner_id != user_id:
+        raise HTTPException(403, "Only bot owner can use the message bus as this bot")
+    return bot
+
+
+def _check_payload(payload: Any) -> None:
+    size = len(json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode())
+    if size > settings.BUS_MAX_PAYLOAD_BYTES:
+        raise HTTPException(
+            status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            f"Payload is {size} bytes, limit is {settings.BUS_MAX_PAYLOAD_BYTES}"
+        )
+
+
+@router.get("/bots/{bot_id}/subscriptions", response_model=SubscriptionList)
+def list_subscriptions(
+    bot_id: str,
+    db: Session = Depends(get_db),
+    current_user_id: UUID = Depends(get_current_user_id)
+):
+    """机器人订阅的主题"""
+    bot = _acting_bot(db, bot_id, current_user_id)
+    return SubscriptionList(topics=get_bus().subscriptions(bot.id))
+
+
+@router.post("/bots/{bot_id}/subscriptions", response_model=SubscriptionList)
+def subscribe(
+    bot_id: str,
+    subscription: SubscriptionRequest,
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user_id: UUID = Depends(get_current_user_id)
+):
+    """订阅主题（重复订阅不报错），返回全部订阅"""
+    bus = get_bus()
+    bot = _acting_bot(db, bot_id, current_user_id)
+    if bus.subscribe(bot.id, subscription.topic):
+        response.status_code = status.HTTP_201_CREATED
+    return SubscriptionList(topics=bus.subscriptions(bot.id))
+
+
+@router.delete("/bots/{bot_id}/subscriptions/{topic}", status_code=status.HTTP_204_NO_CONTENT)
+def unsubscribe(
+    bot_id: str,
+    topic: str,
+    db: Session = Depends(get_db),
+    current_user_id: UUID = Depends(get_current_user_id)
+):
+    """取消订阅"""
+    bot = _acting_bot(db, bot_id, current_user_id)
+    if not get_bus().unsubscribe(bot.id, topic):
+        raise HTTPException(404, f"Bot '{bot_id}' is not subscribed to '{topic}'")
+
+
+@router.post(
+    "/bots/{bot_id}/publish",
+    response_model=MessageAccepted,
+    status_code=status.HTTP_202_ACCEPTED
+)
+def publish_to_topic(
+    bot_id: str,
+    message: MessagePublish,
+    db: Session = Depends(get_db),
+    current_user_id: UUID = Depends(get_current_user_id)
+):
+    """
+    以机器人的身份向主题发布消息，扇出给每个订阅者
+
+    收件箱已满的订阅者被跳过并计入 rejected，不影响其他订阅者。
+    """
+    _check_payload(message.payload)
+    sender = _acting_bot(db, bot_id, current_user_id)
+    bus = get_bus()
+    subscribers = bus.subscribers(message.topic)
+    rejected = bus.send(subscribers, new_envelope(sender.bot_id, message.payload, message.topic))
+    return MessageAccepted(delivered=len(subscribers) - len(rejected), rejected=len(rejected))
+
+
+@router.post(
+    "/bots/{bot_id}/send",
+    response_model=MessageAccepted,
+    status_code=status.HTTP_202_ACCEPTED
+)
+def send_to_bot(
+    bot_id: str,
+    message: MessageSend,
+    db: Session = Depends(get_db),
+    current_user_id: UUID = Depends(get_current_user_id)
+):
+    """
+    以机器人的身份直接发给另一个机器人
+
+    当前用户需要有接收方的调用权限（所有者或 can_invoke 授权）。
+    接收者的收件箱已满时返回 429 和 Retry-After，发送方应稍后重试。
+    """
+    _check_payload(message.payload)
+    sender = _acting_bot(db, bot_id, current_user_id)
+    recipient = _get_bot(db, message.to)
+    if not permission_engine.can(db, current_user_id, recipient, PERMISSION_INVOKE):
+        raise HTTPException(403, "No permission to invoke this bot")
+    if get_bus().send([recipient.id], new_envelope(sender.bot_id, message.payload)):
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"Inbox of '{message.to}' is full, retry later",
+            headers={"Retry-After": "1"}
+        )
+    return MessageAccepted(delivered=1)
+
+
+def _authorize_inbox(bot_id: str, user_id: UUID) -> UUID:
+    # 长轮询等待期间不占用连接：用单独的会话检查，等待前关闭
+    db = SessionLocal()
+    try:
+        return _acting_bot(db, bot_id, user_id).id
+    finally:
+        db.close()
+
+
+@router.get("/bots/{bot_id}/messages", response_model=List[BusMessageResponse])
+async def receive_messages(
+    bot_id: str,
+    max_messages: int = Query(100, ge=1, le=1000, alias="max"),
+    wait: float = Query(0, ge=0, description="收件箱为空时最多等待的秒数（不超过 BUS_MAX_WAIT）"),
+    current_user_id: UUID = Depends(get_current_user_id)
+):
+    """
+    长轮询取出消息
+
+    取出的消息需要在 BUS_ACK_TIMEOUT 秒内确认，否则会重新投递。
+    """
+    bot_uuid = await run_in_threadpool(_authorize_inbox, bot_id, current_user_id)
+    messages = await get_bus().fetch(bot_uuid, max_messages, min(wait, settings.BUS_MAX_WAIT))
+    return [BusMessageResponse(**message._asdict()) for message in messages]
+
+
+@router.post("/bots/{bot_id}/messages/ack", response_model=MessageAckResult)
+def ack_messages(
+    bot_id: str,
+    ack: MessageAck,
+    db: Session = Depends(get_db),
+    current_user_id: UUID = Depends(get_current_user_id)
+):
+    """确认处理完的消息；已确认或已过期的 id 会被忽略"""
+    bot = _acting_bot(db, bot_id, current_user_id)
+    return MessageAckResult(acked=get_bus().ack(bot.id, ack.ids))
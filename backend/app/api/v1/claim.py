@@ -11,6 +11,7 @@ from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, status
 from sqlalchemy.orm import Session
 from sqlalchemy import or_
+from starlette.concurrency import run_in_threadpool
 
 from app.database import get_db
 from app.models.bot import Bot, BotStatus
@@ -25,6 +26,9 @@ from app.schemas.claim import (
     NotificationCreate
 )
 from app.services.feishu import get_feishu_service
+from app.services.json_blobs import set_capabilities
+from app.services.storage import IMAGE_TYPES, get_blob_store, sniff_image
+from app.services.webhooks import EVENT_CLAIM_APPROVED, enqueue_event, generate_webhook_secret
 from app.core.deps import get_current_user, get_current_user_optional
 
 router = APIRouter(prefix="/claim", tags=["claim"])
@@ -60,13 +64,14 @@ def register_bot(
         feishu_app_id=bot_data.feishu_app_id,
         feishu_bot_id=bot_data.feishu_bot_id,
         description=bot_data.description,
-        capabilities=bot_data.capabilities,
         endpoint=bot_data.endpoint,
+        webhook_secret=generate_webhook_secret(),
         version=bot_data.version,
         status=BotStatus.UNCLAIMED,
         claim_code=claim_code,
         claim_code_expires_at=datetime.utcnow() + timedelta(days=7)  # 7天有效期
     )
+    set_capabilities(db, new_bot, bot_data.capabilities)
     
     db.add(new_bot)
     db.commit()
@@ -84,7 +89,8 @@ def register_bot(
         claim_code=claim_code,
         claim_url=claim_url,
         claim_code_expires_at=new_bot.claim_code_expires_at,
-        feishu_app_id=new_bot.feishu_app_id
+        feishu_app_id=new_bot.feishu_app_id,
+        webhook_secret=new_bot.webhook_secret
     )
 
 
@@ -95,7 +101,11 @@ async def upload_bot_avatar(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """上传机器人头像"""
+    """
+    上传机器人头像
+
+    只接受 PNG、JPEG、GIF、WebP，按文件头而不是客户端声明的类型判断，不超过 AVATAR_MAX_BYTES。
+    """
     bot = db.query(Bot).filter(Bot.bot_id == bot_id).first()
     if not bot:
         raise HTTPException(404, "Bot not found")
@@ -104,10 +114,27 @@ async def upload_bot_avatar(
     if bot.owner_id != current_user.id:
         raise HTTPException(403, "Only owner can upload avatar")
     
-    # TODO: 保存文件到OSS/S3
-    # 这里简化处理，实际应该上传到云存储
-    filename = f"avatars/{bot.id}_{file.filename}"
-    avatar_url = f"https://cdn.bothub.com/{filename}"
+    from app.config import settings
+    if settings.STORAGE_TYPE == "local":
+        if file.content_type not in IMAGE_TYPES:
+            raise HTTPException(400, "Avatar must be a PNG, JPEG, GIF or WebP image")
+        data = await file.read(settings.AVATAR_MAX_BYTES + 1)
+        if len(data) > settings.AVATAR_MAX_BYTES:
+            raise HTTPException(
+                status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                f"Avatar is larger than {settings.AVATAR_MAX_BYTES} bytes"
+            )
+        content_type = sniff_image(data)
+        if content_type is None:
+            raise HTTPException(400, "Avatar must be a PNG, JPEG, GIF or WebP image")
+        # 写文件是阻塞 IO，不占用事件循环
+        blob_id = await run_in_threadpool(get_blob_store().put, data, content_type)
+        avatar_url = f"/api/v1/blobs/{blob_id}"
+    else:
+        # TODO: 保存文件到OSS/S3
+        # 这里简化处理，实际应该上传到云存储
+        filename = f"avatars/{bot.id}_{file.filename}"
+        avatar_url = f"https://cdn.bothub.com/{filename}"
     
     bot.avatar_url = avatar_url
     db.commit()
@@ -253,7 +280,7 @@ def create_claim_request(
     # 4. 创建认领请求
     claim_request = ClaimRequest(
         bot_id=bot.id,
-        requester_id=current_user.id,
+        requester=current_user,
         claim_type=claim_type,
         message=claim_data.message,
         feishu_verified=feishu_verified,
@@ -341,6 +368,14 @@ def approve_claim_request(
             is_active=True
         )
         db.add(access_grant)
+
+        # 推送给机器人
+        enqueue_event(db, bot, EVENT_CLAIM_APPROVED, {
+            "request_id": str(claim_request.id),
+            "user_id": str(claim_request.requester_id),
+            "claim_type": claim_request.claim_type.value,
+            "permissions": access_grant.permissions,
+        })
         
         # 通知请求者
         send_approval_notification(bot, claim_request, True, db)
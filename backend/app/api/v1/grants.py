@@ -0,0 +1,60 @@
+"""
+BotHub 访问授权 - API 路由
+机器人所有者查看和撤销授权，被授权用户也可以主动放弃授权
+"""
+
+from typing import List
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from app.core.deps import get_current_user_id
+from app.database import get_db
+from app.models.bot import Bot
+from app.models.claim import BotAccessGrant
+from app.schemas.claim import AccessGrantResponse
+from app.services import grants as grant_service
+
+router = APIRouter(tags=["grants"])
+
+
+@router.get("/bots/{bot_id}/grants", response_model=List[AccessGrantResponse])
+def list_grants(
+    bot_id: str,
+    active_only: bool = Query(True, description="只返回有效的授权"),
+    db: Session = Depends(get_db),
+    current_user_id: UUID = Depends(get_current_user_id)
+):
+    """机器人的访问授权（仅所有者）"""
+    bot = db.query(Bot).filter(Bot.bot_id == bot_id).first()
+    if not bot:
+        raise HTTPException(404, f"Bot with bot_id '{bot_id}' not found")
+    if bot.owner_id != current_user_id:
+        raise HTTPException(403, "Only bot owner can view access grants")
+    query = db.query(BotAccessGrant).filter(BotAccessGrant.bot_id == bot.id)
+    if active_only:
+        query = query.filter(BotAccessGrant.is_active.is_(True))
+    return query.order_by(BotAccessGrant.created_at.desc()).all()
+
+
+@router.post("/grants/{grant_id}/revoke", response_model=AccessGrantResponse)
+def revoke_grant(
+    grant_id: UUID,
+    db: Session = Depends(get_db),
+    current_user_id: UUID = Depends(get_current_user_id)
+):
+    """
+    撤销授权（机器人所有者或被授权用户）
+
+    提交后所有进程的权限缓存随即失效，并向机器人推送 grant.revoked 事件。
+    """
+    grant = db.query(BotAccessGrant).filter(BotAccessGrant.id == grant_id).first()
+    if not grant:
+        raise HTTPException(404, "Access grant not found")
+    if current_user_id not in (grant.bot.owner_id, grant.user_id):
+        raise HTTPException(403, "Only bot owner or the grantee can revoke this grant")
+    try:
+        return grant_service.revoke_grant(db, grant)
+    except grant_service.GrantStateError as e:
+        raise HTTPException(409, str(e))
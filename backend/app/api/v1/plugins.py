@@ -0,0 +1,23 @@
+"""
+BotHub 插件 - API 路由
+列出已发现的插件扩展，以及各自的导入耗时和调用开销
+"""
+
+from typing import List
+
+from fastapi import APIRouter
+
+from app.core.plugins import plugins
+from app.schemas.plugin import PluginHookInfo
+
+router = APIRouter(prefix="/plugins", tags=["plugins"])
+
+
+@router.get("", response_model=List[PluginHookInfo])
+def list_plugins():
+    """
+    已发现的插件扩展
+
+    未使用过的扩展尚未导入（loaded 为 false），没有导入耗时。
+    """
+    return plugins.describe()
@@ -0,0 +1,152 @@
+"""
+BotHub 技能市场 - API 路由
+技能发布、浏览、下载、评分和排行榜
+"""
+
+from typing import Optional
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.core.deps import get_current_user_id
+from app.database import get_db
+from app.models.bot import Bot
+from app.models.skill import Skill
+from app.schemas.skill import (
+    SkillCreate, SkillPublishResponse, SkillResponse, SkillDetail, SkillListResponse,
+    SkillRatingCreate, LeaderboardItem, LeaderboardResponse
+)
+from app.services import skills as skill_service
+from app.services.leaderboard import leaderboard
+from app.services.skills import skill_counters
+
+router = APIRouter(prefix="/skills", tags=["skills"])
+
+
+def _get_skill(db: Session, skill_id: str) -> Skill:
+    skill = db.query(Skill).filter(Skill.skill_id == skill_id).first()
+    if not skill:
+        raise HTTPException(404, "Skill not found")
+    return skill
+
+
+def _with_pending(skill: Skill, schema=SkillResponse):
+    """叠加本进程尚未落盘的下载/评分计数"""
+    response = schema.model_validate(skill)
+    downloads, rating_sum, rating_count = skill_counters.pending(skill.id)
+    if downloads or rating_count:
+        response.downloads += downloads
+        response.rating_count += rating_count
+        if response.rating_count:
+            response.rating = round((skill.rating_sum + rating_sum) / response.rating_count, 2)
+    return response
+
+
+@router.post("", response_model=SkillPublishResponse, status_code=status.HTTP_201_CREATED)
+def publish_skill(
+    skill_data: SkillCreate,
+    db: Session = Depends(get_db),
+    current_user_id: UUID = Depends(get_current_user_id)
+):
+    """发布技能，作者机器人必须属于当前用户"""
+    author = None
+    if skill_data.author_bot_id:
+        author = db.query(Bot).filter(Bot.bot_id == skill_data.author_bot_id).first()
+        if not author:
+            raise HTTPException(404, f"Bot with bot_id '{skill_data.author_bot_id}' not found")
+        if author.owner_id != current_user_id:
+            raise HTTPException(403, "Only bot owner can publish skills as this bot")
+
+    skill_service.ensure_leaderboard(db)
+    skill = skill_service.create_skill(
+        db,
+        author,
+        **skill_data.model_dump(exclude={"author_bot_id"})
+    )
+    return SkillPublishResponse(
+        skill_id=skill.skill_id,
+        name=skill.name,
+        url=f"{settings.FRONTEND_URL}/skills/{skill.skill_id}"
+    )
+
+
+@router.get("", response_model=SkillListResponse)
+def list_skills(
+    search: Optional[str] = Query(None, description="按名称和描述搜索"),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    """技能列表（按发布时间倒序）"""
+    query = db.query(Skill)
+    if search:
+        pattern = f"%{search}%"
+        query = query.filter(Skill.name.ilike(pattern) | Skill.description.ilike(pattern))
+
+    total = query.count()
+    skills = query.order_by(Skill.created_at.desc()).offset((page - 1) * page_size).limit(page_size).all()
+    return {
+        "items": skills,
+        "total": total,
+        "page": page,
+        "page_size": page_size,
+        "pages": (total + page_size - 1) // page_size
+    }
+
+
+@router.get("/leaderboard", response_model=LeaderboardResponse)
+def get_leaderboard(
+    period: str = Query("week", pattern="^(day|week|month|all)$"),
+    metric: str = Query("downloads", pattern="^(downloads|rating)$"),
+    top: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    """
+    技能排行榜
+
+    - **period**: day / week / month（最近 1 / 7 / 30 天）或 all（累计）
+    - **metric**: downloads 或 rating（周期内平均分，评分次数不足的技能不参与）
+    """
+    skill_service.ensure_leaderboard(db)
+    items = [
+        LeaderboardItem(rank=rank, **{k: v for k, v in item.items() if k != "score"})
+        for rank, item in enumerate(leaderboard.top(period, metric, top), start=1)
+    ]
+    return LeaderboardResponse(period=period, metric=metric, items=items)
+
+
+@router.get("/{skill_id}", response_model=SkillResponse)
+def get_skill(
+    skill_id: str,
+    db: Session = Depends(get_db)
+):
+    """技能信息"""
+    return _with_pending(_get_skill(db, skill_id))
+
+
+@router.post("/{skill_id}/download", response_model=SkillDetail)
+def download_skill(
+    skill_id: str,
+    db: Session = Depends(get_db)
+):
+    """下载技能（返回完整内容并计入下载次数）"""
+    skill = _get_skill(db, skill_id)
+    skill_service.ensure_leaderboard(db)
+    skill_service.record_download(skill)
+    return _with_pending(skill, SkillDetail)
+
+
+@router.post("/{skill_id}/ratings", response_model=SkillResponse)
+def rate_skill(
+    skill_id: str,
+    rating: SkillRatingCreate,
+    db: Session = Depends(get_db),
+    current_user_id: UUID = Depends(get_current_user_id)
+):
+    """给技能评分（1-5）"""
+    skill = _get_skill(db, skill_id)
+    skill_service.ensure_leaderboard(db)
+    skill_service.rate_skill(skill, rating.rating)
+    return _with_pending(skill)
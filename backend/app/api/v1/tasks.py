@@ -0,0 +1,134 @@
+"""
+BotHub 任务系统 - API 路由
+用户提交/取消任务，机器人领取任务并上报结果
+
+领取和上报以请求中的机器人身份进行，只有该机器人的所有者可以调用（与心跳领取任务相同）。
+"""
+
+from typing import List
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+
+from app.core.deps import get_current_user_id
+from app.database import get_db
+from app.models.bot import Bot
+from app.models.task import Task
+from app.schemas.task import TaskCreate, TaskResponse, TaskLease, TaskLeaseRequest, TaskComplete
+from app.services import tasks as task_service
+from app.services.permissions import PERMISSION_INVOKE, permission_engine
+
+router = APIRouter(prefix="/tasks", tags=["tasks"])
+
+
+def _get_task(db: Session, task_id: str) -> Task:
+    task = db.query(Task).filter(Task.task_id == task_id).first()
+    if not task:
+        raise HTTPException(404, "Task not found")
+    return task
+
+
+def _get_bot(db: Session, bot_id: str) -> Bot:
+    bot = db.query(Bot).filter(Bot.bot_id == bot_id).first()
+    if not bot:
+        raise HTTPException(404, f"Bot with bot_id '{bot_id}' not found")
+    return bot
+
+
+def _acting_bot(db: Session, bot_id: str, user_id: UUID) -> Bot:
+    """当前用户以 bot_id 的身份领取或上报任务，必须是它的所有者"""
+    bot = _get_bot(db, bot_id)
+    if bot.owner_id != user_id:
+        raise HTTPException(403, "Only bot owner can lease or complete tasks as this bot")
+    return bot
+
+
+@router.post("", response_model=TaskResponse, status_code=status.HTTP_201_CREATED)
+def submit_task(
+    task_data: TaskCreate,
+    db: Session = Depends(get_db),
+    current_user_id: UUID = Depends(get_current_user_id)
+):
+    """
+    提交任务
+
+    - 指定 target_bot_id 时只有该机器人能领取，提交者需要有该机器人的调用权限（所有者或 can_invoke 授权）
+    - 否则由具备 required_capabilities 的任一机器人领取
+    """
+    target_bot = _get_bot(db, task_data.target_bot_id) if task_data.target_bot_id else None
+    if target_bot and not permission_engine.can(db, current_user_id, target_bot, PERMISSION_INVOKE):
+        raise HTTPException(403, "No permission to invoke this bot")
+    return task_service.create_task(
+        db,
+        title=task_data.title,
+        requester_id=current_user_id,
+        description=task_data.description,
+        priority=task_data.priority,
+        params=task_data.params,
+        required_capabilities=task_data.required_capabilities,
+        target_bot=target_bot,
+        deadline=task_data.deadline,
+        max_attempts=task_data.max_attempts,
+    )
+
+
+@router.post("/lease", response_model=List[TaskLease])
+def lease_tasks(
+    lease_request: TaskLeaseRequest,
+    db: Session = Depends(get_db),
+    current_user_id: UUID = Depends(get_current_user_id)
+):
+    """
+    机器人主动领取任务
+
+    一般不需要调用：心跳时带上 max_tasks 即可在心跳响应中拿到任务。
+    """
+    bot = _acting_bot(db, lease_request.bot_id, current_user_id)
+    return task_service.lease_tasks(db, bot, lease_request.max_tasks)
+
+
+@router.get("/{task_id}", response_model=TaskResponse)
+def get_task(
+    task_id: str,
+    db: Session = Depends(get_db)
+):
+    """获取任务详情"""
+    return _get_task(db, task_id)
+
+
+@router.post("/{task_id}/cancel", response_model=TaskResponse)
+def cancel_task(
+    task_id: str,
+    db: Session = Depends(get_db),
+    current_user_id: UUID = Depends(get_current_user_id)
+):
+    """取消任务（仅提交者）"""
+    task = _get_task(db, task_id)
+    if task.requester_id != current_user_id:
+        raise HTTPException(403, "Only the requester can cancel this task")
+    try:
+        return task_service.cancel_task(db, task)
+    except task_service.TaskStateError as e:
+        raise HTTPException(409, str(e))
+
+
+@router.post("/{task_id}/complete", response_model=TaskResponse)
+def complete_task(
+    task_id: str,
+    completion: TaskComplete,
+    db: Session = Depends(get_db),
+    current_user_id: UUID = Depends(get_current_user_id)
+):
+    """机器人上报任务结果（仅当前租约持有者）"""
+    task = _get_task(db, task_id)
+    bot = _acting_bot(db, completion.bot_id, current_user_id)
+    try:
+        return task_service.complete_task(
+            db, task, bot,
+            success=completion.success,
+            result=completion.result,
+            error=completion.error,
+        )
+    except task_service.TaskStateError as e:
+        raise HTTPException(409, str(e))
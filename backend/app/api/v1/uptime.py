@@ -0,0 +1,99 @@
+"""
+BotHub 在线率 - API 路由
+按机器人 / 所有者 / 全局返回在线时长与可用率，以及单个机器人的状态历史（游程编码）
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from app.database import get_db
+from app.schemas.bot import StatusHistoryResponse, StatusRunResponse, UptimeResponse
+from app.services.activities import activity_ingestor
+from app.services.status_history import status_history, uptime_report
+
+router = APIRouter(prefix="/uptime", tags=["uptime"])
+
+DEFAULT_SPAN = timedelta(days=30)
+
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # 数据库中是不带时区的 UTC 时间，带时区的参数（如 ...Z）先换算
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _time_range(start: Optional[datetime], end: Optional[datetime]) -> Tuple[datetime, datetime]:
+    start, end = _naive_utc(start), _naive_utc(end)
+    end = end or datetime.utcnow()
+    start = start or end - DEFAULT_SPAN
+    if start >= end:
+        raise HTTPException(400, "start must be before end")
+    return start, end
+
+
+def _resolve(db: Session, bot_id: str) -> UUID:
+    bot_uuid = activity_ingestor.resolve_bot(db, bot_id)
+    if bot_uuid is None:
+        raise HTTPException(404, f"Bot with bot_id '{bot_id}' not found")
+    return bot_uuid
+
+
+@router.get("/bots/{bot_id}", response_model=UptimeResponse)
+def get_bot_uptime(
+    bot_id: str,
+    start: Optional[datetime] = Query(None, description="起始时间（UTC），默认 30 天前"),
+    end: Optional[datetime] = Query(None, description="结束时间（UTC），默认当前时间"),
+    db: Session = Depends(get_db)
+):
+    """单个机器人的在线率"""
+    bot_uuid = _resolve(db, bot_id)
+    start, end = _time_range(start, end)
+    return UptimeResponse(scope="bot", **uptime_report(db, start, end, bot_uuid=bot_uuid))
+
+
+@router.get("/bots/{bot_id}/history", response_model=StatusHistoryResponse)
+def get_bot_status_history(
+    bot_id: str,
+    start: Optional[datetime] = Query(None, description="起始时间（UTC），默认 30 天前"),
+    end: Optional[datetime] = Query(None, description="结束时间（UTC），默认当前时间"),
+    limit: int = Query(500, ge=1, le=5000),
+    db: Session = Depends(get_db)
+):
+    """单个机器人的状态历史，每次状态变化一段"""
+    bot_uuid = _resolve(db, bot_id)
+    start, end = _time_range(start, end)
+    runs = status_history(db, bot_uuid, start, end, limit)
+    return StatusHistoryResponse(
+        bot_id=bot_id,
+        start=start,
+        end=end,
+        runs=[StatusRunResponse(**run) for run in runs]
+    )
+
+
+@router.get("/owners/{owner_id}", response_model=UptimeResponse)
+def get_owner_uptime(
+    owner_id: UUID,
+    start: Optional[datetime] = Query(None, description="起始时间（UTC），默认 30 天前"),
+    end: Optional[datetime] = Query(None, description="结束时间（UTC），默认当前时间"),
+    db: Session = Depends(get_db)
+):
+    """某个所有者名下全部机器人的在线率"""
+    start, end = _time_range(start, end)
+    return UptimeResponse(scope="owner", **uptime_report(db, start, end, owner_id=owner_id))
+
+
+@router.get("/fleet", response_model=UptimeResponse)
+def get_fleet_uptime(
+    start: Optional[datetime] = Query(None, description="起始时间（UTC），默认 30 天前"),
+    end: Optional[datetime] = Query(None, description="结束时间（UTC），默认当前时间"),
+    db: Session = Depends(get_db)
+):
+    """全部机器人的在线率"""
+    start, end = _time_range(start, end)
+    return UptimeResponse(scope="fleet", **uptime_report(db, start, end))
@@ -0,0 +1,104 @@
+"""
+BotHub 用量统计 - API 路由
+按机器人 / 所有者 / 全局返回活动次数和 token 用量时间序列，只读汇总表
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from app.database import get_db
+from app.schemas.activity import UsagePoint, UsageSeries
+from app.services.activities import activity_ingestor
+from app.services.rollups import query_series
+
+router = APIRouter(prefix="/usage", tags=["usage"])
+
+DEFAULT_SPAN = {"hour": timedelta(hours=24), "day": timedelta(days=30)}
+MAX_BUCKETS = 1000
+
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # 汇总表中是不带时区的 UTC 时间，带时区的参数（如 ...Z）先换算
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _time_range(
+    granularity: str,
+    start: Optional[datetime],
+    end: Optional[datetime]
+) -> Tuple[datetime, datetime]:
+    start, end = _naive_utc(start), _naive_utc(end)
+    end = end or datetime.utcnow()
+    start = start or end - DEFAULT_SPAN[granularity]
+    if start >= end:
+        raise HTTPException(400, "start must be before end")
+    bucket = timedelta(hours=1) if granularity == "hour" else timedelta(days=1)
+    if (end - start) / bucket > MAX_BUCKETS:
+        raise HTTPException(400, f"Time range covers more than {MAX_BUCKETS} buckets")
+    return start, end
+
+
+def _series(scope: str, granularity: str, start: datetime, end: datetime, rows) -> UsageSeries:
+    points = [
+        UsagePoint(bucket_start=bucket, activity_count=count, tokens_used=tokens)
+        for bucket, count, tokens in rows
+    ]
+    return UsageSeries(
+        scope=scope,
+        granularity=granularity,
+        start=start,
+        end=end,
+        total_activities=sum(p.activity_count for p in points),
+        total_tokens=sum(p.tokens_used for p in points),
+        points=points
+    )
+
+
+@router.get("/bots/{bot_id}", response_model=UsageSeries)
+def get_bot_usage(
+    bot_id: str,
+    granularity: str = Query("hour", pattern="^(hour|day)$"),
+    start: Optional[datetime] = Query(None, description="起始时间（UTC）"),
+    end: Optional[datetime] = Query(None, description="结束时间（UTC），默认当前时间"),
+    db: Session = Depends(get_db)
+):
+    """单个机器人的用量时间序列"""
+    bot_uuid = activity_ingestor.resolve_bot(db, bot_id)
+    if bot_uuid is None:
+        raise HTTPException(404, f"Bot with bot_id '{bot_id}' not found")
+    start, end = _time_range(granularity, start, end)
+    rows = query_series(db, granularity, start, end, bot_uuid=bot_uuid)
+    return _series("bot", granularity, start, end, rows)
+
+
+@router.get("/owners/{owner_id}", response_model=UsageSeries)
+def get_owner_usage(
+    owner_id: UUID,
+    granularity: str = Query("hour", pattern="^(hour|day)$"),
+    start: Optional[datetime] = Query(None, description="起始时间（UTC）"),
+    end: Optional[datetime] = Query(None, description="结束时间（UTC），默认当前时间"),
+    db: Session = Depends(get_db)
+):
+    """某个所有者名下全部机器人的用量时间序列"""
+    start, end = _time_range(granularity, start, end)
+    rows = query_series(db, granularity, start, end, owner_id=owner_id)
+    return _series("owner", granularity, start, end, rows)
+
+
+@router.get("/fleet", response_model=UsageSeries)
+def get_fleet_usage(
+    granularity: str = Query("hour", pattern="^(hour|day)$"),
+    start: Optional[datetime] = Query(None, description="起始时间（UTC）"),
+    end: Optional[datetime] = Query(None, description="结束时间（UTC），默认当前时间"),
+    db: Session = Depends(get_db)
+):
+    """全部机器人的用量时间序列"""
+    start, end = _time_range(granularity, start, end)
+    rows = query_series(db, granularity, start, end)
+    return _series("fleet", granularity, start, end, rows)
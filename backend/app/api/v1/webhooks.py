@@ -0,0 +1,84 @@
+"""
+BotHub Webhook - API 路由
+机器人所有者管理签名密钥、查看投递记录、重新投递
+"""
+
+from datetime import datetime
+from typing import List, Optional
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from app.core.deps import get_current_user_id
+from app.database import get_db
+from app.models.bot import Bot
+from app.models.webhook import WebhookDelivery, DeliveryStatus
+from app.schemas.webhook import WebhookSecretResponse, WebhookDeliveryResponse
+from app.services.webhooks import generate_webhook_secret, dispatch_worker
+
+router = APIRouter(tags=["webhooks"])
+
+
+def _get_owned_bot(db: Session, bot_id: str, user_id: UUID) -> Bot:
+    bot = db.query(Bot).filter(Bot.bot_id == bot_id).first()
+    if not bot:
+        raise HTTPException(404, f"Bot with bot_id '{bot_id}' not found")
+    if bot.owner_id != user_id:
+        raise HTTPException(403, "Only bot owner can manage webhooks")
+    return bot
+
+
+@router.post("/bots/{bot_id}/webhook-secret", response_model=WebhookSecretResponse)
+def rotate_webhook_secret(
+    bot_id: str,
+    db: Session = Depends(get_db),
+    current_user_id: UUID = Depends(get_current_user_id)
+):
+    """生成新的 webhook 签名密钥，旧密钥立即失效"""
+    bot = _get_owned_bot(db, bot_id, current_user_id)
+    bot.webhook_secret = generate_webhook_secret()
+    db.commit()
+    return WebhookSecretResponse(bot_id=bot.bot_id, webhook_secret=bot.webhook_secret)
+
+
+@router.get("/bots/{bot_id}/webhook-deliveries", response_model=List[WebhookDeliveryResponse])
+def list_webhook_deliveries(
+    bot_id: str,
+    status: Optional[DeliveryStatus] = Query(None, description="按投递状态过滤"),
+    limit: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_db),
+    current_user_id: UUID = Depends(get_current_user_id)
+):
+    """最近的投递记录"""
+    bot = _get_owned_bot(db, bot_id, current_user_id)
+    query = db.query(WebhookDelivery).filter(WebhookDelivery.bot_id == bot.id)
+    if status:
+        query = query.filter(WebhookDelivery.status == status)
+    return query.order_by(WebhookDelivery.created_at.desc()).limit(limit).all()
+
+
+@router.post("/bots/{bot_id}/webhook-deliveries/{event_id}/redeliver", response_model=WebhookDeliveryResponse)
+def redeliver_webhook(
+    bot_id: str,
+    event_id: str,
+    db: Session = Depends(get_db),
+    current_user_id: UUID = Depends(get_current_user_id)
+):
+    """重新投递一个事件（重置重试次数）"""
+    bot = _get_owned_bot(db, bot_id, current_user_id)
+    delivery = db.query(WebhookDelivery).filter(
+        WebhookDelivery.bot_id == bot.id,
+        WebhookDelivery.event_id == event_id
+    ).first()
+    if not delivery:
+        raise HTTPException(404, "Delivery not found")
+
+    delivery.status = DeliveryStatus.PENDING
+    delivery.attempts = 0
+    delivery.next_attempt_at = datetime.utcnow()
+    delivery.delivered_at = None
+    db.commit()
+    db.refresh(delivery)
+    dispatch_worker.wake()
+    return delivery
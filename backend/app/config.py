@@ -33,11 +33,157 @@ class Settings(BaseSettings):
     STORAGE_ENDPOINT: str = ""
     STORAGE_ACCESS_KEY: str = ""
     STORAGE_SECRET_KEY: str = ""
+    STORAGE_LOCAL_PATH: str = "./storage"  # STORAGE_TYPE=local 时的存储目录
+
+    # Blob serving
+    BLOB_HOT_CACHE_ENABLED: bool = True
+    BLOB_HOT_CACHE_MAX_ITEM_BYTES: int = 16 * 1024
+    BLOB_HOT_CACHE_MAX_BYTES: int = 8 * 1024 * 1024
+    AVATAR_MAX_BYTES: int = 2 * 1024 * 1024
+
+    # Background workers
+    BACKGROUND_WORKERS_ENABLED: bool = True
+
+    # Activity ingestion
+    ACTIVITY_BUFFER_MAX_EVENTS: int = 50000
+    ACTIVITY_FLUSH_BATCH_SIZE: int = 5000
+    ACTIVITY_FLUSH_INTERVAL: float = 1.0
+    ACTIVITY_PARTITION_DAYS_AHEAD: int = 3
+    ACTIVITY_MAX_AGE_DAYS: int = 30  # 上报的 created_at 最早可以是多少天前，更早的整批拒绝
+
+    # Activity rollups
+    ROLLUP_CATCHUP_INTERVAL: float = 300.0
+    ROLLUP_CATCHUP_HOURS: int = 6
+
+    # Task dispatch
+    TASK_LEASE_SECONDS: int = 300  # 租约时长，心跳会续约
+    TASK_LEASE_SWEEP_INTERVAL: float = 15.0
+    TASK_MAX_ATTEMPTS: int = 3
+    TASK_LEASE_MAX_SCAN: int = 1000  # 一次领取最多扫描多少个候选任务，队首都执行不了时不会扫完整个队列
+
+    # Task routing
+    ROUTING_POLICY: str = "least_loaded"  # least_loaded, power_of_two, sticky
+    ROUTING_BOT_TTL: float = 90.0  # 超过该时间没有心跳的机器人不参与路由
+    ROUTING_TASK_LOAD_WEIGHT: float = 0.1  # 每个进行中的任务折算的负载
+    ROUTING_HANDOFF_SECONDS: int = 30  # 路由到的机器人未领取时，多久后放开给其他机器人
+
+    # Webhooks
+    WEBHOOK_DISPATCH_INTERVAL: float = 1.0
+    WEBHOOK_BATCH_SIZE: int = 200
+    WEBHOOK_TIMEOUT: float = 10.0
+    WEBHOOK_MAX_CONNECTIONS: int = 100
+    WEBHOOK_ENDPOINT_CONCURRENCY: int = 4  # 每个 endpoint 同时进行的请求数
+    WEBHOOK_MAX_ATTEMPTS: int = 8
+    WEBHOOK_BACKOFF_BASE: float = 5.0
+    WEBHOOK_BACKOFF_MAX: float = 3600.0
+    WEBHOOK_BREAKER_THRESHOLD: int = 5  # 连续失败多少次后熔断
+    WEBHOOK_BREAKER_COOLDOWN: float = 60.0
+    WEBHOOK_ALLOW_PRIVATE_ENDPOINTS: bool = False  # 允许 http 和内网地址，仅用于本地开发
+
+    # Skill counters
+    SKILL_COUNTER_FLUSH_INTERVAL: float = 2.0
+
+    # Skill leaderboard
+    LEADERBOARD_MIN_RATINGS: int = 3  # 评分次数不足的技能不进入评分榜
+    LEADERBOARD_REFRESH_INTERVAL: float = 60.0
+
+    # JSON blobs
+    JSON_BLOB_INLINE_MAX_BYTES: int = 2048  # 超过这个大小的能力描述存入 json_blobs
+
+    # Metrics
+    METRICS_ENABLED: bool = True
+
+    # SQL profiling
+    SQL_PROFILING_ENABLED: bool = False  # 为所有请求记录 SQL
+    SQL_PROFILING_ALLOW_HEADER: bool = False  # 允许请求用 X-SQL-Profile: 1 单独开启
+    SQL_PROFILING_TOP_N: int = 5  # 日志中列出最慢的几条语句
+    SQL_PROFILING_REPEAT_THRESHOLD: int = 5  # 同一语句执行多少次视为 N+1
+
+    # Permission cache
+    PERMISSION_CACHE_SIZE: int = 100000  # 缓存的 (用户, 机器人) 数
+    PERMISSION_CACHE_TTL: float = 300.0  # 兜底：收不到变更通知时缓存最多保留多久
+    PERMISSION_NOTIFY_POLL_INTERVAL: float = 1.0  # 其他进程的授权变化最迟多久生效
+
+    # Access grant lifecycle
+    GRANT_EXPIRY_INTERVAL: float = 60.0
+    GRANT_EXPIRY_BATCH_SIZE: int = 500
+
+    # Startup and readiness
+    DATABASE_AUTO_CREATE: bool = False  # 启动时 create_all（只用于本地空库，正式环境用 alembic upgrade head）
+    SCHEMA_CHECK: str = "warn"  # 数据库迁移版本与代码不一致时：strict 不就绪，warn 只记日志，off 不检查
+    DB_POOL_WARM_CONNECTIONS: int = 2  # 就绪前预先建立的数据库连接数
+
+    # Multi-worker state
+    STATE_BACKEND: str = "local"  # local（单进程）、shm（同一台机器的多个 worker）、redis（多台机器）
+    STATE_SHM_PATH: str = "/dev/shm/bothub-state.db"
+    STATE_REDIS_URL: str = "redis://localhost:6379/0"
+    STATE_KEY_PREFIX: str = "bothub:"
+    STATE_CHANNEL_RETENTION: float = 300.0  # 广播消息保留多久，落后更久的 worker 会整体失效缓存
+    STATE_SYNC_INTERVAL: float = 1.0  # 多久从共享状态同步一次在线状态和失效通知
+    STATE_PRUNE_INTERVAL: float = 60.0  # 多久删除一次已过期的键和字段（local、shm）
+
+    # Rate limiting（规则格式见 app/core/ratelimit.py）
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMITS: str = (
+        "POST /api/v1/bots/{bot_id}/heartbeat bot=1/s:10;"
+        "GET /api/v1/bots user=10/s:50;"
+        "POST /api/v1/claim/bots/register ip=2/s:20;"
+        "POST /api/v1/claim/request user=1/s:10"
+    )
+    RATE_LIMIT_TRUST_FORWARDED: bool = False  # 在反向代理之后时按 X-Forwarded-For 识别客户端
+
+    # Idempotency keys
+    IDEMPOTENCY_ENABLED: bool = True
+    IDEMPOTENCY_ROUTES: str = (
+        "POST /api/v1/claim/bots/register;"
+        "POST /api/v1/claim/request;"
+        "POST /api/v1/bots/register"
+    )
+    IDEMPOTENCY_TTL: float = 86400.0  # 保存的响应保留多久
+    IDEMPOTENCY_WAIT_TIMEOUT: float = 30.0  # 并发的重复请求最多等待原请求多久
+    IDEMPOTENCY_LOCK_TTL: float = 10.0  # 执行锁的有效期，执行期间持续续期
+    IDEMPOTENCY_MAX_BODY_BYTES: int = 262144  # 更大的响应不保存
+    IDEMPOTENCY_MAX_STORED_BYTES: int = 8 * 1024 * 1024  # 每个调用方在 IDEMPOTENCY_TTL 内最多保存多少字节
+
+    # Status history
+    STATUS_HISTORY_MAX_GAP: float = 90.0  # 一次心跳证明之后多少秒内的状态，间隔更久时中间记为无数据
+    STATUS_HISTORY_RETENTION_DAYS: int = 400
+    STATUS_HISTORY_PRUNE_INTERVAL: float = 3600.0
+
+    # Bot stats
+    BOT_STATS_CACHE_TTL: float = 60.0  # 增量维护的统计多久按数据库重新加载一次
+
+    # Bot search
+    BOT_SEARCH_REBUILD_INTERVAL: float = 600.0  # 搜索索引多久按数据库重建一次
+
+    # Heartbeats
+    HEARTBEAT_FINGERPRINT_CACHE_SIZE: int = 100000  # 缓存多少个机器人的状态指纹
+
+    # Message bus
+    BUS_BACKEND: str = "memory"  # memory（进程内，单 worker）、database（持久化，至少一次投递）
+    BUS_QUEUE_SIZE: int = 1000  # 每个接收者最多积压多少条，满了以后拒绝新消息
+    BUS_RETENTION: float = 3600.0  # 消息最多保留多久
+    BUS_ACK_TIMEOUT: float = 30.0  # database：取出后多久未确认重新投递
+    BUS_MAX_WAIT: float = 30.0  # 长轮询最多等待多久
+    BUS_POLL_INTERVAL: float = 1.0  # database：等待时多久查询一次其他 worker 写入的消息
+    BUS_MAX_PAYLOAD_BYTES: int = 65536
+    BUS_PRUNE_INTERVAL: float = 60.0
+
+    # Plugins
+    PLUGINS_ENABLED: bool = True
+    PLUGINS_DISABLED: str = ""  # 逗号分隔的插件名，已安装也不加载
+    PLUGIN_HOOK_BUDGET_MS: float = 5.0  # 单次钩子调用超过这个耗时记为超时并告警
+    PLUGIN_NOTIFY_QUEUE_SIZE: int = 10000  # 等待通知渠道处理的事件上限，满了以后丢弃
+    PLUGIN_NOTIFY_INTERVAL: float = 1.0
 
     def get_cors_origins_list(self) -> List[str]:
         """Convert CORS_ORIGINS string to list"""
         return [origin.strip() for origin in self.CORS_ORIGINS.split(",")]
 
+    def get_disabled_plugins(self) -> List[str]:
+        """Convert PLUGINS_DISABLED string to list"""
+        return [name.strip() for name in self.PLUGINS_DISABLED.split(",") if name.strip()]
+
     class Config:
         env_file = ".env"
         case_sensitive = True
@@ -0,0 +1,116 @@
+"""
+后台周期任务
+
+数据库访问都是同步的，同步任务函数在线程池中执行，不阻塞事件循环；
+协程函数（如 HTTP 投递）直接在事件循环中执行。
+任务在 lifespan 中统一启动和停止，停止时会再执行一次以落盘缓冲数据。
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, List, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicWorker:
+    """按固定间隔执行函数，也可以被 wake() 提前唤醒"""
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[], None],
+        interval: float,
+        run_on_start: bool = False,
+        run_on_shutdown: bool = False,
+        on_stop: Optional[Callable[[], Awaitable[None]]] = None,
+    ):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.run_on_start = run_on_start
+        self.run_on_shutdown = run_on_shutdown
+        self.on_stop = on_stop
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name=f"worker:{self.name}")
+
+    def wake(self) -> None:
+        """线程安全地唤醒任务（可在同步接口的工作线程中调用）"""
+        if self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._loop = None
+        if self.run_on_shutdown:
+            await self._run_once()
+        if self.on_stop is not None:
+            try:
+                await self.on_stop()
+            except Exception:
+                logger.exception("Background worker %s failed to stop cleanly", self.name)
+
+    async def _run(self) -> None:
+        if self.run_on_start:
+            await self._run_once()
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self._run_once()
+
+    async def _run_once(self) -> None:
+        try:
+            if asyncio.iscoroutinefunction(self.func):
+                await self.func()
+            else:
+                await run_in_threadpool(self.func)
+        except Exception:
+            logger.exception("Background worker %s failed", self.name)
+
+
+_workers: List[PeriodicWorker] = []
+
+
+def register_worker(
+    name: str,
+    func: Callable[[], None],
+    interval: float,
+    run_on_start: bool = False,
+    run_on_shutdown: bool = False,
+    on_stop: Optional[Callable[[], Awaitable[None]]] = None,
+) -> PeriodicWorker:
+    """注册一个后台任务，在应用启动时开始运行；on_stop 在任务停止后调用，用于释放资源"""
+    worker = PeriodicWorker(
+        name, func, interval,
+        run_on_start=run_on_start, run_on_shutdown=run_on_shutdown, on_stop=on_stop
+    )
+    _workers.append(worker)
+    return worker
+
+
+def start_workers() -> None:
+    for worker in _workers:
+        worker.start()
+
+
+async def stop_workers() -> None:
+    for worker in reversed(_workers):
+        await worker.stop()
@@ -0,0 +1,280 @@
+"""
+Idempotency-Key 重放
+
+客户端超时后重试写接口时带上同一个 Idempotency-Key：第一次的响应保存在共享状态后端中
+（IDEMPOTENCY_TTL 秒），之后的重试直接重放，不再执行接口（也不再调用飞书验证）。
+同一个 key 的并发请求只有一个真正执行，其余的等待它完成后重放同一个响应：
+同一进程内等待 asyncio.Future，其他 worker 通过共享状态中的锁和轮询等待。
+锁的有效期只有 IDEMPOTENCY_LOCK_TTL 秒，执行期间持有者不断续期，所以原请求再慢也不会被
+别的 worker 重复执行；持有者进程退出后锁很快过期，等待者接手。共享状态的调用都是同步的
+（shm 要等 SQLite 锁、redis 要等网络），全部放到线程池中执行。
+
+- 只对 IDEMPOTENCY_ROUTES 中的路由生效，没有 Idempotency-Key 头的请求照常处理
+- key 按调用方（Authorization 头，没有时为客户端地址）、方法和路径区分
+- 同一个 key 搭配不同的请求体返回 422
+- 5xx 和 429 不保存，客户端可以用同一个 key 重试
+- 保存的响应有上限：单个响应体不超过 IDEMPOTENCY_MAX_BODY_BYTES，每个调用方在 IDEMPOTENCY_TTL
+  内保存的总字节数不超过 IDEMPOTENCY_MAX_STORED_BYTES，超出的响应照常返回但不保存
+- 重放的响应带 Idempotent-Replayed: true
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import re
+import time
+from typing import Dict, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from starlette.routing import compile_path
+
+from app.config import settings
+from app.core.state import get_state
+
+logger = logging.getLogger(__name__)
+
+HEADER = b"idempotency-key"
+REPLAYED_HEADER = b"idempotent-replayed"
+POLL_INTERVAL = 0.05
+
+# 这些响应头随响应一起保存和重放
+_STORED_HEADERS = {b"content-type", b"location"}
+
+
+def parse_routes(spec: str) -> List[Tuple[str, re.Pattern]]:
+    """IDEMPOTENCY_ROUTES：分号分隔的 '<方法> <路径模板>'"""
+    routes = []
+    for raw in spec.split(";"):
+        raw = raw.strip()
+        if not raw:
+            continue
+        parts = raw.split()
+        if len(parts) != 2:
+            raise ValueError(f"Invalid idempotent route {raw!r}, expected '<METHOD> <path>'")
+        pattern, _, _ = compile_path(parts[1])
+        routes.append((parts[0].upper(), pattern))
+    return routes
+
+
+def _header(scope, name: bytes) -> Optional[bytes]:
+    for key, value in scope.get("headers", ()):
+        if key == name:
+            return value
+    return None
+
+
+def _json_response(status: int, detail: str) -> Tuple[int, List[Tuple[bytes, bytes]], bytes]:
+    body = json.dumps({"detail": detail}).encode()
+    return status, [(b"content-type", b"application/json")], body
+
+
+async def _send_response(send, status: int, headers: List[Tuple[bytes, bytes]], body: bytes) -> None:
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": headers + [(b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class IdempotencyMiddleware:
+    """为配置的写接口提供 Idempotency-Key 重放（纯 ASGI 中间件）"""
+
+    def __init__(self, app):
+        self.app = app
+        self._spec: Optional[str] = None
+        self._routes: List[Tuple[str, re.Pattern]] = []
+        # 本进程内正在执行的请求：存储键 -> 完成时的响应
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    def _matches(self, method: str, path: str) -> bool:
+        if self._spec != settings.IDEMPOTENCY_ROUTES:
+            self._routes = parse_routes(settings.IDEMPOTENCY_ROUTES)
+            self._spec = settings.IDEMPOTENCY_ROUTES
+        return any(m == method and pattern.match(path) for m, pattern in self._routes)
+
+    @staticmethod
+    def _caller(scope) -> bytes:
+        caller = _header(scope, b"authorization")
+        if caller is None:
+            client = scope.get("client")
+            caller = (client[0] if client else "unknown").encode()
+        return caller
+
+    @classmethod
+    def _store_key(cls, scope, key: bytes) -> str:
+        digest = hashlib.sha256(cls._caller(scope) + b"\0" + key).hexdigest()
+        return f"idempotency:{scope['method']}:{scope['path']}:{digest}"
+
+    @classmethod
+    def _quota_key(cls, scope) -> str:
+        return f"idempotency:stored:{hashlib.sha256(cls._caller(scope)).hexdigest()}"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.IDEMPOTENCY_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        key = _header(scope, HEADER)
+        if not key or not self._matches(scope["method"], scope["path"]):
+            await self.app(scope, receive, send)
+            return
+        if len(key) > 255:
+            await _send_response(send, *_json_response(400, "Idempotency-Key must be at most 255 characters"))
+            return
+
+        body = await self._read_body(receive)
+        fingerprint = hashlib.sha256(body).hexdigest()
+        store_key = self._store_key(scope, key)
+        state = get_state()
+
+        stored = await self._wait_for_stored(state, store_key)
+        if stored is None:
+            stored = await self._execute(scope, receive, body, send, state, store_key, fingerprint)
+            if stored is None:
+                # 已经把响应发给了客户端（首个请求）
+                return
+        await self._replay(stored, fingerprint, send)
+
+    @staticmethod
+    async def _read_body(receive) -> bytes:
+        chunks = []
+        while True:
+            message = await receive()
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                return b"".join(chunks)
+
+    async def _wait_for_stored(self, state, store_key: str) -> Optional[dict]:
+        """已有保存的响应，或者（本进程内）有相同的请求正在执行时等它完成"""
+        pending = self._in_flight.get(store_key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+        raw = await run_in_threadpool(state.get, store_key)
+        return json.loads(raw) if raw else None
+
+    @staticmethod
+    async def _hold_lock(state, lock_key: str) -> None:
+        """执行期间定期续期锁，直到被取消"""
+        ttl = settings.IDEMPOTENCY_LOCK_TTL
+        while True:
+            await asyncio.sleep(ttl / 3)
+            try:
+                await run_in_threadpool(state.set, lock_key, "1", ttl)
+            except Exception:
+                logger.exception("Failed to refresh idempotency lock")
+
+    async def _store(self, scope, state, store_key: str, stored: dict) -> bool:
+        """在调用方的配额内保存响应，超出配额时不保存"""
+        size = len(stored["body"])
+        used = await run_in_threadpool(
+            state.incr, self._quota_key(scope), size, settings.IDEMPOTENCY_TTL
+        )
+        if used > settings.IDEMPOTENCY_MAX_STORED_BYTES:
+            await run_in_threadpool(state.incr, self._quota_key(scope), -size)
+            logger.warning("Idempotency storage quota exceeded, response for %s not stored", scope["path"])
+            return False
+        await run_in_threadpool(state.set, store_key, json.dumps(stored), settings.IDEMPOTENCY_TTL)
+        return True
+
+    async def _execute(self, scope, receive, body, send, state, store_key, fingerprint) -> Optional[dict]:
+        """
+        执行请求并保存响应；其他 worker 正在执行同一个请求时等待并返回它保存的响应
+
+        返回 None 表示本次请求已经执行并把响应发送给了客户端。
+        """
+        lock_key = f"{store_key}:lock"
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_TIMEOUT
+        while await run_in_threadpool(state.incr, lock_key, 1, settings.IDEMPOTENCY_LOCK_TTL) != 1:
+            # 其他 worker 持有锁：等它保存响应（或持有者退出后锁过期）
+            await asyncio.sleep(POLL_INTERVAL)
+            raw = await run_in_threadpool(state.get, store_key)
+            if raw:
+                return json.loads(raw)
+            if time.monotonic() > deadline:
+                status, headers, payload = _json_response(
+                    409, "A request with this Idempotency-Key is still in progress"
+                )
+                await _send_response(send, status, headers, payload)
+                return None
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[store_key] = future
+        holder = asyncio.create_task(self._hold_lock(state, lock_key))
+        response = {"status": 500, "headers": [], "chunks": []}
+        try:
+            # 锁拿到之前可能已经有响应保存下来了
+            raw = await run_in_threadpool(state.get, store_key)
+            if raw:
+                stored = json.loads(raw)
+                future.set_result(stored)
+                return stored
+
+            body_sent = False
+
+            async def replay_receive():
+                # 请求体已经读出，先交给应用，之后的 receive（等待断开）交给原来的通道
+                nonlocal body_sent
+                if body_sent:
+                    return await receive()
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+
+            async def capture_send(message):
+                if message["type"] == "http.response.start":
+                    response["status"] = message["status"]
+                    response["headers"] = list(message.get("headers", []))
+                elif message["type"] == "http.response.body":
+                    response["chunks"].append(message.get("body", b""))
+                await send(message)
+
+            await self.app(scope, replay_receive, capture_send)
+        finally:
+            holder.cancel()
+            stored = self._serialize(response, fingerprint)
+            try:
+                if stored is not None and not await self._store(scope, state, store_key, stored):
+                    stored = None
+            except Exception:
+                logger.exception("Failed to store idempotent response")
+                stored = None
+            try:
+                await run_in_threadpool(state.delete, lock_key)
+            except Exception:
+                logger.exception("Failed to release idempotency lock")
+            self._in_flight.pop(store_key, None)
+            if not future.done():
+                if stored is not None:
+                    future.set_result(stored)
+                else:
+                    # 没有保存（5xx、429、过大或超出配额），等待者各自重新执行
+                    future.set_result(None)
+        return None
+
+    @staticmethod
+    def _serialize(response: dict, fingerprint: str) -> Optional[dict]:
+        status = response["status"]
+        body = b"".join(response["chunks"])
+        if status >= 500 or status == 429 or len(body) > settings.IDEMPOTENCY_MAX_BODY_BYTES:
+            return None
+        return {
+            "status": status,
+            "headers": [
+                [name.decode("latin-1"), value.decode("latin-1")]
+                for name, value in response["headers"]
+                if name.lower() in _STORED_HEADERS
+            ],
+            "body": base64.b64encode(body).decode(),
+            "fingerprint": fingerprint,
+        }
+
+    async def _replay(self, stored: dict, fingerprint: str, send) -> None:
+        if stored["fingerprint"] != fingerprint:
+            await _send_response(
+                send, *_json_response(422, "Idempotency-Key was already used with a different request body")
+            )
+            return
+        headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in stored["headers"]]
+        headers.append((REPLAYED_HEADER, b"true"))
+        await _send_response(send, stored["status"], headers, base64.b64decode(stored["body"]))
@@ -0,0 +1,405 @@
+"""
+Prometheus 指标
+
+不依赖 prometheus_client，输出 text exposition format（/metrics）。
+热路径不加锁：每个指标子项按线程分片，线程只写自己的分片，抓取时把各分片相加。
+标签组合在导入或应用启动时预先注册，请求中只做一次字典查找。
+指标只统计本进程；多进程部署时由 Prometheus 按实例分别抓取。
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 秒
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_str(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Sharded:
+    """按线程分片的一组数值；size 个槽位，线程首次写入时创建自己的分片"""
+
+    def __init__(self, size: int):
+        self._size = size
+        self._local = threading.local()
+        self._shards: List[List[float]] = []
+        self._lock = threading.Lock()  # 只在新线程首次写入时使用
+
+    def shard(self) -> List[float]:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = [0.0] * self._size
+            with self._lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+            return shard
+
+    def totals(self) -> List[float]:
+        with self._lock:
+            shards = list(self._shards)
+        totals = [0.0] * self._size
+        for shard in shards:
+            for i, value in enumerate(shard):
+                totals[i] += value
+        return totals
+
+
+class CounterChild:
+    __slots__ = ("_values",)
+
+    def __init__(self):
+        self._values = _Sharded(1)
+
+    def inc(self, amount: float = 1) -> None:
+        self._values.shard()[0] += amount
+
+    def get(self) -> float:
+        return self._values.totals()[0]
+
+
+class GaugeChild:
+    """可增减的仪表（如进行中的请求数），各线程分片的增减量之和即当前值"""
+
+    __slots__ = ("_values",)
+
+    def __init__(self):
+        self._values = _Sharded(1)
+
+    def inc(self, amount: float = 1) -> None:
+        self._values.shard()[0] += amount
+
+    def dec(self, amount: float = 1) -> None:
+        self._values.shard()[0] -= amount
+
+    def get(self) -> float:
+        return self._values.totals()[0]
+
+
+class HistogramChild:
+    __slots__ = ("_buckets", "_values")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self._buckets = buckets
+        # 每个桶的计数（非累计）、+Inf 桶、总和
+        self._values = _Sharded(len(buckets) + 2)
+
+    def observe(self, value: float) -> None:
+        shard = self._values.shard()
+        shard[bisect_left(self._buckets, value)] += 1
+        shard[-1] += value
+
+    def time(self) -> "_Timer":
+        return _Timer(self)
+
+    def snapshot(self) -> Tuple[List[float], float, float]:
+        """(累计桶计数, 总数, 总和)"""
+        totals = self._values.totals()
+        cumulative, running = [], 0.0
+        for count in totals[:-1]:
+            running += count
+            cumulative.append(running)
+        return cumulative, running, totals[-1]
+
+
+class _Timer:
+    __slots__ = ("_child", "_start")
+
+    def __init__(self, child: HistogramChild):
+        self._child = child
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._child.observe(time.perf_counter() - self._start)
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        """取标签对应的子项；已注册的组合不加锁"""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                child = self._children.get(values)
+                if child is None:
+                    child = self._new_child()
+                    self._children = {**self._children, values: child}
+        return child
+
+    def preregister(self, label_sets: Iterable[Sequence[str]]) -> None:
+        for values in label_sets:
+            self.labels(*values)
+
+    def _samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return CounterChild()
+
+    def inc(self, amount: float = 1) -> None:
+        self._children[()].inc(amount)
+
+    def _samples(self):
+        for values, child in sorted(self._children.items()):
+            yield f"{self.name}{_label_str(self.labelnames, values)} {_format_value(child.get())}"
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 function: Optional[Callable[[], float]] = None):
+        self._function = function
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return GaugeChild()
+
+    def inc(self, amount: float = 1) -> None:
+        self._children[()].inc(amount)
+
+    def dec(self, amount: float = 1) -> None:
+        self._children[()].dec(amount)
+
+    def _samples(self):
+        if self._function is not None:
+            yield f"{self.name} {_format_value(self._function())}"
+            return
+        for values, child in sorted(self._children.items()):
+            yield f"{self.name}{_label_str(self.labelnames, values)} {_format_value(child.get())}"
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._children[()].observe(value)
+
+    def _samples(self):
+        bounds = [*map(_format_value, self.buckets), "+Inf"]
+        for values, child in sorted(self._children.items()):
+            cumulative, count, total = child.snapshot()
+            for bound, bucket_count in zip(bounds, cumulative):
+                labels = _label_str(self.labelnames, values, f'le="{bound}"')
+                yield f"{self.name}_bucket{labels} {_format_value(bucket_count)}"
+            labels = _label_str(self.labelnames, values)
+            yield f"{self.name}_count{labels} {_format_value(count)}"
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def get(self, name: str) -> Metric:
+        return self._metrics[name]
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+registry = Registry()
+
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+    return registry.register(Counter(name, documentation, labelnames))
+
+
+def gauge(name: str, documentation: str, labelnames: Sequence[str] = (),
+          function: Optional[Callable[[], float]] = None) -> Gauge:
+    return registry.register(Gauge(name, documentation, labelnames, function))
+
+
+def histogram(name: str, documentation: str, labelnames: Sequence[str] = (),
+              buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+    return registry.register(Histogram(name, documentation, labelnames, buckets))
+
+
+# ========== HTTP ==========
+
+UNMATCHED_ROUTE = "<unmatched>"
+# 挂载的子应用（如插件路由）不在 app.routes 中，可以在 scope 中自己写上路由标签
+ROUTE_LABEL_SCOPE_KEY = "bothub.route"
+
+http_requests = counter("bothub_http_requests_total", "HTTP requests", ("method", "route", "status"))
+http_latency = histogram(
+    "bothub_http_request_duration_seconds", "HTTP request latency", ("method", "route")
+)
+http_in_flight = gauge("bothub_http_requests_in_flight", "HTTP requests being served", ("method",))
+http_in_flight.preregister([(m,) for m in ("GET", "POST", "PUT", "PATCH", "DELETE")])
+
+
+def route_templates(app) -> Dict[object, str]:
+    """endpoint 函数 -> 路径模板"""
+    return {route.endpoint: route.path for route in app.routes if hasattr(route, "endpoint")}
+
+
+def preregister_routes(app) -> None:
+    """启动时为所有路由预先注册延迟直方图的标签"""
+    http_latency.preregister(
+        (method, route.path)
+        for route in app.routes
+        if hasattr(route, "endpoint")
+        for method in (getattr(route, "methods", None) or ())
+    )
+
+
+class MetricsMiddleware:
+    """
+    记录每个路由的请求数、延迟和进行中的请求数（纯 ASGI 中间件）
+
+    路由标签用路径模板（/api/v1/bots/{bot_id}），不会因为路径参数产生无限多的标签。
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._routes: Optional[Dict[object, str]] = None
+
+    def _route_label(self, scope) -> str:
+        label = scope.get(ROUTE_LABEL_SCOPE_KEY)
+        if label is not None:
+            return label
+        if self._routes is None:
+            self._routes = route_templates(scope["app"])
+        return self._routes.get(scope.get("endpoint"), UNMATCHED_ROUTE)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        in_flight = http_in_flight.labels(method)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            in_flight.dec()
+            route = self._route_label(scope)
+            http_latency.labels(method, route).observe(elapsed)
+            http_requests.labels(method, route, str(status_code)).inc()
+
+
+# ========== 数据库 ==========
+
+DB_OPERATIONS = ("select", "insert", "update", "delete", "other")
+
+db_queries = counter("bothub_db_queries_total", "SQL statements executed", ("operation",))
+db_latency = histogram(
+    "bothub_db_query_duration_seconds", "SQL statement latency", ("operation",), buckets=DB_BUCKETS
+)
+db_queries.preregister([(op,) for op in DB_OPERATIONS])
+db_latency.preregister([(op,) for op in DB_OPERATIONS])
+
+
+def statement_operation(statement: str) -> str:
+    head = statement.lstrip()[:6].lower()
+    return head if head in DB_OPERATIONS else "other"
+
+
+def instrument_engine(engine) -> None:
+    """通过 SQLAlchemy 游标事件统计语句数和耗时"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("metrics_query_start")
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        operation = statement_operation(statement)
+        db_queries.labels(operation).inc()
+        db_latency.labels(operation).observe(elapsed)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        starts = context.connection.info.get("metrics_query_start") if context.connection is not None else None
+        if starts:
+            starts.pop()
+
+
+# ========== 外部调用和业务 ==========
+
+feishu_latency = histogram(
+    "bothub_feishu_request_duration_seconds", "Feishu open API call latency", ("api", "outcome")
+)
+heartbeats = counter("bothub_bot_heartbeats_total", "Bot heartbeats ingested", ("status",))
+heartbeats.preregister([(s,) for s in ("online", "offline", "busy", "error")])
@@ -0,0 +1,292 @@
+"""
+插件
+
+插件是安装在同一环境中的 Python 包，通过入口点（entry points）声明扩展，每种扩展一个组：
+
+- bothub.routes：APIRouter，挂载在 /api/v1/plugins/<插件名>
+- bothub.heartbeat_hooks：hook(bot, changed)，心跳提交后调用，changed 为变化的字段
+- bothub.notification_channels：channel(event)，事件（与 webhook 的请求体相同）提交后
+  放入队列，由后台任务 plugin-notify 在工作线程中调用，不占用请求线程
+
+例如插件的 pyproject.toml：
+
+    [project.entry-points."bothub.heartbeat_hooks"]
+    my_plugin = "my_plugin.hooks:on_heartbeat"
+
+启动时只读取已安装包的入口点元数据，不导入插件；每个入口点在第一次使用时
+（第一次心跳、第一个事件、第一个请求）才导入。导入耗时、每次调用的耗时、失败次数
+和超过 PLUGIN_HOOK_BUDGET_MS 的次数按插件和扩展记入 /metrics，并由 GET /api/v1/plugins 汇总；
+超时的调用记一条 WARNING，插件抛出的异常只记日志，不影响调用方。
+插件路由处理的是整个请求，耗时单独记入 bothub_plugin_route_duration_seconds，不受预算限制。
+PLUGINS_DISABLED 中的插件不会被发现；修改后重启生效。
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from importlib import metadata
+from typing import Any, Dict, Iterable, List, Optional
+
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+from starlette.routing import Mount
+from starlette.types import Receive, Scope, Send
+
+from app.config import settings
+from app.core import metrics
+from app.core.background import register_worker
+
+logger = logging.getLogger(__name__)
+
+HOOK_ROUTES = "routes"
+HOOK_HEARTBEAT = "heartbeat"
+HOOK_NOTIFICATIONS = "notifications"
+
+# 扩展 -> 入口点组
+ENTRY_POINT_GROUPS = {
+    HOOK_ROUTES: "bothub.routes",
+    HOOK_HEARTBEAT: "bothub.heartbeat_hooks",
+    HOOK_NOTIFICATIONS: "bothub.notification_channels",
+}
+
+# 秒，钩子应在毫秒级完成
+HOOK_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+plugin_import_seconds = metrics.gauge(
+    "bothub_plugin_import_seconds", "Time spent importing each plugin entry point", ("plugin", "hook")
+)
+plugin_hook_seconds = metrics.histogram(
+    "bothub_plugin_hook_duration_seconds", "Plugin hook call latency", ("plugin", "hook"), HOOK_BUCKETS
+)
+plugin_route_seconds = metrics.histogram(
+    "bothub_plugin_route_duration_seconds", "Plugin route request latency", ("plugin",)
+)
+plugin_hook_errors = metrics.counter(
+    "bothub_plugin_hook_errors_total", "Plugin hook calls that raised", ("plugin", "hook")
+)
+plugin_hook_over_budget = metrics.counter(
+    "bothub_plugin_hook_over_budget_total",
+    "Plugin hook calls slower than PLUGIN_HOOK_BUDGET_MS", ("plugin", "hook")
+)
+plugin_notifications_dropped = metrics.counter(
+    "bothub_plugin_notifications_dropped_total",
+    "Events not handed to notification channels because the queue was full"
+)
+
+
+class PluginHook:
+    """插件的一个入口点；load() 之前只有元数据"""
+
+    def __init__(self, plugin: str, hook: str, entry_point: metadata.EntryPoint):
+        self.plugin = plugin
+        self.hook = hook
+        self.entry_point = entry_point
+        self.target: Any = None
+        self.loaded = False
+        self.error: Optional[str] = None
+        self.import_seconds: Optional[float] = None
+        self._lock = threading.Lock()
+        # 热路径不做标签查找
+        labels = (plugin, hook)
+        self._import_gauge = plugin_import_seconds.labels(*labels)
+        # 路由的耗时是整个请求，和钩子分开统计
+        if hook == HOOK_ROUTES:
+            self._latency = plugin_route_seconds.labels(plugin)
+        else:
+            self._latency = plugin_hook_seconds.labels(*labels)
+        self._errors = plugin_hook_errors.labels(*labels)
+        self._over_budget = plugin_hook_over_budget.labels(*labels)
+
+    @property
+    def distribution(self) -> Optional[str]:
+        dist = getattr(self.entry_point, "dist", None)
+        return f"{dist.name} {dist.version}" if dist is not None else None
+
+    def load(self) -> Any:
+        """导入入口点（只导入一次），导入失败时返回 None"""
+        if self.loaded:
+            return self.target
+        with self._lock:
+            if self.loaded:
+                return self.target
+            started = time.perf_counter()
+            try:
+                self.target = self.entry_point.load()
+            except Exception as exc:
+                self.error = f"{type(exc).__name__}: {exc}"
+                logger.exception("Failed to import plugin %s (%s)", self.plugin, self.entry_point.value)
+            self.import_seconds = time.perf_counter() - started
+            # 仪表只能增减：重新发现后覆盖旧值
+            self._import_gauge.inc(self.import_seconds - self._import_gauge.get())
+            logger.info(
+                "Loaded plugin %s %s hook from %s in %.1f ms",
+                self.plugin, self.hook, self.entry_point.value, self.import_seconds * 1000,
+            )
+            self.loaded = True
+        return self.target
+
+    def observe(self, elapsed: float) -> None:
+        self._latency.observe(elapsed)
+        if self.hook != HOOK_ROUTES and elapsed * 1000 > settings.PLUGIN_HOOK_BUDGET_MS:
+            self._over_budget.inc()
+            logger.warning(
+                "Plugin %s %s hook took %.1f ms (budget %.1f ms)",
+                self.plugin, self.hook, elapsed * 1000, settings.PLUGIN_HOOK_BUDGET_MS,
+            )
+
+    def call(self, *args) -> None:
+        """调用钩子，计时；异常只记日志"""
+        target = self.load()
+        if target is None:
+            return
+        started = time.perf_counter()
+        try:
+            target(*args)
+        except Exception:
+            self._errors.inc()
+            logger.exception("Plugin %s %s hook failed", self.plugin, self.hook)
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def describe(self) -> dict:
+        _, calls, total = self._latency.snapshot()
+        return {
+            "plugin": self.plugin,
+            "hook": self.hook,
+            "entry_point": self.entry_point.value,
+            "distribution": self.distribution,
+            "loaded": self.loaded,
+            "error": self.error,
+            "import_ms": self.import_seconds * 1000 if self.import_seconds is not None else None,
+            "calls": int(calls),
+            "errors": int(self._errors.get()),
+            "over_budget": int(self._over_budget.get()),
+            "total_ms": total * 1000,
+            "avg_ms": total * 1000 / calls if calls else None,
+        }
+
+
+class LazyRoutes:
+    """插件路由的 ASGI 入口：第一个请求时才导入插件的 APIRouter"""
+
+    def __init__(self, hook: PluginHook, path: str):
+        self.hook = hook
+        self.path = path
+        self._templates: Optional[Dict[Any, str]] = None
+
+    def _route_label(self, router, scope: Scope) -> str:
+        """请求指标的路由标签：挂载路径 + 插件路由的路径模板，未匹配时只用挂载路径"""
+        if self._templates is None:
+            self._templates = {
+                route.endpoint: self.path + route.path
+                for route in getattr(router, "routes", ()) if hasattr(route, "endpoint")
+            }
+        return self._templates.get(scope.get("endpoint"), self.path)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        # 导入可能很慢，不阻塞事件循环
+        router = self.hook.target if self.hook.loaded else await run_in_threadpool(self.hook.load)
+        if router is None:
+            scope[metrics.ROUTE_LABEL_SCOPE_KEY] = self.path
+            response = JSONResponse({"detail": f"Plugin '{self.hook.plugin}' failed to load"}, status_code=503)
+            await response(scope, receive, send)
+            return
+        started = time.perf_counter()
+        try:
+            await router(scope, receive, send)
+        finally:
+            self.hook.observe(time.perf_counter() - started)
+            scope[metrics.ROUTE_LABEL_SCOPE_KEY] = self._route_label(router, scope)
+
+
+class PluginRegistry:
+    """已发现的插件入口点，按扩展分组"""
+
+    def __init__(self, queue_size: int = 10000):
+        self._hooks: Dict[str, List[PluginHook]] = {hook: [] for hook in ENTRY_POINT_GROUPS}
+        self.queue_size = queue_size
+        self._notifications: deque = deque()
+        self._lock = threading.Lock()
+
+    def discover(self, entry_points: Optional[Iterable[metadata.EntryPoint]] = None) -> None:
+        """
+        读取入口点元数据（不导入插件），替换已发现的插件
+
+        不指定 entry_points 时读取已安装包的入口点；PLUGINS_ENABLED 为 False 时不发现任何插件。
+        """
+        if entry_points is None:
+            entry_points = []
+            if settings.PLUGINS_ENABLED:
+                installed = metadata.entry_points()
+                for group in ENTRY_POINT_GROUPS.values():
+                    entry_points.extend(installed.select(group=group))
+        groups = {group: hook for hook, group in ENTRY_POINT_GROUPS.items()}
+        disabled = set(settings.get_disabled_plugins())
+        hooks: Dict[str, List[PluginHook]] = {hook: [] for hook in ENTRY_POINT_GROUPS}
+        for entry_point in entry_points:
+            hook = groups.get(entry_point.group)
+            if hook is None:
+                continue
+            if entry_point.name in disabled:
+                logger.info("Plugin %s is disabled, skipping its %s hook", entry_point.name, hook)
+                continue
+            hooks[hook].append(PluginHook(entry_point.name, hook, entry_point))
+        self._hooks = hooks
+
+    def hooks(self, hook: str) -> List[PluginHook]:
+        return self._hooks[hook]
+
+    def run_heartbeat_hooks(self, bot, changed) -> None:
+        for hook in self._hooks[HOOK_HEARTBEAT]:
+            hook.call(bot, changed)
+
+    def has_notification_channels(self) -> bool:
+        return bool(self._hooks[HOOK_NOTIFICATIONS])
+
+    def queue_notifications(self, events: Iterable[dict]) -> None:
+        """
+        把事件交给后台任务通知插件（线程安全，不调用插件）
+
+        队列已满时丢弃新事件并计数；通知渠道是尽力而为的，可靠投递用 webhook。
+        """
+        dropped = 0
+        with self._lock:
+            for event in events:
+                if len(self._notifications) >= self.queue_size:
+                    dropped += 1
+                else:
+                    self._notifications.append(event)
+        if dropped:
+            plugin_notifications_dropped.inc(dropped)
+            logger.warning("Plugin notification queue is full, dropped %d events", dropped)
+        notify_worker.wake()
+
+    def deliver_notifications(self) -> int:
+        """依次把队列中的事件交给每个通知渠道，返回事件数"""
+        delivered = 0
+        while True:
+            with self._lock:
+                if not self._notifications:
+                    return delivered
+                event = self._notifications.popleft()
+            for hook in self._hooks[HOOK_NOTIFICATIONS]:
+                hook.call(event)
+            delivered += 1
+
+    def mount_routes(self, app, prefix: str) -> None:
+        """为每个提供路由的插件挂载一个延迟导入的入口"""
+        for hook in self._hooks[HOOK_ROUTES]:
+            path = f"{prefix}/{hook.plugin}"
+            app.router.routes.append(Mount(path, app=LazyRoutes(hook, path)))
+
+    def describe(self) -> List[dict]:
+        return [hook.describe() for hooks in self._hooks.values() for hook in hooks]
+
+
+plugins = PluginRegistry(settings.PLUGIN_NOTIFY_QUEUE_SIZE)
+plugins.discover()
+
+notify_worker = register_worker(
+    "plugin-notify", plugins.deliver_notifications, settings.PLUGIN_NOTIFY_INTERVAL, run_on_shutdown=True
+)
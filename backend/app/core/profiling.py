@@ -0,0 +1,170 @@
+"""
+按请求的 SQL 分析
+
+开启后（SQL_PROFILING_ENABLED，或 SQL_PROFILING_ALLOW_HEADER 时请求带 X-SQL-Profile: 1）
+记录每个请求执行的语句数、数据库总耗时、最慢的几条语句，以及重复执行的同一条语句（N+1）。
+结果写入响应头和一条日志记录（发现 N+1 时为 WARNING）。
+
+当前请求的分析对象放在 contextvar 中；同步接口在线程池中执行时会复制上下文，
+引擎事件在工作线程中也能找到它。
+"""
+
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+
+from app.config import settings
+
+logger = logging.getLogger("app.sql_profile")
+
+REQUEST_HEADER = "x-sql-profile"
+QUERY_COUNT_HEADER = "X-SQL-Query-Count"
+QUERY_TIME_HEADER = "X-SQL-Time-Ms"
+REPEATED_HEADER = "X-SQL-Repeated"
+
+_current: ContextVar[Optional["QueryProfile"]] = ContextVar("sql_profile", default=None)
+
+# IN (?, ?, ?) / IN (%(p_1)s, ...) / IN (__[POSTCOMPILE_p]) 折叠成一个占位符，参数个数不同也算同一条语句
+_PLACEHOLDER_LIST = re.compile(r"\(\s*(?:\?|%\(\w+\)s|%s|:\w+)(?:\s*,\s*(?:\?|%\(\w+\)s|%s|:\w+))*\s*\)")
+_POSTCOMPILE = re.compile(r"\(?__\[POSTCOMPILE_\w+\]\)?")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_statement(statement: str) -> str:
+    """语句模式：折叠空白和占位符列表"""
+    statement = _WHITESPACE.sub(" ", statement.strip())
+    statement = _POSTCOMPILE.sub("(?)", statement)
+    return _PLACEHOLDER_LIST.sub("(?)", statement)
+
+
+class QueryProfile:
+    """一个请求（或一段代码）中执行的 SQL"""
+
+    def __init__(self, label: str = ""):
+        self.label = label
+        self.count = 0
+        self.total_time = 0.0
+        self.statements: List[Tuple[float, str]] = []
+        self.patterns: Counter = Counter()
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.count += 1
+        self.total_time += elapsed
+        self.statements.append((elapsed, statement))
+        self.patterns[normalize_statement(statement)] += 1
+
+    def slowest(self, n: int) -> List[Tuple[float, str]]:
+        return sorted(self.statements, key=lambda item: item[0], reverse=True)[:n]
+
+    def repeated(self, threshold: int) -> Dict[str, int]:
+        """执行次数达到阈值的语句模式（疑似 N+1）"""
+        return {pattern: count for pattern, count in self.patterns.most_common() if count >= threshold}
+
+    def summary(self, top_n: int, threshold: int) -> dict:
+        return {
+            "label": self.label,
+            "queries": self.count,
+            "db_time_ms": round(self.total_time * 1000, 2),
+            "slowest": [
+                {"ms": round(elapsed * 1000, 2), "statement": statement[:500]}
+                for elapsed, statement in self.slowest(top_n)
+            ],
+            "repeated": [
+                {"count": count, "statement": pattern[:500]}
+                for pattern, count in self.repeated(threshold).items()
+            ],
+        }
+
+
+@contextmanager
+def profile_queries(label: str = "") -> Iterator[QueryProfile]:
+    """在当前上下文中记录 SQL（也可在脚本和测试中直接使用）"""
+    profile = QueryProfile(label)
+    token = _current.set(profile)
+    try:
+        yield profile
+    finally:
+        _current.reset(token)
+
+
+def instrument_engine(engine) -> None:
+    """没有进行中的分析时只多一次 contextvar 读取"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if _current.get() is not None:
+            conn.info.setdefault("profile_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        profile = _current.get()
+        starts = conn.info.get("profile_query_start")
+        if profile is None or not starts:
+            return
+        profile.record(statement, time.perf_counter() - starts.pop())
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        starts = context.connection.info.get("profile_query_start") if context.connection is not None else None
+        if starts:
+            starts.pop()
+
+
+class SQLProfilingMiddleware:
+    """为开启分析的请求记录 SQL，结果写入响应头和日志（纯 ASGI 中间件）"""
+
+    def __init__(self, app):
+        self.app = app
+
+    @staticmethod
+    def _enabled(scope) -> bool:
+        if settings.SQL_PROFILING_ENABLED:
+            return True
+        if not settings.SQL_PROFILING_ALLOW_HEADER:
+            return False
+        for name, value in scope.get("headers", ()):
+            if name == REQUEST_HEADER.encode():
+                return value.strip() in (b"1", b"true")
+        return False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._enabled(scope):
+            await self.app(scope, receive, send)
+            return
+
+        threshold = settings.SQL_PROFILING_REPEAT_THRESHOLD
+
+        with profile_queries(f"{scope['method']} {scope['path']}") as profile:
+
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    headers = list(message.get("headers", []))
+                    headers += [
+                        (QUERY_COUNT_HEADER.lower().encode(), str(profile.count).encode()),
+                        (QUERY_TIME_HEADER.lower().encode(), f"{profile.total_time * 1000:.2f}".encode()),
+                        (REPEATED_HEADER.lower().encode(), str(len(profile.repeated(threshold))).encode()),
+                    ]
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                summary = profile.summary(settings.SQL_PROFILING_TOP_N, threshold)
+                level = logging.WARNING if summary["repeated"] else logging.INFO
+                logger.log(
+                    level,
+                    "%s: %d queries in %.2f ms%s",
+                    profile.label, profile.count, profile.total_time * 1000,
+                    f", {len(summary['repeated'])} repeated (possible N+1)" if summary["repeated"] else "",
+                    extra={"sql_profile": summary},
+                )
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(json.dumps(summary, ensure_ascii=False))
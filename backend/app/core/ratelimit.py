@@ -0,0 +1,196 @@
+"""
+按路由的令牌桶限流
+
+规则写在 RATE_LIMITS 中，用分号分隔，每条规则：
+
+    <方法> <路径模板> <键>=<次数>/<周期>[:<突发>][, <键>=...]
+
+例如 ``POST /api/v1/bots/{bot_id}/heartbeat bot=1/s:10`` 表示每个机器人每秒补充 1 个令牌、
+桶容量 10。键可以是：
+
+- bot：路径参数 bot_id
+- user：Bearer token 中的用户，未登录时退回 ip
+- ip：客户端地址（RATE_LIMIT_TRUST_FORWARDED 时取 X-Forwarded-For 的第一个地址）
+
+周期为 s、m、h；不写突发时桶容量等于一个周期内的次数。一个请求匹配的每个桶都必须有令牌，
+否则返回 429 和 Retry-After。令牌桶保存在共享状态后端（app.core.state）中：
+local 为进程内字典，shm / redis 在多个 worker 之间共享（redis 用 Lua 脚本原子地扣减）。
+扣减令牌是同步的后端调用（shm 要等 SQLite 锁、redis 要等网络），在线程池中执行，不阻塞事件循环。
+后端出错时放行请求，不让限流本身成为故障点。
+"""
+
+import json
+import logging
+import math
+import re
+from typing import List, NamedTuple, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from starlette.routing import compile_path
+
+from app.config import settings
+from app.core import metrics
+from app.core.state import get_state
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {"s": 1.0, "m": 60.0, "h": 3600.0}
+
+_LIMIT = re.compile(r"^(bot|user|ip)=(\d+(?:\.\d+)?)/([smh])(?::(\d+(?:\.\d+)?))?$")
+
+rate_limited = metrics.counter(
+    "bothub_rate_limited_total", "Requests rejected by rate limiting", ("route", "key")
+)
+
+
+class Limit(NamedTuple):
+    key: str
+    rate: float  # 每秒补充的令牌数
+    burst: float
+
+
+class RateLimitRule(NamedTuple):
+    method: str
+    path: str
+    pattern: "re.Pattern"
+    limits: Tuple[Limit, ...]
+
+
+def parse_rules(spec: str) -> List[RateLimitRule]:
+    """解析 RATE_LIMITS，格式错误时抛出 ValueError"""
+    rules = []
+    for raw in spec.split(";"):
+        raw = raw.strip()
+        if not raw:
+            continue
+        parts = raw.split(None, 2)
+        if len(parts) != 3:
+            raise ValueError(f"Invalid rate limit rule {raw!r}, expected '<METHOD> <path> <key>=<n>/<period>'")
+        method, path, limits_spec = parts
+        limits = []
+        for item in limits_spec.split(","):
+            match = _LIMIT.match(item.strip())
+            if not match:
+                raise ValueError(f"Invalid limit {item.strip()!r} in rule {raw!r}")
+            key, count, period, burst = match.groups()
+            limits.append(Limit(key, float(count) / PERIODS[period], float(burst) if burst else float(count)))
+        pattern, _, _ = compile_path(path)
+        rules.append(RateLimitRule(method.upper(), path, pattern, tuple(limits)))
+    return rules
+
+
+class RateLimiter:
+    """按规则检查请求，返回需要等待的秒数（0 表示放行）"""
+
+    def __init__(self, rules: List[RateLimitRule], backend=None):
+        self.rules = rules
+        self._backend = backend
+
+    @property
+    def backend(self):
+        return self._backend or get_state()
+
+    def match(self, method: str, path: str) -> Optional[Tuple[RateLimitRule, dict]]:
+        for rule in self.rules:
+            if rule.method in (method, "*"):
+                found = rule.pattern.match(path)
+                if found:
+                    return rule, found.groupdict()
+        return None
+
+    def check(self, rule: RateLimitRule, identities: dict) -> Tuple[float, Optional[str]]:
+        """identities: {"bot": ..., "user": ..., "ip": ...}，返回 (等待秒数, 触发限流的键)"""
+        backend = self.backend
+        for limit in rule.limits:
+            identity = identities.get(limit.key)
+            if identity is None:
+                continue
+            key = f"ratelimit:{rule.method}:{rule.path}:{limit.key}:{identity}"
+            retry_after = backend.take_token(key, limit.rate, limit.burst)
+            if retry_after > 0:
+                return retry_after, limit.key
+        return 0.0, None
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers", ()):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def client_ip(scope) -> str:
+    if settings.RATE_LIMIT_TRUST_FORWARDED:
+        forwarded = _header(scope, b"x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+def authenticated_user(scope) -> Optional[str]:
+    authorization = _header(scope, b"authorization")
+    if not authorization or not authorization.lower().startswith("bearer "):
+        return None
+    from app.core.security import decode_access_token
+
+    payload = decode_access_token(authorization[7:].strip())
+    return str(payload["sub"]) if payload and "sub" in payload else None
+
+
+class RateLimitMiddleware:
+    """匹配 RATE_LIMITS 规则的请求先取令牌，取不到时直接返回 429（纯 ASGI 中间件）"""
+
+    def __init__(self, app):
+        self.app = app
+        self._spec: Optional[str] = None
+        self._limiter: Optional[RateLimiter] = None
+
+    def limiter(self) -> RateLimiter:
+        # 规则在第一次使用（或配置变化）时解析
+        if self._spec != settings.RATE_LIMITS:
+            self._limiter = RateLimiter(parse_rules(settings.RATE_LIMITS))
+            self._spec = settings.RATE_LIMITS
+        return self._limiter
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.RATE_LIMIT_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        limiter = self.limiter()
+        matched = limiter.match(scope["method"], scope["path"])
+        if matched is None:
+            await self.app(scope, receive, send)
+            return
+
+        rule, params = matched
+        keys = {limit.key for limit in rule.limits}
+        identities = {"bot": params.get("bot_id")}
+        if "ip" in keys or "user" in keys:
+            identities["ip"] = client_ip(scope)
+        if "user" in keys:
+            identities["user"] = authenticated_user(scope) or f"ip:{identities['ip']}"
+
+        try:
+            retry_after, key = await run_in_threadpool(limiter.check, rule, identities)
+        except Exception:
+            logger.exception("Rate limit check failed, allowing request")
+            retry_after, key = 0.0, None
+
+        if retry_after <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        rate_limited.labels(rule.path, key).inc()
+        body = json.dumps({"detail": "Rate limit exceeded"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
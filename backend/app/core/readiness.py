@@ -0,0 +1,136 @@
+"""
+存活与就绪检查
+
+- /livez：进程能处理请求即可，不访问数据库（探测失败时应重启进程）
+- /readyz：连接池已预热、数据库可用、迁移版本与代码一致（探测失败时应暂停转发流量）
+
+启动时不再 create_all（它会对整个 schema 做反射），而是在后台线程中预先建立
+DB_POOL_WARM_CONNECTIONS 个连接，并比较 alembic_version 与代码中的迁移 head。
+预热完成前 /readyz 返回 503；数据库暂时不可用时每隔几秒重试。
+"""
+
+import asyncio
+import logging
+import os
+import time
+from functools import lru_cache
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.database import engine
+
+logger = logging.getLogger(__name__)
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "alembic.ini")
+
+
+@lru_cache(maxsize=1)
+def code_heads() -> List[str]:
+    """代码中的迁移 head（alembic 只在这里导入）"""
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+
+    return sorted(ScriptDirectory.from_config(Config(ALEMBIC_INI)).get_heads())
+
+
+def database_revisions(connection) -> List[str]:
+    """数据库当前的迁移版本；没有 alembic_version 表时为空"""
+    try:
+        rows = connection.execute(text("SELECT version_num FROM alembic_version")).scalars().all()
+    except Exception:
+        connection.rollback()
+        return []
+    return sorted(rows)
+
+
+class Readiness:
+    """进程的就绪状态，prepare() 在后台线程中执行，成功之前会重试"""
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.restart()
+
+    def restart(self) -> None:
+        """进程（或测试中的应用）重新启动时清空状态"""
+        self.pool_warm = False
+        self.schema_ok: Optional[bool] = None
+        self.schema_detail: Optional[str] = None
+        self.error: Optional[str] = None
+        self.started_at = time.monotonic()
+        self.ready_after: Optional[float] = None
+
+    def warm_pool(self, size: int) -> None:
+        """同时借出 size 个连接，让连接池在第一个请求之前建好连接"""
+        connections = []
+        try:
+            for _ in range(max(1, size)):
+                connection = self.engine.connect()
+                connections.append(connection)
+                connection.execute(text("SELECT 1"))
+        finally:
+            for connection in connections:
+                connection.close()
+
+    def check_schema(self) -> None:
+        if settings.SCHEMA_CHECK == "off" or settings.DATABASE_AUTO_CREATE:
+            self.schema_ok = True
+            return
+        heads = code_heads()
+        with self.engine.connect() as connection:
+            current = database_revisions(connection)
+        self.schema_ok = current == heads
+        if not self.schema_ok:
+            self.schema_detail = (
+                f"database at {', '.join(current) or 'no revision'}, code at {', '.join(heads)}; "
+                "run `alembic upgrade head`"
+            )
+            log = logger.error if settings.SCHEMA_CHECK == "strict" else logger.warning
+            log("Schema revision mismatch: %s", self.schema_detail)
+
+    def prepare(self) -> bool:
+        """预热连接池并检查迁移版本，失败时返回 False"""
+        try:
+            self.warm_pool(settings.DB_POOL_WARM_CONNECTIONS)
+            self.pool_warm = True
+            self.check_schema()
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            logger.warning("Readiness preparation failed: %s", self.error)
+            return False
+        self.error = None
+        self.ready_after = time.monotonic() - self.started_at
+        logger.info("Ready after %.3fs", self.ready_after)
+        return True
+
+    def check(self) -> dict:
+        """/readyz 的结果，ready 为 False 时返回 503"""
+        checks = {
+            "pool_warm": self.pool_warm,
+            "schema": "ok" if self.schema_ok else (self.schema_detail or "pending"),
+        }
+        ready = self.ready_after is not None and (self.schema_ok or settings.SCHEMA_CHECK != "strict")
+        if self.error:
+            checks["error"] = self.error
+            ready = False
+        if ready:
+            try:
+                with self.engine.connect() as connection:
+                    connection.execute(text("SELECT 1"))
+                checks["database"] = "ok"
+            except Exception as e:
+                checks["database"] = f"{type(e).__name__}: {e}"
+                ready = False
+        return {"status": "ready" if ready else "not_ready", "checks": checks}
+
+
+readiness = Readiness(engine)
+
+
+async def prepare_in_background(state: Readiness = readiness, retry_interval: float = 2.0) -> None:
+    """在 lifespan 中作为任务启动，不阻塞启动过程（调用前先 restart()）"""
+    while not await run_in_threadpool(state.prepare):
+        await asyncio.sleep(retry_interval)
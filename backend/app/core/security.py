@@ -1,24 +1,28 @@
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Optional, Union
 from uuid import UUID
 
-from jose import JWTError, jwt
-from passlib.context import CryptContext
-
 from app.config import settings
 
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# jose and passlib are imported on first use to keep app startup fast
+
+
+@lru_cache(maxsize=None)
+def get_pwd_context():
+    """Password hashing context."""
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a plain password against a hashed password."""
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
     """Generate password hash."""
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 
 def create_access_token(
@@ -36,6 +40,7 @@ def create_access_token(
         )
 
     to_encode.update({"exp": expire})
+    from jose import jwt
     encoded_jwt = jwt.encode(
         to_encode,
         settings.SECRET_KEY,
@@ -46,6 +51,7 @@ def create_access_token(
 
 def decode_access_token(token: str) -> Optional[dict]:
     """Decode and validate JWT access token."""
+    from jose import JWTError, jwt
     try:
         payload = jwt.decode(
             token,
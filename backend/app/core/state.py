@@ -0,0 +1,552 @@
+"""
+跨进程共享状态
+
+多进程部署（gunicorn 多个 worker）时，进程内的缓存、在线状态和限流计数只对本进程可见。
+需要在 worker 之间保持一致的状态通过这里的后端读写：
+
+- local：进程内字典，单进程部署（默认）
+- shm：/dev/shm 中的 SQLite 文件，同一台机器上的所有 worker 共享，不需要额外服务
+- redis：多台机器共享（需要 redis 包）
+
+后端只提供少量原语：带过期时间的键值、原子计数、令牌桶、带过期时间的字段表，
+以及在这些原语之上实现的广播通道（Channel），用于通知其他 worker 失效缓存。
+过期时间都按墙上时钟计算，各进程的时钟一致即可。
+读取时跳过已过期的数据，后台任务 state-prune 定期删除它们（shm 的数据占用的是内存）。
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from app.config import settings
+from app.core.background import register_worker
+
+logger = logging.getLogger(__name__)
+
+
+class StateBackend:
+    """共享状态后端接口"""
+
+    name = "base"
+    # 是否在进程之间共享；local 为 False，这时调用方可以跳过同步
+    shared = True
+
+    def get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        """原子加 amount 并返回新值；键不存在（或已过期）时从 0 开始，并设置 ttl"""
+        raise NotImplementedError
+
+    def take_token(self, key: str, rate: float, burst: float, cost: float = 1.0) -> float:
+        """
+        令牌桶：桶容量 burst，每秒补充 rate 个令牌，取出 cost 个
+
+        成功返回 0，令牌不足时不扣减并返回需要等待的秒数。桶满后状态会过期删除。
+        """
+        raise NotImplementedError
+
+    def put_field(self, namespace: str, field: str, value: str, ttl: float) -> None:
+        raise NotImplementedError
+
+    def append_field(self, counter: str, namespace: str, value: str, ttl: float) -> int:
+        """
+        原子地把计数器 counter 加 1，并以新值为字段名写入 namespace，返回新值
+
+        读到计数器新值的一方一定也能读到这个字段。
+        """
+        raise NotImplementedError
+
+    def delete_field(self, namespace: str, field: str) -> None:
+        raise NotImplementedError
+
+    def fields(self, namespace: str) -> Dict[str, str]:
+        """namespace 中未过期的全部字段"""
+        raise NotImplementedError
+
+    def prune(self) -> int:
+        """删除已过期的键和字段，返回删除的数量；自己会过期的后端什么也不做"""
+        return 0
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class LocalStateBackend(StateBackend):
+    """进程内实现"""
+
+    name = "local"
+    shared = False
+
+    # 令牌桶数量超过这个值时清理已经补满的桶
+    MAX_BUCKETS = 100000
+
+    def __init__(self):
+        self._values: Dict[str, tuple] = {}
+        self._fields: Dict[str, Dict[str, tuple]] = {}
+        self._buckets: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _expires(ttl: Optional[float]) -> Optional[float]:
+        return time.time() + ttl if ttl else None
+
+    def _live(self, item: Optional[tuple], now: float) -> Optional[str]:
+        if item is None or (item[1] is not None and item[1] <= now):
+            return None
+        return item[0]
+
+    def get(self, key):
+        with self._lock:
+            return self._live(self._values.get(key), time.time())
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._values[key] = (value, self._expires(ttl))
+
+    def delete(self, key):
+        with self._lock:
+            self._values.pop(key, None)
+
+    def incr(self, key, amount=1, ttl=None):
+        with self._lock:
+            item = self._values.get(key)
+            if self._live(item, time.time()) is None:
+                item = ("0", self._expires(ttl))
+            value = int(item[0]) + amount
+            self._values[key] = (str(value), item[1])
+            return value
+
+    def take_token(self, key, rate, burst, cost=1.0):
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= self.MAX_BUCKETS:
+                    self._prune_buckets(now)
+                bucket = self._buckets[key] = [burst, now, rate, burst]
+            tokens = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+            if tokens >= cost:
+                bucket[0] = tokens - cost
+                return 0.0
+            bucket[0] = tokens
+            return (cost - tokens) / rate
+
+    def _prune_buckets(self, now: float) -> None:
+        # 调用方持有锁
+        full = [
+            key for key, (tokens, updated, rate, burst) in self._buckets.items()
+            if tokens + (now - updated) * rate >= burst
+        ]
+        for key in full:
+            del self._buckets[key]
+
+    def put_field(self, namespace, field, value, ttl):
+        with self._lock:
+            self._fields.setdefault(namespace, {})[field] = (value, self._expires(ttl))
+
+    def append_field(self, counter, namespace, value, ttl):
+        with self._lock:
+            item = self._values.get(counter)
+            seq = int(item[0]) + 1 if self._live(item, time.time()) is not None else 1
+            self._values[counter] = (str(seq), item[1] if item else None)
+            self._fields.setdefault(namespace, {})[str(seq)] = (value, self._expires(ttl))
+            return seq
+
+    def delete_field(self, namespace, field):
+        with self._lock:
+            self._fields.get(namespace, {}).pop(field, None)
+
+    def fields(self, namespace):
+        now = time.time()
+        with self._lock:
+            table = self._fields.get(namespace, {})
+            for field in [f for f, item in table.items() if self._live(item, now) is None]:
+                del table[field]
+            return {field: item[0] for field, item in table.items()}
+
+    def prune(self):
+        now = time.time()
+        removed = 0
+        with self._lock:
+            for key in [k for k, item in self._values.items() if self._live(item, now) is None]:
+                del self._values[key]
+                removed += 1
+            for namespace, table in list(self._fields.items()):
+                for field in [f for f, item in table.items() if self._live(item, now) is None]:
+                    del table[field]
+                    removed += 1
+                if not table:
+                    del self._fields[namespace]
+        return removed
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+            self._fields.clear()
+            self._buckets.clear()
+
+
+class SharedMemoryStateBackend(StateBackend):
+    """
+    同一台机器上多个进程共享的状态，存放在 /dev/shm（内存文件系统）中的 SQLite 文件里
+
+    每个线程一个连接；写操作使用 BEGIN IMMEDIATE，计数等读改写在一个事务中完成。
+    """
+
+    name = "shm"
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)",
+        "CREATE TABLE IF NOT EXISTS fields ("
+        "namespace TEXT NOT NULL, field TEXT NOT NULL, value TEXT NOT NULL, expires_at REAL NOT NULL, "
+        "PRIMARY KEY (namespace, field))",
+        "CREATE INDEX IF NOT EXISTS kv_expires_at ON kv (expires_at) WHERE expires_at IS NOT NULL",
+        "CREATE INDEX IF NOT EXISTS fields_expires_at ON fields (expires_at)",
+    )
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        with self._transaction() as conn:
+            for statement in self.SCHEMA:
+                conn.execute(statement)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    @staticmethod
+    def _expires(ttl: Optional[float]) -> Optional[float]:
+        return time.time() + ttl if ttl else None
+
+    def get(self, key):
+        row = self._conn().execute(
+            "SELECT value FROM kv WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)", (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, value, ttl=None):
+        with self._transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO kv VALUES (?, ?, ?)", (key, value, self._expires(ttl)))
+
+    def delete(self, key):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM kv WHERE key = ?", (key,))
+
+    def incr(self, key, amount=1, ttl=None):
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute("SELECT value, expires_at FROM kv WHERE key = ?", (key,)).fetchone()
+            if row is None or (row[1] is not None and row[1] <= now):
+                value, expires_at = amount, self._expires(ttl)
+            else:
+                value, expires_at = int(row[0]) + amount, row[1]
+            conn.execute("INSERT OR REPLACE INTO kv VALUES (?, ?, ?)", (key, str(value), expires_at))
+            return value
+
+    def take_token(self, key, rate, burst, cost=1.0):
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT value FROM kv WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)", (key, now)
+            ).fetchone()
+            if row is None:
+                tokens = burst
+            else:
+                stored, updated = map(float, row[0].split(":"))
+                tokens = min(burst, stored + max(0.0, now - updated) * rate)
+            retry_after = 0.0
+            if tokens >= cost:
+                tokens -= cost
+            else:
+                retry_after = (cost - tokens) / rate
+            # 桶补满之后状态可以丢弃
+            conn.execute(
+                "INSERT OR REPLACE INTO kv VALUES (?, ?, ?)",
+                (key, f"{tokens}:{now}", now + (burst - tokens) / rate + 1),
+            )
+            return retry_after
+
+    def put_field(self, namespace, field, value, ttl):
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO fields VALUES (?, ?, ?, ?)", (namespace, field, value, time.time() + ttl)
+            )
+
+    def append_field(self, counter, namespace, value, ttl):
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute("SELECT value, expires_at FROM kv WHERE key = ?", (counter,)).fetchone()
+            if row is None or (row[1] is not None and row[1] <= now):
+                seq, expires_at = 1, None
+            else:
+                seq, expires_at = int(row[0]) + 1, row[1]
+            conn.execute("INSERT OR REPLACE INTO kv VALUES (?, ?, ?)", (counter, str(seq), expires_at))
+            conn.execute("INSERT OR REPLACE INTO fields VALUES (?, ?, ?, ?)", (namespace, str(seq), value, now + ttl))
+            return seq
+
+    def delete_field(self, namespace, field):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM fields WHERE namespace = ? AND field = ?", (namespace, field))
+
+    def fields(self, namespace):
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM fields WHERE namespace = ? AND expires_at <= ?", (namespace, now))
+            rows = conn.execute("SELECT field, value FROM fields WHERE namespace = ?", (namespace,)).fetchall()
+        return dict(rows)
+
+    def prune(self):
+        now = time.time()
+        with self._transaction() as conn:
+            removed = conn.execute("DELETE FROM kv WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,)).rowcount
+            removed += conn.execute("DELETE FROM fields WHERE expires_at <= ?", (now,)).rowcount
+        return removed
+
+    def clear(self):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM kv")
+            conn.execute("DELETE FROM fields")
+
+    def close(self):
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+
+class RedisStateBackend(StateBackend):
+    """
+    Redis 实现，多台机器共享
+
+    字段表用一个 hash 存值、一个 zset 存过期时间（Redis 7.4 之前 hash 字段不能单独过期）。
+    """
+
+    name = "redis"
+
+    # 令牌桶在一个脚本中原子地完成读取、补充和扣减；时间取 Redis 服务器时钟
+    TOKEN_BUCKET_SCRIPT = """
+local rate, burst, cost = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local retry_after = 0
+if tokens >= cost then
+    tokens = tokens - cost
+else
+    retry_after = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil((burst - tokens) / rate * 1000) + 1000)
+return tostring(retry_after)
+"""
+
+    # 递增序号并写入字段在同一个脚本中完成，读到新序号时字段一定已经存在
+    APPEND_FIELD_SCRIPT = """
+local seq = tostring(redis.call('INCR', KEYS[1]))
+redis.call('HSET', KEYS[2], seq, ARGV[1])
+redis.call('ZADD', KEYS[3], ARGV[2], seq)
+return seq
+"""
+
+    def __init__(self, url: str, prefix: str):
+        try:
+            import redis
+        except ImportError:  # pragma: no cover
+            raise RuntimeError("STATE_BACKEND=redis requires the redis package (pip install redis)")
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self.prefix = prefix
+        # EVALSHA，脚本不在服务器缓存中时自动改用 EVAL
+        self._token_bucket = self.client.register_script(self.TOKEN_BUCKET_SCRIPT)
+        self._append_field = self.client.register_script(self.APPEND_FIELD_SCRIPT)
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    def get(self, key):
+        return self.client.get(self._key(key))
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self._key(key), value, px=int(ttl * 1000) if ttl else None)
+
+    def delete(self, key):
+        self.client.delete(self._key(key))
+
+    def incr(self, key, amount=1, ttl=None):
+        name = self._key(key)
+        pipe = self.client.pipeline()
+        if ttl:
+            # 只在键不存在时设置过期时间，固定窗口计数
+            pipe.set(name, 0, px=int(ttl * 1000), nx=True)
+        pipe.incrby(name, amount)
+        return int(pipe.execute()[-1])
+
+    def take_token(self, key, rate, burst, cost=1.0):
+        # Lua 的数字返回给客户端时会截断成整数，所以脚本返回字符串
+        return float(self._token_bucket(keys=[self._key(key)], args=[rate, burst, cost]))
+
+    def put_field(self, namespace, field, value, ttl):
+        pipe = self.client.pipeline()
+        pipe.hset(self._key(namespace), field, value)
+        pipe.zadd(self._key(f"{namespace}:expires"), {field: time.time() + ttl})
+        pipe.execute()
+
+    def append_field(self, counter, namespace, value, ttl):
+        # 过期时间和 fields() 一样用本机时钟
+        keys = [self._key(counter), self._key(namespace), self._key(f"{namespace}:expires")]
+        return int(self._append_field(keys=keys, args=[value, time.time() + ttl]))
+
+    def delete_field(self, namespace, field):
+        pipe = self.client.pipeline()
+        pipe.hdel(self._key(namespace), field)
+        pipe.zrem(self._key(f"{namespace}:expires"), field)
+        pipe.execute()
+
+    def fields(self, namespace):
+        values, expires = self._key(namespace), self._key(f"{namespace}:expires")
+        expired = self.client.zrangebyscore(expires, "-inf", time.time())
+        if expired:
+            pipe = self.client.pipeline()
+            pipe.hdel(values, *expired)
+            pipe.zrem(expires, *expired)
+            pipe.execute()
+        return self.client.hgetall(values)
+
+    def clear(self):
+        keys = list(self.client.scan_iter(match=f"{self.prefix}*"))
+        if keys:
+            self.client.delete(*keys)
+
+    def close(self):
+        self.client.close()
+
+
+class Channel:
+    """
+    在共享状态上实现的广播通道
+
+    publish() 递增序号并把消息按序号写入字段表（一次原子操作，保留 STATE_CHANNEL_RETENTION 秒）；
+    每个订阅者记住读到的序号，poll() 取出之后的消息。订阅者落后太多、消息已过期时
+    poll() 返回 None，调用方应按“全部失效”处理。local 后端上通道什么也不做。
+    不指定 backend 时使用 get_state()。
+    """
+
+    def __init__(self, name: str, backend: Optional[StateBackend] = None, retention: Optional[float] = None):
+        self._backend = backend
+        self.name = name
+        self.retention = retention or settings.STATE_CHANNEL_RETENTION
+        self._seq_key = f"channel:{name}:seq"
+        self._log = f"channel:{name}:log"
+        self._last_seen: Optional[int] = None
+
+    @property
+    def backend(self) -> StateBackend:
+        return self._backend or get_state()
+
+    def publish(self, message) -> None:
+        if not self.backend.shared:
+            return
+        self.backend.append_field(self._seq_key, self._log, json.dumps(message), self.retention)
+
+    def poll(self) -> Optional[List]:
+        if not self.backend.shared:
+            return []
+        current = int(self.backend.get(self._seq_key) or 0)
+        if self._last_seen is None or current < self._last_seen:
+            # 第一次读取（或共享状态被清空）：从当前位置开始
+            self._last_seen = current
+            return []
+        if current == self._last_seen:
+            return []
+        log = self.backend.fields(self._log)
+        wanted = range(self._last_seen + 1, current + 1)
+        self._last_seen = current
+        if any(str(seq) not in log for seq in wanted):
+            return None
+        return [json.loads(log[str(seq)]) for seq in wanted]
+
+
+def create_backend(name: Optional[str] = None) -> StateBackend:
+    name = name or settings.STATE_BACKEND
+    if name == "local":
+        return LocalStateBackend()
+    if name == "shm":
+        return SharedMemoryStateBackend(settings.STATE_SHM_PATH)
+    if name == "redis":
+        return RedisStateBackend(settings.STATE_REDIS_URL, settings.STATE_KEY_PREFIX)
+    raise ValueError(f"Unknown state backend '{name}', expected one of ['local', 'redis', 'shm']")
+
+
+_backend: Optional[StateBackend] = None
+_backend_lock = threading.Lock()
+
+
+def get_state() -> StateBackend:
+    """进程内的共享状态后端（第一次使用时按配置创建）"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = create_backend()
+                if not _backend.shared and int(os.environ.get("WEB_CONCURRENCY", "1")) > 1:
+                    logger.warning(
+                        "STATE_BACKEND=local with %s workers: caches, presence and rate limits are per worker",
+                        os.environ["WEB_CONCURRENCY"],
+                    )
+    return _backend
+
+
+def set_state(backend: Optional[StateBackend]) -> None:
+    """替换后端（测试用）"""
+    global _backend
+    with _backend_lock:
+        _backend = backend
+
+
+def prune_state() -> None:
+    removed = get_state().prune()
+    if removed:
+        logger.debug("Pruned %d expired state entries", removed)
+
+
+register_worker("state-prune", prune_state, settings.STATE_PRUNE_INTERVAL)
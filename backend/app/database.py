@@ -1,15 +1,27 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import StaticPool
 from typing import Generator
 
 from app.config import settings
 
+# SQLite (tests / local benchmarks): share connections across threads,
+# and keep a single connection for in-memory databases
+engine_kwargs = {}
+database_url = make_url(settings.DATABASE_URL)
+if database_url.get_backend_name() == "sqlite":
+    engine_kwargs["connect_args"] = {"check_same_thread": False}
+    if database_url.database in (None, "", ":memory:"):
+        engine_kwargs["poolclass"] = StaticPool
+
 # Create SQLAlchemy engine
 engine = create_engine(
     settings.DATABASE_URL,
     pool_pre_ping=True,
-    echo=settings.DEBUG
+    echo=settings.DEBUG,
+    **engine_kwargs
 )
 
 # Create session factory
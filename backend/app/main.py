@@ -1,22 +1,48 @@
+import asyncio
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 
 from app.config import settings
 from app.database import engine, Base
+from app.core.background import start_workers, stop_workers
+from app.core import metrics, profiling
+from app.core.plugins import plugins
+from app.core.idempotency import IdempotencyMiddleware
+from app.core.ratelimit import RateLimitMiddleware
+from app.core.readiness import prepare_in_background, readiness
 from app.api.v1 import bots_router
 from app.api.v1.claim import router as claim_router
+from app.api.v1.blobs import router as blobs_router
+from app.api.v1.activities import router as activities_router
+from app.api.v1.usage import router as usage_router
+from app.api.v1.uptime import router as uptime_router
+from app.api.v1.tasks import router as tasks_router
+from app.api.v1.webhooks import router as webhooks_router
+from app.api.v1.skills import router as skills_router
+from app.api.v1.grants import router as grants_router
+from app.api.v1.bus import router as bus_router
+from app.api.v1.plugins import router as plugins_router
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan handler."""
-    # Startup: Create database tables
-    Base.metadata.create_all(bind=engine)
+    # Startup: the schema is managed by Alembic; create_all only for local empty databases
+    if settings.DATABASE_AUTO_CREATE:
+        Base.metadata.create_all(bind=engine)
+    # Warm the DB pool and check the migration revision without blocking startup (see /readyz)
+    readiness.restart()
+    prepare_task = asyncio.create_task(prepare_in_background())
+    if settings.BACKGROUND_WORKERS_ENABLED:
+        start_workers()
     yield
-    # Shutdown: Cleanup (if needed)
+    # Shutdown: Stop background workers and flush buffers
+    prepare_task.cancel()
+    if settings.BACKGROUND_WORKERS_ENABLED:
+        await stop_workers()
 
 
 # Create FastAPI application
@@ -29,6 +55,18 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Rejected requests never reach the handlers, so the limiter sits innermost
+app.add_middleware(RateLimitMiddleware)
+# Replayed retries are answered before they spend rate-limit tokens
+app.add_middleware(IdempotencyMiddleware)
+
+profiling.instrument_engine(engine)
+app.add_middleware(profiling.SQLProfilingMiddleware)
+
+if settings.METRICS_ENABLED:
+    metrics.instrument_engine(engine)
+    app.add_middleware(metrics.MetricsMiddleware)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -53,6 +91,43 @@ def health_check():
     }
 
 
+@app.get("/livez", status_code=status.HTTP_200_OK)
+def liveness():
+    """
+    Liveness probe.
+
+    Answers as long as the process can serve requests; never touches the
+    database, so a database outage does not get the process restarted.
+    """
+    return {"status": "alive"}
+
+
+@app.get("/readyz")
+def readiness_probe():
+    """
+    Readiness probe.
+
+    Returns 503 until the database pool has been warmed and the migration
+    revision has been checked (with SCHEMA_CHECK=strict a mismatch keeps the
+    process not ready), and whenever the database cannot be reached.
+    """
+    result = readiness.check()
+    code = status.HTTP_200_OK if result["status"] == "ready" else status.HTTP_503_SERVICE_UNAVAILABLE
+    return JSONResponse(result, status_code=code)
+
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """
+    Prometheus metrics endpoint.
+
+    Per-route request counts and latency histograms, in-flight requests,
+    SQL statement counts and latency, Feishu API latency and heartbeat counts
+    for this process.
+    """
+    return Response(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
+
 @app.get("/")
 def root():
     """
@@ -64,13 +139,30 @@ def root():
         "name": settings.APP_NAME,
         "version": "1.0.0",
         "docs": "/docs",
-        "health": "/health"
+        "health": "/health",
+        "liveness": "/livez",
+        "readiness": "/readyz"
     }
 
 
 # Include API routers
 app.include_router(bots_router, prefix="/api/v1")
 app.include_router(claim_router, prefix="/api/v1")
+app.include_router(blobs_router, prefix="/api/v1")
+app.include_router(activities_router, prefix="/api/v1")
+app.include_router(usage_router, prefix="/api/v1")
+app.include_router(uptime_router, prefix="/api/v1")
+app.include_router(tasks_router, prefix="/api/v1")
+app.include_router(webhooks_router, prefix="/api/v1")
+app.include_router(skills_router, prefix="/api/v1")
+app.include_router(grants_router, prefix="/api/v1")
+app.include_router(bus_router, prefix="/api/v1")
+app.include_router(plugins_router, prefix="/api/v1")
+# Plugins are imported on their first request, not at startup
+plugins.mount_routes(app, "/api/v1/plugins")
+
+if settings.METRICS_ENABLED:
+    metrics.preregister_routes(app)
 
 
 if __name__ == "__main__":
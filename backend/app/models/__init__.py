@@ -1,3 +1,10 @@
 from app.models.bot import Bot
+from app.models.activity import BotActivity, BotActivityRollup
+from app.models.task import Task
+from app.models.webhook import WebhookDelivery
+from app.models.skill import Skill, SkillDailyStats
+from app.models.json_blob import JsonBlob
+from app.models.status_history import BotStatusRun
+from app.models.bus import BusSubscription, BusMessage
 
-__all__ = ["Bot"]
+__all__ = ["Bot", "BotActivity", "BotActivityRollup", "Task", "WebhookDelivery", "Skill", "SkillDailyStats", "JsonBlob", "BotStatusRun", "BusSubscription", "BusMessage"]
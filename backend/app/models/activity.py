@@ -0,0 +1,56 @@
+"""
+BotHub 活动日志 - 数据库模型
+PostgreSQL 上按 created_at 做按天范围分区
+"""
+
+import uuid
+from datetime import datetime
+
+from sqlalchemy import Column, Uuid, String, DateTime, Text, JSON, Integer, BigInteger, ForeignKey, Index
+
+from app.database import Base
+
+
+class BotActivity(Base):
+    """机器人活动日志（任务、技能安装、API 调用等）"""
+    __tablename__ = "bot_activities"
+    __table_args__ = (
+        Index("ix_bot_activities_bot_id_created_at", "bot_id", "created_at"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+    # 分区表的主键必须包含分区键
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
+    created_at = Column(DateTime, primary_key=True, default=datetime.utcnow)
+
+    bot_id = Column(Uuid, ForeignKey("bots.id", ondelete="CASCADE"), nullable=False)
+    activity_type = Column(String(50), nullable=False)  # task, skill_install, api_call
+    description = Column(Text, nullable=True)
+    meta = Column("metadata", JSON, nullable=True)
+    tokens_used = Column(Integer, default=0, nullable=False)
+
+    def to_dict(self):
+        return {
+            "id": str(self.id),
+            "bot_id": str(self.bot_id),
+            "activity_type": self.activity_type,
+            "description": self.description,
+            "metadata": self.meta,
+            "tokens_used": self.tokens_used,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+        }
+
+
+class BotActivityRollup(Base):
+    """活动日志汇总（按小时/按天），看板只读这张表"""
+    __tablename__ = "bot_activity_rollups"
+    __table_args__ = (
+        Index("ix_bot_activity_rollups_granularity_bucket", "granularity", "bucket_start"),
+    )
+
+    bot_id = Column(Uuid, ForeignKey("bots.id", ondelete="CASCADE"), primary_key=True)
+    granularity = Column(String(8), primary_key=True)  # hour, day
+    bucket_start = Column(DateTime, primary_key=True)
+
+    activity_count = Column(BigInteger, default=0, nullable=False)
+    tokens_used = Column(BigInteger, default=0, nullable=False)
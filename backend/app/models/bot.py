@@ -8,8 +8,7 @@ from datetime import datetime
 from typing import Dict, Any, Optional
 from enum import Enum
 
-from sqlalchemy import Column, String, DateTime, Text, JSON, ForeignKey, Enum as SQLEnum
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, Uuid, String, DateTime, Text, JSON, ForeignKey, Enum as SQLEnum
 from sqlalchemy.orm import relationship
 
 from app.database import Base
@@ -30,7 +29,7 @@ class Bot(Base):
 
     __tablename__ = "bots"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
     bot_id = Column(String(255), unique=True, nullable=False, index=True)
     bot_name = Column(String(255), nullable=False)
     
@@ -39,7 +38,7 @@ class Bot(Base):
     feishu_bot_id = Column(String(128), nullable=True)
     
     # 所有者
-    owner_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=True, index=True)
+    owner_id = Column(Uuid, ForeignKey("users.id"), nullable=True, index=True)
     
     # 基本信息
     description = Column(Text, nullable=True)
@@ -47,8 +46,11 @@ class Bot(Base):
     status = Column(SQLEnum(BotStatus), default=BotStatus.OFFLINE, nullable=False)
     
     # 能力和配置
+    # 超过 JSON_BLOB_INLINE_MAX_BYTES 的能力描述存入 json_blobs，这里只保留能力名摘要
     capabilities = Column(JSON, default=dict, nullable=False)
-    endpoint = Column(String(512), nullable=True)
+    capabilities_ref = Column(String(64), ForeignKey("json_blobs.hash"), nullable=True)
+    endpoint = Column(String(512), nullable=True)  # webhook URL
+    webhook_secret = Column(String(128), nullable=True)  # webhook HMAC 签名密钥
     version = Column(String(50), nullable=True)
     
     # 认领码
@@ -65,10 +67,18 @@ class Bot(Base):
     owner = relationship("User", back_populates="owned_bots", foreign_keys=[owner_id])
     claim_requests = relationship("ClaimRequest", back_populates="bot", cascade="all, delete-orphan")
     access_grants = relationship("BotAccessGrant", back_populates="bot", cascade="all, delete-orphan")
+    capabilities_blob = relationship("JsonBlob", lazy="select")
 
     def __repr__(self) -> str:
         return f"<Bot(id={self.id}, bot_id={self.bot_id}, name={self.bot_name})>"
 
+    @property
+    def full_capabilities(self) -> Dict[str, Any]:
+        """完整能力描述（外存时按需加载 json_blobs）"""
+        if self.capabilities_ref is not None:
+            return self.capabilities_blob.data
+        return self.capabilities
+
     def to_dict(self) -> Dict[str, Any]:
         """Convert bot instance to dictionary."""
         return {
@@ -0,0 +1,42 @@
+"""
+BotHub 消息总线 - 数据库模型
+BUS_BACKEND=database 时使用：订阅关系和每个接收者的一份待投递消息
+"""
+
+import uuid
+from datetime import datetime
+
+from sqlalchemy import Column, Uuid, String, DateTime, JSON, Integer, ForeignKey, Index
+
+from app.database import Base
+
+
+class BusSubscription(Base):
+    """机器人订阅的主题"""
+    __tablename__ = "bus_subscriptions"
+    __table_args__ = (
+        Index("ix_bus_subscriptions_topic", "topic"),
+    )
+
+    bot_id = Column(Uuid, ForeignKey("bots.id", ondelete="CASCADE"), primary_key=True)
+    topic = Column(String(128), primary_key=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class BusMessage(Base):
+    """投递给一个接收者的消息，确认后删除；超过确认时限未确认的重新投递"""
+    __tablename__ = "bus_messages"
+    __table_args__ = (
+        Index("ix_bus_messages_recipient_visible_at", "recipient_id", "visible_at"),
+        Index("ix_bus_messages_expires_at", "expires_at"),
+    )
+
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
+    recipient_id = Column(Uuid, ForeignKey("bots.id", ondelete="CASCADE"), nullable=False)
+    topic = Column(String(128), nullable=True)  # 为空表示直接发送
+    sender = Column(String(255), nullable=False)  # 发送方 bot_id
+    payload = Column(JSON, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+    visible_at = Column(DateTime, nullable=False)  # 取出后推迟到确认时限，到期未确认时重新投递
+    attempts = Column(Integer, default=0, nullable=False)
@@ -8,8 +8,7 @@ from datetime import datetime
 from typing import Optional
 from enum import Enum
 
-from sqlalchemy import Column, String, DateTime, Text, JSON, Boolean, ForeignKey, Enum as SQLEnum
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, Uuid, String, DateTime, Text, JSON, Boolean, ForeignKey, Index, Enum as SQLEnum
 from sqlalchemy.orm import relationship
 
 from app.database import Base
@@ -34,7 +33,7 @@ class User(Base):
     """用户模型"""
     __tablename__ = "users"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
     feishu_user_id = Column(String(128), unique=True, nullable=False, index=True)
     feishu_open_id = Column(String(128), unique=True, nullable=True)
     name = Column(String(255), nullable=False)
@@ -46,18 +45,18 @@ class User(Base):
     
     # 关系
     owned_bots = relationship("Bot", back_populates="owner", foreign_keys="Bot.owner_id")
-    claim_requests = relationship("ClaimRequest", back_populates="requester")
+    claim_requests = relationship("ClaimRequest", back_populates="requester", foreign_keys="ClaimRequest.requester_id")
 
 
 class ClaimRequest(Base):
     """认领请求"""
     __tablename__ = "claim_requests"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
     
     # 关联
-    bot_id = Column(UUID(as_uuid=True), ForeignKey("bots.id"), nullable=False, index=True)
-    requester_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
+    bot_id = Column(Uuid, ForeignKey("bots.id"), nullable=False, index=True)
+    requester_id = Column(Uuid, ForeignKey("users.id"), nullable=False, index=True)
     
     # 认领类型
     claim_type = Column(SQLEnum(ClaimType), nullable=False)
@@ -71,7 +70,7 @@ class ClaimRequest(Base):
     feishu_verification_data = Column(JSON, nullable=True)
     
     # 审批信息
-    approved_by = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=True)
+    approved_by = Column(Uuid, ForeignKey("users.id"), nullable=True)
     approval_message = Column(Text, nullable=True)
     
     # 时间戳
@@ -102,12 +101,18 @@ class ClaimRequest(Base):
 class BotAccessGrant(Base):
     """机器人访问授权（雇佣/分享后的权限）"""
     __tablename__ = "bot_access_grants"
+    __table_args__ = (
+        # 权限检查按 (用户, 机器人) 查有效授权
+        Index("ix_bot_access_grants_user_bot_active", "user_id", "bot_id", "is_active"),
+        # 到期停用任务按 valid_until 扫描有效授权
+        Index("ix_bot_access_grants_active_valid_until", "is_active", "valid_until"),
+    )
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
     
     # 关联
-    bot_id = Column(UUID(as_uuid=True), ForeignKey("bots.id"), nullable=False, index=True)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
+    bot_id = Column(Uuid, ForeignKey("bots.id"), nullable=False, index=True)
+    user_id = Column(Uuid, ForeignKey("users.id"), nullable=False, index=True)
     
     # 访问类型
     access_type = Column(SQLEnum(ClaimType), nullable=False)  # hire 或 share
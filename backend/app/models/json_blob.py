@@ -0,0 +1,24 @@
+"""
+BotHub JSON Blob - 数据库模型
+大体积 JSON（技能内容、大的机器人能力描述）按内容哈希存放，
+业务行只保存哈希引用，相同内容只存一份
+"""
+
+from datetime import datetime
+
+from sqlalchemy import Column, String, DateTime, Integer, JSON
+
+from app.database import Base
+
+
+class JsonBlob(Base):
+    """按 sha256 寻址的不可变 JSON 文档"""
+    __tablename__ = "json_blobs"
+
+    hash = Column(String(64), primary_key=True)  # sha256(规范化 JSON)
+    data = Column(JSON, nullable=False)
+    size = Column(Integer, nullable=False)  # 规范化 JSON 的字节数
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<JsonBlob(hash={self.hash[:12]}, size={self.size})>"
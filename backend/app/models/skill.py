@@ -0,0 +1,67 @@
+"""
+BotHub 技能市场 - 数据库模型
+"""
+
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import Column, Uuid, String, DateTime, Date, Text, JSON, Integer, BigInteger, Numeric, ForeignKey, Index
+from sqlalchemy.orm import relationship
+
+from app.database import Base
+
+
+class Skill(Base):
+    """机器人发布的技能"""
+    __tablename__ = "skills"
+    __table_args__ = (
+        Index("ix_skills_rating", "rating"),
+        Index("ix_skills_downloads", "downloads"),
+    )
+
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
+    skill_id = Column(String(100), unique=True, nullable=False, index=True)
+    name = Column(String(200), nullable=False)
+    author_bot_id = Column(Uuid, ForeignKey("bots.id", ondelete="SET NULL"), nullable=True, index=True)
+    description = Column(Text, nullable=True)
+    tags = Column(JSON, default=list, nullable=False)  # ["云资源", "阿里云", "ECS"]
+    version = Column(String(50), nullable=True)
+    icon_url = Column(String(500), nullable=True)
+
+    # 统计（由 services/skills.py 的缓冲计数器批量累加，不逐次更新）
+    downloads = Column(Integer, default=0, nullable=False)
+    rating = Column(Numeric(3, 2), default=0, nullable=False)  # 0.00 - 5.00，= rating_sum / rating_count
+    rating_count = Column(Integer, default=0, nullable=False)
+    rating_sum = Column(BigInteger, default=0, nullable=False)  # 评分总和，平均分无需重算
+
+    # 技能完整内容（SKILL.yaml）存在 json_blobs，相同内容只存一份，只在详情/下载时加载
+    content_hash = Column(String(64), ForeignKey("json_blobs.hash"), nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    author = relationship("Bot")
+    content_blob = relationship("JsonBlob", lazy="select")
+
+    @property
+    def content(self) -> Optional[Dict[str, Any]]:
+        return self.content_blob.data if self.content_blob is not None else None
+
+    def __repr__(self) -> str:
+        return f"<Skill(skill_id={self.skill_id}, name={self.name})>"
+
+
+class SkillDailyStats(Base):
+    """技能按天的下载/评分计数，排行榜的时间窗口由它计算"""
+    __tablename__ = "skill_daily_stats"
+    __table_args__ = (
+        Index("ix_skill_daily_stats_day", "day"),
+    )
+
+    skill_id = Column(Uuid, ForeignKey("skills.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+
+    downloads = Column(Integer, default=0, nullable=False)
+    rating_sum = Column(Integer, default=0, nullable=False)
+    rating_count = Column(Integer, default=0, nullable=False)
@@ -0,0 +1,29 @@
+"""
+BotHub 状态历史 - 数据库模型
+按游程编码保存：每次状态变化一行，同一状态内的心跳只把 last_seen_at 往后推
+"""
+
+import uuid
+
+from sqlalchemy import Column, Uuid, String, DateTime, ForeignKey, Index
+
+from app.database import Base
+
+
+class BotStatusRun(Base):
+    """一段连续的相同状态（游程）"""
+    __tablename__ = "bot_status_runs"
+    __table_args__ = (
+        Index("ix_bot_status_runs_bot_id_started_at", "bot_id", "started_at"),
+        Index("ix_bot_status_runs_bot_id_ended_at", "bot_id", "ended_at"),
+    )
+
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
+    bot_id = Column(Uuid, ForeignKey("bots.id", ondelete="CASCADE"), nullable=False)
+    status = Column(String(20), nullable=False)
+    started_at = Column(DateTime, nullable=False)
+    last_seen_at = Column(DateTime, nullable=False)  # 这段状态内最后一次心跳
+    ended_at = Column(DateTime, nullable=True)  # 为空表示仍在进行中
+
+    def __repr__(self) -> str:
+        return f"<BotStatusRun(bot_id={self.bot_id}, status={self.status}, started_at={self.started_at})>"
@@ -0,0 +1,90 @@
+"""
+BotHub 任务系统 - 数据库模型
+机器人通过租约领取任务，租约到期未完成的任务会重新排队
+"""
+
+import uuid
+from datetime import datetime
+from enum import Enum
+
+from sqlalchemy import Column, Uuid, String, DateTime, Text, JSON, Integer, ForeignKey, Index, Enum as SQLEnum
+from sqlalchemy.orm import relationship
+
+from app.database import Base
+
+
+class TaskStatus(str, Enum):
+    """任务状态"""
+    PENDING = "pending"      # 等待领取
+    RUNNING = "running"      # 已被机器人租用，执行中
+    COMPLETED = "completed"  # 已完成
+    FAILED = "failed"        # 失败（含重试耗尽、超过截止时间）
+    CANCELLED = "cancelled"  # 已取消
+
+
+class TaskPriority(str, Enum):
+    """任务优先级"""
+    LOW = "low"
+    NORMAL = "normal"
+    HIGH = "high"
+    URGENT = "urgent"
+
+
+# 领取顺序按数值从大到小
+PRIORITY_RANK = {
+    TaskPriority.LOW: 0,
+    TaskPriority.NORMAL: 1,
+    TaskPriority.HIGH: 2,
+    TaskPriority.URGENT: 3,
+}
+
+
+class Task(Base):
+    """任务"""
+    __tablename__ = "tasks"
+    __table_args__ = (
+        # 领取任务：WHERE status = 'pending' ORDER BY priority_rank DESC, created_at
+        Index("ix_tasks_status_priority_created", "status", "priority_rank", "created_at"),
+        # 回收过期租约：WHERE status = 'running' AND lease_expires_at < now
+        Index("ix_tasks_status_lease_expires", "status", "lease_expires_at"),
+    )
+
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
+    task_id = Column(String(100), unique=True, nullable=False, index=True)
+    title = Column(String(200), nullable=False)
+    description = Column(Text, nullable=True)
+
+    # 关联
+    requester_id = Column(Uuid, ForeignKey("users.id"), nullable=True, index=True)
+    target_bot_id = Column(Uuid, ForeignKey("bots.id", ondelete="CASCADE"), nullable=True)  # 指定执行的机器人
+    assigned_bot_id = Column(Uuid, ForeignKey("bots.id", ondelete="SET NULL"), nullable=True, index=True)  # 当前持有租约的机器人
+
+    # 状态
+    status = Column(SQLEnum(TaskStatus), default=TaskStatus.PENDING, nullable=False)
+    priority = Column(SQLEnum(TaskPriority), default=TaskPriority.NORMAL, nullable=False)
+    priority_rank = Column(Integer, default=1, nullable=False)
+
+    # 内容
+    required_capabilities = Column(JSON, default=list, nullable=False)
+    params = Column(JSON, nullable=True)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+
+    # 租约
+    attempts = Column(Integer, default=0, nullable=False)
+    max_attempts = Column(Integer, default=3, nullable=False)
+    lease_expires_at = Column(DateTime, nullable=True)
+
+    # 时间戳
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    completed_at = Column(DateTime, nullable=True)
+    deadline = Column(DateTime, nullable=True)
+
+    # 关系
+    requester = relationship("User")
+    target_bot = relationship("Bot", foreign_keys=[target_bot_id])
+    assigned_bot = relationship("Bot", foreign_keys=[assigned_bot_id])
+
+    def __repr__(self) -> str:
+        return f"<Task(task_id={self.task_id}, status={self.status})>"
@@ -0,0 +1,46 @@
+"""
+BotHub Webhook 投递 - 数据库模型
+事件与业务数据在同一事务中写入，投递状态持久化，重启不会丢事件
+"""
+
+import uuid
+from datetime import datetime
+from enum import Enum
+
+from sqlalchemy import Column, Uuid, String, DateTime, Text, JSON, Integer, ForeignKey, Index, Enum as SQLEnum
+
+from app.database import Base
+
+
+class DeliveryStatus(str, Enum):
+    """投递状态"""
+    PENDING = "pending"      # 等待投递（含等待重试）
+    DELIVERED = "delivered"  # 对方返回 2xx
+    DEAD = "dead"            # 重试次数耗尽
+
+
+class WebhookDelivery(Base):
+    """一次待投递到 Bot.endpoint 的事件"""
+    __tablename__ = "webhook_deliveries"
+    __table_args__ = (
+        # 取到期的投递：WHERE status = 'pending' AND next_attempt_at <= now
+        Index("ix_webhook_deliveries_status_next_attempt", "status", "next_attempt_at"),
+    )
+
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
+    event_id = Column(String(64), unique=True, nullable=False)
+    event_type = Column(String(64), nullable=False)  # task.assigned, claim.approved, grant.revoked
+    bot_id = Column(Uuid, ForeignKey("bots.id", ondelete="CASCADE"), nullable=False, index=True)
+    payload = Column(JSON, nullable=False)
+
+    status = Column(SQLEnum(DeliveryStatus), default=DeliveryStatus.PENDING, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    last_status_code = Column(Integer, nullable=True)
+    last_error = Column(Text, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    delivered_at = Column(DateTime, nullable=True)
+
+    def __repr__(self) -> str:
+        return f"<WebhookDelivery(event_id={self.event_id}, status={self.status})>"
@@ -0,0 +1,47 @@
+"""
+BotHub 活动日志 - Pydantic Schemas
+"""
+
+from datetime import datetime
+from typing import Optional, Dict, Any, List
+
+from pydantic import BaseModel, Field
+
+
+class ActivityCreate(BaseModel):
+    """单条活动日志"""
+    activity_type: str = Field(..., min_length=1, max_length=50, description="活动类型")
+    description: Optional[str] = Field(None, max_length=5000)
+    metadata: Dict[str, Any] = Field(default_factory=dict)
+    tokens_used: int = Field(0, ge=0)
+    created_at: Optional[datetime] = Field(None, description="事件发生时间，默认为接收时间")
+
+
+class ActivityBatch(BaseModel):
+    """批量上报活动日志"""
+    activities: List[ActivityCreate] = Field(..., min_length=1, max_length=1000)
+
+
+class ActivityBatchAccepted(BaseModel):
+    """批量上报响应（已进入缓冲区，尚未落库）"""
+    accepted: int
+
+
+# ========== 用量统计 ==========
+
+class UsagePoint(BaseModel):
+    """一个时间桶的用量"""
+    bucket_start: datetime
+    activity_count: int
+    tokens_used: int
+
+
+class UsageSeries(BaseModel):
+    """用量时间序列（来自汇总表）"""
+    scope: str  # bot, owner, fleet
+    granularity: str
+    start: datetime
+    end: datetime
+    total_activities: int
+    total_tokens: int
+    points: List[UsagePoint]
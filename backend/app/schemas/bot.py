@@ -4,6 +4,8 @@ from uuid import UUID
 
 from pydantic import BaseModel, Field, ConfigDict
 
+from app.schemas.task import TaskLease
+
 
 class BotBase(BaseModel):
     """Base bot schema with common attributes."""
@@ -35,6 +37,9 @@ class BotHeartbeat(BaseModel):
     status: str = Field(..., pattern="^(online|offline|busy|error)$", description="Current bot status")
     capabilities: Optional[Dict[str, Any]] = None
     version: Optional[str] = Field(None, max_length=50)
+    current_load: Optional[float] = Field(None, ge=0, le=1, description="Current load between 0 and 1")
+    active_tasks: Optional[int] = Field(None, ge=0, description="Number of tasks the bot is working on")
+    max_tasks: int = Field(0, ge=0, le=50, description="Lease up to this many pending tasks with this heartbeat")
 
 
 class BotResponse(BotBase):
@@ -43,13 +48,18 @@ class BotResponse(BotBase):
 
     id: UUID = Field(..., description="Internal UUID")
     bot_id: str = Field(..., description="Unique bot identifier")
-    owner_id: UUID = Field(..., description="UUID of the bot owner")
+    owner_id: Optional[UUID] = Field(None, description="UUID of the bot owner (unset until a self-registered bot is claimed)")
     status: str = Field(..., description="Current bot status")
     created_at: datetime = Field(..., description="Creation timestamp")
     updated_at: datetime = Field(..., description="Last update timestamp")
     last_heartbeat_at: Optional[datetime] = Field(None, description="Last heartbeat timestamp")
 
 
+class BotHeartbeatResponse(BotResponse):
+    """Schema for heartbeat response, carrying newly leased tasks."""
+    pending_tasks: List[TaskLease] = Field(default_factory=list, description="Tasks leased to the bot")
+
+
 class BotListResponse(BaseModel):
     """Schema for paginated bot list response."""
     items: List[BotResponse] = Field(..., description="List of bots")
@@ -59,8 +69,70 @@ class BotListResponse(BaseModel):
     pages: int = Field(..., description="Total number of pages")
 
 
+class FacetCount(BaseModel):
+    """Schema for the number of matching bots with one facet value."""
+    value: str
+    count: int
+
+
+class BotSearchResponse(BotListResponse):
+    """Schema for a page of search results with facet counts for the whole query."""
+    facets: Dict[str, List[FacetCount]] = Field(
+        default_factory=dict, description="Counts per facet (status, owner, version, capability), largest first"
+    )
+
+
 class BotFilterParams(BaseModel):
     """Schema for bot list filter parameters."""
     status: Optional[str] = Field(None, description="Filter by status")
     owner_id: Optional[UUID] = Field(None, description="Filter by owner")
     search: Optional[str] = Field(None, description="Search in bot_name and description")
+
+
+class BotStatsResponse(BaseModel):
+    """Schema for fleet-wide bot counts by status, owner, version and claim state."""
+    total: int = Field(..., description="Total number of bots")
+    claimed: int = Field(..., description="Bots with an owner")
+    unclaimed: int = Field(..., description="Bots without an owner")
+    by_status: Dict[str, int] = Field(default_factory=dict, description="Bot count per status")
+    by_version: Dict[str, int] = Field(default_factory=dict, description="Bot count per reported version")
+    by_owner: Dict[str, int] = Field(default_factory=dict, description="Bot count of the owners with the most bots")
+    owners: int = Field(..., description="Number of distinct owners")
+    age_seconds: float = Field(..., description="Seconds since the counts were last reloaded from the database")
+
+
+class BotPermissionsResponse(BaseModel):
+    """Schema for the current user's effective permissions on a bot."""
+    bot_id: str = Field(..., description="Unique bot identifier")
+    is_owner: bool = Field(..., description="Whether the current user owns the bot")
+    permissions: List[str] = Field(default_factory=list, description="Effective permissions, e.g. can_invoke")
+
+
+class StatusRunResponse(BaseModel):
+    """Schema for one run of consecutive heartbeats with the same status."""
+    status: str = Field(..., description="Status reported throughout the run")
+    started_at: datetime = Field(..., description="First heartbeat of the run")
+    last_seen_at: datetime = Field(..., description="Last heartbeat of the run")
+    ended_at: Optional[datetime] = Field(None, description="End of the run, unset while it is ongoing")
+
+
+class StatusHistoryResponse(BaseModel):
+    """Schema for a bot's run-length encoded status history."""
+    bot_id: str = Field(..., description="Unique bot identifier")
+    start: datetime
+    end: datetime
+    runs: List[StatusRunResponse] = Field(default_factory=list, description="Runs overlapping the window, oldest first")
+
+
+class UptimeResponse(BaseModel):
+    """Schema for uptime and availability over a time window."""
+    scope: str = Field(..., description="bot, owner or fleet")
+    start: datetime
+    end: datetime
+    bots: int = Field(..., description="Number of bots that existed during the window")
+    window_seconds: float = Field(..., description="Bot-seconds in the window, counted from each bot's creation")
+    status_seconds: Dict[str, float] = Field(default_factory=dict, description="Bot-seconds spent in each status")
+    up_seconds: float = Field(..., description="Bot-seconds spent online or busy")
+    unknown_seconds: float = Field(..., description="Bot-seconds without any heartbeat")
+    uptime: Optional[float] = Field(None, description="up_seconds / window_seconds; silence counts as downtime")
+    availability: Optional[float] = Field(None, description="up_seconds over the bot-seconds with a known status")
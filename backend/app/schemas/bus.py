@@ -0,0 +1,59 @@
+"""
+BotHub 消息总线 - Pydantic Schemas
+"""
+
+from datetime import datetime
+from typing import Any, List, Optional
+from uuid import UUID
+
+from pydantic import BaseModel, Field
+
+TOPIC_PATTERN = r"^[A-Za-z0-9_.:\-]{1,128}$"
+
+
+class SubscriptionRequest(BaseModel):
+    """订阅主题"""
+    topic: str = Field(..., pattern=TOPIC_PATTERN)
+
+
+class SubscriptionList(BaseModel):
+    """机器人订阅的主题"""
+    topics: List[str]
+
+
+class MessageSend(BaseModel):
+    """直接发给一个机器人"""
+    to: str = Field(..., min_length=1, max_length=255, description="接收方 bot_id")
+    payload: Any = Field(..., description="任意 JSON，序列化后不超过 BUS_MAX_PAYLOAD_BYTES")
+
+
+class MessagePublish(BaseModel):
+    """向主题发布"""
+    topic: str = Field(..., pattern=TOPIC_PATTERN)
+    payload: Any = Field(..., description="任意 JSON，序列化后不超过 BUS_MAX_PAYLOAD_BYTES")
+
+
+class MessageAccepted(BaseModel):
+    """发送结果"""
+    delivered: int = Field(..., description="放入收件箱的接收者数")
+    rejected: int = Field(0, description="收件箱已满、被跳过的接收者数")
+
+
+class BusMessageResponse(BaseModel):
+    """收到的消息"""
+    id: UUID
+    topic: Optional[str] = Field(None, description="为空表示直接发送")
+    sender: str
+    payload: Any
+    created_at: datetime
+    expires_at: datetime
+    attempts: int = Field(..., description="第几次投递，大于 1 表示之前未按时确认")
+
+
+class MessageAck(BaseModel):
+    """确认消息"""
+    ids: List[UUID] = Field(..., min_length=1, max_length=1000)
+
+
+class MessageAckResult(BaseModel):
+    acked: int
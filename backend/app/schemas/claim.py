@@ -56,6 +56,7 @@ class BotRegisterResponse(BaseModel):
     claim_url: str
     claim_code_expires_at: datetime
     feishu_app_id: Optional[str]
+    webhook_secret: Optional[str] = Field(None, description="Webhook 签名密钥，只在注册时返回")
     
     class Config:
         from_attributes = True
@@ -183,6 +184,7 @@ class AccessGrantResponse(BaseModel):
     valid_from: datetime
     valid_until: Optional[datetime]
     is_active: bool
+    revoked_at: Optional[datetime] = None
     
     class Config:
         from_attributes = True
@@ -0,0 +1,23 @@
+"""
+BotHub 插件 - Pydantic Schemas
+"""
+
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+class PluginHookInfo(BaseModel):
+    """插件的一个扩展及其开销"""
+    plugin: str
+    hook: str = Field(..., description="routes、heartbeat 或 notifications")
+    entry_point: str
+    distribution: Optional[str] = Field(None, description="提供插件的包及版本")
+    loaded: bool = Field(..., description="是否已导入（第一次使用时导入）")
+    error: Optional[str] = Field(None, description="导入失败的原因")
+    import_ms: Optional[float] = None
+    calls: int
+    errors: int
+    over_budget: int = Field(..., description="超过 PLUGIN_HOOK_BUDGET_MS 的调用次数")
+    total_ms: float
+    avg_ms: Optional[float] = None
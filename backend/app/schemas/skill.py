@@ -0,0 +1,82 @@
+"""
+BotHub 技能市场 - Pydantic Schemas
+"""
+
+from datetime import datetime
+from typing import Optional, Dict, Any, List
+from uuid import UUID
+
+from pydantic import BaseModel, Field, ConfigDict
+
+
+class SkillCreate(BaseModel):
+    """发布技能"""
+    name: str = Field(..., min_length=1, max_length=200)
+    author_bot_id: Optional[str] = Field(None, description="作者机器人 bot_id（需为当前用户所有）")
+    description: Optional[str] = Field(None, max_length=5000)
+    tags: List[str] = Field(default_factory=list)
+    version: Optional[str] = Field(None, max_length=50)
+    icon_url: Optional[str] = Field(None, max_length=500)
+    content: Dict[str, Any] = Field(default_factory=dict, description="SKILL.yaml 内容")
+
+
+class SkillPublishResponse(BaseModel):
+    """发布结果"""
+    skill_id: str
+    name: str
+    url: str
+
+
+class SkillResponse(BaseModel):
+    """技能信息（不含完整内容）"""
+    model_config = ConfigDict(from_attributes=True)
+
+    skill_id: str
+    name: str
+    author_bot_id: Optional[UUID]
+    description: Optional[str]
+    tags: List[str]
+    version: Optional[str]
+    icon_url: Optional[str]
+    downloads: int
+    rating: float
+    rating_count: int
+    created_at: datetime
+    updated_at: datetime
+
+
+class SkillDetail(SkillResponse):
+    """技能详情（含完整内容）"""
+    content: Optional[Dict[str, Any]]
+
+
+class SkillListResponse(BaseModel):
+    """技能分页列表"""
+    items: List[SkillResponse]
+    total: int
+    page: int
+    page_size: int
+    pages: int
+
+
+class SkillRatingCreate(BaseModel):
+    """评分"""
+    rating: int = Field(..., ge=1, le=5)
+
+
+class LeaderboardItem(BaseModel):
+    """排行榜条目，下载数和评分为所选周期内的值"""
+    rank: int
+    skill_id: str
+    name: str
+    author: Optional[str]
+    downloads: int
+    rating: float
+    rating_count: int
+
+
+class LeaderboardResponse(BaseModel):
+    """排行榜"""
+    period: str
+    metric: str
+    items: List[LeaderboardItem]
@@ -0,0 +1,76 @@
+"""
+BotHub 任务系统 - Pydantic Schemas
+"""
+
+from datetime import datetime
+from typing import Optional, Dict, Any, List
+from uuid import UUID
+
+from pydantic import BaseModel, Field, ConfigDict
+
+from app.models.task import TaskStatus, TaskPriority
+
+
+class TaskCreate(BaseModel):
+    """提交任务"""
+    title: str = Field(..., min_length=1, max_length=200)
+    description: Optional[str] = Field(None, max_length=5000)
+    priority: TaskPriority = TaskPriority.NORMAL
+    params: Dict[str, Any] = Field(default_factory=dict)
+    required_capabilities: List[str] = Field(default_factory=list, description="执行任务所需的能力")
+    target_bot_id: Optional[str] = Field(None, description="指定执行的机器人 bot_id")
+    deadline: Optional[datetime] = None
+    max_attempts: int = Field(3, ge=1, le=20)
+
+
+class TaskResponse(BaseModel):
+    """任务详情"""
+    model_config = ConfigDict(from_attributes=True)
+
+    task_id: str
+    title: str
+    description: Optional[str]
+    status: TaskStatus
+    priority: TaskPriority
+    requester_id: Optional[UUID]
+    target_bot_id: Optional[UUID]
+    assigned_bot_id: Optional[UUID]
+    required_capabilities: List[str]
+    params: Optional[Dict[str, Any]]
+    result: Optional[Dict[str, Any]]
+    error: Optional[str]
+    attempts: int
+    max_attempts: int
+    lease_expires_at: Optional[datetime]
+    created_at: datetime
+    started_at: Optional[datetime]
+    completed_at: Optional[datetime]
+    deadline: Optional[datetime]
+
+
+class TaskLease(BaseModel):
+    """机器人领取到的任务"""
+    model_config = ConfigDict(from_attributes=True)
+
+    task_id: str
+    title: str
+    description: Optional[str]
+    priority: TaskPriority
+    params: Optional[Dict[str, Any]]
+    attempts: int
+    lease_expires_at: datetime
+    deadline: Optional[datetime]
+
+
+class TaskLeaseRequest(BaseModel):
+    """主动领取任务"""
+    bot_id: str
+    max_tasks: int = Field(1, ge=1, le=50)
+
+
+class TaskComplete(BaseModel):
+    """上报任务结果"""
+    bot_id: str
+    success: bool = True
+    result: Dict[str, Any] = Field(default_factory=dict)
+    error: Optional[str] = Field(None, max_length=5000)
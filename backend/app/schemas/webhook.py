@@ -0,0 +1,32 @@
+"""
+BotHub Webhook 投递 - Pydantic Schemas
+"""
+
+from datetime import datetime
+from typing import Optional, Dict, Any
+
+from pydantic import BaseModel, ConfigDict
+
+from app.models.webhook import DeliveryStatus
+
+
+class WebhookSecretResponse(BaseModel):
+    """新生成的签名密钥（只在生成时返回一次）"""
+    bot_id: str
+    webhook_secret: str
+
+
+class WebhookDeliveryResponse(BaseModel):
+    """投递记录"""
+    model_config = ConfigDict(from_attributes=True)
+
+    event_id: str
+    event_type: str
+    status: DeliveryStatus
+    attempts: int
+    next_attempt_at: datetime
+    last_status_code: Optional[int]
+    last_error: Optional[str]
+    payload: Dict[str, Any]
+    created_at: datetime
+    delivered_at: Optional[datetime]
@@ -0,0 +1,305 @@
+"""
+活动日志写入服务
+接口只把事件放进内存缓冲区，后台任务批量落库（PostgreSQL 用 COPY，其他数据库用多行 INSERT）
+一批违反约束时先丢掉已删除机器人的事件，再二分找出单独写也失败的行，记日志后丢掉，
+不让一条坏数据卡住整个缓冲区。
+"""
+
+import io
+import json
+import logging
+import threading
+import uuid
+from collections import deque
+from datetime import date, datetime, timedelta, timezone
+from typing import Deque, Dict, Iterable, List, Optional, Set, Tuple
+from uuid import UUID
+
+from sqlalchemy import insert, select, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.core.background import register_worker
+from app.database import SessionLocal
+from app.models.activity import BotActivity
+from app.models.bot import Bot
+from app.schemas.activity import ActivityCreate
+from app.services.rollups import apply_batch
+
+logger = logging.getLogger(__name__)
+
+COPY_COLUMNS = ("id", "created_at", "bot_id", "activity_type", "description", "metadata", "tokens_used")
+
+
+class ActivityBuffer:
+    """有界的内存缓冲区，满了之后拒绝写入，由调用方向客户端施加背压"""
+
+    def __init__(self, max_events: int):
+        self.max_events = max_events
+        self._rows: Deque[dict] = deque()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def offer(self, rows: List[dict]) -> bool:
+        """整批放入缓冲区；放不下时整批拒绝"""
+        with self._lock:
+            if len(self._rows) + len(rows) > self.max_events:
+                return False
+            self._rows.extend(rows)
+            return True
+
+    def drain(self, limit: int) -> List[dict]:
+        with self._lock:
+            count = min(limit, len(self._rows))
+            return [self._rows.popleft() for _ in range(count)]
+
+    def requeue(self, rows: List[dict]) -> None:
+        """写库失败时把数据放回队首（允许暂时超过上限）"""
+        with self._lock:
+            self._rows.extendleft(reversed(rows))
+
+
+class PartitionManager:
+    """按天创建 bot_activities 的分区（仅 PostgreSQL）"""
+
+    def __init__(self):
+        self._known: Set[date] = set()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def partition_name(day: date) -> str:
+        return f"{BotActivity.__tablename__}_p{day:%Y%m%d}"
+
+    def ensure(self, db: Session, days: Iterable[date]) -> None:
+        """确保这些日期的分区存在，新建分区单独提交，不和数据写入放在同一事务"""
+        if db.get_bind().dialect.name != "postgresql":
+            return
+        with self._lock:
+            missing = sorted(set(days) - self._known)
+        if not missing:
+            return
+        for day in missing:
+            db.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {self.partition_name(day)} "
+                f"PARTITION OF {BotActivity.__tablename__} "
+                f"FOR VALUES FROM ('{day.isoformat()}') TO ('{(day + timedelta(days=1)).isoformat()}')"
+            ))
+        db.commit()
+        with self._lock:
+            self._known.update(missing)
+
+    def precreate(self, db: Session, days_ahead: int) -> None:
+        today = datetime.utcnow().date()
+        self.ensure(db, (today + timedelta(days=n) for n in range(-1, days_ahead + 1)))
+
+
+def _copy_value(value) -> str:
+    """COPY text 格式的字段转义"""
+    if value is None:
+        return "\\N"
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value, ensure_ascii=False)
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def _copy_rows(db: Session, rows: List[dict]) -> None:
+    buf = io.StringIO()
+    for row in rows:
+        buf.write("\t".join(_copy_value(row[key]) for key in (
+            "id", "created_at", "bot_id", "activity_type", "description", "meta", "tokens_used"
+        )))
+        buf.write("\n")
+    buf.seek(0)
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {BotActivity.__tablename__} ({', '.join(COPY_COLUMNS)}) FROM STDIN",
+            buf
+        )
+    finally:
+        cursor.close()
+
+
+def write_activities(db: Session, rows: List[dict]) -> None:
+    """写入一批活动日志（不提交）"""
+    if db.get_bind().dialect.name == "postgresql":
+        _copy_rows(db, rows)
+    else:
+        db.execute(insert(BotActivity), rows)
+
+
+def accepted_window(now: datetime) -> Tuple[datetime, datetime]:
+    """接受的事件时间范围 [earliest, latest)：不早于 ACTIVITY_MAX_AGE_DAYS 天前，不晚于预建分区覆盖的最后一天"""
+    earliest = now - timedelta(days=settings.ACTIVITY_MAX_AGE_DAYS)
+    last_day = now.date() + timedelta(days=settings.ACTIVITY_PARTITION_DAYS_AHEAD)
+    return earliest, datetime.combine(last_day + timedelta(days=1), datetime.min.time())
+
+
+class ActivityIngestor:
+    """活动日志接收：bot_id 解析、缓冲、批量落库"""
+
+    def __init__(self, max_events: int, batch_size: int):
+        self.buffer = ActivityBuffer(max_events)
+        self.batch_size = batch_size
+        self.partitions = PartitionManager()
+        self._bot_ids: Dict[str, UUID] = {}
+
+    def resolve_bot(self, db: Session, bot_id: str) -> Optional[UUID]:
+        """bot_id -> bots.id，带进程内缓存"""
+        bot_uuid = self._bot_ids.get(bot_id)
+        if bot_uuid is None:
+            bot_uuid = db.execute(select(Bot.id).where(Bot.bot_id == bot_id)).scalar()
+            if bot_uuid is not None:
+                if len(self._bot_ids) >= 100_000:
+                    self._bot_ids.clear()
+                self._bot_ids[bot_id] = bot_uuid
+        return bot_uuid
+
+    def forget_bot(self, bot_id: str) -> None:
+        self._bot_ids.pop(bot_id, None)
+
+    def submit(self, bot_uuid: UUID, activities: List[ActivityCreate]) -> bool:
+        """
+        放入缓冲区，缓冲区已满时返回 False
+
+        created_at 必须在 ACTIVITY_MAX_AGE_DAYS 天前到预建分区的最后一天之间，
+        否则整批拒绝（ValueError），不会为任意日期创建分区。
+        """
+        now = datetime.utcnow()
+        earliest, latest = accepted_window(now)
+        rows = []
+        for i, activity in enumerate(activities):
+            created_at = activity.created_at or now
+            if created_at.tzinfo is not None:
+                created_at = created_at.astimezone(timezone.utc).replace(tzinfo=None)
+            if not earliest <= created_at < latest:
+                raise ValueError(
+                    f"activities[{i}].created_at {created_at.isoformat()} is outside the accepted range "
+                    f"{earliest.isoformat()} to {latest.isoformat()}"
+                )
+            rows.append({
+                "id": uuid.uuid4(),
+                "created_at": created_at,
+                "bot_id": bot_uuid,
+                "activity_type": activity.activity_type,
+                "description": activity.description,
+                "meta": activity.metadata,
+                "tokens_used": activity.tokens_used,
+            })
+        if not self.buffer.offer(rows):
+            return False
+        if len(self.buffer) >= self.batch_size:
+            flush_worker.wake()
+        return True
+
+    def flush(self, db: Session) -> int:
+        """把缓冲区全部写入数据库，返回写入条数"""
+        total = 0
+        while True:
+            rows = self.buffer.drain(self.batch_size)
+            if not rows:
+                return total
+            try:
+                self.partitions.ensure(db, {row["created_at"].date() for row in rows})
+                self._write_batch(db, rows)
+            except IntegrityError:
+                db.rollback()
+                total += self._write_isolating(db, rows)
+                continue
+            except Exception:
+                db.rollback()
+                self.buffer.requeue(rows)
+                raise
+            total += len(rows)
+
+    def _write_batch(self, db: Session, rows: List[dict]) -> None:
+        write_activities(db, rows)
+        apply_batch(db, rows)
+        db.commit()
+
+    def _write_isolating(self, db: Session, rows: List[dict]) -> int:
+        """
+        整批违反约束时逐步缩小范围写入，返回写入条数
+
+        机器人在事件落库前被删除是最常见的原因，先按机器人过滤；剩下的二分写入，
+        单独写也失败的行记日志后丢掉。其他错误时把还没写入的行放回缓冲区。
+        """
+        try:
+            pending = [self._drop_orphans(db, rows)]
+        except Exception:
+            db.rollback()
+            self.buffer.requeue(rows)
+            raise
+        written = 0
+        while pending:
+            chunk = pending.pop()
+            if not chunk:
+                continue
+            try:
+                self._write_batch(db, chunk)
+            except IntegrityError as exc:
+                db.rollback()
+                if len(chunk) == 1:
+                    row = chunk[0]
+                    logger.error(
+                        "Dropped activity %s of bot %s that violates a constraint: %s", row["id"], row["bot_id"], exc.orig
+                    )
+                    continue
+                middle = len(chunk) // 2
+                pending += [chunk[middle:], chunk[:middle]]
+                continue
+            except Exception:
+                db.rollback()
+                self.buffer.requeue([row for part in [chunk, *reversed(pending)] for row in part])
+                raise
+            written += len(chunk)
+        return written
+
+    def _drop_orphans(self, db: Session, rows: List[dict]) -> List[dict]:
+        bot_uuids = {row["bot_id"] for row in rows}
+        existing = set(db.execute(select(Bot.id).where(Bot.id.in_(bot_uuids))).scalars())
+        dropped = len(rows)
+        rows = [row for row in rows if row["bot_id"] in existing]
+        if dropped > len(rows):
+            logger.warning("Dropped %d activities of deleted bots", dropped - len(rows))
+        for bot_id, bot_uuid in list(self._bot_ids.items()):
+            if bot_uuid not in existing and bot_uuid in bot_uuids:
+                self._bot_ids.pop(bot_id, None)
+        return rows
+
+
+activity_ingestor = ActivityIngestor(
+    max_events=settings.ACTIVITY_BUFFER_MAX_EVENTS,
+    batch_size=settings.ACTIVITY_FLUSH_BATCH_SIZE,
+)
+
+
+def flush_activities() -> None:
+    db = SessionLocal()
+    try:
+        activity_ingestor.flush(db)
+    finally:
+        db.close()
+
+
+def precreate_partitions() -> None:
+    db = SessionLocal()
+    try:
+        activity_ingestor.partitions.precreate(db, settings.ACTIVITY_PARTITION_DAYS_AHEAD)
+    finally:
+        db.close()
+
+
+flush_worker = register_worker(
+    "activity-flush", flush_activities, settings.ACTIVITY_FLUSH_INTERVAL, run_on_shutdown=True
+)
+register_worker("activity-partitions", precreate_partitions, 3600, run_on_start=True)
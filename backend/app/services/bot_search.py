@@ -0,0 +1,455 @@
+"""
+机器人分面搜索
+进程内为每个机器人分配一个槽位，按分面（状态、所有者、版本、能力）的每个取值保存一个位图
+（Python 整数，第 i 位表示槽位 i）。筛选是位图求与，分面计数是位图求与后数 1 的个数，
+不需要下载或逐个遍历机器人。取值很多的分面（例如所有者）每个取值的位图都和槽位总数一样宽，
+内存按取值数 × 机器人数增长，因此改存有序的槽位数组，计数时遍历命中的槽位。
+关键字在名称和描述中做子串匹配，结果位图按关键字缓存，文本变化时失效。
+
+结果按注册顺序排列（槽位只追加，删除留下空位，重建时压缩）。索引只保存筛选需要的字段，
+当前页的机器人再按 id 从数据库取出。
+
+索引第一次使用时从数据库加载，之后由会话事件增量维护：提交后更新本进程索引，
+并通过共享状态的广播通道把变化的机器人 id 发给其他 worker，它们在下一次搜索前按 id 重新读取；
+落后太多时整体重建。后台任务每 BOT_SEARCH_REBUILD_INTERVAL 秒重建一次，兜住绕过 ORM 的修改。
+"""
+
+import logging
+import threading
+import uuid
+from array import array
+from bisect import bisect_left
+from collections import Counter, OrderedDict
+from enum import Enum
+from itertools import islice
+from typing import Dict, FrozenSet, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple, Union
+from uuid import UUID
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.core.background import register_worker
+from app.core.state import Channel
+from app.database import SessionLocal
+from app.models.bot import Bot
+from app.services.routing import bot_capabilities
+
+logger = logging.getLogger(__name__)
+
+# 单值分面；capability 是多值分面（一个机器人有多个能力）
+FACETS = ("status", "owner", "version", "capability")
+SINGLE_VALUED = ("status", "owner", "version")
+UNKNOWN_VERSION = "unknown"
+
+# 取值超过这个数量的分面改存槽位数组、遍历命中的槽位计数；减少到一半以下时换回位图
+BITSET_FACET_MAX_VALUES = 256
+TEXT_CACHE_SIZE = 64
+
+# 变化时需要更新索引的列
+INDEXED_ATTRIBUTES = ("bot_name", "description", "status", "owner_id", "version", "capabilities")
+
+
+class BotDocument(NamedTuple):
+    """索引中的一个机器人"""
+    bot_uuid: UUID
+    text: str  # 小写的名称和描述
+    status: str
+    owner: Optional[str]
+    version: str
+    capabilities: FrozenSet[str]
+
+    def values(self, facet: str) -> Iterable[str]:
+        if facet == "capability":
+            return self.capabilities
+        value = getattr(self, facet)
+        return () if value is None else (value,)
+
+
+def document(bot: Bot) -> BotDocument:
+    status = bot.status.value if isinstance(bot.status, Enum) else bot.status
+    return BotDocument(
+        bot_uuid=bot.id,
+        text=f"{bot.bot_name}\n{bot.description or ''}".lower(),
+        status=status,
+        owner=str(bot.owner_id) if bot.owner_id else None,
+        version=bot.version or UNKNOWN_VERSION,
+        capabilities=frozenset(bot_capabilities(bot.capabilities)),
+    )
+
+
+def _bits(slots: Iterable[int]) -> int:
+    """槽位集合转为位图"""
+    buffer = bytearray()
+    for slot in slots:
+        index = slot >> 3
+        if index >= len(buffer):
+            buffer.extend(bytes(index + 1 - len(buffer)))
+        buffer[index] |= 1 << (slot & 7)
+    return int.from_bytes(buffer, "little")
+
+
+def _slots(mask: int) -> Iterator[int]:
+    """按从小到大的顺序取出位图中的槽位"""
+    digits = bin(mask)[:1:-1]
+    slot = digits.find("1")
+    while slot != -1:
+        yield slot
+        slot = digits.find("1", slot + 1)
+
+
+# 位图（int）或有序槽位数组
+Posting = Union[int, "array[int]"]
+
+
+def _posting_bits(posting: Posting) -> int:
+    return posting if isinstance(posting, int) else _bits(posting)
+
+
+class SearchResult(NamedTuple):
+    total: int
+    bot_uuids: List[UUID]
+    facets: Dict[str, List[Tuple[str, int]]]
+
+
+class FacetIndex:
+    """位图分面索引（不加锁，由 BotSearchIndex 负责同步）"""
+
+    def __init__(self):
+        self.documents: List[Optional[BotDocument]] = []
+        self.slot_of: Dict[UUID, int] = {}
+        self.live = 0
+        self.postings: Dict[str, Dict[str, Posting]] = {facet: {} for facet in FACETS}
+        # 按槽位数组保存的分面
+        self.sparse: Set[str] = set()
+        self._text_cache: "OrderedDict[str, int]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.slot_of)
+
+    @classmethod
+    def build(cls, documents: Iterable[BotDocument]) -> "FacetIndex":
+        """一次性建立索引：先收集每个取值的槽位，最后各转换一次位图"""
+        index = cls()
+        slots: Dict[str, Dict[str, List[int]]] = {facet: {} for facet in FACETS}
+        for doc in documents:
+            slot = len(index.documents)
+            index.documents.append(doc)
+            index.slot_of[doc.bot_uuid] = slot
+            for facet in FACETS:
+                for value in doc.values(facet):
+                    slots[facet].setdefault(value, []).append(slot)
+        index.live = (1 << len(index.documents)) - 1
+        for facet in FACETS:
+            if len(slots[facet]) > BITSET_FACET_MAX_VALUES:
+                index.sparse.add(facet)
+                index.postings[facet] = {value: array("I", found) for value, found in slots[facet].items()}
+            else:
+                index.postings[facet] = {value: _bits(found) for value, found in slots[facet].items()}
+        return index
+
+    def upsert(self, doc: BotDocument) -> None:
+        slot = self.slot_of.get(doc.bot_uuid)
+        if slot is None:
+            slot = len(self.documents)
+            self.documents.append(None)
+            self.slot_of[doc.bot_uuid] = slot
+            self._text_cache.clear()
+        else:
+            old = self.documents[slot]
+            if old == doc:
+                return
+            self._unindex(slot, old)
+            if old.text != doc.text:
+                self._text_cache.clear()
+        self.documents[slot] = doc
+        bit = 1 << slot
+        self.live |= bit
+        for facet in FACETS:
+            postings = self.postings[facet]
+            if facet in self.sparse:
+                for value in doc.values(facet):
+                    posting = postings.get(value)
+                    if posting is None:
+                        postings[value] = array("I", (slot,))
+                    elif posting[-1] < slot:
+                        posting.append(slot)
+                    else:
+                        posting.insert(bisect_left(posting, slot), slot)
+            else:
+                for value in doc.values(facet):
+                    postings[value] = postings.get(value, 0) | bit
+            self._rebalance(facet)
+
+    def remove(self, bot_uuid: UUID) -> None:
+        slot = self.slot_of.pop(bot_uuid, None)
+        if slot is None:
+            return
+        self._unindex(slot, self.documents[slot])
+        self.documents[slot] = None
+        self.live &= ~(1 << slot)
+        self._text_cache.clear()
+        for facet in FACETS:
+            self._rebalance(facet)
+
+    def _unindex(self, slot: int, doc: BotDocument) -> None:
+        clear = ~(1 << slot)
+        for facet in FACETS:
+            postings = self.postings[facet]
+            sparse = facet in self.sparse
+            for value in doc.values(facet):
+                posting = postings[value]
+                if sparse:
+                    del posting[bisect_left(posting, slot)]
+                    if not posting:
+                        del postings[value]
+                    continue
+                remaining = posting & clear
+                if remaining:
+                    postings[value] = remaining
+                else:
+                    del postings[value]
+
+    def _rebalance(self, facet: str) -> None:
+        """按取值数切换分面的存储方式"""
+        postings = self.postings[facet]
+        if facet not in self.sparse and len(postings) > BITSET_FACET_MAX_VALUES:
+            self.postings[facet] = {value: array("I", _slots(bits)) for value, bits in postings.items()}
+            self.sparse.add(facet)
+        elif facet in self.sparse and len(postings) <= BITSET_FACET_MAX_VALUES // 2:
+            self.postings[facet] = {value: _bits(slots) for value, slots in postings.items()}
+            self.sparse.discard(facet)
+
+    def _text_bits(self, query: str) -> int:
+        bits = self._text_cache.get(query)
+        if bits is None:
+            bits = _bits(
+                slot for slot, doc in enumerate(self.documents)
+                if doc is not None and query in doc.text
+            )
+            self._text_cache[query] = bits
+            if len(self._text_cache) > TEXT_CACHE_SIZE:
+                self._text_cache.popitem(last=False)
+        else:
+            self._text_cache.move_to_end(query)
+        return bits
+
+    def _facet_counts(self, facet: str, mask: int, size: int) -> List[Tuple[str, int]]:
+        postings = self.postings[facet]
+        if facet not in self.sparse:
+            counts = Counter({value: (bits & mask).bit_count() for value, bits in postings.items()})
+        elif mask == self.live:
+            # 没有筛选：每个取值的槽位数就是计数
+            counts = Counter({value: len(slots) for value, slots in postings.items()})
+        elif facet in SINGLE_VALUED:
+            documents = self.documents
+            counts = Counter(getattr(documents[slot], facet) for slot in _slots(mask))
+            counts.pop(None, None)
+        else:
+            counts = Counter()
+            for slot in _slots(mask):
+                counts.update(self.documents[slot].capabilities)
+        return [(value, count) for value, count in counts.most_common(size) if count > 0]
+
+    def search(
+        self,
+        query: Optional[str] = None,
+        filters: Optional[Dict[str, str]] = None,
+        capabilities: Iterable[str] = (),
+        offset: int = 0,
+        limit: int = 20,
+        facet_size: int = 10,
+    ) -> SearchResult:
+        """
+        filters 为单值分面的取值；capabilities 要求同时具备
+
+        单值分面的计数不应用该分面自己的筛选（选中一个状态后仍能看到其他状态各有多少），
+        能力分面的计数应用全部筛选（在当前结果中再具备该能力的数量）。
+        """
+        filters = filters or {}
+        base = self.live
+        query = (query or "").strip().lower()
+        if query:
+            base &= self._text_bits(query)
+        for capability in capabilities:
+            base &= _posting_bits(self.postings["capability"].get(capability, 0))
+
+        selected = {facet: _posting_bits(self.postings[facet].get(value, 0)) for facet, value in filters.items()}
+        mask = base
+        for bits in selected.values():
+            mask &= bits
+
+        facets = {}
+        for facet in SINGLE_VALUED:
+            facet_mask = base
+            for other, bits in selected.items():
+                if other != facet:
+                    facet_mask &= bits
+            facets[facet] = self._facet_counts(facet, facet_mask, facet_size)
+        facets["capability"] = self._facet_counts("capability", mask, facet_size)
+
+        page = [self.documents[slot].bot_uuid for slot in islice(_slots(mask), offset, offset + limit)]
+        return SearchResult(mask.bit_count(), page, facets)
+
+
+class BotSearchIndex:
+    """本进程的机器人搜索索引，线程安全"""
+
+    def __init__(self, channel: Optional[Channel] = None):
+        self.channel = channel or Channel("bot-search")
+        self.origin = uuid.uuid4().hex
+        self._lock = threading.Lock()
+        self._index: Optional[FacetIndex] = None
+        # 重建期间提交的变化，重建完成后补到新索引上
+        self._pending: Optional[List[Tuple[List[BotDocument], Set[UUID]]]] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._index is not None
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._index = None
+
+    def rebuild(self, db: Session) -> int:
+        """从数据库重建索引，返回机器人数量；重建期间仍用旧索引回答查询"""
+        try:
+            # 先移动通道游标：之后的变化在下次搜索前合并
+            self.channel.poll()
+        except Exception:
+            logger.exception("Failed to read bot search changes")
+        with self._lock:
+            self._pending = []
+        rows = db.execute(
+            select(Bot.id, Bot.bot_name, Bot.description, Bot.status, Bot.owner_id, Bot.version, Bot.capabilities)
+            .order_by(Bot.created_at, Bot.id)
+            .execution_options(yield_per=5000)
+        )
+        try:
+            index = FacetIndex.build(document(row) for row in rows)
+        except BaseException:
+            with self._lock:
+                self._pending = None
+            raise
+        # 取出积压、补上并换上新索引必须在同一次加锁内，否则中间的 apply() 会丢失
+        with self._lock:
+            pending, self._pending = self._pending, None
+            for upserts, removed in pending:
+                self._apply(index, upserts, removed)
+            self._index = index
+        return len(index)
+
+    @staticmethod
+    def _apply(index: FacetIndex, upserts: List[BotDocument], removed: Set[UUID]) -> None:
+        for doc in upserts:
+            index.upsert(doc)
+        for bot_uuid in removed:
+            index.remove(bot_uuid)
+
+    def apply(self, upserts: List[BotDocument], removed: Set[UUID]) -> None:
+        """更新已提交的变化；还没有加载时什么也不做（加载时会读到）"""
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((upserts, removed))
+            if self._index is not None:
+                self._apply(self._index, upserts, removed)
+
+    def publish(self, bot_uuids: Set[UUID]) -> None:
+        try:
+            self.channel.publish({"origin": self.origin, "bots": [str(bot_uuid) for bot_uuid in bot_uuids]})
+        except Exception:
+            logger.exception("Failed to publish bot search changes")
+
+    def _refresh(self, db: Session, bot_uuids: Set[UUID]) -> None:
+        """按 id 重新读取其他 worker 修改过的机器人"""
+        rows = db.execute(
+            select(Bot.id, Bot.bot_name, Bot.description, Bot.status, Bot.owner_id, Bot.version, Bot.capabilities)
+            .where(Bot.id.in_(bot_uuids))
+        ).all()
+        found = {row.id for row in rows}
+        self.apply([document(row) for row in rows], bot_uuids - found)
+
+    def _sync(self, db: Session) -> None:
+        if self._index is None:
+            self.rebuild(db)
+            return
+        try:
+            messages = self.channel.poll()
+        except Exception:
+            logger.exception("Failed to read bot search changes")
+            return
+        if messages is None:
+            self.rebuild(db)
+            return
+        changed = {
+            UUID(bot_uuid)
+            for message in messages if message["origin"] != self.origin
+            for bot_uuid in message["bots"]
+        }
+        if changed:
+            self._refresh(db, changed)
+
+    def search(self, db: Session, **kwargs) -> SearchResult:
+        self._sync(db)
+        with self._lock:
+            return self._index.search(**kwargs)
+
+
+bot_search = BotSearchIndex()
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _collect_search_changes(session: Session, flush_context) -> None:
+    """记下本事务中新增、删除或可搜索字段变化的机器人，提交后再更新索引"""
+    upserts: Dict[UUID, BotDocument] = {}
+    removed: Set[UUID] = set()
+    for obj in session.new:
+        if isinstance(obj, Bot):
+            upserts[obj.id] = document(obj)
+    for obj in session.dirty:
+        if isinstance(obj, Bot):
+            state = inspect(obj)
+            if any(state.attrs[name].history.has_changes() for name in INDEXED_ATTRIBUTES):
+                upserts[obj.id] = document(obj)
+    for obj in session.deleted:
+        if isinstance(obj, Bot):
+            removed.add(obj.id)
+    if not upserts and not removed:
+        return
+    pending_upserts = session.info.setdefault("bot_search_upserts", {})
+    pending_removed = session.info.setdefault("bot_search_removed", set())
+    pending_upserts.update(upserts)
+    pending_removed.difference_update(upserts)
+    for bot_uuid in removed:
+        pending_upserts.pop(bot_uuid, None)
+    pending_removed.update(removed)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _apply_search_changes(session: Session) -> None:
+    upserts = session.info.pop("bot_search_upserts", {})
+    removed = session.info.pop("bot_search_removed", set())
+    if not upserts and not removed:
+        return
+    bot_search.apply(list(upserts.values()), removed)
+    bot_search.publish(set(upserts) | removed)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_search_changes(session: Session) -> None:
+    session.info.pop("bot_search_upserts", None)
+    session.info.pop("bot_search_removed", None)
+
+
+def rebuild_search_index() -> int:
+    if not bot_search.loaded:
+        # 还没有人搜索过，第一次搜索时再加载
+        return 0
+    db = SessionLocal()
+    try:
+        return bot_search.rebuild(db)
+    finally:
+        db.close()
+
+
+register_worker("bot-search-rebuild", rebuild_search_index, settings.BOT_SEARCH_REBUILD_INTERVAL)
@@ -0,0 +1,221 @@
+"""
+机器人统计（按状态、所有者、版本、认领状态计数）
+第一次读取时用一条 GROUP BY (status, owner_id, version) 查询加载，之后由会话事件增量维护：
+事务中新增、删除的机器人，以及状态、所有者、版本变化的机器人在 after_flush 记下增量，
+提交后累加到计数上（回滚则丢弃）。BOT_STATS_CACHE_TTL 秒后下一次读取重新加载一次，
+兜住绕过 ORM 的批量修改。
+
+多个 worker 时，增量通过共享状态的广播通道（app.core.state.Channel）发给其他 worker，
+读取前先合并；落后太多、消息已过期时重新加载。
+"""
+
+import logging
+import threading
+import time
+import uuid
+from collections import Counter
+from enum import Enum
+from typing import List, Optional, Tuple
+
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.core.state import Channel
+from app.database import SessionLocal
+from app.models.bot import Bot
+
+logger = logging.getLogger(__name__)
+
+# (状态, 所有者, 版本)
+StatsKey = Tuple[str, Optional[str], Optional[str]]
+# (旧键, 新键)，新增时旧键为 None，删除时新键为 None
+Delta = Tuple[Optional[StatsKey], Optional[StatsKey]]
+
+UNKNOWN_VERSION = "unknown"
+
+
+def _status_value(status) -> str:
+    return status.value if isinstance(status, Enum) else status
+
+
+def _key(status, owner_id, version) -> StatsKey:
+    return (_status_value(status), str(owner_id) if owner_id else None, version)
+
+
+class BotStatsCache:
+    """进程内的机器人统计，线程安全"""
+
+    def __init__(self, ttl: float, channel: Optional[Channel] = None):
+        self.ttl = ttl
+        self.channel = channel or Channel("bot-stats")
+        # 发布增量时带上来源，读取通道时跳过自己发出的消息
+        self.origin = uuid.uuid4().hex
+        self._lock = threading.Lock()
+        self.invalidate()
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._loaded_at: Optional[float] = None
+            self._total = 0
+            self._status: Counter = Counter()
+            self._owner: Counter = Counter()
+            self._version: Counter = Counter()
+            self._claimed = 0
+
+    def _add(self, key: StatsKey, count: int) -> None:
+        status, owner_id, version = key
+        self._total += count
+        self._status[status] += count
+        self._version[version or UNKNOWN_VERSION] += count
+        if owner_id is not None:
+            self._owner[owner_id] += count
+            self._claimed += count
+
+    def load(self, db: Session) -> None:
+        # 先移动通道游标：查询结果已经包含之前的广播，之后的广播在下次读取时合并
+        try:
+            self.channel.poll()
+        except Exception:
+            logger.exception("Failed to read bot stats changes")
+        rows = db.execute(
+            select(Bot.status, Bot.owner_id, Bot.version, func.count())
+            .group_by(Bot.status, Bot.owner_id, Bot.version)
+        ).all()
+        with self._lock:
+            self._total = 0
+            self._status, self._owner, self._version = Counter(), Counter(), Counter()
+            self._claimed = 0
+            for status, owner_id, version, count in rows:
+                self._add(_key(status, owner_id, version), count)
+            self._loaded_at = time.monotonic()
+
+    def apply(self, deltas: List[Delta]) -> None:
+        """累加已提交的增量；还没有加载时什么也不做（加载时会读到）"""
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            for old, new in deltas:
+                if old is not None:
+                    self._add(old, -1)
+                if new is not None:
+                    self._add(new, 1)
+            self._prune()
+
+    def _prune(self) -> None:
+        for counter in (self._status, self._owner, self._version):
+            for name in [name for name, count in counter.items() if count <= 0]:
+                del counter[name]
+
+    def publish(self, deltas: Optional[List[Delta]]) -> None:
+        """deltas 为 None 时通知其他 worker 重新加载"""
+        try:
+            self.channel.publish({"origin": self.origin, "deltas": deltas})
+        except Exception:
+            logger.exception("Failed to publish bot stats changes")
+
+    def _poll_channel(self) -> bool:
+        """合并其他 worker 的增量，返回 False 表示消息已过期，需要重新加载"""
+        try:
+            messages = self.channel.poll()
+        except Exception:
+            logger.exception("Failed to read bot stats changes")
+            return False
+        if messages is None:
+            return False
+        for message in messages:
+            if message["origin"] == self.origin:
+                continue
+            if message["deltas"] is None:
+                return False
+            self.apply([
+                (tuple(old) if old else None, tuple(new) if new else None)
+                for old, new in message["deltas"]
+            ])
+        return True
+
+    def snapshot(self, db: Session, top_owners: int) -> dict:
+        """当前统计，过期或落后时先重新加载"""
+        loaded_at = self._loaded_at
+        if loaded_at is None or time.monotonic() - loaded_at > self.ttl:
+            self.load(db)
+        elif not self._poll_channel():
+            self.load(db)
+        with self._lock:
+            return {
+                "total": self._total,
+                "claimed": self._claimed,
+                "unclaimed": self._total - self._claimed,
+                "by_status": dict(self._status),
+                "by_version": dict(self._version),
+                "by_owner": dict(self._owner.most_common(top_owners)),
+                "owners": len(self._owner),
+                "age_seconds": time.monotonic() - self._loaded_at,
+            }
+
+
+bot_stats = BotStatsCache(settings.BOT_STATS_CACHE_TTL)
+
+
+_STALE = object()
+
+
+def _previous(state, name: str):
+    """属性在本次 flush 之前的值；没有加载过时返回 _STALE"""
+    history = state.attrs[name].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    return _STALE
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _collect_stats_deltas(session: Session, flush_context) -> None:
+    """记下本事务中影响统计的机器人变化，提交后再累加"""
+    deltas: List[Delta] = []
+    stale = False
+    for obj in session.new:
+        if isinstance(obj, Bot):
+            deltas.append((None, _key(obj.status, obj.owner_id, obj.version)))
+    for obj in session.deleted:
+        if isinstance(obj, Bot):
+            state = inspect(obj)
+            old = [_previous(state, name) for name in ("status", "owner_id", "version")]
+            if _STALE in old:
+                stale = True
+                continue
+            deltas.append((_key(*old), None))
+    for obj in session.dirty:
+        if not isinstance(obj, Bot):
+            continue
+        state = inspect(obj)
+        if not any(state.attrs[name].history.has_changes() for name in ("status", "owner_id", "version")):
+            continue
+        old = [_previous(state, name) for name in ("status", "owner_id", "version")]
+        if _STALE in old:
+            stale = True
+            continue
+        deltas.append((_key(*old), _key(obj.status, obj.owner_id, obj.version)))
+    if stale:
+        session.info["bot_stats_stale"] = True
+    if deltas:
+        session.info.setdefault("bot_stats_deltas", []).extend(deltas)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _apply_stats_deltas(session: Session) -> None:
+    deltas = session.info.pop("bot_stats_deltas", [])
+    if session.info.pop("bot_stats_stale", False):
+        # 不知道旧值，只能整体重新加载
+        bot_stats.invalidate()
+        bot_stats.publish(None)
+    elif deltas:
+        bot_stats.apply(deltas)
+        bot_stats.publish(deltas)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_stats_deltas(session: Session) -> None:
+    session.info.pop("bot_stats_deltas", None)
+    session.info.pop("bot_stats_stale", None)
@@ -2,12 +2,17 @@
 飞书 OAuth 和验证服务
 """
 
-import requests
-from typing import Optional, Dict, Any
+import time
+
+from typing import TYPE_CHECKING, Optional, Dict, Any
 from datetime import datetime, timedelta
 
+from app.core.metrics import feishu_latency
 from app.schemas.claim import FeishuUserInfo, FeishuBotRelationship
 
+if TYPE_CHECKING:
+    import requests
+
 
 class FeishuService:
     """飞书服务封装"""
@@ -19,6 +24,19 @@ class FeishuService:
         self._access_token = None
         self._token_expires_at = None
     
+    def _request(self, method: str, api: str, url: str, **kwargs) -> "requests.Response":
+        """发起请求并按接口记录耗时（requests 在第一次调用时才导入，加快启动）"""
+        import requests
+
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            response = requests.request(method, url, **kwargs)
+            outcome = "ok" if response.status_code < 400 else "http_error"
+            return response
+        finally:
+            feishu_latency.labels(api, outcome).observe(time.perf_counter() - start)
+    
     def get_access_token(self) -> str:
         """获取 tenant_access_token"""
         # 如果token还有效，直接返回
@@ -33,7 +51,7 @@ class FeishuService:
             "app_secret": self.app_secret
         }
         
-        response = requests.post(url, json=payload)
+        response = self._request("POST", "tenant_access_token", url, json=payload)
         response.raise_for_status()
         
         data = response.json()
@@ -55,7 +73,7 @@ class FeishuService:
             "code": code
         }
         
-        token_response = requests.post(token_url, json=token_payload)
+        token_response = self._request("POST", "user_access_token", token_url, json=token_payload)
         token_response.raise_for_status()
         
         token_data = token_response.json()
@@ -70,7 +88,7 @@ class FeishuService:
             "Authorization": f"Bearer {user_access_token}"
         }
         
-        user_response = requests.get(user_url, headers=headers)
+        user_response = self._request("GET", "user_info", user_url, headers=headers)
         user_response.raise_for_status()
         
         user_data = user_response.json()
@@ -104,7 +122,7 @@ class FeishuService:
         }
         
         try:
-            app_response = requests.get(app_url, headers=headers)
+            app_response = self._request("GET", "application", app_url, headers=headers)
             app_response.raise_for_status()
             
             app_data = app_response.json()
@@ -125,7 +143,7 @@ class FeishuService:
             
             # 检查是否是管理员
             admins_url = f"{self.base_url}/application/v6/applications/{bot_app_id}/app_admin_user_list"
-            admins_response = requests.get(admins_url, headers=headers)
+            admins_response = self._request("GET", "app_admins", admins_url, headers=headers)
             
             is_admin = False
             if admins_response.status_code == 200:
@@ -196,7 +214,7 @@ class FeishuService:
         }
         
         try:
-            response = requests.post(url, headers=headers, params=params, json=payload)
+            response = self._request("POST", "send_message", url, headers=headers, params=params, json=payload)
             response.raise_for_status()
             
             data = response.json()
@@ -0,0 +1,87 @@
+"""
+访问授权生命周期
+撤销授权、到期停用，并通知被撤销授权的机器人（grant.revoked webhook）。
+
+权限检查本身按 valid_until 判断（见 services/permissions.py），到期的授权即使尚未停用也不生效；
+后台任务定期把到期授权分批标记为停用，使数据库状态一致并发出通知。
+停用/撤销随事务提交后，各进程的权限缓存通过 NOTIFY 失效。
+"""
+
+import logging
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session, joinedload
+
+from app.config import settings
+from app.core.background import register_worker
+from app.database import SessionLocal
+from app.models.claim import BotAccessGrant
+from app.services.webhooks import EVENT_GRANT_REVOKED, enqueue_event
+
+logger = logging.getLogger(__name__)
+
+# 停用原因
+REASON_REVOKED = "revoked"
+REASON_EXPIRED = "expired"
+
+
+class GrantStateError(Exception):
+    """授权当前状态不允许该操作"""
+
+
+def _deactivate(db: Session, grant: BotAccessGrant, reason: str, now: datetime) -> None:
+    grant.is_active = False
+    grant.revoked_at = now
+    enqueue_event(db, grant.bot, EVENT_GRANT_REVOKED, {
+        "grant_id": str(grant.id),
+        "user_id": str(grant.user_id),
+        "access_type": grant.access_type.value,
+        "reason": reason,
+    })
+
+
+def revoke_grant(db: Session, grant: BotAccessGrant, now: Optional[datetime] = None) -> BotAccessGrant:
+    """立即撤销授权"""
+    if not grant.is_active:
+        raise GrantStateError("Grant is already revoked")
+    _deactivate(db, grant, REASON_REVOKED, now or datetime.utcnow())
+    db.commit()
+    db.refresh(grant)
+    return grant
+
+
+def expire_grants(db: Session, now: Optional[datetime] = None, batch_size: int = 500) -> int:
+    """停用一批已到期的授权，返回处理的数量"""
+    now = now or datetime.utcnow()
+    expired = db.execute(
+        select(BotAccessGrant)
+        .options(joinedload(BotAccessGrant.bot))
+        .where(
+            BotAccessGrant.is_active.is_(True),
+            BotAccessGrant.valid_until <= now,
+        )
+        .order_by(BotAccessGrant.valid_until)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True, of=BotAccessGrant)
+    ).scalars().all()
+
+    for grant in expired:
+        _deactivate(db, grant, REASON_EXPIRED, now)
+    db.commit()
+    if expired:
+        logger.info("Deactivated %d expired access grants", len(expired))
+    return len(expired)
+
+
+def sweep_expired_grants() -> None:
+    db = SessionLocal()
+    try:
+        while expire_grants(db, batch_size=settings.GRANT_EXPIRY_BATCH_SIZE) >= settings.GRANT_EXPIRY_BATCH_SIZE:
+            pass
+    finally:
+        db.close()
+
+
+register_worker("grant-expiry", sweep_expired_grants, settings.GRANT_EXPIRY_INTERVAL, run_on_start=True)
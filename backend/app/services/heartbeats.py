@@ -0,0 +1,126 @@
+"""
+心跳变化检测
+机器人的可变状态（状态、能力、版本）记为指纹 (status, 能力哈希, version)，按 updated_at 缓存在进程内。
+心跳先与指纹比较：只有真正变化的字段才写入（updated_at 随之更新）；没有变化时只用一条
+不经过 ORM 的 UPDATE 写 last_heartbeat_at，并保持 updated_at 不变，
+不重写 JSON 列，也不触发统计、搜索索引等会话事件。
+
+任何真正的修改（包括 PATCH、认领）都会更新 updated_at，缓存项的 updated_at 与行不一致时
+按行重新计算指纹，所以缓存在多个 worker 之间也不会过期。
+"""
+
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from enum import Enum
+from typing import Dict, NamedTuple, Optional, Set, Tuple
+from uuid import UUID
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.config import settings
+from app.core import metrics
+from app.models.bot import Bot
+from app.services.json_blobs import hash_json, set_capabilities
+
+heartbeat_writes = metrics.counter(
+    "bothub_heartbeat_writes_total", "Heartbeat writes to the bots table", ("kind",)
+)
+heartbeat_writes.preregister([("liveness",), ("state",)])
+
+
+class Fingerprint(NamedTuple):
+    status: str
+    capabilities: str  # 规范化 JSON 的 sha256
+    version: Optional[str]
+
+
+def row_fingerprint(bot: Bot) -> Fingerprint:
+    # 外存的能力描述以完整内容的哈希为键，不需要加载 json_blobs
+    digest = bot.capabilities_ref or hash_json(bot.capabilities)[0]
+    status = bot.status.value if isinstance(bot.status, Enum) else bot.status
+    return Fingerprint(status, digest, bot.version)
+
+
+class FingerprintCache:
+    """bot uuid -> (updated_at, 指纹)，LRU，线程安全"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[UUID, Tuple[datetime, Fingerprint]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, bot: Bot) -> Fingerprint:
+        with self._lock:
+            entry = self._entries.get(bot.id)
+            if entry is not None and entry[0] == bot.updated_at:
+                self._entries.move_to_end(bot.id)
+                return entry[1]
+        fingerprint = row_fingerprint(bot)
+        self.remember(bot.id, bot.updated_at, fingerprint)
+        return fingerprint
+
+    def remember(self, bot_uuid: UUID, updated_at: datetime, fingerprint: Fingerprint) -> None:
+        with self._lock:
+            self._entries[bot_uuid] = (updated_at, fingerprint)
+            self._entries.move_to_end(bot_uuid)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def forget(self, bot_uuid: UUID) -> None:
+        with self._lock:
+            self._entries.pop(bot_uuid, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+fingerprints = FingerprintCache(settings.HEARTBEAT_FINGERPRINT_CACHE_SIZE)
+
+
+def apply_heartbeat(
+    db: Session,
+    bot: Bot,
+    status: str,
+    capabilities: Optional[Dict],
+    version: Optional[str],
+    now: datetime,
+) -> Set[str]:
+    """
+    把心跳写入机器人（不提交），返回变化的字段
+
+    capabilities / version 为 None 表示心跳没有上报，保持原值。
+    """
+    known = fingerprints.get(bot)
+    digest = known.capabilities if capabilities is None else hash_json(capabilities)[0]
+    reported = Fingerprint(status, digest, known.version if version is None else version)
+    changed = {field for field in Fingerprint._fields if getattr(reported, field) != getattr(known, field)}
+
+    if not changed:
+        heartbeat_writes.labels("liveness").inc()
+        db.execute(
+            update(Bot)
+            .where(Bot.id == bot.id)
+            .values(last_heartbeat_at=now, updated_at=Bot.updated_at)
+            .execution_options(synchronize_session=False)
+        )
+        set_committed_value(bot, "last_heartbeat_at", now)
+        return changed
+
+    heartbeat_writes.labels("state").inc()
+    if "status" in changed:
+        bot.status = status
+    if "capabilities" in changed:
+        set_capabilities(db, bot, capabilities)
+    if "version" in changed:
+        bot.version = version
+    bot.last_heartbeat_at = now
+    # 提交后 updated_at 变化，下一次心跳按行重新计算指纹
+    fingerprints.forget(bot.id)
+    return changed
@@ -0,0 +1,65 @@
+"""
+JSON Blob 服务
+按规范化 JSON 的 sha256 写入 json_blobs，已存在时跳过（不同机器人、不同版本的相同内容只存一份）。
+"""
+
+import hashlib
+import json
+from typing import Any, Optional, Tuple
+
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.bot import Bot
+from app.models.json_blob import JsonBlob
+from app.services.routing import bot_capabilities
+
+
+def canonical_json(data: Any) -> bytes:
+    """键排序、无多余空白，内容相同的 JSON 得到相同的字节串"""
+    return json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def hash_json(data: Any) -> Tuple[str, int]:
+    """返回 (sha256, 字节数)"""
+    raw = canonical_json(data)
+    return hashlib.sha256(raw).hexdigest(), len(raw)
+
+
+def put_json(db: Session, data: Any) -> str:
+    """写入 JSON 文档（不提交），返回哈希"""
+    digest, size = hash_json(data)
+    if db.get(JsonBlob, digest) is None:
+        insert = pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+        db.execute(
+            insert(JsonBlob)
+            .values(hash=digest, data=data, size=size)
+            .on_conflict_do_nothing(index_elements=["hash"])
+        )
+    return digest
+
+
+def set_capabilities(db: Session, bot: Bot, capabilities: Optional[dict]) -> bool:
+    """
+    更新机器人能力（不提交），内容没有变化时不写入，返回是否有变化
+
+    超过 JSON_BLOB_INLINE_MAX_BYTES 的能力描述存入 json_blobs，
+    bots.capabilities 只保留能力名摘要（{"名称": true}），供列表、路由和任务领取使用；
+    完整内容只在详情接口通过 Bot.full_capabilities 按需加载。
+    """
+    capabilities = capabilities or {}
+    digest, size = hash_json(capabilities)
+    if size <= settings.JSON_BLOB_INLINE_MAX_BYTES:
+        if bot.capabilities_ref is None and bot.capabilities == capabilities:
+            return False
+        bot.capabilities = capabilities
+        bot.capabilities_ref = None
+        return True
+
+    if bot.capabilities_ref == digest:
+        return False
+    bot.capabilities_ref = put_json(db, capabilities)
+    bot.capabilities = {name: True for name in sorted(bot_capabilities(capabilities))}
+    return True
@@ -0,0 +1,215 @@
+"""
+技能排行榜
+进程内维护按天分桶的滑动窗口计数和每个 (周期, 指标) 的有序排名，
+下载/评分时增量更新，读取前 K 名只需切片，不查询 skills 表。
+启动后首次使用时从 skill_daily_stats 加载，并定期重新加载以合并其他进程的写入
+（定期任务见 services/skills.py，加载前先落盘本进程缓冲的计数）。
+"""
+
+import threading
+from bisect import bisect_left, insort
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.bot import Bot
+from app.models.skill import Skill, SkillDailyStats
+
+# 周期 -> 窗口天数（含今天），all 为累计
+PERIOD_DAYS = {"day": 1, "week": 7, "month": 30}
+PERIODS = ("day", "week", "month", "all")
+METRICS = ("downloads", "rating")
+MAX_WINDOW_DAYS = max(PERIOD_DAYS.values())
+
+# 计数：[下载次数, 评分总和, 评分次数]
+Counts = List[float]
+
+
+class SortedRanking:
+    """按分数降序的有序表：更新 O(log n)（加列表移动），取前 K 名 O(K)"""
+
+    def __init__(self):
+        self._keys: List[Tuple[float, UUID]] = []  # (-score, skill)
+        self._scores: Dict[UUID, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def set(self, skill: UUID, score: Optional[float]) -> None:
+        """更新分数；score 为 None 或不大于 0 时移出排名"""
+        old = self._scores.get(skill)
+        if old == score:
+            return
+        if old is not None:
+            del self._keys[bisect_left(self._keys, (-old, skill))]
+            del self._scores[skill]
+        if score is not None and score > 0:
+            insort(self._keys, (-score, skill))
+            self._scores[skill] = score
+
+    def top(self, k: int) -> List[Tuple[UUID, float]]:
+        return [(skill, -neg_score) for neg_score, skill in self._keys[:k]]
+
+
+class LeaderboardEngine:
+    """技能排行榜引擎，线程安全"""
+
+    def __init__(self, min_ratings: int):
+        self.min_ratings = min_ratings
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._reset_state(datetime.utcnow().date())
+
+    def _reset_state(self, today: date) -> None:
+        self._today = today
+        self._days: Dict[date, Dict[UUID, Counts]] = {}
+        self._windows: Dict[str, Dict[UUID, Counts]] = {period: {} for period in PERIODS}
+        self._rankings = {(period, metric): SortedRanking() for period in PERIODS for metric in METRICS}
+        self._meta: Dict[UUID, Tuple[str, str, Optional[str]]] = {}  # skill -> (skill_id, name, 作者名)
+
+    # ========== 加载 ==========
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def ensure_loaded(self, db: Session) -> None:
+        if not self._loaded:
+            self.load(db)
+
+    def load(self, db: Session, today: Optional[date] = None) -> None:
+        """从数据库重建全部状态（只读最近 30 天的按天计数和技能元数据）"""
+        today = today or datetime.utcnow().date()
+        skills = db.execute(
+            select(
+                Skill.id, Skill.skill_id, Skill.name, Bot.bot_name,
+                Skill.downloads, Skill.rating_sum, Skill.rating_count,
+            ).outerjoin(Bot, Bot.id == Skill.author_bot_id)
+        ).all()
+        daily = db.execute(
+            select(
+                SkillDailyStats.skill_id, SkillDailyStats.day, SkillDailyStats.downloads,
+                SkillDailyStats.rating_sum, SkillDailyStats.rating_count,
+            ).where(SkillDailyStats.day > today - timedelta(days=MAX_WINDOW_DAYS))
+        ).all()
+
+        with self._lock:
+            self._reset_state(today)
+            for skill, skill_id, name, author, downloads, rating_sum, rating_count in skills:
+                self._meta[skill] = (skill_id, name, author)
+                self._windows["all"][skill] = [downloads, rating_sum, rating_count]
+                self._rerank("all", skill)
+            for skill, day, downloads, rating_sum, rating_count in daily:
+                if skill not in self._meta:
+                    continue
+                counts = [downloads, rating_sum, rating_count]
+                self._days.setdefault(day, {})[skill] = list(counts)
+                for period, days in PERIOD_DAYS.items():
+                    if day > today - timedelta(days=days):
+                        self._add(period, skill, counts)
+            self._loaded = True
+
+    def reset(self) -> None:
+        with self._lock:
+            self._reset_state(datetime.utcnow().date())
+            self._loaded = False
+
+    # ========== 增量更新 ==========
+
+    def add_skill(self, skill: UUID, skill_id: str, name: str, author: Optional[str]) -> None:
+        with self._lock:
+            if self._loaded:
+                self._meta[skill] = (skill_id, name, author)
+
+    def record(
+        self,
+        skill: UUID,
+        downloads: int = 0,
+        rating_sum: int = 0,
+        rating_count: int = 0,
+        day: Optional[date] = None,
+    ) -> None:
+        """记录一次（或一批）下载/评分；尚未加载时忽略，加载时会从数据库读到"""
+        day = day or datetime.utcnow().date()
+        counts = [downloads, rating_sum, rating_count]
+        with self._lock:
+            if not self._loaded or skill not in self._meta:
+                return
+            self._roll(max(day, self._today))
+            if day > self._today - timedelta(days=MAX_WINDOW_DAYS):
+                day_counts = self._days.setdefault(day, {}).setdefault(skill, [0, 0, 0])
+                for i, value in enumerate(counts):
+                    day_counts[i] += value
+                for period, days in PERIOD_DAYS.items():
+                    if day > self._today - timedelta(days=days):
+                        self._add(period, skill, counts)
+            self._add("all", skill, counts)
+
+    # ========== 读取 ==========
+
+    def top(self, period: str, metric: str, k: int, today: Optional[date] = None) -> List[dict]:
+        """前 K 名，O(K)"""
+        with self._lock:
+            self._roll(today or datetime.utcnow().date())
+            window = self._windows[period]
+            items = []
+            for skill, score in self._rankings[(period, metric)].top(k):
+                skill_id, name, author = self._meta[skill]
+                downloads, rating_sum, rating_count = window[skill]
+                items.append({
+                    "skill_id": skill_id,
+                    "name": name,
+                    "author": author,
+                    "downloads": int(downloads),
+                    "rating": round(rating_sum / rating_count, 2) if rating_count else 0.0,
+                    "rating_count": int(rating_count),
+                    "score": score,
+                })
+            return items
+
+    # ========== 内部方法（调用方持有锁） ==========
+
+    def _score(self, metric: str, counts: Counts) -> Optional[float]:
+        downloads, rating_sum, rating_count = counts
+        if metric == "downloads":
+            return downloads
+        if rating_count < self.min_ratings:
+            return None
+        return rating_sum / rating_count
+
+    def _rerank(self, period: str, skill: UUID) -> None:
+        counts = self._windows[period].get(skill)
+        for metric in METRICS:
+            self._rankings[(period, metric)].set(skill, self._score(metric, counts) if counts else None)
+
+    def _add(self, period: str, skill: UUID, counts: Counts, sign: int = 1) -> None:
+        window = self._windows[period]
+        total = window.setdefault(skill, [0, 0, 0])
+        for i, value in enumerate(counts):
+            total[i] += sign * value
+        if not any(total):
+            del window[skill]
+        self._rerank(period, skill)
+
+    def _roll(self, today: date) -> None:
+        """日期变化时把滑出窗口的天从各周期总数中减掉"""
+        if today <= self._today:
+            return
+        for day, day_counts in list(self._days.items()):
+            for period, days in PERIOD_DAYS.items():
+                was_in = day > self._today - timedelta(days=days)
+                still_in = day > today - timedelta(days=days)
+                if was_in and not still_in:
+                    for skill, counts in day_counts.items():
+                        self._add(period, skill, counts, sign=-1)
+            if day <= today - timedelta(days=MAX_WINDOW_DAYS):
+                del self._days[day]
+        self._today = today
+
+
+leaderboard = LeaderboardEngine(min_ratings=settings.LEADERBOARD_MIN_RATINGS)
+
@@ -0,0 +1,507 @@
+"""
+机器人间消息总线
+机器人订阅主题，向主题发布（扇出给每个订阅者）或直接发给某个 bot_id。
+每个接收者有一个收件箱：接收者长轮询取出消息，处理完后确认；超过 BUS_ACK_TIMEOUT
+未确认的消息重新投递（至少一次），超过 BUS_RETENTION 的消息丢弃。
+
+收件箱最多积压 BUS_QUEUE_SIZE 条，满了以后拒绝新消息（背压）：直接发送返回 429，
+主题扇出跳过积压的订阅者，不拖慢其他订阅者。
+
+后端（BUS_BACKEND）：
+- memory：进程内收件箱，零 I/O，只在单个 worker 内有效，重启丢失
+- database：bus_subscriptions / bus_messages 表，多个 worker 共享，重启不丢失；
+  取消息用 FOR UPDATE SKIP LOCKED，多个消费者不会取到同一条
+新后端（如 redis）实现 MessageBusBackend 的同步原语并加到 create_bus_backend 即可，
+长轮询等待由基类统一处理：本进程投递时立即唤醒，否则每 BUS_POLL_INTERVAL 秒重新查询一次。
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta
+from typing import Any, Deque, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+from uuid import UUID, uuid4
+
+from sqlalchemy import delete, func, insert, select, update
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.core import metrics
+from app.core.background import register_worker
+from app.database import SessionLocal
+from app.models.bus import BusMessage, BusSubscription
+
+logger = logging.getLogger(__name__)
+
+bus_messages = metrics.counter(
+    "bothub_bus_messages_total", "Message bus deliveries by outcome", ("outcome",)
+)
+bus_messages.preregister([("delivered",), ("rejected",), ("acked",), ("redelivered",), ("expired",)])
+
+
+class Envelope(NamedTuple):
+    id: UUID
+    topic: Optional[str]  # 为空表示直接发送
+    sender: str
+    payload: Any
+    created_at: datetime
+    expires_at: datetime
+    attempts: int = 0
+
+
+def new_envelope(sender: str, payload: Any, topic: Optional[str] = None) -> Envelope:
+    now = datetime.utcnow()
+    return Envelope(uuid4(), topic, sender, payload, now, now + timedelta(seconds=settings.BUS_RETENTION))
+
+
+class MessageBusBackend:
+    """消息总线后端接口；同步方法可能阻塞，blocking 为 True 时在线程池中调用"""
+
+    name = "base"
+    # 是否在进程之间共享
+    shared = True
+    blocking = True
+
+    def __init__(self):
+        self._waiters: Dict[UUID, Set[Tuple[asyncio.AbstractEventLoop, asyncio.Event]]] = {}
+        self._waiters_lock = threading.Lock()
+
+    def subscribe(self, bot_uuid: UUID, topic: str) -> bool:
+        """订阅主题，返回是否新增"""
+        raise NotImplementedError
+
+    def unsubscribe(self, bot_uuid: UUID, topic: str) -> bool:
+        raise NotImplementedError
+
+    def subscriptions(self, bot_uuid: UUID) -> List[str]:
+        raise NotImplementedError
+
+    def subscribers(self, topic: str) -> List[UUID]:
+        raise NotImplementedError
+
+    def deliver(self, recipients: Iterable[UUID], envelope: Envelope) -> Set[UUID]:
+        """放入每个接收者的收件箱，返回收件箱已满、被拒绝的接收者"""
+        raise NotImplementedError
+
+    def receive(self, bot_uuid: UUID, limit: int) -> List[Envelope]:
+        """不等待地取出最多 limit 条，取出的消息在确认时限内对其他消费者不可见"""
+        raise NotImplementedError
+
+    def ack(self, bot_uuid: UUID, message_ids: Iterable[UUID]) -> int:
+        """确认（删除）消息，返回确认的条数"""
+        raise NotImplementedError
+
+    def depth(self, bot_uuid: UUID) -> int:
+        """收件箱中的消息数（包括已取出未确认的）"""
+        raise NotImplementedError
+
+    def prune(self) -> int:
+        """删除过期消息，返回删除的条数"""
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    def send(self, recipients: Iterable[UUID], envelope: Envelope) -> Set[UUID]:
+        """投递并唤醒本进程中等待这些接收者的长轮询"""
+        recipients = list(recipients)
+        rejected = self.deliver(recipients, envelope) if recipients else set()
+        bus_messages.labels("delivered").inc(len(recipients) - len(rejected))
+        if rejected:
+            bus_messages.labels("rejected").inc(len(rejected))
+        if self._waiters:
+            self._notify(bot_uuid for bot_uuid in recipients if bot_uuid not in rejected)
+        return rejected
+
+    def _notify(self, recipients: Iterable[UUID]) -> None:
+        with self._waiters_lock:
+            for bot_uuid in recipients:
+                for loop, event in self._waiters.get(bot_uuid, ()):
+                    loop.call_soon_threadsafe(event.set)
+
+    async def _receive(self, bot_uuid: UUID, limit: int) -> List[Envelope]:
+        if self.blocking:
+            return await run_in_threadpool(self.receive, bot_uuid, limit)
+        return self.receive(bot_uuid, limit)
+
+    async def fetch(self, bot_uuid: UUID, limit: int, wait: float = 0.0) -> List[Envelope]:
+        """取出最多 limit 条；收件箱为空时最多等待 wait 秒"""
+        deadline = time.monotonic() + wait
+        loop = asyncio.get_running_loop()
+        while True:
+            # 先登记再查询，查询之后到达的消息不会错过唤醒
+            waiter = (loop, asyncio.Event())
+            with self._waiters_lock:
+                self._waiters.setdefault(bot_uuid, set()).add(waiter)
+            try:
+                messages = await self._receive(bot_uuid, limit)
+                remaining = deadline - time.monotonic()
+                if messages or remaining <= 0:
+                    return messages
+                try:
+                    await asyncio.wait_for(waiter[1].wait(), min(remaining, settings.BUS_POLL_INTERVAL))
+                except asyncio.TimeoutError:
+                    pass
+            finally:
+                with self._waiters_lock:
+                    waiters = self._waiters.get(bot_uuid)
+                    if waiters is not None:
+                        waiters.discard(waiter)
+                        if not waiters:
+                            del self._waiters[bot_uuid]
+
+
+class _Inbox:
+    __slots__ = ("ready", "inflight")
+
+    def __init__(self):
+        self.ready: Deque[Envelope] = deque()
+        # 消息 id -> (确认时限, 消息)；确认时限相同，按取出顺序即按到期顺序
+        self.inflight: "OrderedDict[UUID, Tuple[datetime, Envelope]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.ready) + len(self.inflight)
+
+
+class MemoryBusBackend(MessageBusBackend):
+    """进程内实现，线程安全"""
+
+    name = "memory"
+    shared = False
+    blocking = False
+
+    def __init__(self, queue_size: int, ack_timeout: float):
+        super().__init__()
+        self.queue_size = queue_size
+        self.ack_timeout = timedelta(seconds=ack_timeout)
+        self._lock = threading.Lock()
+        self._topics: Dict[str, Set[UUID]] = {}
+        self._inboxes: Dict[UUID, _Inbox] = {}
+
+    def subscribe(self, bot_uuid, topic):
+        with self._lock:
+            subscribers = self._topics.setdefault(topic, set())
+            if bot_uuid in subscribers:
+                return False
+            subscribers.add(bot_uuid)
+            return True
+
+    def unsubscribe(self, bot_uuid, topic):
+        with self._lock:
+            subscribers = self._topics.get(topic)
+            if not subscribers or bot_uuid not in subscribers:
+                return False
+            subscribers.discard(bot_uuid)
+            if not subscribers:
+                del self._topics[topic]
+            return True
+
+    def subscriptions(self, bot_uuid):
+        with self._lock:
+            return sorted(topic for topic, subscribers in self._topics.items() if bot_uuid in subscribers)
+
+    def subscribers(self, topic):
+        with self._lock:
+            return list(self._topics.get(topic, ()))
+
+    def deliver(self, recipients, envelope):
+        rejected = set()
+        with self._lock:
+            for bot_uuid in recipients:
+                inbox = self._inboxes.get(bot_uuid)
+                if inbox is None:
+                    inbox = self._inboxes[bot_uuid] = _Inbox()
+                if len(inbox) >= self.queue_size:
+                    rejected.add(bot_uuid)
+                else:
+                    inbox.ready.append(envelope)
+        return rejected
+
+    def receive(self, bot_uuid, limit):
+        now = datetime.utcnow()
+        messages = []
+        expired = redelivered = 0
+        with self._lock:
+            inbox = self._inboxes.get(bot_uuid)
+            if inbox is None:
+                return messages
+            # 确认超时的消息放回队首，保持原来的顺序
+            overdue = []
+            while inbox.inflight:
+                message_id, (deadline, envelope) = next(iter(inbox.inflight.items()))
+                if deadline > now:
+                    break
+                del inbox.inflight[message_id]
+                overdue.append(envelope)
+            inbox.ready.extendleft(reversed(overdue))
+            redelivered = len(overdue)
+            while inbox.ready and len(messages) < limit:
+                envelope = inbox.ready.popleft()
+                if envelope.expires_at <= now:
+                    expired += 1
+                    continue
+                envelope = envelope._replace(attempts=envelope.attempts + 1)
+                inbox.inflight[envelope.id] = (now + self.ack_timeout, envelope)
+                messages.append(envelope)
+        if redelivered:
+            bus_messages.labels("redelivered").inc(redelivered)
+        if expired:
+            bus_messages.labels("expired").inc(expired)
+        return messages
+
+    def ack(self, bot_uuid, message_ids):
+        with self._lock:
+            inbox = self._inboxes.get(bot_uuid)
+            if inbox is None:
+                return 0
+            acked = sum(inbox.inflight.pop(message_id, None) is not None for message_id in message_ids)
+        if acked:
+            bus_messages.labels("acked").inc(acked)
+        return acked
+
+    def depth(self, bot_uuid):
+        with self._lock:
+            inbox = self._inboxes.get(bot_uuid)
+            return len(inbox) if inbox is not None else 0
+
+    def prune(self):
+        now = datetime.utcnow()
+        pruned = 0
+        with self._lock:
+            for bot_uuid, inbox in list(self._inboxes.items()):
+                kept = deque(envelope for envelope in inbox.ready if envelope.expires_at > now)
+                pruned += len(inbox.ready) - len(kept)
+                inbox.ready = kept
+                for message_id, (_, envelope) in list(inbox.inflight.items()):
+                    if envelope.expires_at <= now:
+                        del inbox.inflight[message_id]
+                        pruned += 1
+                if not inbox:
+                    del self._inboxes[bot_uuid]
+        if pruned:
+            bus_messages.labels("expired").inc(pruned)
+        return pruned
+
+    def clear(self):
+        with self._lock:
+            self._topics.clear()
+            self._inboxes.clear()
+
+
+class DatabaseBusBackend(MessageBusBackend):
+    """数据库实现：每个接收者一行消息，确认后删除"""
+
+    name = "database"
+
+    def __init__(self, queue_size: int, ack_timeout: float):
+        super().__init__()
+        self.queue_size = queue_size
+        self.ack_timeout = timedelta(seconds=ack_timeout)
+
+    def subscribe(self, bot_uuid, topic):
+        db = SessionLocal()
+        try:
+            if db.get(BusSubscription, (bot_uuid, topic)) is not None:
+                return False
+            db.add(BusSubscription(bot_id=bot_uuid, topic=topic))
+            db.commit()
+            return True
+        finally:
+            db.close()
+
+    def unsubscribe(self, bot_uuid, topic):
+        db = SessionLocal()
+        try:
+            result = db.execute(
+                delete(BusSubscription)
+                .where(BusSubscription.bot_id == bot_uuid, BusSubscription.topic == topic)
+            )
+            db.commit()
+            return result.rowcount > 0
+        finally:
+            db.close()
+
+    def subscriptions(self, bot_uuid):
+        db = SessionLocal()
+        try:
+            return list(db.execute(
+                select(BusSubscription.topic)
+                .where(BusSubscription.bot_id == bot_uuid)
+                .order_by(BusSubscription.topic)
+            ).scalars())
+        finally:
+            db.close()
+
+    def subscribers(self, topic):
+        db = SessionLocal()
+        try:
+            return list(db.execute(
+                select(BusSubscription.bot_id).where(BusSubscription.topic == topic)
+            ).scalars())
+        finally:
+            db.close()
+
+    def deliver(self, recipients, envelope):
+        recipients = list(recipients)
+        db = SessionLocal()
+        try:
+            # 一条 GROUP BY 查出所有接收者的积压，一条批量 INSERT 写入其余的
+            depths = dict(db.execute(
+                select(BusMessage.recipient_id, func.count())
+                .where(BusMessage.recipient_id.in_(recipients), BusMessage.expires_at > envelope.created_at)
+                .group_by(BusMessage.recipient_id)
+            ).all())
+            rejected = {bot_uuid for bot_uuid in recipients if depths.get(bot_uuid, 0) >= self.queue_size}
+            rows = [
+                {
+                    "id": envelope.id if len(recipients) == 1 else uuid4(),
+                    "recipient_id": bot_uuid,
+                    "topic": envelope.topic,
+                    "sender": envelope.sender,
+                    "payload": envelope.payload,
+                    "created_at": envelope.created_at,
+                    "expires_at": envelope.expires_at,
+                    "visible_at": envelope.created_at,
+                    "attempts": 0,
+                }
+                for bot_uuid in recipients if bot_uuid not in rejected
+            ]
+            if rows:
+                db.execute(insert(BusMessage), rows)
+                db.commit()
+            return rejected
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def receive(self, bot_uuid, limit):
+        now = datetime.utcnow()
+        db = SessionLocal()
+        try:
+            rows = db.execute(
+                select(BusMessage)
+                .where(
+                    BusMessage.recipient_id == bot_uuid,
+                    BusMessage.visible_at <= now,
+                    BusMessage.expires_at > now,
+                )
+                .order_by(BusMessage.created_at, BusMessage.id)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+            ).scalars().all()
+            if not rows:
+                db.rollback()
+                return []
+            messages = [
+                Envelope(row.id, row.topic, row.sender, row.payload, row.created_at, row.expires_at, row.attempts + 1)
+                for row in rows
+            ]
+            db.execute(
+                update(BusMessage)
+                .where(BusMessage.id.in_([message.id for message in messages]))
+                .values(visible_at=now + self.ack_timeout, attempts=BusMessage.attempts + 1)
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        redelivered = sum(message.attempts > 1 for message in messages)
+        if redelivered:
+            bus_messages.labels("redelivered").inc(redelivered)
+        return messages
+
+    def ack(self, bot_uuid, message_ids):
+        message_ids = list(message_ids)
+        if not message_ids:
+            return 0
+        db = SessionLocal()
+        try:
+            result = db.execute(
+                delete(BusMessage)
+                .where(BusMessage.recipient_id == bot_uuid, BusMessage.id.in_(message_ids))
+            )
+            db.commit()
+        finally:
+            db.close()
+        if result.rowcount:
+            bus_messages.labels("acked").inc(result.rowcount)
+        return result.rowcount
+
+    def depth(self, bot_uuid):
+        db = SessionLocal()
+        try:
+            return db.execute(
+                select(func.count())
+                .select_from(BusMessage)
+                .where(BusMessage.recipient_id == bot_uuid, BusMessage.expires_at > datetime.utcnow())
+            ).scalar_one()
+        finally:
+            db.close()
+
+    def prune(self):
+        db = SessionLocal()
+        try:
+            result = db.execute(delete(BusMessage).where(BusMessage.expires_at <= datetime.utcnow()))
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        if result.rowcount:
+            bus_messages.labels("expired").inc(result.rowcount)
+        return result.rowcount
+
+    def clear(self):
+        # 表随数据库一起清空
+        pass
+
+
+def create_bus_backend(name: Optional[str] = None) -> MessageBusBackend:
+    name = name or settings.BUS_BACKEND
+    if name == "memory":
+        return MemoryBusBackend(settings.BUS_QUEUE_SIZE, settings.BUS_ACK_TIMEOUT)
+    if name == "database":
+        return DatabaseBusBackend(settings.BUS_QUEUE_SIZE, settings.BUS_ACK_TIMEOUT)
+    raise ValueError(f"Unknown message bus backend '{name}', expected one of ['database', 'memory']")
+
+
+_bus: Optional[MessageBusBackend] = None
+_bus_lock = threading.Lock()
+
+
+def get_bus() -> MessageBusBackend:
+    """进程内的消息总线后端（第一次使用时按配置创建）"""
+    global _bus
+    if _bus is None:
+        with _bus_lock:
+            if _bus is None:
+                _bus = create_bus_backend()
+                if not _bus.shared and int(os.environ.get("WEB_CONCURRENCY", "1")) > 1:
+                    logger.warning(
+                        "BUS_BACKEND=memory with %s workers: bots only receive messages sent through their own worker",
+                        os.environ["WEB_CONCURRENCY"],
+                    )
+    return _bus
+
+
+def set_bus(backend: Optional[MessageBusBackend]) -> None:
+    """替换后端（测试用）"""
+    global _bus
+    with _bus_lock:
+        _bus = backend
+
+
+def prune_bus() -> int:
+    return get_bus().prune()
+
+
+register_worker("bus-prune", prune_bus, settings.BUS_PRUNE_INTERVAL)
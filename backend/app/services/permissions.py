@@ -0,0 +1,352 @@
+"""
+机器人访问权限服务
+回答"用户 U 对机器人 B 有哪些权限"：所有者拥有全部权限，
+其他用户取有效期内、未撤销的 BotAccessGrant 的 permissions 并集。
+
+结果按 (用户, 机器人) 缓存在进程内，授权变化时按机器人版本号失效：
+提交包含 BotAccessGrant 或机器人所有者变化的事务后递增该机器人的版本，
+旧版本的缓存项在下次读取时重新加载。绕过 ORM 单元的批量 update()/delete() 先按同样的条件
+查出涉及的机器人再一并失效。版本号取自全局递增的计数器，超过 PERMISSION_CACHE_TTL 的版本号
+会被丢掉（在那之前缓存的项已经过期），所以版本表不会随机器人数增长。
+有效期在每次检查时按当前时间判断，不需要因为授权到期而失效缓存。
+
+其他进程通过 PostgreSQL LISTEN/NOTIFY 得知变化：同一事务中 pg_notify 变化的机器人，
+NOTIFY 只在提交后送达、回滚时丢弃；每个进程的监听任务每 PERMISSION_NOTIFY_POLL_INTERVAL 秒
+读取一次连接上的通知，不查询 bot_access_grants。监听连接断开期间可能漏掉通知，
+重连后整体失效一次；PERMISSION_CACHE_TTL 是最后的兜底。
+不是 PostgreSQL 时，变化通过共享状态的广播通道（app.core.state.Channel）通知其他 worker。
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, FrozenSet, NamedTuple, Optional, Set, Tuple
+from uuid import UUID
+
+from sqlalchemy import event, inspect, select, text
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.core.background import register_worker
+from app.core.state import Channel
+from app.database import SessionLocal, engine
+from app.models.bot import Bot
+from app.models.claim import BotAccessGrant
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = "bothub_permissions"
+
+# 权限
+PERMISSION_INVOKE = "can_invoke"
+PERMISSION_VIEW_LOGS = "can_view_logs"
+PERMISSION_MODIFY_SETTINGS = "can_modify_settings"
+
+OWNER_PERMISSIONS: FrozenSet[str] = frozenset({PERMISSION_INVOKE, PERMISSION_VIEW_LOGS, PERMISSION_MODIFY_SETTINGS})
+NO_PERMISSIONS: FrozenSet[str] = frozenset()
+
+
+class GrantWindow(NamedTuple):
+    """一条授权：权限集合和有效期"""
+    permissions: FrozenSet[str]
+    valid_from: Optional[datetime]
+    valid_until: Optional[datetime]
+
+    def active_at(self, now: datetime) -> bool:
+        return (self.valid_from is None or self.valid_from <= now) and (
+            self.valid_until is None or now < self.valid_until
+        )
+
+
+class AccessEntry:
+    """缓存项：某用户在某机器人上的全部有效授权"""
+
+    __slots__ = ("version", "loaded_at", "grants")
+
+    def __init__(self, version: Tuple[int, int], loaded_at: float, grants: Tuple[GrantWindow, ...]):
+        self.version = version
+        self.loaded_at = loaded_at
+        self.grants = grants
+
+    def permissions(self, now: datetime) -> FrozenSet[str]:
+        if len(self.grants) == 1:
+            grant = self.grants[0]
+            return grant.permissions if grant.active_at(now) else NO_PERMISSIONS
+        result: Set[str] = set()
+        for grant in self.grants:
+            if grant.active_at(now):
+                result |= grant.permissions
+        return frozenset(result)
+
+
+class PermissionEngine:
+    """带缓存的权限计算，线程安全"""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple[UUID, UUID], AccessEntry]" = OrderedDict()
+        # 机器人 -> (版本号, 递增时间)，按递增时间排序
+        self._versions: "OrderedDict[UUID, Tuple[int, float]]" = OrderedDict()
+        self._counter = 0
+        self._generation = 0  # 全部失效时递增
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _version(self, bot_uuid: UUID) -> Tuple[int, int]:
+        version = self._versions.get(bot_uuid)
+        return self._generation, version[0] if version else 0
+
+    # ========== 查询 ==========
+
+    def effective_permissions(
+        self,
+        db: Session,
+        user_id: Optional[UUID],
+        bot: Bot,
+        now: Optional[datetime] = None,
+    ) -> FrozenSet[str]:
+        """用户在机器人上的有效权限集合"""
+        if user_id is None:
+            return NO_PERMISSIONS
+        if bot.owner_id is not None and bot.owner_id == user_id:
+            return OWNER_PERMISSIONS
+        entry = self._get(db, user_id, bot.id)
+        return entry.permissions(now or datetime.utcnow())
+
+    def can(
+        self,
+        db: Session,
+        user_id: Optional[UUID],
+        bot: Bot,
+        permission: str = PERMISSION_INVOKE,
+        now: Optional[datetime] = None,
+    ) -> bool:
+        return permission in self.effective_permissions(db, user_id, bot, now)
+
+    def _get(self, db: Session, user_id: UUID, bot_uuid: UUID) -> AccessEntry:
+        key = (user_id, bot_uuid)
+        with self._lock:
+            version = self._version(bot_uuid)
+            entry = self._entries.get(key)
+            if (
+                entry is not None
+                and entry.version == version
+                and time.monotonic() - entry.loaded_at < self.ttl
+            ):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        entry = AccessEntry(version, time.monotonic(), self._load(db, user_id, bot_uuid))
+        with self._lock:
+            # 加载期间授权又变化了：结果照常返回，但不写入缓存
+            if self._version(bot_uuid) == version:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return entry
+
+    @staticmethod
+    def _load(db: Session, user_id: UUID, bot_uuid: UUID) -> Tuple[GrantWindow, ...]:
+        # 命中 (user_id, bot_id, is_active) 复合索引
+        rows = db.execute(
+            select(BotAccessGrant.permissions, BotAccessGrant.valid_from, BotAccessGrant.valid_until).where(
+                BotAccessGrant.user_id == user_id,
+                BotAccessGrant.bot_id == bot_uuid,
+                BotAccessGrant.is_active.is_(True),
+            )
+        ).all()
+        return tuple(
+            GrantWindow(
+                frozenset(name for name, allowed in (permissions or {}).items() if allowed),
+                valid_from,
+                valid_until,
+            )
+            for permissions, valid_from, valid_until in rows
+        )
+
+    # ========== 失效 ==========
+
+    def invalidate(self, bot_uuid: Optional[UUID] = None) -> None:
+        """某个机器人（或全部）的授权发生变化"""
+        with self._lock:
+            if bot_uuid is None:
+                self._generation += 1
+                self._versions.clear()
+                self._entries.clear()
+            else:
+                now = time.monotonic()
+                self._counter += 1
+                self._versions[bot_uuid] = (self._counter, now)
+                self._versions.move_to_end(bot_uuid)
+                # 递增前缓存的项都已超过 ttl，版本号可以丢掉（之后按 0 处理，计数器保证不会重复）
+                while self._versions:
+                    oldest, (_, bumped_at) = next(iter(self._versions.items()))
+                    if now - bumped_at < self.ttl:
+                        break
+                    del self._versions[oldest]
+
+    def clear(self) -> None:
+        self.invalidate()
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+
+permission_engine = PermissionEngine(settings.PERMISSION_CACHE_SIZE, settings.PERMISSION_CACHE_TTL)
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _collect_changed_bots(session: Session, flush_context) -> None:
+    """记下本事务中授权或所有者发生变化的机器人，提交后再失效（回滚则丢弃）"""
+    changed = set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, BotAccessGrant):
+            changed.add(obj.bot_id)
+        elif isinstance(obj, Bot) and (obj in session.deleted or inspect(obj).attrs.owner_id.history.has_changes()):
+            changed.add(obj.id)
+    if changed:
+        _record_changed_bots(session, changed)
+
+
+@event.listens_for(SessionLocal, "do_orm_execute")
+def _collect_bulk_changes(orm_execute_state) -> None:
+    """批量 update()/delete() 授权不经过 after_flush：按同样的条件先查出涉及的机器人"""
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None or mapper.class_ is not BotAccessGrant:
+        return
+    query = select(BotAccessGrant.bot_id).distinct()
+    if orm_execute_state.statement.whereclause is not None:
+        query = query.where(orm_execute_state.statement.whereclause)
+    changed = set(orm_execute_state.session.execute(query).scalars())
+    if changed:
+        _record_changed_bots(orm_execute_state.session, changed)
+
+
+def _record_changed_bots(session: Session, changed: Set[UUID]) -> None:
+    session.info.setdefault("permission_bots", set()).update(changed)
+    connection = session.connection()
+    if connection.dialect.name == "postgresql":
+        for bot_uuid in changed:
+            connection.execute(
+                text("SELECT pg_notify(:channel, :payload)"),
+                {"channel": NOTIFY_CHANNEL, "payload": str(bot_uuid)},
+            )
+
+
+permission_channel = Channel("permissions")
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _invalidate_changed_bots(session: Session) -> None:
+    changed = session.info.pop("permission_bots", ())
+    for bot_uuid in changed:
+        permission_engine.invalidate(bot_uuid)
+    if changed and engine.dialect.name != "postgresql":
+        # PostgreSQL 上由 pg_notify 通知其他进程
+        permission_channel.publish([str(bot_uuid) for bot_uuid in changed])
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_changed_bots(session: Session) -> None:
+    session.info.pop("permission_bots", None)
+
+
+class PermissionChangeListener:
+    """
+    在独立连接上 LISTEN 授权变化，收到通知时失效本进程缓存
+
+    不是 PostgreSQL 时改为读取共享状态的广播通道（local 后端上什么也不做）。
+    """
+
+    def __init__(self, engine, permission_engine: PermissionEngine, channel: Optional[Channel] = None):
+        self.engine = engine
+        self.permission_engine = permission_engine
+        self.channel = channel or permission_channel
+        self._connection = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.engine.dialect.name == "postgresql"
+
+    def poll(self) -> int:
+        """读取已到达的通知，返回失效的机器人数"""
+        if not self.enabled:
+            return self._poll_channel()
+        try:
+            if self._connection is None:
+                self._connect()
+            self._connection.poll()
+            notifies = self._connection.notifies
+            count = 0
+            while notifies:
+                payload = notifies.pop(0).payload
+                try:
+                    self.permission_engine.invalidate(UUID(payload))
+                    count += 1
+                except ValueError:
+                    logger.warning("Ignoring malformed permission notification %r", payload)
+            return count
+        except Exception:
+            logger.exception("Permission change listener lost its connection")
+            self.close()
+            raise
+
+    def _poll_channel(self) -> int:
+        messages = self.channel.poll()
+        if messages is None:
+            # 落后太多，消息已过期
+            self.permission_engine.invalidate()
+            return 0
+        count = 0
+        for bot_uuids in messages:
+            for payload in bot_uuids:
+                self.permission_engine.invalidate(UUID(payload))
+                count += 1
+        return count
+
+    def _connect(self) -> None:
+        # 独立连接，不占用连接池
+        proxied = self.engine.raw_connection()
+        proxied.detach()
+        connection = proxied.driver_connection
+        connection.autocommit = True
+        cursor = connection.cursor()
+        cursor.execute(f"LISTEN {NOTIFY_CHANNEL}")
+        cursor.close()
+        self._connection = connection
+        # 没有监听的这段时间可能漏掉了通知
+        self.permission_engine.invalidate()
+
+    def close(self) -> None:
+        if self._connection is not None:
+            try:
+                self._connection.close()
+            except Exception:
+                pass
+            self._connection = None
+
+    async def aclose(self) -> None:
+        self.close()
+
+
+permission_listener = PermissionChangeListener(engine, permission_engine)
+
+register_worker(
+    "permission-change-listener",
+    permission_listener.poll,
+    settings.PERMISSION_NOTIFY_POLL_INTERVAL,
+    run_on_start=True,
+    on_stop=permission_listener.aclose,
+)
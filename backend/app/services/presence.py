@@ -0,0 +1,97 @@
+"""
+机器人在线状态
+心跳更新本进程的路由索引（routing.bot_index）。使用共享状态后端（STATE_BACKEND 不是 local）时，
+同时把负载快照写入共享的字段表，每个 worker 每 STATE_SYNC_INTERVAL 秒把它同步到自己的索引：
+心跳落在哪个 worker 上，所有 worker 都能把任务路由给这个机器人。
+"""
+
+import json
+import logging
+import time
+from typing import Optional
+from uuid import UUID
+
+from app.config import settings
+from app.core.background import register_worker
+from app.core.state import get_state
+from app.services.routing import bot_index
+
+logger = logging.getLogger(__name__)
+
+NAMESPACE = "presence"
+
+
+def record_heartbeat(
+    bot_uuid: UUID,
+    status: str,
+    capabilities,
+    current_load: Optional[float] = None,
+    active_tasks: Optional[int] = None,
+) -> None:
+    """心跳时调用；共享状态不可用时只更新本进程索引，不影响心跳本身"""
+    bot_index.update(bot_uuid, status, capabilities, current_load, active_tasks)
+    state = get_state()
+    if not state.shared:
+        return
+    entry = bot_index.get(bot_uuid)
+    try:
+        if entry is None:
+            state.delete_field(NAMESPACE, str(bot_uuid))
+            return
+        state.put_field(
+            NAMESPACE,
+            str(bot_uuid),
+            json.dumps({
+                "capabilities": sorted(entry.capabilities),
+                "current_load": entry.current_load,
+                "active_tasks": entry.active_tasks,
+                "seen_at": time.time(),
+            }),
+            settings.ROUTING_BOT_TTL,
+        )
+    except Exception:
+        logger.exception("Failed to share presence of bot %s", bot_uuid)
+
+
+def remove_bot(bot_uuid: UUID) -> None:
+    bot_index.remove(bot_uuid)
+    state = get_state()
+    if not state.shared:
+        return
+    try:
+        state.delete_field(NAMESPACE, str(bot_uuid))
+    except Exception:
+        logger.exception("Failed to remove shared presence of bot %s", bot_uuid)
+
+
+def sync_presence() -> int:
+    """用共享状态替换本进程索引中的在线机器人，返回在线数量"""
+    state = get_state()
+    if not state.shared:
+        return len(bot_index)
+    snapshot = state.fields(NAMESPACE)
+    # 共享状态中的时间是墙上时钟，换算成索引使用的 monotonic 时刻
+    offset = time.monotonic() - time.time()
+    online = set()
+    for field, value in snapshot.items():
+        try:
+            bot_uuid = UUID(field)
+            data = json.loads(value)
+        except ValueError:
+            continue
+        online.add(bot_uuid)
+        bot_index.update(
+            bot_uuid,
+            "online",
+            data["capabilities"],
+            data["current_load"],
+            data["active_tasks"],
+            seen_at=data["seen_at"] + offset,
+        )
+    for bot_uuid in bot_index.bot_uuids():
+        if bot_uuid not in online:
+            bot_index.remove(bot_uuid)
+    return len(online)
+
+
+register_worker("presence-sync", sync_presence, settings.STATE_SYNC_INTERVAL, run_on_start=True)
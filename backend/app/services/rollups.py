@@ -0,0 +1,228 @@
+"""
+活动日志汇总服务
+写入活动日志时在进程内先按 (机器人, 小时/天) 预聚合，再用 upsert 累加到汇总表；
+后台补算任务按原始日志重算最近已结束的小时，兜住绕过缓冲区写入的迟到事件。
+补算先锁住已有的汇总行，再按差值累加，不会覆盖并发写入的增量。
+"""
+
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import and_, delete, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.core.background import register_worker
+from app.database import SessionLocal
+from app.models.activity import BotActivity, BotActivityRollup
+from app.models.bot import Bot
+
+GRANULARITIES = ("hour", "day")
+
+RollupKey = Tuple[UUID, str, datetime]
+
+
+def bucket_start(ts: datetime, granularity: str) -> datetime:
+    if granularity == "hour":
+        return ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def aggregate(rows: Iterable[dict]) -> Dict[RollupKey, List[int]]:
+    """把一批原始事件聚合为 {(bot_id, 粒度, 时间桶): [次数, tokens]}"""
+    deltas: Dict[RollupKey, List[int]] = defaultdict(lambda: [0, 0])
+    for row in rows:
+        for granularity in GRANULARITIES:
+            delta = deltas[(row["bot_id"], granularity, bucket_start(row["created_at"], granularity))]
+            delta[0] += 1
+            delta[1] += row["tokens_used"] or 0
+    return deltas
+
+
+def _insert(db: Session):
+    if db.get_bind().dialect.name == "postgresql":
+        return pg_insert(BotActivityRollup)
+    return sqlite_insert(BotActivityRollup)
+
+
+def _key_order(key: RollupKey):
+    return str(key[0]), key[1], key[2]
+
+
+def upsert_rollups(db: Session, deltas: Dict[RollupKey, List[int]], insert_only: bool = False) -> None:
+    """
+    写入汇总（不提交）
+
+    默认把增量累加到已有行上；insert_only=True 时只插入不存在的行，已有的行不动（用于补算）。
+    按主键排序写入，多个进程同时 upsert 时不会互相死锁。
+    """
+    if not deltas:
+        return
+    table = BotActivityRollup.__table__
+    stmt = _insert(db)
+    index_elements = ["bot_id", "granularity", "bucket_start"]
+    if insert_only:
+        stmt = stmt.on_conflict_do_nothing(index_elements=index_elements)
+    else:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=index_elements,
+            set_={
+                "activity_count": table.c.activity_count + stmt.excluded.activity_count,
+                "tokens_used": table.c.tokens_used + stmt.excluded.tokens_used,
+            },
+        )
+    keys = sorted(deltas, key=_key_order)
+    db.execute(stmt, [
+        {
+            "bot_id": bot_id,
+            "granularity": granularity,
+            "bucket_start": bucket,
+            "activity_count": deltas[(bot_id, granularity, bucket)][0],
+            "tokens_used": deltas[(bot_id, granularity, bucket)][1],
+        }
+        for bot_id, granularity, bucket in keys
+    ])
+
+
+def apply_batch(db: Session, rows: List[dict]) -> None:
+    """随原始日志在同一事务中更新汇总，提交后汇总与原始数据一致"""
+    upsert_rollups(db, aggregate(rows))
+
+
+def _hour_bucket_expr(db: Session):
+    if db.get_bind().dialect.name == "postgresql":
+        return func.date_trunc("hour", BotActivity.created_at)
+    return func.strftime("%Y-%m-%d %H:00:00", BotActivity.created_at)
+
+
+def reconcile(db: Session, start: datetime, end: datetime) -> int:
+    """
+    按原始日志重算 [start, end) 内的小时汇总，并据此重算覆盖到的天汇总
+
+    先按 upsert 的顺序 SELECT ... FOR UPDATE 锁住涉及的汇总行：并发的写入要么已经提交
+    （原始日志和汇总都能读到），要么等本事务提交后再在结果上累加。已有的行按差值累加，
+    不存在的行只插入不覆盖，被并发写入抢先创建的行留给下一轮补算。
+    start/end 必须按小时对齐；返回重算的小时桶数量。
+    """
+    day_start = bucket_start(start, "day")
+    day_end = bucket_start(end - timedelta(microseconds=1), "day") + timedelta(days=1)
+    locked: Dict[RollupKey, List[int]] = {
+        (bot_id, granularity, bucket): [count, tokens]
+        for bot_id, granularity, bucket, count, tokens in db.execute(
+            select(
+                BotActivityRollup.bot_id,
+                BotActivityRollup.granularity,
+                BotActivityRollup.bucket_start,
+                BotActivityRollup.activity_count,
+                BotActivityRollup.tokens_used,
+            )
+            .where(BotActivityRollup.bucket_start >= day_start, BotActivityRollup.bucket_start < day_end)
+            .order_by(BotActivityRollup.bot_id, BotActivityRollup.granularity, BotActivityRollup.bucket_start)
+            .with_for_update()
+        )
+    }
+
+    bucket = _hour_bucket_expr(db).label("bucket")
+    result = db.execute(
+        select(
+            BotActivity.bot_id,
+            bucket,
+            func.count(),
+            func.coalesce(func.sum(BotActivity.tokens_used), 0),
+        )
+        .where(BotActivity.created_at >= start, BotActivity.created_at < end)
+        .group_by(BotActivity.bot_id, bucket)
+    ).all()
+
+    hours: Dict[RollupKey, List[int]] = {}
+    for bot_id, hour, count, tokens in result:
+        if isinstance(hour, str):
+            hour = datetime.fromisoformat(hour)
+        hours[(bot_id, "hour", hour)] = [count, tokens]
+    for key in locked:
+        # 原始日志已经没有的小时清零
+        if key[1] == "hour" and start <= key[2] < end:
+            hours.setdefault(key, [0, 0])
+
+    # 天汇总 = 当天所有小时汇总之和：范围内的小时取重算值，范围外的取锁住的现值
+    days: Dict[RollupKey, List[int]] = {key: [0, 0] for key in locked if key[1] == "day"}
+    out_of_range = [(key, value) for key, value in locked.items() if key[1] == "hour" and key not in hours]
+    for (bot_id, _, hour), (count, tokens) in [*hours.items(), *out_of_range]:
+        total = days.setdefault((bot_id, "day", bucket_start(hour, "day")), [0, 0])
+        total[0] += count
+        total[1] += tokens
+
+    deltas: Dict[RollupKey, List[int]] = {}
+    fresh: Dict[RollupKey, List[int]] = {}
+    for key, (count, tokens) in [*hours.items(), *days.items()]:
+        current = locked.get(key)
+        if current is None:
+            if count or tokens:
+                fresh[key] = [count, tokens]
+        elif current != [count, tokens]:
+            deltas[key] = [count - current[0], tokens - current[1]]
+    upsert_rollups(db, fresh, insert_only=True)
+    upsert_rollups(db, deltas)
+
+    # 清零的行已被本事务锁住，直接删除
+    db.execute(delete(BotActivityRollup).where(
+        BotActivityRollup.bucket_start >= day_start,
+        BotActivityRollup.bucket_start < day_end,
+        BotActivityRollup.activity_count == 0,
+        BotActivityRollup.tokens_used == 0,
+    ))
+    return len(hours)
+
+
+def catch_up() -> None:
+    """补算最近 ROLLUP_CATCHUP_HOURS 个已结束的小时"""
+    end = bucket_start(datetime.utcnow(), "hour")
+    start = end - timedelta(hours=settings.ROLLUP_CATCHUP_HOURS)
+    db = SessionLocal()
+    try:
+        reconcile(db, start, end)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+register_worker("activity-rollup-catchup", catch_up, settings.ROLLUP_CATCHUP_INTERVAL)
+
+
+# ========== 查询 ==========
+
+def query_series(
+    db: Session,
+    granularity: str,
+    start: datetime,
+    end: datetime,
+    bot_uuid: Optional[UUID] = None,
+    owner_id: Optional[UUID] = None,
+) -> List[Tuple[datetime, int, int]]:
+    """按时间桶返回 (bucket_start, 次数, tokens)，只读汇总表"""
+    query = (
+        select(
+            BotActivityRollup.bucket_start,
+            func.sum(BotActivityRollup.activity_count),
+            func.sum(BotActivityRollup.tokens_used),
+        )
+        .where(
+            BotActivityRollup.granularity == granularity,
+            BotActivityRollup.bucket_start >= bucket_start(start, granularity),
+            BotActivityRollup.bucket_start < end,
+        )
+        .group_by(BotActivityRollup.bucket_start)
+        .order_by(BotActivityRollup.bucket_start)
+    )
+    if bot_uuid is not None:
+        query = query.where(BotActivityRollup.bot_id == bot_uuid)
+    if owner_id is not None:
+        query = query.join(Bot, and_(Bot.id == BotActivityRollup.bot_id, Bot.owner_id == owner_id))
+    return [(bucket, int(count), int(tokens)) for bucket, count, tokens in db.execute(query)]
@@ -0,0 +1,262 @@
+"""
+任务路由服务
+心跳把在线机器人的负载写入进程内索引，提交任务时从索引中按策略挑选机器人，
+不需要每个任务都扫描 bots 表。索引只是提示：路由到的机器人迟迟不领取时，
+任务会开放给其他能力满足的机器人（见 tasks.lease_tasks）。
+"""
+
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Set
+from uuid import UUID
+
+from app.config import settings
+from app.core.background import register_worker
+
+
+def bot_capabilities(capabilities) -> Set[str]:
+    """机器人能力集合：capabilities 可以是 {"名称": true/配置} 或 ["名称", ...]"""
+    if isinstance(capabilities, dict):
+        return {name for name, value in capabilities.items() if value not in (False, None)}
+    if isinstance(capabilities, (list, tuple, set)):
+        return {str(name) for name in capabilities}
+    return set()
+
+
+class BotLoad:
+    """索引中一个在线机器人的负载快照"""
+
+    __slots__ = ("bot_uuid", "capabilities", "current_load", "active_tasks", "seen_at")
+
+    def __init__(self, bot_uuid: UUID, capabilities: Set[str], current_load: float, active_tasks: int, seen_at: float):
+        self.bot_uuid = bot_uuid
+        self.capabilities = capabilities
+        self.current_load = current_load
+        self.active_tasks = active_tasks
+        self.seen_at = seen_at
+
+    @property
+    def score(self) -> float:
+        """负载分，越小越空闲：上报的负载 + 每个进行中的任务折算的负载"""
+        return self.current_load + self.active_tasks * settings.ROUTING_TASK_LOAD_WEIGHT
+
+
+class BotIndex:
+    """
+    在线机器人负载索引
+
+    bot -> 负载快照，外加 能力 -> 机器人集合 的倒排表，按能力筛选时只需做集合交集。
+    超过 ttl 秒没有心跳的机器人视为离线，查询时跳过、定期清理。
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._bots: Dict[UUID, BotLoad] = {}
+        self._by_capability: Dict[str, Set[UUID]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._bots)
+
+    def update(
+        self,
+        bot_uuid: UUID,
+        status: str,
+        capabilities,
+        current_load: Optional[float] = None,
+        active_tasks: Optional[int] = None,
+        seen_at: Optional[float] = None,
+    ) -> None:
+        """心跳时调用；只有 online 的机器人留在索引中。seen_at 为 time.monotonic() 时刻，默认当前"""
+        if status != "online":
+            self.remove(bot_uuid)
+            return
+        caps = bot_capabilities(capabilities)
+        now = time.monotonic() if seen_at is None else seen_at
+        with self._lock:
+            entry = self._bots.get(bot_uuid)
+            if entry is None:
+                entry = BotLoad(bot_uuid, set(), 0.0, 0, now)
+                self._bots[bot_uuid] = entry
+            self._reindex(entry, caps)
+            if current_load is not None:
+                entry.current_load = current_load
+            if active_tasks is not None:
+                entry.active_tasks = active_tasks
+            entry.seen_at = now
+
+    def get(self, bot_uuid: UUID) -> Optional[BotLoad]:
+        with self._lock:
+            return self._bots.get(bot_uuid)
+
+    def bot_uuids(self) -> List[UUID]:
+        with self._lock:
+            return list(self._bots)
+
+    def remove(self, bot_uuid: UUID) -> None:
+        with self._lock:
+            entry = self._bots.pop(bot_uuid, None)
+            if entry is not None:
+                self._reindex(entry, set())
+
+    def note_assigned(self, bot_uuid: UUID, count: int = 1) -> None:
+        """两次心跳之间把任务计入负载，避免突发的任务全部路由到同一个机器人"""
+        with self._lock:
+            entry = self._bots.get(bot_uuid)
+            if entry is not None:
+                entry.active_tasks += count
+
+    def candidates(self, required: Iterable[str] = ()) -> List[BotLoad]:
+        """能力满足且未过期的机器人"""
+        required = set(required)
+        deadline = time.monotonic() - self.ttl
+        with self._lock:
+            if required:
+                sets = sorted((self._by_capability.get(name, set()) for name in required), key=len)
+                bot_uuids = set.intersection(*sets) if sets[0] else set()
+                entries = [self._bots[bot_uuid] for bot_uuid in bot_uuids]
+            else:
+                entries = list(self._bots.values())
+        return [entry for entry in entries if entry.seen_at >= deadline]
+
+    def prune(self) -> int:
+        """清理过期的机器人，返回清理数量"""
+        deadline = time.monotonic() - self.ttl
+        with self._lock:
+            expired = [entry for entry in self._bots.values() if entry.seen_at < deadline]
+            for entry in expired:
+                del self._bots[entry.bot_uuid]
+                self._reindex(entry, set())
+        return len(expired)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._bots.clear()
+            self._by_capability.clear()
+
+    def _reindex(self, entry: BotLoad, capabilities: Set[str]) -> None:
+        # 调用方持有锁
+        for name in entry.capabilities - capabilities:
+            members = self._by_capability.get(name)
+            if members is not None:
+                members.discard(entry.bot_uuid)
+                if not members:
+                    del self._by_capability[name]
+        for name in capabilities - entry.capabilities:
+            self._by_capability.setdefault(name, set()).add(entry.bot_uuid)
+        entry.capabilities = capabilities
+
+
+# ========== 路由策略 ==========
+
+class RoutingPolicy(ABC):
+    """从候选机器人中选一个；候选列表非空"""
+
+    name = ""
+
+    @abstractmethod
+    def choose(self, candidates: List[BotLoad], requester_id: Optional[UUID] = None) -> BotLoad:
+        """选出接收任务的机器人"""
+
+
+class LeastLoadedPolicy(RoutingPolicy):
+    """选负载分最小的机器人，O(n)"""
+
+    name = "least_loaded"
+
+    def choose(self, candidates, requester_id=None):
+        return min(candidates, key=lambda entry: entry.score)
+
+
+class PowerOfTwoPolicy(RoutingPolicy):
+    """
+    随机取两个选较空闲的一个
+
+    负载信息有延迟时比严格最小负载更不容易让所有任务扎堆到同一个机器人。
+    """
+
+    name = "power_of_two"
+
+    def __init__(self, rng: Optional[random.Random] = None):
+        self._rng = rng or random.Random()
+
+    def choose(self, candidates, requester_id=None):
+        if len(candidates) <= 2:
+            return min(candidates, key=lambda entry: entry.score)
+        a, b = self._rng.sample(candidates, 2)
+        return a if a.score <= b.score else b
+
+
+class StickyPolicy(RoutingPolicy):
+    """
+    同一提交者的任务尽量发给上次的机器人（利用机器人侧的上下文缓存）
+
+    上次的机器人不可用或负载分超过 max_score 时退回最小负载，并记住新的选择。
+    """
+
+    name = "sticky"
+
+    def __init__(self, max_score: float = 1.0, max_entries: int = 10000):
+        self.max_score = max_score
+        self.max_entries = max_entries
+        self._fallback = LeastLoadedPolicy()
+        self._last: "OrderedDict[UUID, UUID]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def choose(self, candidates, requester_id=None):
+        if requester_id is None:
+            return self._fallback.choose(candidates)
+        with self._lock:
+            last = self._last.get(requester_id)
+            chosen = None
+            if last is not None:
+                chosen = next(
+                    (entry for entry in candidates if entry.bot_uuid == last and entry.score < self.max_score),
+                    None
+                )
+            if chosen is None:
+                chosen = self._fallback.choose(candidates)
+            self._last[requester_id] = chosen.bot_uuid
+            self._last.move_to_end(requester_id)
+            while len(self._last) > self.max_entries:
+                self._last.popitem(last=False)
+            return chosen
+
+
+POLICIES = {
+    LeastLoadedPolicy.name: LeastLoadedPolicy,
+    PowerOfTwoPolicy.name: PowerOfTwoPolicy,
+    StickyPolicy.name: StickyPolicy,
+}
+
+
+def get_policy(name: str) -> RoutingPolicy:
+    try:
+        return POLICIES[name]()
+    except KeyError:
+        raise ValueError(f"Unknown routing policy '{name}', expected one of {sorted(POLICIES)}")
+
+
+class TaskRouter:
+    """按策略为任务挑选机器人"""
+
+    def __init__(self, index: BotIndex, policy: RoutingPolicy):
+        self.index = index
+        self.policy = policy
+
+    def route(self, required_capabilities: Iterable[str] = (), requester_id: Optional[UUID] = None) -> Optional[UUID]:
+        """返回选中的机器人 id；索引中没有合适的机器人时返回 None（任务由任一能力满足的机器人领取）"""
+        candidates = self.index.candidates(required_capabilities)
+        if not candidates:
+            return None
+        chosen = self.policy.choose(candidates, requester_id)
+        self.index.note_assigned(chosen.bot_uuid)
+        return chosen.bot_uuid
+
+
+bot_index = BotIndex(ttl=settings.ROUTING_BOT_TTL)
+task_router = TaskRouter(bot_index, get_policy(settings.ROUTING_POLICY))
+register_worker("routing-index-prune", bot_index.prune, settings.ROUTING_BOT_TTL)
@@ -0,0 +1,207 @@
+"""
+技能市场服务
+发布技能、记录下载和评分。
+
+热门技能的下载/评分如果逐次 UPDATE skills，会在同一行上排队等行锁。
+这里先在进程内累加，后台定期按技能合并为一条
+UPDATE skills SET downloads = downloads + n ...，评分保存为总和与次数，
+平均分在同一条 UPDATE 中由总和算出，不需要重新统计。落盘后计数是精确的。
+"""
+
+import secrets
+import threading
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import bindparam, case, cast, Numeric, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.core.background import register_worker
+from app.database import SessionLocal
+from app.models.bot import Bot
+from app.models.skill import Skill, SkillDailyStats
+from app.services.json_blobs import put_json
+from app.services.leaderboard import leaderboard
+
+# 计数：[下载次数, 评分总和, 评分次数]
+Counts = List[int]
+
+
+def generate_skill_id() -> str:
+    return f"skill_{secrets.token_hex(8)}"
+
+
+def _insert(db: Session):
+    if db.get_bind().dialect.name == "postgresql":
+        return pg_insert(SkillDailyStats)
+    return sqlite_insert(SkillDailyStats)
+
+
+class SkillCounters:
+    """进程内缓冲的技能计数，按 (技能, 天) 合并"""
+
+    def __init__(self):
+        self._pending: Dict[Tuple[UUID, date], Counts] = defaultdict(lambda: [0, 0, 0])
+        self._lock = threading.Lock()
+
+    def add(self, skill: UUID, day: date, downloads: int = 0, rating_sum: int = 0, rating_count: int = 0) -> None:
+        with self._lock:
+            counts = self._pending[(skill, day)]
+            counts[0] += downloads
+            counts[1] += rating_sum
+            counts[2] += rating_count
+
+    def pending(self, skill: UUID) -> Counts:
+        """尚未落盘的计数，用于在响应中叠加到数据库值上"""
+        total = [0, 0, 0]
+        with self._lock:
+            for (pending_skill, _), counts in self._pending.items():
+                if pending_skill == skill:
+                    for i, value in enumerate(counts):
+                        total[i] += value
+        return total
+
+    def clear(self) -> None:
+        with self._lock:
+            self._pending.clear()
+
+    def flush(self, db: Session) -> int:
+        """把缓冲的计数写入数据库，返回更新的技能数；失败时计数放回缓冲区"""
+        with self._lock:
+            batch = dict(self._pending)
+            self._pending.clear()
+        if not batch:
+            return 0
+        try:
+            per_skill: Dict[UUID, Counts] = defaultdict(lambda: [0, 0, 0])
+            for (skill, _), counts in batch.items():
+                for i, value in enumerate(counts):
+                    per_skill[skill][i] += value
+            self._update_skills(db, per_skill)
+            self._upsert_daily(db, batch)
+            db.commit()
+        except Exception:
+            db.rollback()
+            with self._lock:
+                for key, counts in batch.items():
+                    pending = self._pending[key]
+                    for i, value in enumerate(counts):
+                        pending[i] += value
+            raise
+        return len(per_skill)
+
+    @staticmethod
+    def _update_skills(db: Session, per_skill: Dict[UUID, Counts]) -> None:
+        # 按主键顺序更新，多个进程同时落盘时不会死锁
+        rating_sum = Skill.rating_sum + bindparam("d_rating_sum")
+        rating_count = Skill.rating_count + bindparam("d_rating_count")
+        stmt = (
+            update(Skill.__table__)
+            .where(Skill.id == bindparam("skill"))
+            .values(
+                downloads=Skill.downloads + bindparam("d_downloads"),
+                rating_sum=rating_sum,
+                rating_count=rating_count,
+                rating=case(
+                    (rating_count > 0, cast(rating_sum, Numeric(12, 4)) / rating_count),
+                    else_=0,
+                ),
+                updated_at=Skill.updated_at,  # 计数变化不算技能更新
+            )
+        )
+        db.execute(stmt, [
+            {
+                "skill": skill,
+                "d_downloads": per_skill[skill][0],
+                "d_rating_sum": per_skill[skill][1],
+                "d_rating_count": per_skill[skill][2],
+            }
+            for skill in sorted(per_skill, key=str)
+        ])
+
+    @staticmethod
+    def _upsert_daily(db: Session, batch: Dict[Tuple[UUID, date], Counts]) -> None:
+        table = SkillDailyStats.__table__
+        stmt = _insert(db)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["skill_id", "day"],
+            set_={
+                "downloads": table.c.downloads + stmt.excluded.downloads,
+                "rating_sum": table.c.rating_sum + stmt.excluded.rating_sum,
+                "rating_count": table.c.rating_count + stmt.excluded.rating_count,
+            },
+        )
+        db.execute(stmt, [
+            {
+                "skill_id": skill,
+                "day": day,
+                "downloads": counts[0],
+                "rating_sum": counts[1],
+                "rating_count": counts[2],
+            }
+            for (skill, day), counts in sorted(batch.items(), key=lambda item: (str(item[0][0]), item[0][1]))
+        ])
+
+
+skill_counters = SkillCounters()
+
+
+def create_skill(db: Session, author: Optional[Bot], content: Optional[dict] = None, **fields) -> Skill:
+    skill = Skill(skill_id=generate_skill_id(), author_bot_id=author.id if author else None, **fields)
+    if content is not None:
+        skill.content_hash = put_json(db, content)
+    db.add(skill)
+    db.commit()
+    db.refresh(skill)
+    leaderboard.add_skill(skill.id, skill.skill_id, skill.name, author.bot_name if author else None)
+    return skill
+
+
+def ensure_leaderboard(db: Session) -> None:
+    """首次使用排行榜时加载；先落盘本进程缓冲的计数，加载结果才完整"""
+    if not leaderboard.loaded:
+        skill_counters.flush(db)
+        leaderboard.ensure_loaded(db)
+
+
+def record_download(skill: Skill) -> None:
+    """下载次数 +1（缓冲）"""
+    today = datetime.utcnow().date()
+    skill_counters.add(skill.id, today, downloads=1)
+    leaderboard.record(skill.id, downloads=1, day=today)
+
+
+def rate_skill(skill: Skill, rating: int) -> None:
+    """新增一个评分（缓冲）"""
+    today = datetime.utcnow().date()
+    skill_counters.add(skill.id, today, rating_sum=rating, rating_count=1)
+    leaderboard.record(skill.id, rating_sum=rating, rating_count=1, day=today)
+
+
+def flush_skill_counters() -> None:
+    db = SessionLocal()
+    try:
+        skill_counters.flush(db)
+    finally:
+        db.close()
+
+
+def refresh_leaderboard() -> None:
+    """定期从数据库重建排行榜，合并其他进程的写入"""
+    db = SessionLocal()
+    try:
+        skill_counters.flush(db)
+        leaderboard.load(db)
+    finally:
+        db.close()
+
+
+register_worker(
+    "skill-counter-flush", flush_skill_counters, settings.SKILL_COUNTER_FLUSH_INTERVAL, run_on_shutdown=True
+)
+register_worker("skill-leaderboard-refresh", refresh_leaderboard, settings.LEADERBOARD_REFRESH_INTERVAL)
@@ -0,0 +1,222 @@
+"""
+机器人状态历史与在线率
+心跳只保存状态变化：同一状态内的心跳把当前游程的 last_seen_at 往后推，状态变化时结束当前游程、
+开始新的一段。一次心跳证明之后 STATUS_HISTORY_MAX_GAP 秒内的状态，间隔更久时先在
+last_seen_at + STATUS_HISTORY_MAX_GAP 处结束当前游程，中间的时间记为无数据。
+
+在线率在数据库中按区间算术一次聚合：每段游程裁剪到查询窗口后按状态求和，
+不把游程逐行取回 Python。
+"""
+
+from datetime import datetime, timedelta
+from enum import Enum
+from typing import Dict, List, Optional
+from uuid import UUID
+
+from sqlalchemy import and_, delete, func, insert, literal, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.core.background import register_worker
+from app.database import SessionLocal
+from app.models.bot import Bot
+from app.models.status_history import BotStatusRun
+
+# 计入在线时间的状态
+UP_STATUSES = ("online", "busy")
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def _status_value(status) -> Optional[str]:
+    return status.value if isinstance(status, Enum) else status
+
+
+def record_status(db: Session, bot: Bot, status: str, now: datetime) -> None:
+    """
+    心跳时调用（不提交），必须在更新 bot.status / last_heartbeat_at 之前
+
+    上一次心跳的状态和时间直接取自 bot 行，稳定状态下只有一条 UPDATE。
+    """
+    gap = timedelta(seconds=settings.STATUS_HISTORY_MAX_GAP)
+    previous = _status_value(bot.status)
+    last_seen = bot.last_heartbeat_at
+    open_run = and_(BotStatusRun.bot_id == bot.id, BotStatusRun.ended_at.is_(None))
+
+    if last_seen is not None and now - last_seen <= gap:
+        if previous == status:
+            extended = db.execute(update(BotStatusRun).where(open_run).values(last_seen_at=now))
+            if extended.rowcount:
+                return
+        else:
+            db.execute(update(BotStatusRun).where(open_run).values(ended_at=now))
+    elif last_seen is not None:
+        # 心跳中断过：当前游程只延续到最后一次心跳之后 gap 秒
+        db.execute(update(BotStatusRun).where(open_run).values(ended_at=last_seen + gap))
+
+    db.execute(insert(BotStatusRun).values(
+        bot_id=bot.id, status=status, started_at=now, last_seen_at=now
+    ))
+
+
+# ========== 区间算术 ==========
+
+def _epoch(dialect: str, column):
+    """时间列换算为 Unix 秒（数据库中的时间都是 UTC）"""
+    if dialect == "postgresql":
+        return func.extract("epoch", column)
+    return (func.julianday(column) - 2440587.5) * 86400.0
+
+
+def _greatest(dialect: str, *args):
+    return func.greatest(*args) if dialect == "postgresql" else func.max(*args)
+
+
+def _least(dialect: str, *args):
+    return func.least(*args) if dialect == "postgresql" else func.min(*args)
+
+
+def _seconds(ts: datetime) -> float:
+    return (ts - EPOCH).total_seconds()
+
+
+def _run_end(dialect: str, now: datetime):
+    """游程的实际结束时间：已结束的取 ended_at，进行中的最多延续到最后一次心跳之后 gap 秒"""
+    return func.coalesce(
+        _epoch(dialect, BotStatusRun.ended_at),
+        _least(
+            dialect,
+            _epoch(dialect, BotStatusRun.last_seen_at) + settings.STATUS_HISTORY_MAX_GAP,
+            literal(_seconds(now)),
+        ),
+    )
+
+
+def _scope(query, bot_uuid: Optional[UUID], owner_id: Optional[UUID]):
+    if bot_uuid is not None:
+        query = query.where(Bot.id == bot_uuid)
+    if owner_id is not None:
+        query = query.where(Bot.owner_id == owner_id)
+    return query
+
+
+def uptime_report(
+    db: Session,
+    start: datetime,
+    end: datetime,
+    bot_uuid: Optional[UUID] = None,
+    owner_id: Optional[UUID] = None,
+    now: Optional[datetime] = None,
+) -> dict:
+    """
+    [start, end) 内各状态的机器人·秒，以及在线率
+
+    - window_seconds：每个机器人从创建（或 start）到 end 的时长之和
+    - unknown_seconds：窗口内没有任何状态数据的时长（心跳中断、从未上报）
+    - uptime：在线时长 / window_seconds，无数据计为不在线
+    - availability：在线时长 / 有数据的时长
+    """
+    dialect = db.get_bind().dialect.name
+    now = now or datetime.utcnow()
+    end = min(end, now)
+    window_start, window_end = literal(_seconds(start)), literal(_seconds(end))
+
+    clipped = _greatest(
+        dialect,
+        _least(dialect, _run_end(dialect, now), window_end)
+        - _greatest(dialect, _epoch(dialect, BotStatusRun.started_at), window_start),
+        literal(0.0),
+    )
+    runs = _scope(
+        select(BotStatusRun.status, func.sum(clipped))
+        .join(Bot, Bot.id == BotStatusRun.bot_id)
+        .where(
+            BotStatusRun.started_at < end,
+            or_(BotStatusRun.ended_at.is_(None), BotStatusRun.ended_at > start),
+        )
+        .group_by(BotStatusRun.status),
+        bot_uuid,
+        owner_id,
+    )
+    status_seconds: Dict[str, float] = {
+        status: float(seconds or 0) for status, seconds in db.execute(runs)
+    }
+
+    lifetime = _greatest(
+        dialect,
+        window_end - _greatest(dialect, _epoch(dialect, Bot.created_at), window_start),
+        literal(0.0),
+    )
+    bots, window_seconds = db.execute(
+        _scope(select(func.count(), func.sum(lifetime)).where(Bot.created_at < end), bot_uuid, owner_id)
+    ).one()
+    window_seconds = float(window_seconds or 0)
+
+    observed = sum(status_seconds.values())
+    up = sum(status_seconds.get(status, 0.0) for status in UP_STATUSES)
+    return {
+        "start": start,
+        "end": end,
+        "bots": bots,
+        "window_seconds": window_seconds,
+        "status_seconds": status_seconds,
+        "up_seconds": up,
+        "unknown_seconds": max(window_seconds - observed, 0.0),
+        "uptime": up / window_seconds if window_seconds else None,
+        "availability": up / observed if observed else None,
+    }
+
+
+def status_history(
+    db: Session,
+    bot_uuid: UUID,
+    start: datetime,
+    end: datetime,
+    limit: int,
+    now: Optional[datetime] = None,
+) -> List[dict]:
+    """与 [start, end) 相交的游程，按开始时间排序"""
+    now = now or datetime.utcnow()
+    gap = timedelta(seconds=settings.STATUS_HISTORY_MAX_GAP)
+    runs = db.execute(
+        select(BotStatusRun)
+        .where(
+            BotStatusRun.bot_id == bot_uuid,
+            BotStatusRun.started_at < end,
+            or_(BotStatusRun.ended_at.is_(None), BotStatusRun.ended_at > start),
+        )
+        .order_by(BotStatusRun.started_at)
+        .limit(limit)
+    ).scalars()
+    history = []
+    for run in runs:
+        ended_at = run.ended_at
+        if ended_at is None and now - run.last_seen_at > gap:
+            ended_at = run.last_seen_at + gap
+        if ended_at is not None and ended_at <= start:
+            continue
+        history.append({
+            "status": run.status,
+            "started_at": run.started_at,
+            "last_seen_at": run.last_seen_at,
+            "ended_at": ended_at,
+        })
+    return history
+
+
+def prune_history() -> int:
+    """删除 STATUS_HISTORY_RETENTION_DAYS 之前结束的游程"""
+    cutoff = datetime.utcnow() - timedelta(days=settings.STATUS_HISTORY_RETENTION_DAYS)
+    db = SessionLocal()
+    try:
+        result = db.execute(delete(BotStatusRun).where(BotStatusRun.ended_at < cutoff))
+        db.commit()
+        return result.rowcount
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+register_worker("status-history-prune", prune_history, settings.STATUS_HISTORY_PRUNE_INTERVAL)
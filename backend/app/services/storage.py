@@ -0,0 +1,162 @@
+"""
+本地 Blob 存储服务
+按内容哈希寻址，文件写入后不可变，可安全地长期缓存
+"""
+
+import hashlib
+import mimetypes
+import os
+import re
+import tempfile
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from app.config import settings
+
+# blob_id = <sha256 hex>[.<ext>]
+BLOB_ID_PATTERN = re.compile(r"^[0-9a-f]{64}(\.[a-z0-9]{1,8})?$")
+
+# 允许作为头像的位图格式及其文件头；SVG 等可以带脚本的格式不接受
+IMAGE_SIGNATURES = (
+    ("image/png", b"\x89PNG\r\n\x1a\n"),
+    ("image/jpeg", b"\xff\xd8\xff"),
+    ("image/gif", b"GIF87a"),
+    ("image/gif", b"GIF89a"),
+)
+IMAGE_TYPES = frozenset(["image/png", "image/jpeg", "image/gif", "image/webp"])
+
+
+def sniff_image(data: bytes) -> Optional[str]:
+    """按文件头识别位图格式，返回 content type，不是允许的格式时返回 None"""
+    for content_type, signature in IMAGE_SIGNATURES:
+        if data.startswith(signature):
+            return content_type
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+class HotBlobCache:
+    """
+    小文件热点缓存
+
+    只缓存不超过 max_item_bytes 的 blob（如 BotCard 上的头像缩略图），
+    同一 blob 被请求 min_hits 次后才放入缓存，避免一次性请求挤掉热点；
+    总大小超过 max_total_bytes 时按 LRU 淘汰。
+    """
+
+    def __init__(self, max_item_bytes: int, max_total_bytes: int, min_hits: int = 2):
+        self.max_item_bytes = max_item_bytes
+        self.max_total_bytes = max_total_bytes
+        self.min_hits = min_hits
+        self._items: "OrderedDict[str, bytes]" = OrderedDict()
+        self._hits: Dict[str, int] = {}
+        self._total_bytes = 0
+
+    def get(self, blob_id: str) -> Optional[bytes]:
+        data = self._items.get(blob_id)
+        if data is not None:
+            self._items.move_to_end(blob_id)
+        return data
+
+    def should_admit(self, blob_id: str, size: int) -> bool:
+        """记录一次未命中，返回是否应该把该 blob 读入缓存"""
+        if size > self.max_item_bytes:
+            return False
+        # 计数表只保留有限条目，防止被大量冷门 blob 撑大
+        if len(self._hits) >= 4096 and blob_id not in self._hits:
+            self._hits.clear()
+        hits = self._hits.get(blob_id, 0) + 1
+        self._hits[blob_id] = hits
+        return hits >= self.min_hits
+
+    def put(self, blob_id: str, data: bytes) -> None:
+        if len(data) > self.max_item_bytes or blob_id in self._items:
+            return
+        self._hits.pop(blob_id, None)
+        self._items[blob_id] = data
+        self._total_bytes += len(data)
+        while self._total_bytes > self.max_total_bytes and self._items:
+            _, evicted = self._items.popitem(last=False)
+            self._total_bytes -= len(evicted)
+
+    def clear(self) -> None:
+        self._items.clear()
+        self._hits.clear()
+        self._total_bytes = 0
+
+
+class LocalBlobStore:
+    """本地文件系统 Blob 存储"""
+
+    def __init__(self, root: str, hot_cache: Optional[HotBlobCache] = None):
+        self.root = Path(root) / "blobs"
+        self.hot_cache = hot_cache
+
+    def path_for(self, blob_id: str) -> Path:
+        """blob 的存储路径，按哈希前两位分目录"""
+        return self.root / blob_id[:2] / blob_id
+
+    def put(self, data: bytes, content_type: Optional[str] = None) -> str:
+        """
+        写入 blob，返回 blob_id
+
+        相同内容只会存一份；写入先落临时文件再原子改名，读者不会看到半截文件
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        ext = mimetypes.guess_extension(content_type or "") or ""
+        blob_id = f"{digest}{ext}"
+
+        path = self.path_for(blob_id)
+        if path.exists():
+            return blob_id
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return blob_id
+
+    def stat(self, blob_id: str) -> Optional[Tuple[Path, int]]:
+        """返回 (路径, 大小)，blob 不存在时返回 None"""
+        if not BLOB_ID_PATTERN.match(blob_id):
+            return None
+        path = self.path_for(blob_id)
+        try:
+            return path, path.stat().st_size
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def media_type(blob_id: str) -> str:
+        media_type, _ = mimetypes.guess_type(blob_id)
+        return media_type or "application/octet-stream"
+
+    @staticmethod
+    def etag(blob_id: str) -> str:
+        # 内容哈希本身就是强校验 ETag
+        return f'"{blob_id.split(".", 1)[0]}"'
+
+
+_blob_store: Optional[LocalBlobStore] = None
+
+
+def get_blob_store() -> LocalBlobStore:
+    """获取全局 Blob 存储实例"""
+    global _blob_store
+    if _blob_store is None:
+        hot_cache = None
+        if settings.BLOB_HOT_CACHE_ENABLED:
+            hot_cache = HotBlobCache(
+                max_item_bytes=settings.BLOB_HOT_CACHE_MAX_ITEM_BYTES,
+                max_total_bytes=settings.BLOB_HOT_CACHE_MAX_BYTES,
+            )
+        _blob_store = LocalBlobStore(settings.STORAGE_LOCAL_PATH, hot_cache=hot_cache)
+    return _blob_store
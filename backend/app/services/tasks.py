@@ -0,0 +1,260 @@
+"""
+任务分发服务
+机器人通过租约领取任务：PostgreSQL 上用 SELECT ... FOR UPDATE SKIP LOCKED，
+多个机器人同时领取互不阻塞，也不会领到同一个任务。
+租约过期未完成的任务由后台任务重新排队，重试次数耗尽后标记失败。
+"""
+
+import logging
+import secrets
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional, Set
+
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.core.background import register_worker
+from app.database import SessionLocal
+from app.models.bot import Bot
+from app.models.task import Task, TaskStatus, TaskPriority, PRIORITY_RANK
+from app.services.routing import bot_capabilities, task_router
+from app.services.webhooks import EVENT_TASK_ASSIGNED, enqueue_event
+
+logger = logging.getLogger(__name__)
+
+FINISHED_STATUSES = (TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELLED)
+
+# 按能力过滤时每次扫描的候选数（limit 的倍数），不够时继续扫描下一批
+LEASE_CANDIDATE_FACTOR = 4
+
+
+class TaskStateError(Exception):
+    """任务当前状态不允许该操作"""
+
+
+def generate_task_id() -> str:
+    return f"task_{secrets.token_hex(8)}"
+
+
+def can_run(required_capabilities: Optional[Iterable[str]], capabilities: Set[str]) -> bool:
+    return set(required_capabilities or ()).issubset(capabilities)
+
+
+def create_task(
+    db: Session,
+    title: str,
+    requester_id=None,
+    description: Optional[str] = None,
+    priority=None,
+    params: Optional[dict] = None,
+    required_capabilities: Iterable[str] = (),
+    target_bot: Optional[Bot] = None,
+    deadline: Optional[datetime] = None,
+    max_attempts: Optional[int] = None,
+) -> Task:
+    """创建待领取的任务；未指定机器人时由路由器按负载和能力挑选一个"""
+    assigned_bot_id = None
+    if target_bot is None:
+        assigned_bot_id = task_router.route(required_capabilities, requester_id)
+    task = Task(
+        task_id=generate_task_id(),
+        title=title,
+        description=description,
+        requester_id=requester_id,
+        target_bot_id=target_bot.id if target_bot else None,
+        assigned_bot_id=assigned_bot_id,
+        required_capabilities=list(required_capabilities),
+        params=params or {},
+        deadline=deadline,
+        max_attempts=max_attempts or settings.TASK_MAX_ATTEMPTS,
+    )
+    task.priority = priority or TaskPriority.NORMAL
+    task.priority_rank = PRIORITY_RANK[task.priority]
+    db.add(task)
+
+    # 推送给指定/路由到的机器人，机器人收到后可立即领取，不必等下一次心跳
+    bot = target_bot or (db.get(Bot, assigned_bot_id) if assigned_bot_id else None)
+    if bot is not None:
+        enqueue_event(db, bot, EVENT_TASK_ASSIGNED, {
+            "task_id": task.task_id,
+            "title": task.title,
+            "priority": task.priority.value,
+            "required_capabilities": task.required_capabilities,
+            "deadline": deadline.isoformat() if deadline else None,
+        })
+
+    db.commit()
+    db.refresh(task)
+    return task
+
+
+def lease_tasks(db: Session, bot: Bot, limit: int, now: Optional[datetime] = None) -> List[Task]:
+    """
+    为机器人领取最多 limit 个任务并提交
+
+    只领取能力满足、且指定给该机器人或路由给该机器人的任务；
+    路由到其他机器人但超过 ROUTING_HANDOFF_SECONDS 仍未被领取的任务也会放开。
+    按优先级从高到低、同优先级先到先得。
+
+    能力在 Python 中判断：先不加锁地按顺序分批扫描候选（只读 id 和所需能力），
+    只对能执行的任务加锁（SKIP LOCKED）并领取。队首堆积本机器人执行不了的任务时继续扫描下一批，
+    直到领够、扫完或扫描了 TASK_LEASE_MAX_SCAN 个候选，也不会锁住这些任务、挡住能执行它们的机器人；
+    上限保证每次心跳的开销有界，更靠后的任务留给能执行队首任务的机器人领走之后再领取。
+    """
+    if limit <= 0:
+        return []
+    now = now or datetime.utcnow()
+    handoff_before = now - timedelta(seconds=settings.ROUTING_HANDOFF_SECONDS)
+    eligible = (
+        Task.status == TaskStatus.PENDING,
+        or_(
+            Task.target_bot_id == bot.id,
+            and_(
+                Task.target_bot_id.is_(None),
+                or_(
+                    Task.assigned_bot_id.is_(None),
+                    Task.assigned_bot_id == bot.id,
+                    Task.created_at < handoff_before,
+                ),
+            ),
+        ),
+        or_(Task.deadline.is_(None), Task.deadline > now),
+    )
+    order = (Task.priority_rank.desc(), Task.created_at, Task.id)
+    window = limit * LEASE_CANDIDATE_FACTOR
+    capabilities = bot_capabilities(bot.capabilities)
+    leased: List[Task] = []
+    after = None
+    scanned = 0
+    while len(leased) < limit and scanned < settings.TASK_LEASE_MAX_SCAN:
+        query = select(Task.id, Task.required_capabilities, Task.priority_rank, Task.created_at).where(*eligible)
+        if after is not None:
+            # 键集分页：排在上一批最后一个候选之后
+            rank, created_at, task_id = after
+            query = query.where(or_(
+                Task.priority_rank < rank,
+                and_(Task.priority_rank == rank, Task.created_at > created_at),
+                and_(Task.priority_rank == rank, Task.created_at == created_at, Task.id > task_id),
+            ))
+        candidates = db.execute(query.order_by(*order).limit(window)).all()
+        scanned += len(candidates)
+        runnable = [
+            task_id for task_id, required, _, _ in candidates
+            if can_run(required, capabilities)
+        ]
+        if runnable:
+            # 扫描之后可能已被其他机器人领走，加锁时重新检查条件
+            tasks = db.execute(
+                select(Task)
+                .where(Task.id.in_(runnable), *eligible)
+                .order_by(*order)
+                .limit(limit - len(leased))
+                .with_for_update(skip_locked=True)
+            ).scalars().all()
+            for task in tasks:
+                task.status = TaskStatus.RUNNING
+                task.assigned_bot_id = bot.id
+                task.attempts += 1
+                task.started_at = now
+                task.lease_expires_at = now + timedelta(seconds=settings.TASK_LEASE_SECONDS)
+                leased.append(task)
+        if len(candidates) < window:
+            break
+        last = candidates[-1]
+        after = (last.priority_rank, last.created_at, last.id)
+    db.commit()
+    return leased
+
+
+def renew_leases(db: Session, bot: Bot, now: Optional[datetime] = None) -> int:
+    """续期机器人持有的所有租约（不提交），心跳即续约"""
+    now = now or datetime.utcnow()
+    result = db.execute(
+        update(Task)
+        .where(Task.assigned_bot_id == bot.id, Task.status == TaskStatus.RUNNING)
+        .values(lease_expires_at=now + timedelta(seconds=settings.TASK_LEASE_SECONDS))
+    )
+    return result.rowcount
+
+
+def complete_task(
+    db: Session,
+    task: Task,
+    bot: Bot,
+    success: bool,
+    result: Optional[dict] = None,
+    error: Optional[str] = None,
+) -> Task:
+    """上报任务结果，只有当前租约持有者可以上报"""
+    if task.status != TaskStatus.RUNNING or task.assigned_bot_id != bot.id:
+        raise TaskStateError("Task is not leased by this bot")
+    task.status = TaskStatus.COMPLETED if success else TaskStatus.FAILED
+    task.result = result
+    task.error = error
+    task.completed_at = datetime.utcnow()
+    task.lease_expires_at = None
+    db.commit()
+    db.refresh(task)
+    return task
+
+
+def cancel_task(db: Session, task: Task) -> Task:
+    if task.status in FINISHED_STATUSES:
+        raise TaskStateError(f"Task is already {task.status.value}")
+    task.status = TaskStatus.CANCELLED
+    task.completed_at = datetime.utcnow()
+    task.lease_expires_at = None
+    db.commit()
+    db.refresh(task)
+    return task
+
+
+def requeue_expired(db: Session, now: Optional[datetime] = None, batch_size: int = 500) -> int:
+    """
+    回收过期租约：重试次数未用完的重新排队，否则标记失败；
+    同时把超过截止时间仍未领取的任务标记失败。返回处理的任务数。
+    """
+    now = now or datetime.utcnow()
+    expired = db.execute(
+        select(Task)
+        .where(
+            or_(
+                and_(Task.status == TaskStatus.RUNNING, Task.lease_expires_at < now),
+                and_(Task.status == TaskStatus.PENDING, Task.deadline < now),
+            )
+        )
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    ).scalars().all()
+
+    for task in expired:
+        if task.status == TaskStatus.PENDING:
+            task.status = TaskStatus.FAILED
+            task.error = "Deadline exceeded"
+            task.completed_at = now
+        elif task.attempts >= task.max_attempts or (task.deadline and task.deadline < now):
+            task.status = TaskStatus.FAILED
+            task.error = "Lease expired"
+            task.completed_at = now
+            task.lease_expires_at = None
+        else:
+            task.status = TaskStatus.PENDING
+            task.assigned_bot_id = None
+            task.lease_expires_at = None
+    db.commit()
+    if expired:
+        logger.info("Requeued or failed %d expired tasks", len(expired))
+    return len(expired)
+
+
+def sweep_expired_leases() -> None:
+    db = SessionLocal()
+    try:
+        while requeue_expired(db) > 0:
+            pass
+    finally:
+        db.close()
+
+
+register_worker("task-lease-sweep", sweep_expired_leases, settings.TASK_LEASE_SWEEP_INTERVAL)
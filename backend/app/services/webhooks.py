@@ -0,0 +1,393 @@
+"""
+Webhook 投递服务
+事件先写入 webhook_deliveries（与业务数据在同一事务中提交），后台异步投递到 Bot.endpoint：
+- 共享 httpx.AsyncClient，连接池复用 keep-alive 连接
+- HMAC-SHA256 签名：X-BotHub-Signature = sha256=hex(hmac(secret, "{timestamp}.{body}"))
+- 每个 endpoint 限制并发请求数
+- 失败按指数退避加抖动重试，超过次数标记为 dead
+- endpoint 连续失败时熔断，冷却期内不再请求，到期后放行一次试探
+- 只投递到 https 的公网地址，不能借 webhook 让服务器请求内网服务
+"""
+
+import asyncio
+import hashlib
+import hmac
+import ipaddress
+import json
+import logging
+import math
+import random
+import secrets
+import time
+import uuid
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from sqlalchemy import event, select, update
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.core.background import register_worker
+from app.core.plugins import plugins
+from app.database import SessionLocal
+from app.models.bot import Bot
+from app.models.webhook import WebhookDelivery, DeliveryStatus
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
+# 事件类型
+EVENT_TASK_ASSIGNED = "task.assigned"
+EVENT_CLAIM_APPROVED = "claim.approved"
+EVENT_GRANT_REVOKED = "grant.revoked"
+
+SIGNATURE_HEADER = "X-BotHub-Signature"
+TIMESTAMP_HEADER = "X-BotHub-Timestamp"
+EVENT_HEADER = "X-BotHub-Event"
+DELIVERY_HEADER = "X-BotHub-Delivery"
+
+
+def generate_webhook_secret() -> str:
+    return f"secret_{secrets.token_hex(24)}"
+
+
+def sign(secret: str, timestamp: str, body: bytes) -> str:
+    """签名内容为 "{timestamp}.{body}"，带上时间戳防止重放"""
+    mac = hmac.new(secret.encode(), timestamp.encode() + b"." + body, hashlib.sha256)
+    return f"sha256={mac.hexdigest()}"
+
+
+def backoff_delay(attempts: int, rng: random.Random = random) -> float:
+    """
+    第 attempts 次失败后的重试等待（秒）
+
+    指数增长到上限，再在后一半区间随机抖动，避免大量失败的投递同时重试。
+    """
+    delay = min(settings.WEBHOOK_BACKOFF_MAX, settings.WEBHOOK_BACKOFF_BASE * 2 ** (attempts - 1))
+    return delay / 2 + rng.uniform(0, delay / 2)
+
+
+def lease_seconds(endpoint_jobs: int, batch_jobs: int) -> float:
+    """
+    一批投递的租约（秒）：取出后到写回结果前其他进程不会再取
+
+    同一 endpoint 的 endpoint_jobs 个请求每次最多并发 WEBHOOK_ENDPOINT_CONCURRENCY 个，
+    整批还受连接池 WEBHOOK_MAX_CONNECTIONS 限制；按最慢的那一轮请求都超时计算，
+    再加一个超时作为写回结果的余量。
+    """
+    rounds = max(
+        math.ceil(endpoint_jobs / settings.WEBHOOK_ENDPOINT_CONCURRENCY),
+        math.ceil(batch_jobs / settings.WEBHOOK_MAX_CONNECTIONS),
+    )
+    return (rounds + 1) * settings.WEBHOOK_TIMEOUT
+
+
+async def check_endpoint(url: str) -> Optional[Tuple[str, str]]:
+    """
+    检查 endpoint 是否允许投递，允许时返回 None，否则返回 (outcome, error)
+
+    必须是 https，且解析出的每个地址都不能是回环、链路本地、内网或保留地址；
+    不允许的地址直接标记为 dead，域名暂时解析失败按普通失败重试。
+    WEBHOOK_ALLOW_PRIVATE_ENDPOINTS 为 True 时跳过检查（仅用于本地开发和测试）。
+    """
+    if settings.WEBHOOK_ALLOW_PRIVATE_ENDPOINTS:
+        return None
+    parts = urlsplit(url)
+    if parts.scheme != "https" or not parts.hostname:
+        return "dead", "Endpoint must be an https URL"
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(parts.hostname, parts.port or 443)
+    except OSError as e:
+        return "failed", f"Cannot resolve {parts.hostname}: {e}"
+    for info in infos:
+        address = ipaddress.ip_address(info[4][0].split("%")[0])
+        if not address.is_global or address.is_multicast:
+            return "dead", f"Endpoint resolves to a non-public address ({address})"
+    return None
+
+
+def enqueue_event(db: Session, bot: Bot, event_type: str, data: dict) -> Optional[WebhookDelivery]:
+    """
+    登记一个待投递事件（不提交，随调用方事务一起提交）
+
+    提交后自动唤醒投递任务，并把事件放入插件通知队列；
+    机器人没有配置 endpoint 时不投递 webhook。
+    """
+    now = datetime.utcnow()
+    event_id = f"evt_{uuid.uuid4().hex}"
+    payload = {
+        "id": event_id,
+        "type": event_type,
+        "created_at": now.isoformat(),
+        "bot_id": bot.bot_id,
+        "data": data,
+    }
+    if plugins.has_notification_channels():
+        db.info.setdefault("plugin_notifications", []).append(payload)
+    if not bot.endpoint:
+        return None
+    delivery = WebhookDelivery(
+        event_id=event_id,
+        event_type=event_type,
+        bot_id=bot.id,
+        payload=payload,
+        next_attempt_at=now,
+    )
+    db.add(delivery)
+    db.info["webhooks_enqueued"] = True
+    return delivery
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _wake_dispatcher(session: Session) -> None:
+    if session.info.pop("webhooks_enqueued", False):
+        dispatch_worker.wake()
+    notifications = session.info.pop("plugin_notifications", None)
+    if notifications:
+        plugins.queue_notifications(notifications)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_enqueued(session: Session) -> None:
+    session.info.pop("webhooks_enqueued", None)
+    session.info.pop("plugin_notifications", None)
+
+
+class CircuitBreaker:
+    """
+    单个 endpoint 的熔断器
+
+    连续失败 threshold 次后打开，cooldown 秒内的投递直接推迟；
+    冷却结束后只放行一个试探请求，成功则关闭，失败则重新打开。
+    """
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.open_until = 0.0
+        self._probing = False
+
+    @property
+    def is_open(self) -> bool:
+        return self.failures >= self.threshold
+
+    def allow(self, now: float) -> bool:
+        if not self.is_open:
+            return True
+        if now < self.open_until or self._probing:
+            return False
+        self._probing = True
+        return True
+
+    def retry_in(self, now: float) -> float:
+        """熔断期间的投递推迟多久再取"""
+        return max(self.open_until - now, 1.0)
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self, now: float) -> None:
+        self.failures += 1
+        self._probing = False
+        if self.is_open:
+            self.open_until = now + self.cooldown
+
+
+class DeliveryJob:
+    """一次投递尝试需要的数据，取出后不再持有数据库会话"""
+
+    __slots__ = ("id", "event_id", "event_type", "url", "secret", "body", "attempts")
+
+    def __init__(self, delivery: WebhookDelivery, url: Optional[str], secret: Optional[str]):
+        self.id = delivery.id
+        self.event_id = delivery.event_id
+        self.event_type = delivery.event_type
+        self.url = url
+        self.secret = secret
+        self.body = json.dumps(delivery.payload, ensure_ascii=False, separators=(",", ":")).encode()
+        self.attempts = delivery.attempts
+
+
+class WebhookDispatcher:
+    """异步投递器，只在一个事件循环中使用"""
+
+    def __init__(self, transport: Optional["httpx.AsyncBaseTransport"] = None):
+        self._transport = transport
+        self._client: Optional["httpx.AsyncClient"] = None
+        self.breakers: Dict[str, CircuitBreaker] = {}
+
+    def _get_client(self) -> "httpx.AsyncClient":
+        if self._client is None:
+            # 只有投递时才需要 httpx，不在启动时导入
+            import httpx
+
+            self._client = httpx.AsyncClient(
+                timeout=settings.WEBHOOK_TIMEOUT,
+                limits=httpx.Limits(
+                    max_connections=settings.WEBHOOK_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.WEBHOOK_MAX_CONNECTIONS,
+                ),
+                transport=self._transport,
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _breaker(self, url: str) -> CircuitBreaker:
+        breaker = self.breakers.get(url)
+        if breaker is None:
+            breaker = CircuitBreaker(settings.WEBHOOK_BREAKER_THRESHOLD, settings.WEBHOOK_BREAKER_COOLDOWN)
+            self.breakers[url] = breaker
+        return breaker
+
+    async def dispatch_due(self) -> int:
+        """投递一批到期的事件，返回取出的数量"""
+        jobs = await run_in_threadpool(self._claim_due)
+        if not jobs:
+            return 0
+        urls = sorted({job.url for job in jobs if job.url})
+        refusals = dict(zip(urls, await asyncio.gather(*(check_endpoint(url) for url in urls))))
+        limits = defaultdict(lambda: asyncio.Semaphore(settings.WEBHOOK_ENDPOINT_CONCURRENCY))
+        results = await asyncio.gather(*(
+            self._deliver(job, limits[job.url], refusals.get(job.url)) for job in jobs
+        ))
+        await run_in_threadpool(self._record, results)
+        return len(jobs)
+
+    def _claim_due(self) -> List[DeliveryJob]:
+        """取出到期的投递并把 next_attempt_at 推后作为租约，其他进程不会重复取到"""
+        db = SessionLocal()
+        try:
+            now = datetime.utcnow()
+            rows = db.execute(
+                select(WebhookDelivery, Bot.endpoint, Bot.webhook_secret)
+                .join(Bot, Bot.id == WebhookDelivery.bot_id)
+                .where(
+                    WebhookDelivery.status == DeliveryStatus.PENDING,
+                    WebhookDelivery.next_attempt_at <= now,
+                )
+                .order_by(WebhookDelivery.next_attempt_at)
+                .limit(settings.WEBHOOK_BATCH_SIZE)
+                .with_for_update(skip_locked=True, of=WebhookDelivery)
+            ).all()
+            # 同一 endpoint 的投递排队共用并发额度；整批投递完才写回结果，
+            # 所以每条都按最忙的 endpoint 计算租约，快的 endpoint 也不会在写回前过期被重复取出
+            per_endpoint = Counter(url for _, url, _ in rows)
+            lease_until = now + timedelta(seconds=lease_seconds(max(per_endpoint.values(), default=0), len(rows)))
+            jobs = []
+            for delivery, url, secret in rows:
+                delivery.next_attempt_at = lease_until
+                jobs.append(DeliveryJob(delivery, url, secret))
+            db.commit()
+            return jobs
+        finally:
+            db.close()
+
+    async def _deliver(
+        self, job: DeliveryJob, limit: asyncio.Semaphore, refusal: Optional[Tuple[str, str]] = None
+    ) -> dict:
+        if not job.url:
+            return {"job": job, "outcome": "dead", "error": "Bot has no endpoint"}
+        if refusal is not None:
+            outcome, error = refusal
+            return {"job": job, "outcome": outcome, "error": error}
+        breaker = self._breaker(job.url)
+        async with limit:
+            now = time.monotonic()
+            if not breaker.allow(now):
+                return {"job": job, "outcome": "deferred", "retry_in": breaker.retry_in(now)}
+
+            timestamp = str(int(time.time()))
+            headers = {
+                "Content-Type": "application/json",
+                EVENT_HEADER: job.event_type,
+                DELIVERY_HEADER: job.event_id,
+                TIMESTAMP_HEADER: timestamp,
+            }
+            if job.secret:
+                headers[SIGNATURE_HEADER] = sign(job.secret, timestamp, job.body)
+            import httpx
+
+            try:
+                response = await self._get_client().post(job.url, content=job.body, headers=headers)
+            except httpx.HTTPError as e:
+                breaker.record_failure(time.monotonic())
+                return {"job": job, "outcome": "failed", "error": f"{type(e).__name__}: {e}"}
+
+        code = response.status_code
+        if 200 <= code < 300:
+            breaker.record_success()
+            return {"job": job, "outcome": "delivered", "status_code": code}
+        # 4xx 说明对方在线，只重试不计入熔断（429 除外）
+        if code >= 500 or code == 429:
+            breaker.record_failure(time.monotonic())
+        else:
+            breaker.record_success()
+        return {"job": job, "outcome": "failed", "status_code": code, "error": f"HTTP {code}"}
+
+    def _record(self, results: List[dict]) -> None:
+        now = datetime.utcnow()
+        updates = []
+        for result in results:
+            job = result["job"]
+            outcome = result["outcome"]
+            if outcome == "deferred":
+                updates.append({
+                    "id": job.id,
+                    "next_attempt_at": now + timedelta(seconds=result["retry_in"]),
+                })
+                continue
+
+            values = {
+                "id": job.id,
+                "attempts": job.attempts + 1,
+                "last_status_code": result.get("status_code"),
+                "last_error": result.get("error"),
+            }
+            if outcome == "delivered":
+                values.update(status=DeliveryStatus.DELIVERED, delivered_at=now)
+            elif outcome == "dead" or job.attempts + 1 >= settings.WEBHOOK_MAX_ATTEMPTS:
+                values.update(status=DeliveryStatus.DEAD)
+                logger.warning("Webhook %s to %s is dead: %s", job.event_id, job.url, result.get("error"))
+            else:
+                values.update(next_attempt_at=now + timedelta(seconds=backoff_delay(job.attempts + 1)))
+            updates.append(values)
+
+        db = SessionLocal()
+        try:
+            for values in updates:
+                db.execute(
+                    update(WebhookDelivery)
+                    .where(WebhookDelivery.id == values.pop("id"))
+                    .values(**values)
+                )
+            db.commit()
+        finally:
+            db.close()
+
+
+webhook_dispatcher = WebhookDispatcher()
+
+
+async def dispatch_webhooks() -> None:
+    while await webhook_dispatcher.dispatch_due() >= settings.WEBHOOK_BATCH_SIZE:
+        pass
+
+
+dispatch_worker = register_worker(
+    "webhook-dispatch",
+    dispatch_webhooks,
+    settings.WEBHOOK_DISPATCH_INTERVAL,
+    run_on_start=True,
+    on_stop=webhook_dispatcher.aclose,
+)
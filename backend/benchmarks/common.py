@@ -0,0 +1,138 @@
+"""
+基准测试和负载模拟的公共部分
+
+- configure(): 在导入 app 之前设置数据库地址并关闭后台任务
+- make_client(): 进程内（ASGITransport）或指向已运行服务的 httpx.AsyncClient
+- LatencyStats: 记录每个请求的耗时和错误，计算吞吐和分位数
+- FakeFeishuService: 认领流程中代替飞书开放平台，基准不依赖外网
+"""
+
+import math
+import os
+import tempfile
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+import httpx
+
+BENCH_OWNER_ID = "00000000-0000-0000-0000-00000000b0b0"
+
+
+def default_database_url() -> str:
+    """临时目录中的 SQLite 文件"""
+    return f"sqlite:///{os.path.join(tempfile.gettempdir(), 'bothub-bench.db')}"
+
+
+def configure(database_url: str, workers: bool = False, rate_limits: bool = False) -> None:
+    """必须在导入 app 之前调用；默认关闭限流，所有请求来自同一个地址"""
+    os.environ["DATABASE_URL"] = database_url
+    os.environ["BACKGROUND_WORKERS_ENABLED"] = "true" if workers else "false"
+    os.environ["RATE_LIMIT_ENABLED"] = "true" if rate_limits else "false"
+    os.environ.setdefault("DEBUG", "false")
+
+
+def reset_database() -> None:
+    """清空并重建所有表（只用于专门的基准数据库）"""
+    import app.main  # noqa: F401  注册所有模型
+    from app.database import Base, engine
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+
+def make_client(base_url: Optional[str] = None, max_connections: int = 100) -> httpx.AsyncClient:
+    """base_url 为空时直接调用进程内的 app，不经过网络"""
+    limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+    if base_url:
+        return httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0)
+    from app.main import app
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=30.0)
+
+
+def auth_headers(user_id: str) -> Dict[str, str]:
+    from app.core.security import create_access_token
+    return {"Authorization": f"Bearer {create_access_token(data={'sub': user_id})}"}
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """最近秩分位数，sorted_values 已升序"""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(q / 100 * len(sorted_values)) - 1
+    return sorted_values[max(0, min(rank, len(sorted_values) - 1))]
+
+
+class LatencyStats:
+    """一组请求的耗时（秒）和结果"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.latencies: List[float] = []
+        self.errors: Counter = Counter()
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+
+    def record(self, elapsed: float, error: Optional[str] = None) -> None:
+        self.latencies.append(elapsed)
+        if error:
+            self.errors[error] += 1
+
+    def finish(self) -> None:
+        self.finished = time.perf_counter()
+
+    @property
+    def count(self) -> int:
+        return len(self.latencies)
+
+    def summary(self) -> dict:
+        wall = (self.finished or time.perf_counter()) - self.started
+        ordered = sorted(self.latencies)
+        return {
+            "requests": self.count,
+            "errors": sum(self.errors.values()),
+            "error_kinds": dict(self.errors),
+            "seconds": round(wall, 3),
+            "rps": round(self.count / wall, 1) if wall > 0 else 0.0,
+            "p50_ms": round(percentile(ordered, 50) * 1000, 2),
+            "p90_ms": round(percentile(ordered, 90) * 1000, 2),
+            "p99_ms": round(percentile(ordered, 99) * 1000, 2),
+            "max_ms": round(ordered[-1] * 1000, 2) if ordered else 0.0,
+        }
+
+
+async def timed(stats: LatencyStats, request, expected=(200, 201, 204)) -> Optional[httpx.Response]:
+    """执行一个请求并记录耗时；非预期状态码和网络错误计为错误"""
+    start = time.perf_counter()
+    try:
+        response = await request
+    except httpx.HTTPError as e:
+        stats.record(time.perf_counter() - start, type(e).__name__)
+        return None
+    stats.record(
+        time.perf_counter() - start,
+        None if response.status_code in expected else f"HTTP {response.status_code}",
+    )
+    return response
+
+
+class FakeFeishuService:
+    """飞书开放平台的本地替身：OAuth code 即用户标识，关系验证总是通过，消息直接丢弃"""
+
+    def get_user_info_by_code(self, code: str):
+        from app.schemas.claim import FeishuUserInfo
+        return FeishuUserInfo(user_id=code, open_id=f"ou_{code}", name=code, email=None, avatar_url=None)
+
+    def verify_bot_relationship(self, bot_app_id: str, user_id: str):
+        from app.schemas.claim import FeishuBotRelationship
+        return FeishuBotRelationship(is_owner=True, relationship_type="owner", verified=True)
+
+    def send_interactive_card(self, *args, **kwargs) -> Optional[str]:
+        return None
+
+    def send_message(self, *args, **kwargs) -> Optional[str]:
+        return None
+
+
+def use_fake_feishu() -> None:
+    import app.api.v1.claim as claim_api
+    claim_api.get_feishu_service = lambda *args, **kwargs: FakeFeishuService()
@@ -0,0 +1,277 @@
+"""
+机器人集群模拟器
+
+模拟大量机器人通过真实接口自注册（/claim/bots/register），然后按带抖动的间隔发送心跳
+（/bots/{bot_id}/heartbeat），期间会随机切换状态、暂时失联或彻底掉线，也可以发送
+不合法的心跳。结束后输出每类请求的吞吐、延迟分位数和错误，以及集群的行为统计。
+
+用法（在 backend 目录下）：
+
+    # 进程内 app + 临时 SQLite，1000 个机器人，每 10 秒一次心跳，运行 60 秒
+    python -m benchmarks.fleet_sim --bots 1000 --duration 60
+
+    # 2 万个机器人，每秒注册 500 个，5% 的心跳后失联 30 秒左右，1% 的心跳后永久掉线
+    python -m benchmarks.fleet_sim --bots 20000 --register-rate 500 --interval 30 \\
+        --silence-probability 0.05 --silence-duration 30 --crash-probability 0.01
+
+    # 压测已运行的服务
+    python -m benchmarks.fleet_sim --url http://localhost:8000 --bots 5000 --output fleet.json
+
+每个机器人是一个协程；机器人数量很大时，模拟器本身可能跟不上计划的心跳频率，
+报告中的 schedule_lag（实际发送时间比计划晚多少）偏高时，说明服务端（或模拟器本身）
+跟不上计划的心跳频率，可以调大 --max-in-flight、减少机器人数量或分多个进程运行。
+
+进程内运行时同步接口在线程池中执行，同时进行的请求超过数据库连接池大小会互相等待连接，
+因此 --max-in-flight 默认较小。
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import sys
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Optional
+
+import httpx
+
+from benchmarks.common import LatencyStats, configure, default_database_url, make_client, reset_database, timed
+
+HEARTBEAT_STATUSES = ("online", "busy", "offline", "error")
+
+
+def jittered(interval: float, jitter: float, rng: random.Random) -> float:
+    """interval 上下浮动 jitter 比例（0.2 即 ±20%）"""
+    if jitter <= 0:
+        return interval
+    return max(0.0, interval * (1 + rng.uniform(-jitter, jitter)))
+
+
+class FleetSimulator:
+    """按 parse_args() 的参数驱动一组机器人"""
+
+    def __init__(self, client: httpx.AsyncClient, args, rng: Optional[random.Random] = None):
+        self.client = client
+        self.args = args
+        self.rng = rng or random.Random(args.seed)
+        self.prefix = args.prefix or f"sim-{uuid.uuid4().hex[:8]}"
+        self.stats: Dict[str, LatencyStats] = {
+            "register": LatencyStats("register"),
+            "heartbeat": LatencyStats("heartbeat"),
+            "heartbeat_malformed": LatencyStats("heartbeat_malformed"),
+        }
+        self.schedule_lag = LatencyStats("schedule_lag")
+        self.events: Counter = Counter()
+        self.final_status: Counter = Counter()
+        self.active = 0
+        self.in_flight = asyncio.Semaphore(args.max_in_flight)
+
+    def pick_status(self, current: str) -> str:
+        if self.rng.random() >= self.args.status_change_probability:
+            return current
+        return self.rng.choice([s for s in HEARTBEAT_STATUSES if s != current])
+
+    async def send(self, stats: LatencyStats, url: str, payload: dict, expected=(200, 201, 204)):
+        async with self.in_flight:
+            return await timed(stats, self.client.post(url, json=payload), expected=expected)
+
+    async def register(self, bot_id: str) -> bool:
+        response = await self.send(
+            self.stats["register"],
+            "/api/v1/claim/bots/register",
+            {
+                "bot_id": bot_id,
+                "bot_name": bot_id,
+                "description": "simulated bot",
+                "capabilities": {"simulated": True, "shard": self.rng.randrange(16)},
+                "version": "sim-1.0",
+            },
+        )
+        return response is not None and response.status_code == 200
+
+    async def heartbeat(self, bot_id: str, status: str) -> None:
+        url = f"/api/v1/bots/{bot_id}/heartbeat"
+        if self.rng.random() < self.args.malformed_probability:
+            # 不合法的状态值，预期 422
+            await self.send(self.stats["heartbeat_malformed"], url, {"status": "bogus"}, expected=(422,))
+            return
+        await self.send(self.stats["heartbeat"], url, {
+            "status": status,
+            "current_load": round(self.rng.random(), 2),
+            "active_tasks": self.rng.randrange(4),
+        })
+
+    async def run_bot(self, index: int, start_at: float, deadline: float) -> None:
+        args = self.args
+        bot_id = f"{self.prefix}-{index:06d}"
+        await asyncio.sleep(max(0.0, start_at - time.monotonic()))
+        if time.monotonic() >= deadline:
+            return
+        registered = await self.register(bot_id)
+        if self.stats["register"].count == args.bots:
+            self.stats["register"].finish()
+        if not registered:
+            self.events["register_failed"] += 1
+            return
+
+        self.active += 1
+        status = "online"
+        try:
+            # 第一次心跳随机分布在一个间隔内，避免同时到达
+            next_at = time.monotonic() + self.rng.uniform(0, args.interval)
+            while next_at < deadline:
+                await asyncio.sleep(max(0.0, next_at - time.monotonic()))
+                self.schedule_lag.record(max(0.0, time.monotonic() - next_at))
+
+                new_status = self.pick_status(status)
+                if new_status != status:
+                    self.events["status_changes"] += 1
+                    status = new_status
+                await self.heartbeat(bot_id, status)
+
+                roll = self.rng.random()
+                if roll < args.crash_probability:
+                    self.events["crashes"] += 1
+                    status = "crashed"
+                    return
+                next_at += jittered(args.interval, args.jitter, self.rng)
+                if roll < args.crash_probability + args.silence_probability:
+                    self.events["silences"] += 1
+                    next_at += jittered(args.silence_duration, 0.5, self.rng)
+        finally:
+            self.active -= 1
+            self.final_status[status] += 1
+
+    async def report_progress(self, started: float, deadline: float) -> None:
+        last_count = 0
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.args.report_interval)
+            count = self.stats["heartbeat"].count
+            errors = sum(sum(s.errors.values()) for s in self.stats.values())
+            print(
+                f"[{time.monotonic() - started:6.1f}s] active {self.active:>6}  "
+                f"heartbeats {(count - last_count) / self.args.report_interval:>8.1f}/s  errors {errors}",
+                flush=True,
+            )
+            last_count = count
+
+    async def run(self) -> dict:
+        args = self.args
+        started = time.monotonic()
+        deadline = started + args.duration
+        tasks = [
+            asyncio.create_task(self.run_bot(
+                i,
+                started + (i / args.register_rate if args.register_rate > 0 else 0.0),
+                deadline,
+            ))
+            for i in range(args.bots)
+        ]
+        reporter = asyncio.create_task(self.report_progress(started, deadline)) if args.report_interval > 0 else None
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            if reporter:
+                reporter.cancel()
+        for stats in self.stats.values():
+            if stats.finished is None:
+                stats.finish()
+        return self.report(time.monotonic() - started)
+
+    def report(self, elapsed: float) -> dict:
+        lag = self.schedule_lag.summary()
+        heartbeats = self.stats["heartbeat"].count + self.stats["heartbeat_malformed"].count
+        return {
+            "fleet": {
+                "bots": self.args.bots,
+                "registered": self.stats["register"].count - self.events["register_failed"],
+                "seconds": round(elapsed, 1),
+                "heartbeats": heartbeats,
+                "heartbeats_per_second": round(heartbeats / elapsed, 1) if elapsed > 0 else 0.0,
+                # 所有机器人都在线且不失联时的理论心跳频率
+                "planned_heartbeats_per_second": round(self.args.bots / self.args.interval, 1),
+                "events": dict(self.events),
+                "final_status": dict(self.final_status),
+                "schedule_lag_p50_ms": lag["p50_ms"],
+                "schedule_lag_p99_ms": lag["p99_ms"],
+            },
+            "requests": {name: stats.summary() for name, stats in self.stats.items() if stats.count},
+        }
+
+
+def print_report(report: dict) -> None:
+    fleet = report["fleet"]
+    print(
+        f"\n{fleet['registered']}/{fleet['bots']} bots registered, {fleet['heartbeats']} heartbeats in "
+        f"{fleet['seconds']}s ({fleet['heartbeats_per_second']}/s, planned {fleet['planned_heartbeats_per_second']}/s)"
+    )
+    print(f"schedule lag p50 {fleet['schedule_lag_p50_ms']} ms, p99 {fleet['schedule_lag_p99_ms']} ms")
+    print(f"events: {fleet['events']}  final status: {fleet['final_status']}")
+    for name, summary in report["requests"].items():
+        print(
+            f"{name:<20} {summary['requests']:>8} req  {summary['rps']:>9.1f} req/s  "
+            f"p50 {summary['p50_ms']:>8.2f} ms  p90 {summary['p90_ms']:>8.2f} ms  p99 {summary['p99_ms']:>8.2f} ms  "
+            f"errors {summary['errors']} {summary['error_kinds'] or ''}"
+        )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="BotHub bot fleet simulator")
+    parser.add_argument("--database-url", default=default_database_url(),
+                        help="进程内运行时的数据库地址（默认临时目录中的 SQLite 文件；会清空并重建所有表）")
+    parser.add_argument("--url", help="模拟已运行的服务而不是进程内 app")
+    parser.add_argument("--bots", type=int, default=1000, help="机器人数量")
+    parser.add_argument("--duration", type=float, default=60.0, help="运行秒数")
+    parser.add_argument("--register-rate", type=float, default=200.0, help="每秒注册的机器人数（0 为同时注册）")
+    parser.add_argument("--interval", type=float, default=10.0, help="心跳间隔（秒）")
+    parser.add_argument("--jitter", type=float, default=0.2, help="心跳间隔的抖动比例")
+    parser.add_argument("--status-change-probability", type=float, default=0.05, help="每次心跳切换状态的概率")
+    parser.add_argument("--silence-probability", type=float, default=0.01, help="每次心跳后暂时失联的概率")
+    parser.add_argument("--silence-duration", type=float, default=60.0, help="失联的平均时长（秒，±50%%）")
+    parser.add_argument("--crash-probability", type=float, default=0.0, help="每次心跳后永久掉线的概率")
+    parser.add_argument("--malformed-probability", type=float, default=0.0, help="发送不合法心跳（预期 422）的概率")
+    parser.add_argument("--max-in-flight", type=int, default=10,
+                        help="同时进行的请求数上限（进程内运行时不要超过数据库连接池大小）")
+    parser.add_argument("--prefix", help="bot_id 前缀（默认随机，避免与已有机器人冲突）")
+    parser.add_argument("--seed", type=int, help="随机种子")
+    parser.add_argument("--report-interval", type=float, default=5.0, help="进度输出间隔（秒，0 为不输出）")
+    parser.add_argument("--output", help="把报告写入 JSON 文件")
+    return parser.parse_args(argv)
+
+
+async def simulate(args) -> dict:
+    client = make_client(args.url, max_connections=args.max_in_flight)
+    try:
+        return await FleetSimulator(client, args).run()
+    finally:
+        await client.aclose()
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    configure(args.database_url)
+    if not args.url:
+        reset_database()
+
+    started = time.time()
+    report = asyncio.run(simulate(args))
+    report["meta"] = {
+        "target": args.url or args.database_url.split("://", 1)[0],
+        "started_at": datetime.utcfromtimestamp(started).isoformat(),
+        "python": platform.python_version(),
+        "options": {k: v for k, v in vars(args).items() if k not in ("database_url", "output")},
+    }
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
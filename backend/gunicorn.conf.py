@@ -0,0 +1,63 @@
+"""
+多进程部署配置
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+每个 worker 是一个独立的 uvicorn 进程（独立的事件循环、数据库连接池和后台任务）。
+worker 数量默认等于可用 CPU 核数，可用 WEB_CONCURRENCY 覆盖。
+多于一个 worker 时请设置 STATE_BACKEND=shm（单机）或 redis（多机），
+否则在线状态、缓存失效和限流计数只在各自的 worker 内有效。
+"""
+
+import os
+
+
+def available_cores() -> int:
+    """容器的 CPU 配额优先，其次是进程可用的核数"""
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            return max(1, int(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+workers = int(os.environ.get("WEB_CONCURRENCY") or available_cores())
+worker_class = "uvicorn.workers.UvicornWorker"
+bind = os.environ.get("BIND", "0.0.0.0:8000")
+
+# 不预加载应用：每个 worker 自己导入 app，创建自己的数据库连接池
+preload_app = False
+# 停止时给 worker 留出落盘缓冲数据的时间（lifespan 中停止后台任务）
+graceful_timeout = int(os.environ.get("GRACEFUL_TIMEOUT", "30"))
+timeout = int(os.environ.get("WORKER_TIMEOUT", "60"))
+keepalive = 5
+# 定期重启 worker，避免内存缓慢增长
+max_requests = int(os.environ.get("MAX_REQUESTS", "0"))
+max_requests_jitter = max_requests // 10
+
+accesslog = "-"
+errorlog = "-"
+
+
+def on_starting(server):
+    # 把 worker 数量告诉应用（用于检查共享状态配置）
+    os.environ["WEB_CONCURRENCY"] = str(server.cfg.workers)
+    backend = os.environ.get("STATE_BACKEND", "local")
+    if backend == "shm":
+        # 上次运行留下的共享状态已经过时
+        path = os.environ.get("STATE_SHM_PATH", "/dev/shm/bothub-state.db")
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                os.remove(path + suffix)
+            except FileNotFoundError:
+                pass
+    elif backend == "local" and server.cfg.workers > 1:
+        server.log.warning(
+            "Running %d workers with STATE_BACKEND=local; set STATE_BACKEND=shm or redis", server.cfg.workers
+        )
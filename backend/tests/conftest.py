@@ -0,0 +1,119 @@
+import os
+
+# Tests run against an in-memory SQLite database with background workers
+# and rate limiting disabled; this must happen before the app is imported.
+os.environ["DATABASE_URL"] = "sqlite://"
+os.environ["BACKGROUND_WORKERS_ENABLED"] = "false"
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+
+import time
+
+import pytest
+from uuid import uuid4
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.config import settings
+from app.core.profiling import QUERY_COUNT_HEADER, REPEATED_HEADER
+from app.core.readiness import readiness
+from app.core.state import get_state
+from app.database import Base, SessionLocal, engine
+from app.services.bot_search import bot_search
+from app.services.bot_stats import bot_stats
+from app.services.heartbeats import fingerprints
+from app.services.leaderboard import leaderboard
+from app.services.message_bus import get_bus
+from app.services.permissions import permission_engine
+from app.services.routing import bot_index
+from app.services.skills import skill_counters
+
+
+@pytest.fixture(scope="function")
+def client():
+    """Create a test client with fresh database."""
+    # Create tables
+    Base.metadata.create_all(bind=engine)
+
+    with TestClient(app) as test_client:
+        # Startup warms the pool in a background thread; let it finish before
+        # the test uses the shared in-memory connection
+        deadline = time.monotonic() + 5
+        while readiness.ready_after is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        yield test_client
+
+    # Drop tables after test
+    Base.metadata.drop_all(bind=engine)
+    bot_index.clear()
+    leaderboard.reset()
+    skill_counters.clear()
+    permission_engine.clear()
+    bot_stats.invalidate()
+    bot_search.invalidate()
+    fingerprints.clear()
+    get_bus().clear()
+    get_state().clear()
+
+
+@pytest.fixture
+def db(client):
+    """Database session bound to the test database."""
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def auth_headers():
+    """Create authorization headers with a test token."""
+    # Create a test token
+    from app.core.security import create_access_token
+    test_user_id = uuid4()
+    token = create_access_token(data={"sub": str(test_user_id)})
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def owner_id():
+    """The user that owns the bots a test registers."""
+    return "00000000-0000-0000-0000-0000000000aa"
+
+
+@pytest.fixture
+def headers_for():
+    """Build authorization headers for a given user id."""
+    from app.core.security import create_access_token
+
+    def build(user_id):
+        token = create_access_token(data={"sub": str(user_id)})
+        return {"Authorization": f"Bearer {token}"}
+
+    return build
+
+
+@pytest.fixture
+def owner_headers(owner_id, headers_for):
+    """Authorization headers of the bot owner."""
+    return headers_for(owner_id)
+
+
+@pytest.fixture
+def query_budget(monkeypatch):
+    """
+    Profile every request and return a checker for a response's SQL budget.
+
+    Usage: ``query_budget(response, 3)`` fails if the request issued more
+    than 3 statements or repeated any statement (N+1).
+    """
+    monkeypatch.setattr(settings, "SQL_PROFILING_ENABLED", True)
+
+    def check(response, max_queries):
+        count = int(response.headers[QUERY_COUNT_HEADER])
+        assert count <= max_queries, f"{count} queries, budget {max_queries}"
+        assert response.headers[REPEATED_HEADER] == "0", "repeated statements (possible N+1)"
+        return count
+
+    return check
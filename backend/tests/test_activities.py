@@ -0,0 +1,148 @@
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import func, select
+
+from app.models.activity import BotActivity
+from app.services.activities import ActivityBuffer, _copy_value, activity_ingestor
+
+
+@pytest.fixture
+def bot(client, auth_headers):
+    """A registered bot."""
+    bot_data = {
+        "bot_id": "activity-bot-001",
+        "bot_name": "Activity Bot",
+        "owner_id": "00000000-0000-0000-0000-000000000001"
+    }
+    response = client.post("/api/v1/bots/register", json=bot_data, headers=auth_headers)
+    assert response.status_code == 201
+    yield response.json()
+    activity_ingestor.buffer.drain(len(activity_ingestor.buffer))
+    activity_ingestor.forget_bot(bot_data["bot_id"])
+
+
+def make_batch(n, **overrides):
+    return {
+        "activities": [
+            {
+                "activity_type": "api_call",
+                "description": f"call {i}",
+                "metadata": {"i": i},
+                "tokens_used": 10,
+                **overrides
+            }
+            for i in range(n)
+        ]
+    }
+
+
+class TestActivityIngestion:
+    """Tests for the activity ingestion endpoint."""
+
+    def test_ingest_returns_202_before_write(self, client, db, bot):
+        """Batches are accepted into the buffer without touching the table."""
+        response = client.post(
+            f"/api/v1/bots/{bot['bot_id']}/activities",
+            json=make_batch(3)
+        )
+        assert response.status_code == 202
+        assert response.json() == {"accepted": 3}
+        assert db.scalar(select(func.count()).select_from(BotActivity)) == 0
+
+        assert activity_ingestor.flush(db) == 3
+        rows = db.scalars(select(BotActivity).order_by(BotActivity.description)).all()
+        assert len(rows) == 3
+        assert rows[0].meta == {"i": 0}
+        assert str(rows[0].bot_id) == bot["id"]
+
+    def test_ingest_unknown_bot(self, client):
+        """Unknown bots are rejected."""
+        response = client.post("/api/v1/bots/missing/activities", json=make_batch(1))
+        assert response.status_code == 404
+
+    def test_ingest_validates_batch(self, client, bot):
+        """Empty batches and negative token counts are rejected."""
+        url = f"/api/v1/bots/{bot['bot_id']}/activities"
+        assert client.post(url, json={"activities": []}).status_code == 422
+        assert client.post(url, json=make_batch(1, tokens_used=-1)).status_code == 422
+
+    def test_rejects_timestamps_outside_the_partition_window(self, client, db, bot, monkeypatch):
+        """Far past or future created_at would create partitions nobody prunes."""
+        monkeypatch.setattr("app.services.activities.settings.ACTIVITY_MAX_AGE_DAYS", 7)
+        monkeypatch.setattr("app.services.activities.settings.ACTIVITY_PARTITION_DAYS_AHEAD", 3)
+        url = f"/api/v1/bots/{bot['bot_id']}/activities"
+        now = datetime.utcnow()
+
+        for created_at in (now - timedelta(days=8), now + timedelta(days=5), datetime(2999, 1, 1)):
+            response = client.post(url, json=make_batch(2, created_at=created_at.isoformat()))
+            assert response.status_code == 422
+            assert "created_at" in response.json()["detail"]
+        assert len(activity_ingestor.buffer) == 0
+
+        aware = datetime.now(timezone.utc) - timedelta(days=6)
+        batch = make_batch(1, created_at=aware.isoformat())
+        batch["activities"].append({"activity_type": "api_call", "created_at": (now + timedelta(days=3)).isoformat()})
+        assert client.post(url, json=batch).status_code == 202
+        assert activity_ingestor.flush(db) == 2
+
+    def test_backpressure_when_buffer_full(self, client, bot, monkeypatch):
+        """A full buffer answers 503 with Retry-After."""
+        monkeypatch.setattr(activity_ingestor.buffer, "max_events", 5)
+        url = f"/api/v1/bots/{bot['bot_id']}/activities"
+        assert client.post(url, json=make_batch(4)).status_code == 202
+
+        response = client.post(url, json=make_batch(2))
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "1"
+        assert len(activity_ingestor.buffer) == 4
+
+    def test_orphaned_events_are_dropped(self, client, db, bot):
+        """Events of bots deleted before the flush are filtered out."""
+        client.post(f"/api/v1/bots/{bot['bot_id']}/activities", json=make_batch(2))
+        rows = activity_ingestor.buffer.drain(10)
+        orphan = dict(rows[0], id=uuid4(), bot_id=uuid4())
+
+        kept = activity_ingestor._drop_orphans(db, rows + [orphan])
+        assert kept == rows
+
+    def test_bad_rows_do_not_block_the_buffer(self, client, db, bot):
+        """A row that violates a constraint is dropped and the rest of its batch is written."""
+        url = f"/api/v1/bots/{bot['bot_id']}/activities"
+        client.post(url, json=make_batch(1))
+        activity_ingestor.flush(db)
+        existing = db.scalars(select(BotActivity)).one()
+
+        client.post(url, json=make_batch(5))
+        rows = activity_ingestor.buffer.drain(10)
+        rows[3].update(id=existing.id, created_at=existing.created_at)
+        activity_ingestor.buffer.requeue(rows)
+
+        assert activity_ingestor.flush(db) == 4
+        assert len(activity_ingestor.buffer) == 0
+        assert db.scalar(select(func.count()).select_from(BotActivity)) == 5
+        assert activity_ingestor.flush(db) == 0
+
+
+class TestActivityBuffer:
+    """Tests for the bounded buffer and COPY encoding."""
+
+    def test_offer_is_all_or_nothing(self):
+        buffer = ActivityBuffer(max_events=3)
+        assert buffer.offer([{}, {}])
+        assert not buffer.offer([{}, {}])
+        assert len(buffer) == 2
+
+    def test_requeue_preserves_order(self):
+        buffer = ActivityBuffer(max_events=10)
+        buffer.offer([{"n": 1}, {"n": 2}, {"n": 3}])
+        batch = buffer.drain(2)
+        buffer.requeue(batch)
+        assert [row["n"] for row in buffer.drain(10)] == [1, 2, 3]
+
+    def test_copy_value_escaping(self):
+        assert _copy_value(None) == "\\N"
+        assert _copy_value("a\tb\nc\\") == "a\\tb\\nc\\\\"
+        assert _copy_value({"k": "值"}) == '{"k": "值"}'
+        assert _copy_value(datetime(2026, 1, 2, 3, 4, 5)) == "2026-01-02 03:04:05"
@@ -0,0 +1,91 @@
+import asyncio
+import random
+from collections import Counter
+
+import httpx
+
+from benchmarks.api_bench import compare
+from benchmarks.common import LatencyStats, percentile
+from benchmarks.fleet_sim import FleetSimulator, jittered, parse_args
+
+
+class TestBenchmarkReport:
+    """Tests for benchmark statistics and regression checks."""
+
+    def test_percentiles(self):
+        values = [i / 1000 for i in range(1, 101)]
+        assert percentile(values, 50) == 0.05
+        assert percentile(values, 99) == 0.099
+        assert percentile([], 99) == 0.0
+
+    def test_summary_counts_errors(self):
+        stats = LatencyStats("get")
+        stats.record(0.010)
+        stats.record(0.020, "HTTP 500")
+        stats.finish()
+        summary = stats.summary()
+        assert summary["requests"] == 2
+        assert summary["errors"] == 1
+        assert summary["error_kinds"] == {"HTTP 500": 1}
+        assert summary["p99_ms"] == 20.0
+
+    def test_regression_threshold(self):
+        baseline = {"get": {"rps": 1000, "p99_ms": 10.0, "errors": 0}}
+        within = {"get": {"rps": 900, "p99_ms": 11.0, "errors": 0}}
+        assert compare(within, baseline, threshold=0.15) == []
+
+        slower = {"get": {"rps": 800, "p99_ms": 12.0, "errors": 0}, "list": {"rps": 1, "p99_ms": 1, "errors": 0}}
+        regressions = compare(slower, baseline, threshold=0.15)
+        assert len(regressions) == 2
+        assert regressions[0].startswith("get: throughput")
+
+
+class TestFleetSimulator:
+    """Tests for the fleet simulator against a stub transport."""
+
+    def run(self, handler, *options):
+        args = parse_args(["--report-interval", "0", "--seed", "1", *options])
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="http://sim")
+
+        async def simulate():
+            async with client:
+                return await FleetSimulator(client, args).run()
+
+        return asyncio.run(simulate())
+
+    def test_registers_and_heartbeats(self):
+        calls = Counter()
+
+        def handler(request):
+            calls["register" if request.url.path.endswith("/register") else "heartbeat"] += 1
+            return httpx.Response(200, json={})
+
+        report = self.run(
+            handler, "--bots", "5", "--duration", "0.5", "--interval", "0.1", "--register-rate", "0",
+            "--status-change-probability", "0",
+        )
+        assert calls["register"] == 5
+        assert report["fleet"]["registered"] == 5
+        assert report["requests"]["heartbeat"]["requests"] == calls["heartbeat"] > 5
+        assert report["fleet"]["final_status"] == {"online": 5}
+
+    def test_failure_modes_are_reported(self):
+        def handler(request):
+            if request.url.path.endswith("/register"):
+                return httpx.Response(409 if b"sim-000000" in request.content else 200, json={})
+            return httpx.Response(422 if b"bogus" in request.content else 200, json={})
+
+        report = self.run(
+            handler, "--bots", "4", "--duration", "0.5", "--interval", "0.05", "--register-rate", "0",
+            "--crash-probability", "1", "--malformed-probability", "0", "--prefix", "sim",
+        )
+        assert report["fleet"]["registered"] == 3
+        assert report["fleet"]["events"] == {"register_failed": 1, "crashes": 3}
+        assert report["requests"]["register"]["error_kinds"] == {"HTTP 409": 1}
+        assert report["fleet"]["final_status"] == {"crashed": 3}
+
+    def test_jitter_stays_in_bounds(self):
+        rng = random.Random(0)
+        delays = [jittered(10, 0.2, rng) for _ in range(1000)]
+        assert 8 <= min(delays) and max(delays) <= 12
+        assert jittered(10, 0, rng) == 10
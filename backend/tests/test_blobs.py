@@ -0,0 +1,143 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.v1.blobs import router as blobs_router
+from app.services.storage import HotBlobCache, LocalBlobStore, get_blob_store, sniff_image
+
+
+PNG_BYTES = b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 4
+
+
+@pytest.fixture
+def store(tmp_path):
+    """Blob store rooted in a temporary directory."""
+    return LocalBlobStore(
+        str(tmp_path),
+        hot_cache=HotBlobCache(max_item_bytes=2048, max_total_bytes=8192)
+    )
+
+
+@pytest.fixture
+def client(store):
+    """Test client serving only the blob routes."""
+    app = FastAPI()
+    app.include_router(blobs_router, prefix="/api/v1")
+    app.dependency_overrides[get_blob_store] = lambda: store
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+class TestBlobStore:
+    """Tests for the content-addressed blob store."""
+
+    def test_put_is_content_addressed(self, store):
+        """Identical content maps to the same blob id."""
+        first = store.put(PNG_BYTES, "image/png")
+        second = store.put(PNG_BYTES, "image/png")
+        assert first == second
+        assert first.endswith(".png")
+        assert store.stat(first)[1] == len(PNG_BYTES)
+
+    def test_sniff_image_accepts_raster_formats_only(self):
+        assert sniff_image(PNG_BYTES) == "image/png"
+        assert sniff_image(b"\xff\xd8\xff\xe0rest") == "image/jpeg"
+        assert sniff_image(b"GIF89a...") == "image/gif"
+        assert sniff_image(b"RIFF\x00\x00\x00\x00WEBPVP8 ") == "image/webp"
+        assert sniff_image(b"<svg xmlns='http://www.w3.org/2000/svg'/>") is None
+        assert sniff_image(b"") is None
+
+    def test_stat_rejects_invalid_ids(self, store):
+        """Path traversal and malformed ids are treated as missing."""
+        assert store.stat("../../etc/passwd") is None
+        assert store.stat("abc") is None
+
+    def test_hot_cache_admits_small_blobs_on_second_hit(self):
+        """Only small, repeatedly requested blobs enter the hot cache."""
+        cache = HotBlobCache(max_item_bytes=10, max_total_bytes=20)
+        assert not cache.should_admit("a", 5)
+        assert cache.should_admit("a", 5)
+        assert not cache.should_admit("big", 11)
+
+        cache.put("a", b"12345")
+        cache.put("b", b"1234567890")
+        cache.put("c", b"1234567890")
+        assert cache.get("a") is None
+        assert cache.get("c") == b"1234567890"
+
+
+class TestBlobEndpoint:
+    """Tests for the blob download endpoint."""
+
+    def test_get_blob(self, client, store):
+        """Full download carries immutable caching headers."""
+        blob_id = store.put(PNG_BYTES, "image/png")
+        response = client.get(f"/api/v1/blobs/{blob_id}")
+        assert response.status_code == 200
+        assert response.content == PNG_BYTES
+        assert response.headers["content-type"] == "image/png"
+        assert response.headers["etag"] == f'"{blob_id[:64]}"'
+        assert "immutable" in response.headers["cache-control"]
+        assert response.headers["accept-ranges"] == "bytes"
+        assert response.headers["x-content-type-options"] == "nosniff"
+        assert response.headers["content-security-policy"] == "default-src 'none'"
+
+    def test_get_blob_not_found(self, client):
+        """Unknown blob ids return 404."""
+        response = client.get(f"/api/v1/blobs/{'0' * 64}.png")
+        assert response.status_code == 404
+
+    def test_if_none_match(self, client, store):
+        """Matching ETag returns 304 without a body."""
+        blob_id = store.put(PNG_BYTES, "image/png")
+        etag = client.get(f"/api/v1/blobs/{blob_id}").headers["etag"]
+        response = client.get(
+            f"/api/v1/blobs/{blob_id}",
+            headers={"If-None-Match": etag}
+        )
+        assert response.status_code == 304
+        assert response.content == b""
+
+    @pytest.mark.parametrize("range_header,expected", [
+        ("bytes=0-9", slice(0, 10)),
+        ("bytes=100-", slice(100, None)),
+        ("bytes=-16", slice(-16, None)),
+    ])
+    def test_range_request(self, client, store, range_header, expected):
+        """Single byte ranges return 206 with the requested slice."""
+        blob_id = store.put(PNG_BYTES, "image/png")
+        # Twice, so the second request is served from the hot cache path too
+        for _ in range(2):
+            response = client.get(
+                f"/api/v1/blobs/{blob_id}",
+                headers={"Range": range_header}
+            )
+            assert response.status_code == 206
+            assert response.content == PNG_BYTES[expected]
+            assert response.headers["content-range"].endswith(f"/{len(PNG_BYTES)}")
+
+    def test_range_not_satisfiable(self, client, store):
+        """Ranges beyond the end of the blob return 416."""
+        blob_id = store.put(PNG_BYTES, "image/png")
+        response = client.get(
+            f"/api/v1/blobs/{blob_id}",
+            headers={"Range": f"bytes={len(PNG_BYTES)}-"}
+        )
+        assert response.status_code == 416
+        assert response.headers["content-range"] == f"bytes */{len(PNG_BYTES)}"
+
+    def test_hot_cache_serves_small_blob(self, client, store):
+        """Small blobs are cached after repeated requests."""
+        data = b"GIF89a" + b"\x00" * 64
+        blob_id = store.put(data, "image/gif")
+        for _ in range(3):
+            assert client.get(f"/api/v1/blobs/{blob_id}").content == data
+        assert store.hot_cache.get(blob_id) == data
+
+    def test_head_blob(self, client, store):
+        """HEAD returns headers only."""
+        blob_id = store.put(PNG_BYTES, "image/png")
+        response = client.head(f"/api/v1/blobs/{blob_id}")
+        assert response.status_code == 200
+        assert response.headers["content-length"] == str(len(PNG_BYTES))
+        assert response.content == b""
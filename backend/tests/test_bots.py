@@ -2,51 +2,6 @@ import pytest
 from datetime import datetime
 from uuid import uuid4, UUID
 
-from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
-
-from app.main import app
-from app.database import Base, get_db
-from app.config import settings
-
-
-# Create test database engine
-SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
-
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
-)
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-
-def override_get_db():
-    """Override database dependency for testing."""
-    try:
-        db = TestingSessionLocal()
-        yield db
-    finally:
-        db.close()
-
-
-app.dependency_overrides[get_db] = override_get_db
-
-
-@pytest.fixture(scope="function")
-def client():
-    """Create a test client with fresh database."""
-    # Create tables
-    Base.metadata.create_all(bind=engine)
-
-    with TestClient(app) as test_client:
-        yield test_client
-
-    # Drop tables after test
-    Base.metadata.drop_all(bind=engine)
-
 
 @pytest.fixture
 def sample_bot_data():
@@ -62,16 +17,6 @@ def sample_bot_data():
     }
 
 
-@pytest.fixture
-def auth_headers():
-    """Create authorization headers with a test token."""
-    # Create a test token
-    from app.core.security import create_access_token
-    test_user_id = uuid4()
-    token = create_access_token(data={"sub": str(test_user_id)})
-    return {"Authorization": f"Bearer {token}"}
-
-
 class TestHealthEndpoint:
     """Tests for health check endpoint."""
 
@@ -134,7 +79,7 @@ class TestBotRegistration:
     def test_register_bot_unauthorized(self, client, sample_bot_data):
         """Test registration without auth fails."""
         response = client.post("/api/v1/bots/register", json=sample_bot_data)
-        assert response.status_code == 403
+        assert response.status_code == 401
 
 
 class TestBotHeartbeat:
@@ -165,6 +110,65 @@ class TestBotHeartbeat:
         assert data["version"] == "1.1.0"
         assert data["last_heartbeat_at"] is not None
 
+    def test_heartbeat_unclaimed_bot(self, client):
+        """Test heartbeat from a self-registered bot that has no owner yet."""
+        client.post("/api/v1/claim/bots/register", json={"bot_id": "self-registered", "bot_name": "Self"})
+        response = client.post("/api/v1/bots/self-registered/heartbeat", json={"status": "online"})
+        assert response.status_code == 200
+        assert response.json()["owner_id"] is None
+
+    def test_unchanged_heartbeat_only_writes_liveness(self, client, sample_bot_data, auth_headers):
+        """Test that a repeated heartbeat does not rewrite state or bump updated_at."""
+        from sqlalchemy import event
+        from app.database import engine
+
+        client.post("/api/v1/bots/register", json=sample_bot_data, headers=auth_headers)
+        url = f"/api/v1/bots/{sample_bot_data['bot_id']}/heartbeat"
+        heartbeat_data = {"status": "online", "capabilities": {"can_chat": True}, "version": "1.1.0"}
+        first = client.post(url, json=heartbeat_data).json()
+
+        updates = []
+        capture = lambda conn, cursor, statement, *args: statement.startswith("UPDATE bots") and updates.append(statement)
+        event.listen(engine, "before_cursor_execute", capture)
+        try:
+            second = client.post(url, json=heartbeat_data).json()
+        finally:
+            event.remove(engine, "before_cursor_execute", capture)
+
+        assert len(updates) == 1
+        assert "capabilities" not in updates[0] and "status" not in updates[0]
+        assert second["updated_at"] == first["updated_at"]
+        assert second["last_heartbeat_at"] > first["last_heartbeat_at"]
+
+    def test_changed_heartbeat_is_written(self, client, sample_bot_data, auth_headers):
+        """Test that a changed version or capabilities are stored and bump updated_at."""
+        client.post("/api/v1/bots/register", json=sample_bot_data, headers=auth_headers)
+        url = f"/api/v1/bots/{sample_bot_data['bot_id']}/heartbeat"
+        first = client.post(url, json={"status": "online", "version": "1.1.0"}).json()
+
+        second = client.post(url, json={"status": "online", "version": "1.2.0"}).json()
+        assert second["version"] == "1.2.0"
+        assert second["updated_at"] > first["updated_at"]
+
+        third = client.post(url, json={"status": "online", "capabilities": {"can_draw": True}}).json()
+        assert third["capabilities"] == {"can_draw": True}
+        assert third["version"] == "1.2.0"
+
+    def test_heartbeat_after_update_restores_reported_state(self, client, sample_bot_data, auth_headers):
+        """Test that the cached fingerprint is not trusted after another write to the bot."""
+        client.post("/api/v1/bots/register", json=sample_bot_data, headers=auth_headers)
+        url = f"/api/v1/bots/{sample_bot_data['bot_id']}/heartbeat"
+        heartbeat_data = {"status": "online", "capabilities": {"can_chat": True}}
+        client.post(url, json=heartbeat_data)
+        client.patch(
+            f"/api/v1/bots/{sample_bot_data['bot_id']}",
+            json={"capabilities": {"can_fly": True}},
+            headers=auth_headers
+        )
+
+        response = client.post(url, json=heartbeat_data)
+        assert response.json()["capabilities"] == {"can_chat": True}
+
     def test_heartbeat_not_found(self, client):
         """Test heartbeat for non-existent bot."""
         response = client.post(
@@ -371,3 +375,119 @@ class TestBotDelete:
             headers=auth_headers
         )
         assert response.status_code == 404
+
+
+class TestBotStats:
+    """Tests for the cached fleet stats endpoint."""
+
+    def register(self, client, auth_headers, bot_id, owner_id, version="1.0.0"):
+        response = client.post(
+            "/api/v1/bots/register",
+            json={"bot_id": bot_id, "bot_name": bot_id, "owner_id": owner_id, "version": version},
+            headers=auth_headers
+        )
+        assert response.status_code == 201
+
+    def test_counts_by_facet(self, client, auth_headers):
+        """Test counts by status, owner, version and claim state."""
+        owner = str(uuid4())
+        self.register(client, auth_headers, "stats-1", owner)
+        self.register(client, auth_headers, "stats-2", owner, version="2.0.0")
+        client.post("/api/v1/claim/bots/register", json={"bot_id": "stats-3", "bot_name": "stats-3"})
+        client.post("/api/v1/bots/stats-1/heartbeat", json={"status": "online"})
+
+        data = client.get("/api/v1/bots/stats").json()
+        assert data["total"] == 3
+        assert (data["claimed"], data["unclaimed"]) == (2, 1)
+        assert data["by_status"] == {"online": 1, "offline": 1, "unclaimed": 1}
+        assert data["by_version"] == {"1.0.0": 1, "2.0.0": 1, "unknown": 1}
+        assert data["by_owner"] == {owner: 2}
+        assert data["owners"] == 1
+
+    def test_changes_are_applied_without_rescanning(self, client, auth_headers, query_budget):
+        """Test that register, heartbeat transitions and delete update the cached counts."""
+        owner = str(uuid4())
+        self.register(client, auth_headers, "stats-1", owner)
+        query_budget(client.get("/api/v1/bots/stats"), 1)
+
+        self.register(client, auth_headers, "stats-2", owner)
+        client.post("/api/v1/bots/stats-1/heartbeat", json={"status": "busy", "version": "1.1.0"})
+        client.post("/api/v1/bots/stats-2/heartbeat", json={"status": "online"})
+        client.delete("/api/v1/bots/stats-2", headers=auth_headers)
+
+        response = client.get("/api/v1/bots/stats")
+        assert query_budget(response, 0) == 0
+        data = response.json()
+        assert data["total"] == 1
+        assert data["by_status"] == {"busy": 1}
+        assert data["by_version"] == {"1.1.0": 1}
+        assert data["by_owner"] == {owner: 1}
+
+    def test_rolled_back_changes_are_discarded(self, client, db, auth_headers):
+        """Test that changes in a rolled back transaction do not reach the counts."""
+        from app.models.bot import Bot
+
+        self.register(client, auth_headers, "stats-1", str(uuid4()))
+        client.get("/api/v1/bots/stats")
+        bot = db.query(Bot).filter(Bot.bot_id == "stats-1").one()
+        bot.status = "error"
+        db.flush()
+        db.rollback()
+
+        assert client.get("/api/v1/bots/stats").json()["by_status"] == {"offline": 1}
+
+    def test_reloads_after_ttl(self, client, auth_headers, query_budget, monkeypatch):
+        """Test that expired counts are reloaded with one grouped query."""
+        from app.services.bot_stats import bot_stats
+
+        self.register(client, auth_headers, "stats-1", str(uuid4()))
+        client.get("/api/v1/bots/stats")
+        monkeypatch.setattr(bot_stats, "ttl", 0)
+        response = client.get("/api/v1/bots/stats")
+        assert query_budget(response, 1) == 1
+        assert response.json()["total"] == 1
+
+
+class TestBotAvatar:
+    """Tests for avatar uploads to the local blob store."""
+
+    PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 64
+
+    @pytest.fixture
+    def owner(self, client, db, monkeypatch, tmp_path, headers_for):
+        from app.models.claim import User
+        from app.services.storage import LocalBlobStore
+
+        monkeypatch.setattr("app.api.v1.claim.get_blob_store", lambda: LocalBlobStore(str(tmp_path)))
+        user = User(feishu_user_id="avatar-owner", name="Avatar Owner")
+        db.add(user)
+        db.commit()
+        headers = headers_for(user.id)
+        client.post(
+            "/api/v1/bots/register",
+            json={"bot_id": "avatar-bot", "bot_name": "Avatar Bot", "owner_id": str(user.id)},
+            headers=headers
+        )
+        return headers
+
+    def upload(self, client, headers, data, content_type):
+        return client.post(
+            "/api/v1/claim/bots/avatar-bot/avatar",
+            files={"file": ("avatar", data, content_type)},
+            headers=headers
+        )
+
+    def test_raster_image_is_stored_by_its_real_type(self, client, owner):
+        response = self.upload(client, owner, self.PNG, "image/png")
+        assert response.status_code == 200
+        assert response.json()["avatar_url"].endswith(".png")
+
+    def test_rejects_svg_and_disguised_files(self, client, owner):
+        svg = b'<svg xmlns="http://www.w3.org/2000/svg"><script>alert(1)</script></svg>'
+        assert self.upload(client, owner, svg, "image/svg+xml").status_code == 400
+        # Declared as PNG, but the bytes are not
+        assert self.upload(client, owner, svg, "image/png").status_code == 400
+
+    def test_rejects_oversized_uploads(self, client, owner, monkeypatch):
+        monkeypatch.setattr("app.config.settings.AVATAR_MAX_BYTES", 32)
+        assert self.upload(client, owner, self.PNG, "image/png").status_code == 413
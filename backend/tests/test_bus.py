@@ -0,0 +1,235 @@
+import asyncio
+import time
+from datetime import timedelta
+from uuid import UUID
+
+import pytest
+from sqlalchemy import event
+
+from app.config import settings
+from app.database import engine
+from app.models.bot import Bot
+from app.models.claim import BotAccessGrant, ClaimType
+from app.services.message_bus import MemoryBusBackend, create_bus_backend, new_envelope, set_bus
+from app.services.permissions import PERMISSION_INVOKE
+
+OTHER_OWNER = "00000000-0000-0000-0000-0000000000bb"
+
+
+@pytest.fixture(params=["memory", "database"])
+def bus(request, client):
+    backend = create_bus_backend(request.param)
+    set_bus(backend)
+    yield backend
+    backend.clear()
+    set_bus(None)
+
+
+@pytest.fixture
+def bots(client, owner_id, headers_for):
+    """alice and bob belong to the owner, carol to OTHER_OWNER."""
+    for bot_id, owner in (("alice", owner_id), ("bob", owner_id), ("carol", OTHER_OWNER)):
+        client.post(
+            "/api/v1/bots/register",
+            json={"bot_id": bot_id, "bot_name": bot_id.title(), "owner_id": owner},
+            headers=headers_for(owner)
+        )
+
+
+def bus_uuid(client, bot_id):
+    return UUID(client.get(f"/api/v1/bots/{bot_id}").json()["id"])
+
+
+def send(client, sender, to, payload, headers):
+    return client.post(f"/api/v1/bus/bots/{sender}/send", json={"to": to, "payload": payload}, headers=headers)
+
+
+def publish(client, sender, topic, payload, headers):
+    return client.post(
+        f"/api/v1/bus/bots/{sender}/publish", json={"topic": topic, "payload": payload}, headers=headers
+    )
+
+
+def subscribe(client, bot_id, topic, headers):
+    return client.post(f"/api/v1/bus/bots/{bot_id}/subscriptions", json={"topic": topic}, headers=headers)
+
+
+def receive(client, bot_id, headers, **params):
+    response = client.get(f"/api/v1/bus/bots/{bot_id}/messages", params=params, headers=headers)
+    assert response.status_code == 200
+    return response.json()
+
+
+class TestDirectMessages:
+    """Tests for sending straight to a bot's inbox."""
+
+    def test_send_receive_ack(self, client, bus, bots, owner_headers):
+        response = send(client, "alice", "bob", {"hi": 1}, headers=owner_headers)
+        assert response.status_code == 202
+        assert response.json() == {"delivered": 1, "rejected": 0}
+
+        [message] = receive(client, "bob", headers=owner_headers)
+        assert message["sender"] == "alice"
+        assert message["payload"] == {"hi": 1}
+        assert message["topic"] is None
+        assert message["attempts"] == 1
+        # Leased messages are hidden until the ack timeout
+        assert receive(client, "bob", headers=owner_headers) == []
+
+        response = client.post(
+            "/api/v1/bus/bots/bob/messages/ack", json={"ids": [message["id"]]}, headers=owner_headers
+        )
+        assert response.json() == {"acked": 1}
+        assert bus.depth(bus_uuid(client, "bob")) == 0
+
+    def test_unacked_messages_are_redelivered(self, client, bus, bots, owner_headers):
+        bus.ack_timeout = timedelta(0)
+        send(client, "alice", "bob", "first", headers=owner_headers)
+        send(client, "alice", "bob", "second", headers=owner_headers)
+
+        assert [m["payload"] for m in receive(client, "bob", max=1, headers=owner_headers)] == ["first"]
+        redelivered = receive(client, "bob", headers=owner_headers)
+        assert [(m["payload"], m["attempts"]) for m in redelivered] == [("first", 2), ("second", 1)]
+
+    def test_full_inbox_applies_backpressure(self, client, bus, bots, owner_headers):
+        bus.queue_size = 1
+        send(client, "alice", "bob", 1, headers=owner_headers)
+        response = send(client, "alice", "bob", 2, headers=owner_headers)
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "1"
+
+    def test_rejects_oversized_payloads_and_unknown_bots(self, client, bus, bots, monkeypatch, owner_headers):
+        monkeypatch.setattr(settings, "BUS_MAX_PAYLOAD_BYTES", 10)
+        assert send(client, "alice", "bob", "x" * 20, headers=owner_headers).status_code == 413
+
+        assert send(client, "alice", "nobody", 1, headers=owner_headers).status_code == 404
+        assert send(client, "nobody", "bob", 1, headers=owner_headers).status_code == 404
+
+    def test_expired_messages_are_dropped(self, client, bus, bots, monkeypatch, owner_headers):
+        monkeypatch.setattr(settings, "BUS_RETENTION", -1)
+        send(client, "alice", "bob", 1, headers=owner_headers)
+        assert receive(client, "bob", headers=owner_headers) == []
+        assert bus.prune() in (0, 1)
+        assert bus.depth(bus_uuid(client, "bob")) == 0
+
+
+class TestBusAuthorization:
+    """Tests that callers can only act as bots they own."""
+
+    def test_requires_authentication(self, client, bus, bots):
+        assert client.post("/api/v1/bus/bots/alice/send", json={"to": "bob", "payload": 1}).status_code == 401
+        assert client.get("/api/v1/bus/bots/bob/messages").status_code == 401
+        assert client.post("/api/v1/bus/bots/bob/messages/ack", json={"ids": [str(UUID(int=1))]}).status_code == 401
+
+    def test_cannot_act_as_someone_elses_bot(self, client, bus, bots, owner_headers, headers_for):
+        send(client, "alice", "bob", "secret", headers=owner_headers)
+
+        # Posing as alice, or reading and acking bob's inbox, needs alice's / bob's owner
+        assert send(client, "alice", "bob", 1, headers=headers_for(OTHER_OWNER)).status_code == 403
+        assert publish(client, "alice", "news", 1, headers=headers_for(OTHER_OWNER)).status_code == 403
+        assert subscribe(client, "bob", "news", headers=headers_for(OTHER_OWNER)).status_code == 403
+        response = client.get("/api/v1/bus/bots/bob/messages", headers=headers_for(OTHER_OWNER))
+        assert response.status_code == 403
+        assert [m["payload"] for m in receive(client, "bob", headers=owner_headers)] == ["secret"]
+
+    def test_direct_messages_need_invoke_permission(self, client, db, bus, bots, owner_id, owner_headers, headers_for):
+        assert send(client, "alice", "carol", 1, headers=owner_headers).status_code == 403
+
+        carol = db.query(Bot).filter(Bot.bot_id == "carol").one()
+        db.add(BotAccessGrant(
+            bot_id=carol.id,
+            user_id=UUID(owner_id),
+            access_type=ClaimType.SHARE,
+            permissions={PERMISSION_INVOKE: True},
+            is_active=True,
+        ))
+        db.commit()
+
+        assert send(client, "alice", "carol", 1, headers=owner_headers).status_code == 202
+        [message] = receive(client, "carol", headers=headers_for(OTHER_OWNER))
+        assert message["sender"] == "alice"
+
+
+class TestTopics:
+    """Tests for topic subscriptions and fan-out."""
+
+    def test_subscriptions(self, client, bus, bots, owner_headers):
+        url = "/api/v1/bus/bots/bob/subscriptions"
+        assert subscribe(client, "bob", "news", headers=owner_headers).status_code == 201
+        response = subscribe(client, "bob", "alerts", headers=owner_headers)
+        assert response.json() == {"topics": ["alerts", "news"]}
+        assert subscribe(client, "bob", "news", headers=owner_headers).status_code == 200
+        assert subscribe(client, "bob", "bad topic", headers=owner_headers).status_code == 422
+
+        assert client.delete(f"{url}/news", headers=owner_headers).status_code == 204
+        assert client.delete(f"{url}/news", headers=owner_headers).status_code == 404
+        assert client.get(url, headers=owner_headers).json() == {"topics": ["alerts"]}
+
+    def test_fan_out_skips_full_inboxes(self, client, bus, bots, owner_headers, headers_for):
+        subscribe(client, "bob", "news", headers=owner_headers)
+        subscribe(client, "carol", "news", headers=headers_for(OTHER_OWNER))
+        bus.queue_size = 1
+        send(client, "carol", "carol", "busy", headers=headers_for(OTHER_OWNER))
+
+        response = publish(client, "alice", "news", "hello", headers=owner_headers)
+        assert response.status_code == 202
+        assert response.json() == {"delivered": 1, "rejected": 1}
+
+        [message] = receive(client, "bob", headers=owner_headers)
+        assert (message["topic"], message["sender"], message["payload"]) == ("news", "alice", "hello")
+        assert [m["payload"] for m in receive(client, "carol", headers=headers_for(OTHER_OWNER))] == ["busy"]
+
+    def test_publish_without_subscribers(self, client, bus, bots, owner_headers):
+        assert publish(client, "alice", "empty", 1, headers=owner_headers).json() == {"delivered": 0, "rejected": 0}
+
+
+class TestLongPolling:
+    """Tests for waiting on an empty inbox."""
+
+    def test_wait_times_out_empty(self, client, bus, bots, monkeypatch, owner_headers):
+        monkeypatch.setattr(settings, "BUS_POLL_INTERVAL", 0.05)
+        started = time.monotonic()
+        assert receive(client, "bob", wait=0.2, headers=owner_headers) == []
+        assert time.monotonic() - started >= 0.2
+
+    def test_waiting_holds_no_database_connection(self, client, bots, owner_headers):
+        checked_out = []
+
+        def on_checkout(*args):
+            checked_out.append(1)
+
+        def on_checkin(*args):
+            checked_out.pop()
+
+        class RecordingBus(MemoryBusBackend):
+            async def fetch(self, bot_uuid, limit, wait=0.0):
+                self.connections_while_waiting = len(checked_out)
+                return await super().fetch(bot_uuid, limit, wait)
+
+        backend = RecordingBus(settings.BUS_QUEUE_SIZE, settings.BUS_ACK_TIMEOUT)
+        set_bus(backend)
+        event.listen(engine, "checkout", on_checkout)
+        event.listen(engine, "checkin", on_checkin)
+        try:
+            assert receive(client, "bob", wait=0.05, headers=owner_headers) == []
+        finally:
+            event.remove(engine, "checkout", on_checkout)
+            event.remove(engine, "checkin", on_checkin)
+            set_bus(None)
+        assert backend.connections_while_waiting == 0
+
+    def test_delivery_wakes_waiting_receiver(self, client, bus, bots, monkeypatch):
+        monkeypatch.setattr(settings, "BUS_POLL_INTERVAL", 10)
+        bob = bus_uuid(client, "bob")
+
+        async def scenario():
+            waiting = asyncio.create_task(bus.fetch(bob, 10, wait=5))
+            await asyncio.sleep(0.05)
+            started = time.monotonic()
+            bus.send([bob], new_envelope("alice", "ping"))
+            messages = await waiting
+            return messages, time.monotonic() - started
+
+        messages, waited = asyncio.run(scenario())
+        assert [m.payload for m in messages] == ["ping"]
+        assert waited < 1
@@ -0,0 +1,150 @@
+import asyncio
+from uuid import UUID
+
+import httpx
+import pytest
+
+from app.api.v1 import claim as claim_api
+from app.config import settings
+from app.core.idempotency import IdempotencyMiddleware
+from app.main import app
+from app.models.bot import Bot
+from app.models.claim import ClaimRequest, User
+from benchmarks.common import FakeFeishuService
+
+USER_ID = "00000000-0000-0000-0000-0000000000bb"
+
+
+def keyed(headers, key):
+    return {**headers, "Idempotency-Key": key}
+
+
+@pytest.fixture
+def bot_data(owner_id):
+    def build(bot_id="idem-bot"):
+        return {"bot_id": bot_id, "bot_name": bot_id, "owner_id": owner_id}
+
+    return build
+
+
+class TestIdempotencyKeys:
+    """Tests for replaying write requests that carry an Idempotency-Key."""
+
+    def test_retry_replays_first_response(self, client, db):
+        first = client.post("/api/v1/claim/bots/register", json={"bot_id": "self", "bot_name": "Self"},
+                            headers={"Idempotency-Key": "k1"})
+        retry = client.post("/api/v1/claim/bots/register", json={"bot_id": "self", "bot_name": "Self"},
+                            headers={"Idempotency-Key": "k1"})
+        assert first.status_code == retry.status_code == 200
+        assert retry.json() == first.json()
+        assert retry.headers["Idempotent-Replayed"] == "true"
+        assert "Idempotent-Replayed" not in first.headers
+        assert db.query(Bot).count() == 1
+
+        # Without a key the retry is a conflict as before
+        again = client.post("/api/v1/claim/bots/register", json={"bot_id": "self", "bot_name": "Self"})
+        assert again.status_code == 409
+
+    def test_key_reuse_with_different_body(self, client, owner_headers, bot_data):
+        headers = keyed(owner_headers, "k2")
+        assert client.post("/api/v1/bots/register", json=bot_data("a"), headers=headers).status_code == 201
+        response = client.post("/api/v1/bots/register", json=bot_data("b"), headers=headers)
+        assert response.status_code == 422
+
+    def test_keys_are_scoped_per_caller(self, client, owner_headers, headers_for, bot_data):
+        response = client.post("/api/v1/bots/register", json=bot_data("a"), headers=keyed(owner_headers, "k"))
+        assert response.status_code == 201
+        response = client.post("/api/v1/bots/register", json=bot_data("a"), headers=keyed(headers_for(USER_ID), "k"))
+        assert response.status_code == 409
+        assert "Idempotent-Replayed" not in response.headers
+
+    def test_concurrent_duplicates_run_once(self, client, db, owner_headers, bot_data):
+        async def storm():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as async_client:
+                return await asyncio.gather(*(
+                    async_client.post("/api/v1/bots/register", json=bot_data(), headers=keyed(owner_headers, "storm"))
+                    for _ in range(5)
+                ))
+
+        responses = asyncio.run(storm())
+        assert [r.status_code for r in responses] == [201] * 5
+        assert len({r.json()["id"] for r in responses}) == 1
+        assert sum(r.headers.get("Idempotent-Replayed") == "true" for r in responses) == 4
+        assert db.query(Bot).count() == 1
+
+    def test_claim_retry_skips_feishu_verification(
+        self, client, db, monkeypatch, owner_id, owner_headers, headers_for, bot_data
+    ):
+        calls = []
+
+        class CountingFeishu(FakeFeishuService):
+            def get_user_info_by_code(self, code):
+                calls.append(code)
+                return super().get_user_info_by_code(code)
+
+        monkeypatch.setattr(claim_api, "get_feishu_service", lambda *args, **kwargs: CountingFeishu())
+        db.add_all([
+            User(id=UUID(owner_id), feishu_user_id="owner", name="owner"),
+            User(id=UUID(USER_ID), feishu_user_id="user", name="user"),
+        ])
+        db.commit()
+        client.post("/api/v1/bots/register", json=bot_data(), headers=owner_headers)
+
+        request = {"bot_id": "idem-bot", "claim_type": "hire", "feishu_code": "user"}
+        responses = [
+            client.post("/api/v1/claim/request", json=request, headers=keyed(headers_for(USER_ID), "claim-1"))
+            for _ in range(3)
+        ]
+        assert [r.status_code for r in responses] == [200] * 3
+        assert calls == ["user"]
+        assert db.query(ClaimRequest).count() == 1
+
+    def test_slow_request_keeps_its_lock(self, monkeypatch):
+        """Another worker must not run the write again while the first one is still going."""
+        monkeypatch.setattr(settings, "IDEMPOTENCY_ROUTES", "POST /slow")
+        monkeypatch.setattr(settings, "IDEMPOTENCY_LOCK_TTL", 0.1)
+        calls = []
+
+        async def slow_app(scope, receive, send):
+            calls.append(scope["path"])
+            await asyncio.sleep(0.5)
+            await send({"type": "http.response.start", "status": 201, "headers": [(b"content-type", b"text/plain")]})
+            await send({"type": "http.response.body", "body": b"done"})
+
+        async def twice():
+            # Two middleware instances stand in for two workers sharing the state backend
+            clients = [
+                httpx.AsyncClient(
+                    transport=httpx.ASGITransport(app=IdempotencyMiddleware(slow_app)), base_url="http://test"
+                )
+                for _ in range(2)
+            ]
+            first = asyncio.create_task(clients[0].post("/slow", headers={"Idempotency-Key": "slow"}))
+            await asyncio.sleep(0.2)
+            second = await clients[1].post("/slow", headers={"Idempotency-Key": "slow"})
+            return await first, second
+
+        first, second = asyncio.run(twice())
+        assert calls == ["/slow"]
+        assert first.status_code == second.status_code == 201
+        assert second.headers["Idempotent-Replayed"] == "true"
+
+    def test_stored_responses_are_capped_per_caller(
+        self, client, db, monkeypatch, owner_headers, headers_for, bot_data
+    ):
+        sample = client.post("/api/v1/bots/register", json=bot_data("sample"), headers=owner_headers)
+        # Room for one stored response (kept base64 encoded), not two
+        monkeypatch.setattr(settings, "IDEMPOTENCY_MAX_STORED_BYTES", len(sample.content) * 3 // 2)
+        client.post("/api/v1/bots/register", json=bot_data("a"), headers=keyed(owner_headers, "a"))
+        client.post("/api/v1/bots/register", json=bot_data("b"), headers=keyed(owner_headers, "b"))
+
+        response = client.post("/api/v1/bots/register", json=bot_data("a"), headers=keyed(owner_headers, "a"))
+        assert response.headers["Idempotent-Replayed"] == "true"
+        # Over the quota the response was returned but not kept for replay
+        response = client.post("/api/v1/bots/register", json=bot_data("b"), headers=keyed(owner_headers, "b"))
+        assert response.status_code == 409
+        # Other callers have their own quota
+        client.post("/api/v1/bots/register", json=bot_data("c"), headers=keyed(headers_for(USER_ID), "c"))
+        response = client.post("/api/v1/bots/register", json=bot_data("c"), headers=keyed(headers_for(USER_ID), "c"))
+        assert response.headers["Idempotent-Replayed"] == "true"
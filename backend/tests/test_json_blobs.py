@@ -0,0 +1,112 @@
+import pytest
+from sqlalchemy import event
+
+from app.models.bot import Bot
+from app.models.json_blob import JsonBlob
+from app.models.skill import Skill
+from app.services.json_blobs import hash_json, put_json
+
+LARGE_CAPABILITIES = {
+    "translate": {"languages": [f"lang-{n}" for n in range(200)]},
+    "search": {"engines": ["web", "docs"]},
+}
+
+
+@pytest.fixture
+def register(client, owner_id, owner_headers):
+    """Register a bot of the owner with the given capabilities."""
+    def post(bot_id, capabilities):
+        return client.post(
+            "/api/v1/bots/register",
+            json={"bot_id": bot_id, "bot_name": bot_id, "owner_id": owner_id, "capabilities": capabilities},
+            headers=owner_headers
+        )
+
+    return post
+
+
+class TestJsonBlobs:
+    """Tests for content-addressed JSON storage."""
+
+    def test_hash_ignores_key_order(self):
+        assert hash_json({"a": 1, "b": [1, 2]}) == hash_json({"b": [1, 2], "a": 1})
+        assert hash_json({"a": 1})[0] != hash_json({"a": 2})[0]
+
+    def test_identical_payloads_are_stored_once(self, client, db):
+        first = put_json(db, {"x": 1, "y": 2})
+        second = put_json(db, {"y": 2, "x": 1})
+        db.commit()
+        assert first == second
+        assert db.query(JsonBlob).count() == 1
+
+
+class TestSkillContent:
+    """Tests for skill content stored as a blob reference."""
+
+    def test_content_is_deduplicated_and_loaded_lazily(self, client, db, auth_headers):
+        content = {"name": "ecs", "steps": ["create", "start"]}
+        for version in ("1.0", "1.1"):
+            client.post(
+                "/api/v1/skills",
+                json={"name": "ecs", "version": version, "content": content},
+                headers=auth_headers
+            )
+        assert db.query(JsonBlob).count() == 1
+        assert len({s.content_hash for s in db.query(Skill)}) == 1
+
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        engine = db.get_bind()
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            response = client.get("/api/v1/skills")
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+        assert response.json()["total"] == 2
+        assert not any("json_blobs" in s for s in statements)
+
+        skill_id = response.json()["items"][0]["skill_id"]
+        detail = client.post(f"/api/v1/skills/{skill_id}/download").json()
+        assert detail["content"] == content
+
+
+class TestBotCapabilities:
+    """Tests for large bot capabilities moved out of the bots row."""
+
+    def test_small_capabilities_stay_inline(self, client, db, register):
+        register("small-bot", {"translate": True})
+        bot = db.query(Bot).filter(Bot.bot_id == "small-bot").one()
+        assert bot.capabilities == {"translate": True}
+        assert bot.capabilities_ref is None
+
+    def test_large_capabilities_keep_summary_inline(self, client, db, register):
+        register("big-bot-1", LARGE_CAPABILITIES)
+        register("big-bot-2", LARGE_CAPABILITIES)
+
+        bots = db.query(Bot).order_by(Bot.bot_id).all()
+        assert [b.capabilities for b in bots] == [{"search": True, "translate": True}] * 2
+        assert bots[0].capabilities_ref == bots[1].capabilities_ref
+        assert db.query(JsonBlob).count() == 1
+
+        listed = client.get("/api/v1/bots").json()["items"]
+        assert listed[0]["capabilities"] == {"search": True, "translate": True}
+        detail = client.get("/api/v1/bots/big-bot-1").json()
+        assert detail["capabilities"] == LARGE_CAPABILITIES
+
+    def test_unchanged_heartbeat_capabilities_are_not_rewritten(self, client, db, register):
+        register("big-bot", LARGE_CAPABILITIES)
+        bot = db.query(Bot).filter(Bot.bot_id == "big-bot").one()
+        ref = bot.capabilities_ref
+
+        client.post("/api/v1/bots/big-bot/heartbeat", json={"status": "online", "capabilities": LARGE_CAPABILITIES})
+        db.expire_all()
+        assert bot.capabilities_ref == ref
+
+        # Shrinking back under the limit moves the capabilities inline again
+        client.post("/api/v1/bots/big-bot/heartbeat", json={"status": "online", "capabilities": {"search": True}})
+        db.expire_all()
+        assert bot.capabilities == {"search": True}
+        assert bot.capabilities_ref is None
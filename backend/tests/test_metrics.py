@@ -0,0 +1,84 @@
+import threading
+
+from app.core.metrics import Counter, Gauge, Histogram, statement_operation
+
+
+def sample(text, line_prefix):
+    """Value of the first exposition line starting with the given prefix."""
+    for line in text.splitlines():
+        if line.startswith(line_prefix):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"{line_prefix} not found")
+
+
+class TestMetricTypes:
+    """Tests for the sharded metric primitives and exposition format."""
+
+    def test_counter_sums_thread_shards(self):
+        counter = Counter("test_total", "Test", ("kind",))
+        threads = [
+            threading.Thread(target=lambda: [counter.labels("a").inc() for _ in range(1000)])
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert counter.labels("a").get() == 4000
+        assert 'test_total{kind="a"} 4000' in counter.render()
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram("test_seconds", "Test", buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value)
+        text = histogram.render()
+        assert sample(text, 'test_seconds_bucket{le="0.1"}') == 2
+        assert sample(text, 'test_seconds_bucket{le="1"}') == 3
+        assert sample(text, 'test_seconds_bucket{le="+Inf"}') == 4
+        assert sample(text, "test_seconds_count") == 4
+        assert sample(text, "test_seconds_sum") == 3.65
+
+    def test_gauge_and_label_validation(self):
+        gauge = Gauge("test_in_flight", "Test")
+        gauge.inc()
+        gauge.inc()
+        gauge.dec()
+        assert sample(gauge.render(), "test_in_flight") == 1
+        assert sample(Gauge("test_fn", "Test", function=lambda: 7).render(), "test_fn") == 7
+        try:
+            Counter("test_labels_total", "Test", ("a", "b")).labels("only-one")
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("expected ValueError")
+
+    def test_statement_operation(self):
+        assert statement_operation("  SELECT 1") == "select"
+        assert statement_operation("UPDATE bots SET x=1") == "update"
+        assert statement_operation("PRAGMA foreign_keys") == "other"
+
+
+class TestMetricsEndpoint:
+    """Tests for the /metrics endpoint."""
+
+    def test_route_latency_db_and_heartbeats(self, client, auth_headers, owner_id):
+        client.post(
+            "/api/v1/bots/register",
+            json={"bot_id": "metrics-bot", "bot_name": "metrics-bot", "owner_id": owner_id},
+            headers=auth_headers
+        )
+        before = client.get("/metrics").text
+        heartbeats_before = sample(before, 'bothub_bot_heartbeats_total{status="online"}')
+        client.post("/api/v1/bots/metrics-bot/heartbeat", json={"status": "online"})
+        client.get("/api/v1/bots/does-not-exist")
+
+        response = client.get("/metrics")
+        assert response.headers["content-type"].startswith("text/plain")
+        text = response.text
+        assert sample(text, 'bothub_bot_heartbeats_total{status="online"}') == heartbeats_before + 1
+        route = 'method="POST",route="/api/v1/bots/{bot_id}/heartbeat"'
+        assert sample(text, f"bothub_http_request_duration_seconds_count{{{route}}}") >= 1
+        assert sample(text, 'bothub_http_requests_total{method="GET",route="/api/v1/bots/{bot_id}",status="404"}') >= 1
+        assert sample(text, 'bothub_db_queries_total{operation="select"}') > 0
+        # Pre-registered routes are exported before they receive traffic
+        assert 'route="/api/v1/skills/leaderboard"' in text
@@ -0,0 +1,207 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from uuid import UUID, uuid4
+
+import pytest
+
+from app.models.bot import Bot
+from app.models.claim import BotAccessGrant, ClaimType
+from app.models.webhook import WebhookDelivery
+from app.services.grants import expire_grants
+from app.services.permissions import (
+    OWNER_PERMISSIONS,
+    PERMISSION_INVOKE,
+    PERMISSION_VIEW_LOGS,
+    PermissionChangeListener,
+    PermissionEngine,
+    permission_engine,
+)
+
+USER_ID = "00000000-0000-0000-0000-0000000000bb"
+
+
+@pytest.fixture
+def bot(client, db, owner_id, owner_headers):
+    client.post(
+        "/api/v1/bots/register",
+        json={
+            "bot_id": "perm-bot", "bot_name": "perm-bot", "owner_id": owner_id,
+            "endpoint": "http://127.0.0.1:9/webhook",
+        },
+        headers=owner_headers
+    )
+    return db.query(Bot).filter(Bot.bot_id == "perm-bot").one()
+
+
+def grant(db, bot, permissions=None, **fields):
+    access_grant = BotAccessGrant(
+        bot_id=bot.id,
+        user_id=UUID(USER_ID),
+        access_type=ClaimType.SHARE,
+        permissions=permissions or {PERMISSION_INVOKE: True, PERMISSION_VIEW_LOGS: False},
+        is_active=True,
+        **fields
+    )
+    db.add(access_grant)
+    db.commit()
+    return access_grant
+
+
+class TestPermissionEngine:
+    """Tests for effective permissions and cache invalidation."""
+
+    def test_owner_grants_and_strangers(self, client, db, bot, owner_id):
+        grant(db, bot)
+        assert permission_engine.effective_permissions(db, UUID(owner_id), bot) == OWNER_PERMISSIONS
+        assert permission_engine.effective_permissions(db, UUID(USER_ID), bot) == {PERMISSION_INVOKE}
+        assert not permission_engine.can(db, uuid4(), bot)
+        assert not permission_engine.can(db, None, bot)
+
+    def test_repeated_checks_hit_the_cache(self, client, db, bot):
+        grant(db, bot)
+        engine = PermissionEngine(max_entries=10, ttl=60)
+        for _ in range(5):
+            assert engine.can(db, UUID(USER_ID), bot)
+        assert (engine.hits, engine.misses) == (4, 1)
+
+    def test_committed_grant_changes_invalidate(self, client, db, bot):
+        user = UUID(USER_ID)
+        assert not permission_engine.can(db, user, bot)
+        access_grant = grant(db, bot)
+        assert permission_engine.can(db, user, bot)
+
+        access_grant.is_active = False
+        db.flush()
+        # Not visible to the cache until the transaction commits
+        assert permission_engine._entries[(user, bot.id)].version == permission_engine._version(bot.id)
+        db.commit()
+        assert not permission_engine.can(db, user, bot)
+
+    def test_expiry_is_evaluated_per_check(self, client, db, bot):
+        now = datetime.utcnow()
+        grant(db, bot, valid_from=now - timedelta(days=1), valid_until=now + timedelta(hours=1))
+        user = UUID(USER_ID)
+        assert permission_engine.can(db, user, bot, now=now)
+        assert not permission_engine.can(db, user, bot, now=now + timedelta(hours=2))
+
+    def test_cache_is_bounded(self, client, db, bot):
+        engine = PermissionEngine(max_entries=2, ttl=60)
+        for _ in range(3):
+            engine.can(db, uuid4(), bot)
+        assert len(engine) == 2
+
+    def test_bulk_updates_invalidate(self, client, db, bot):
+        user = UUID(USER_ID)
+        grant(db, bot)
+        assert permission_engine.can(db, user, bot)
+
+        db.query(BotAccessGrant).filter(BotAccessGrant.bot_id == bot.id).update({"is_active": False})
+        db.commit()
+        assert not permission_engine.can(db, user, bot)
+
+        grant(db, bot)
+        assert permission_engine.can(db, user, bot)
+        db.query(BotAccessGrant).filter(BotAccessGrant.user_id == user).delete()
+        db.commit()
+        assert not permission_engine.can(db, user, bot)
+
+    def test_versions_are_forgotten_after_the_ttl(self, client, db, bot, monkeypatch):
+        clock = [1000.0]
+        monkeypatch.setattr("app.services.permissions.time.monotonic", lambda: clock[0])
+        engine = PermissionEngine(max_entries=10, ttl=60)
+        user = UUID(USER_ID)
+        engine.invalidate(bot.id)
+        assert not engine.can(db, user, bot)
+        grant(db, bot)
+
+        for _ in range(100):
+            engine.invalidate(uuid4())
+        clock[0] += 61
+        engine.invalidate(uuid4())
+        assert len(engine._versions) == 1
+        # Anything cached under the forgotten version has outlived the ttl as well
+        assert engine.can(db, user, bot)
+
+
+class TestPermissionChecks:
+    """Tests for permission checks on the API."""
+
+    def test_pinned_task_requires_invoke(self, client, db, bot, headers_for):
+        task = {"title": "t", "target_bot_id": "perm-bot"}
+        assert client.post("/api/v1/tasks", json=task, headers=headers_for(USER_ID)).status_code == 403
+        grant(db, bot)
+        assert client.post("/api/v1/tasks", json=task, headers=headers_for(USER_ID)).status_code == 201
+
+    def test_permissions_endpoint(self, client, db, bot, owner_headers, headers_for):
+        grant(db, bot, permissions={PERMISSION_INVOKE: True, PERMISSION_VIEW_LOGS: True})
+        response = client.get("/api/v1/bots/perm-bot/permissions", headers=headers_for(USER_ID))
+        assert response.json() == {
+            "bot_id": "perm-bot",
+            "is_owner": False,
+            "permissions": [PERMISSION_INVOKE, PERMISSION_VIEW_LOGS],
+        }
+        response = client.get("/api/v1/bots/perm-bot/permissions", headers=owner_headers)
+        assert response.json()["is_owner"] is True
+
+
+class TestGrantLifecycle:
+    """Tests for revocation, expiry and cross-process invalidation."""
+
+    def test_revoke_takes_effect_immediately(self, client, db, bot, owner_headers):
+        access_grant = grant(db, bot)
+        user = UUID(USER_ID)
+        assert permission_engine.can(db, user, bot)
+
+        response = client.post(f"/api/v1/grants/{access_grant.id}/revoke", headers=owner_headers)
+        assert response.status_code == 200
+        assert response.json()["is_active"] is False
+        assert response.json()["revoked_at"] is not None
+        assert not permission_engine.can(db, user, bot)
+
+        delivery = db.query(WebhookDelivery).one()
+        assert delivery.event_type == "grant.revoked"
+        assert delivery.payload["data"]["reason"] == "revoked"
+
+        again = client.post(f"/api/v1/grants/{access_grant.id}/revoke", headers=owner_headers)
+        assert again.status_code == 409
+
+    def test_only_owner_or_grantee_can_revoke(self, client, db, bot, owner_headers, headers_for):
+        access_grant = grant(db, bot)
+        url = f"/api/v1/grants/{access_grant.id}/revoke"
+        assert client.post(url, headers=headers_for(str(uuid4()))).status_code == 403
+        assert client.post(url, headers=headers_for(USER_ID)).status_code == 200
+
+        listed = client.get("/api/v1/bots/perm-bot/grants", headers=owner_headers).json()
+        assert listed == []
+        listed = client.get(
+            "/api/v1/bots/perm-bot/grants", params={"active_only": False}, headers=owner_headers
+        ).json()
+        assert [g["id"] for g in listed] == [str(access_grant.id)]
+
+    def test_expired_grants_are_deactivated_in_batches(self, client, db, bot):
+        now = datetime.utcnow()
+        for hours in (-3, -2, -1, 1):
+            grant(db, bot, valid_until=now + timedelta(hours=hours))
+
+        assert expire_grants(db, now=now, batch_size=2) == 2
+        assert expire_grants(db, now=now, batch_size=2) == 1
+        assert expire_grants(db, now=now, batch_size=2) == 0
+        assert db.query(BotAccessGrant).filter(BotAccessGrant.is_active.is_(True)).count() == 1
+        reasons = {d.payload["data"]["reason"] for d in db.query(WebhookDelivery)}
+        assert reasons == {"expired"}
+
+    def test_listener_invalidates_on_notification(self):
+        engine = PermissionEngine(max_entries=10, ttl=60)
+        bot_uuid = uuid4()
+        fake_engine = SimpleNamespace(dialect=SimpleNamespace(name="postgresql"))
+        listener = PermissionChangeListener(fake_engine, engine)
+        listener._connection = SimpleNamespace(
+            poll=lambda: None,
+            notifies=[SimpleNamespace(payload=str(bot_uuid)), SimpleNamespace(payload="garbage")],
+        )
+        assert listener.poll() == 1
+        assert engine._version(bot_uuid) == (0, 1)
+
+    def test_listener_is_disabled_without_postgres(self):
+        fake_engine = SimpleNamespace(dialect=SimpleNamespace(name="sqlite"))
+        assert PermissionChangeListener(fake_engine, PermissionEngine(10, 60)).poll() == 0
@@ -0,0 +1,199 @@
+import sys
+from importlib.metadata import EntryPoint
+from uuid import uuid4
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.core import metrics
+from app.core.plugins import ENTRY_POINT_GROUPS, PluginRegistry, plugin_hook_seconds, plugins
+from app.services.webhooks import EVENT_TASK_ASSIGNED
+
+
+PLUGIN_SOURCE = '''
+import time
+
+from fastapi import APIRouter
+
+heartbeats = []
+events = []
+router = APIRouter()
+
+
+@router.get("/hello")
+def hello():
+    return {"hello": "plugin"}
+
+
+def on_heartbeat(bot, changed):
+    heartbeats.append((bot.bot_id, sorted(changed)))
+
+
+def slow(bot, changed):
+    time.sleep(0.02)
+
+
+def broken(bot, changed):
+    raise RuntimeError("boom")
+
+
+def on_event(event):
+    events.append(event["type"])
+'''
+
+
+@pytest.fixture
+def plugin_module(tmp_path, monkeypatch):
+    """An importable plugin module that nothing has imported yet."""
+    name = f"bothub_test_plugin_{uuid4().hex}"
+    (tmp_path / f"{name}.py").write_text(PLUGIN_SOURCE)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield name
+    sys.modules.pop(name, None)
+    plugins.discover([])
+
+
+def entry_point(module, attr, hook, name=None):
+    return EntryPoint(name or f"{module}-{attr}", f"{module}:{attr}", ENTRY_POINT_GROUPS[hook])
+
+
+def heartbeat(client, bot_id, **fields):
+    response = client.post(f"/api/v1/bots/{bot_id}/heartbeat", json={"status": "online", **fields})
+    assert response.status_code == 200
+    return response.json()
+
+
+@pytest.fixture
+def bot(client, auth_headers, owner_id):
+    client.post(
+        "/api/v1/bots/register",
+        json={"bot_id": "plugin-bot", "bot_name": "Plugin Bot", "owner_id": owner_id},
+        headers=auth_headers
+    )
+    return "plugin-bot"
+
+
+class TestPluginLoading:
+    """Tests for discovering plugins from entry points and importing them on first use."""
+
+    def test_heartbeat_hooks_load_on_first_heartbeat(self, client, bot, plugin_module):
+        plugins.discover([entry_point(plugin_module, "on_heartbeat", "heartbeat")])
+        assert plugin_module not in sys.modules
+        [info] = client.get("/api/v1/plugins").json()
+        assert info["loaded"] is False
+        assert info["import_ms"] is None
+
+        heartbeat(client, bot)
+        heartbeat(client, bot, version="2.0")
+
+        assert sys.modules[plugin_module].heartbeats == [("plugin-bot", ["status"]), ("plugin-bot", ["version"])]
+        [info] = client.get("/api/v1/plugins").json()
+        assert info["loaded"] is True
+        assert info["import_ms"] > 0
+        assert info["calls"] == 2
+        assert info["errors"] == 0
+
+    def test_slow_and_failing_hooks_are_measured_not_fatal(self, client, bot, plugin_module, monkeypatch):
+        monkeypatch.setattr(settings, "PLUGIN_HOOK_BUDGET_MS", 10)
+        plugins.discover([
+            entry_point(plugin_module, "slow", "heartbeat"),
+            entry_point(plugin_module, "broken", "heartbeat"),
+            entry_point("bothub_missing_plugin", "hook", "heartbeat"),
+        ])
+
+        heartbeat(client, bot)
+
+        info = {item["entry_point"].split(":")[-1]: item for item in client.get("/api/v1/plugins").json()}
+        assert info["slow"]["over_budget"] == 1
+        assert info["slow"]["avg_ms"] >= 20
+        assert info["broken"]["errors"] == 1
+        assert info["broken"]["over_budget"] == 0
+        assert info["hook"]["loaded"] is True
+        assert info["hook"]["error"].startswith("ModuleNotFoundError")
+        assert info["hook"]["calls"] == 0
+
+    def test_disabled_plugins_are_not_discovered(self, plugin_module, monkeypatch):
+        monkeypatch.setattr(settings, "PLUGINS_DISABLED", "skipped, other")
+        registry = PluginRegistry()
+        registry.discover([
+            entry_point(plugin_module, "on_heartbeat", "heartbeat", name="skipped"),
+            entry_point(plugin_module, "on_event", "notifications", name="kept"),
+            EntryPoint("unrelated", f"{plugin_module}:on_event", "console_scripts"),
+        ])
+        assert [hook.plugin for hook in registry.hooks("heartbeat")] == []
+        assert [hook.plugin for hook in registry.hooks("notifications")] == ["kept"]
+
+    def test_notification_channels_receive_committed_events(self, client, bot, plugin_module, owner_headers):
+        plugins.discover([entry_point(plugin_module, "on_event", "notifications")])
+
+        response = client.post("/api/v1/tasks", json={"title": "t", "target_bot_id": bot}, headers=owner_headers)
+        assert response.status_code == 201
+        # Channels run on the background worker, not in the request
+        assert plugin_module not in sys.modules
+
+        assert plugins.deliver_notifications() == 1
+        assert sys.modules[plugin_module].events == [EVENT_TASK_ASSIGNED]
+        [info] = client.get("/api/v1/plugins").json()
+        assert info["calls"] == 1
+
+    def test_notification_queue_is_bounded(self, plugin_module):
+        registry = PluginRegistry(queue_size=2)
+        registry.discover([entry_point(plugin_module, "on_event", "notifications")])
+        registry.queue_notifications([{"type": "a"}, {"type": "b"}, {"type": "c"}])
+
+        assert registry.deliver_notifications() == 2
+        assert sys.modules[plugin_module].events == ["a", "b"]
+        assert registry.deliver_notifications() == 0
+
+
+class TestPluginRoutes:
+    """Tests for plugin routers mounted behind a lazy importer."""
+
+    def test_router_is_imported_on_first_request(self, plugin_module):
+        registry = PluginRegistry()
+        registry.discover([
+            entry_point(plugin_module, "router", "routes", name="demo"),
+            entry_point("bothub_missing_plugin", "router", "routes", name="missing"),
+        ])
+        app = FastAPI()
+        registry.mount_routes(app, "/plugins")
+        assert plugin_module not in sys.modules
+
+        with TestClient(app) as client:
+            response = client.get("/plugins/demo/hello")
+            assert response.status_code == 200
+            assert response.json() == {"hello": "plugin"}
+            assert client.get("/plugins/missing/hello").status_code == 503
+
+        demo = registry.hooks("routes")[0].describe()
+        assert demo["loaded"] is True
+        assert demo["calls"] == 1
+
+    def test_requests_are_measured_apart_from_hooks(self, plugin_module, monkeypatch, caplog):
+        monkeypatch.setattr(settings, "PLUGIN_HOOK_BUDGET_MS", 0)
+        registry = PluginRegistry()
+        registry.discover([
+            entry_point(plugin_module, "router", "routes", name="measured"),
+            entry_point("bothub_missing_plugin", "router", "routes", name="unloadable"),
+        ])
+        app = FastAPI()
+        app.add_middleware(metrics.MetricsMiddleware)
+        registry.mount_routes(app, "/plugins")
+
+        with TestClient(app) as client:
+            client.get("/plugins/measured/hello")
+            client.get("/plugins/measured/nope")
+            client.get("/plugins/unloadable/hello")
+
+        # Whole requests are neither hook latency nor held to the hook budget
+        measured = registry.hooks("routes")[0].describe()
+        assert measured["calls"] == 2
+        assert measured["over_budget"] == 0
+        assert "budget" not in caplog.text
+        assert plugin_hook_seconds.labels("measured", "routes").snapshot()[1] == 0
+        # Requests are labelled by the plugin's route template, not lumped together as unmatched
+        assert metrics.http_requests.labels("GET", "/plugins/measured/hello", "200").get() == 1
+        assert metrics.http_requests.labels("GET", "/plugins/measured", "404").get() == 1
+        assert metrics.http_requests.labels("GET", "/plugins/unloadable", "503").get() == 1
@@ -0,0 +1,83 @@
+import logging
+
+from sqlalchemy import text
+
+from app.core.profiling import (
+    QUERY_COUNT_HEADER,
+    QueryProfile,
+    normalize_statement,
+    profile_queries,
+)
+
+
+def register_bots(client, headers, owner_id, n):
+    for i in range(n):
+        client.post(
+            "/api/v1/bots/register",
+            json={"bot_id": f"budget-bot-{i}", "bot_name": f"budget-bot-{i}", "owner_id": owner_id},
+            headers=headers
+        )
+
+
+class TestQueryProfile:
+    """Tests for statement recording and N+1 detection."""
+
+    def test_normalize_collapses_placeholder_lists(self):
+        a = normalize_statement("SELECT * FROM bots WHERE id IN (?, ?, ?)")
+        b = normalize_statement("SELECT *\n  FROM bots WHERE id IN (?)")
+        assert a == b == "SELECT * FROM bots WHERE id IN (?)"
+
+    def test_repeated_statements_are_reported(self):
+        profile = QueryProfile()
+        for _ in range(5):
+            profile.record("SELECT * FROM skills WHERE id = ?", 0.001)
+        profile.record("SELECT 1", 0.01)
+        assert profile.repeated(5) == {"SELECT * FROM skills WHERE id = ?": 5}
+        summary = profile.summary(top_n=1, threshold=5)
+        assert summary["queries"] == 6
+        assert summary["slowest"][0]["statement"] == "SELECT 1"
+
+    def test_profile_queries_context(self, client, db):
+        with profile_queries("script") as profile:
+            db.execute(text("SELECT 1"))
+            db.execute(text("SELECT 2"))
+        db.execute(text("SELECT 3"))
+        assert profile.count == 2
+
+
+class TestQueryBudgets:
+    """Per-endpoint SQL budgets; list endpoints must not grow with the page size."""
+
+    def test_profiling_is_off_by_default(self, client):
+        assert QUERY_COUNT_HEADER not in client.get("/api/v1/bots").headers
+
+    def test_header_enables_profiling_when_allowed(self, client, monkeypatch):
+        monkeypatch.setattr("app.core.profiling.settings.SQL_PROFILING_ALLOW_HEADER", True)
+        response = client.get("/api/v1/bots", headers={"X-SQL-Profile": "1"})
+        assert int(response.headers[QUERY_COUNT_HEADER]) >= 1
+
+    def test_bot_list(self, client, auth_headers, owner_id, query_budget):
+        register_bots(client, auth_headers, owner_id, 10)
+        query_budget(client.get("/api/v1/bots"), 2)
+
+    def test_heartbeat(self, client, auth_headers, owner_id, owner_headers, query_budget):
+        register_bots(client, auth_headers, owner_id, 1)
+        response = client.post(
+            "/api/v1/bots/budget-bot-0/heartbeat", json={"status": "online", "max_tasks": 2}, headers=owner_headers
+        )
+        query_budget(response, 6)
+
+    def test_skill_list_and_leaderboard(self, client, auth_headers, query_budget):
+        for i in range(10):
+            client.post("/api/v1/skills", json={"name": f"skill-{i}", "content": {"n": i}}, headers=auth_headers)
+        query_budget(client.get("/api/v1/skills"), 2)
+        # The leaderboard is served from memory once loaded
+        query_budget(client.get("/api/v1/skills/leaderboard"), 0)
+
+    def test_summary_is_logged(self, client, auth_headers, owner_id, query_budget, caplog):
+        register_bots(client, auth_headers, owner_id, 3)
+        with caplog.at_level(logging.INFO, logger="app.sql_profile"):
+            client.get("/api/v1/bots")
+        record = caplog.records[-1]
+        assert record.sql_profile["label"] == "GET /api/v1/bots"
+        assert record.sql_profile["queries"] >= 1
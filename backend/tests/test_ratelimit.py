@@ -0,0 +1,100 @@
+import asyncio
+import time
+
+import pytest
+
+from app.config import settings
+from app.core.ratelimit import RateLimiter, parse_rules
+from app.core.state import LocalStateBackend, set_state
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    """Enable rate limiting with the given rules on a fresh in-memory backend."""
+    set_state(LocalStateBackend())
+
+    def configure(spec):
+        monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+        monkeypatch.setattr(settings, "RATE_LIMITS", spec)
+
+    yield configure
+    set_state(None)
+
+
+class TestRules:
+    """Tests for rule parsing and matching."""
+
+    def test_parse(self):
+        rule, = parse_rules("post /api/v1/bots/{bot_id}/heartbeat bot=1/s:10, ip=120/m")
+        assert rule.method == "POST"
+        assert [(l.key, l.rate, l.burst) for l in rule.limits] == [("bot", 1.0, 10.0), ("ip", 2.0, 120.0)]
+
+    @pytest.mark.parametrize("spec", ["GET /api/v1/bots", "GET /api/v1/bots user=10/d", "GET /x owner=1/s"])
+    def test_invalid_rules(self, spec):
+        with pytest.raises(ValueError):
+            parse_rules(spec)
+
+    def test_match_extracts_path_params(self):
+        limiter = RateLimiter(parse_rules("POST /api/v1/bots/{bot_id}/heartbeat bot=1/s"))
+        rule, params = limiter.match("POST", "/api/v1/bots/b-1/heartbeat")
+        assert params == {"bot_id": "b-1"}
+        assert limiter.match("GET", "/api/v1/bots/b-1/heartbeat") is None
+        assert limiter.match("POST", "/api/v1/bots/b-1") is None
+
+    def test_check_is_cheap(self):
+        limiter = RateLimiter(parse_rules("POST /api/v1/bots/{bot_id}/heartbeat bot=1000000/s"), LocalStateBackend())
+        start = time.perf_counter()
+        for i in range(10000):
+            rule, params = limiter.match("POST", f"/api/v1/bots/bot-{i % 100}/heartbeat")
+            limiter.check(rule, {"bot": params["bot_id"]})
+        per_check = (time.perf_counter() - start) / 10000
+        assert per_check < 0.0002
+
+
+class TestRateLimitMiddleware:
+    """Tests for 429 responses on configured routes."""
+
+    def test_heartbeats_are_limited_per_bot(self, client, limits):
+        limits("POST /api/v1/bots/{bot_id}/heartbeat bot=1/m:2")
+        url = "/api/v1/bots/{}/heartbeat"
+        codes = [client.post(url.format("busy"), json={"status": "online"}).status_code for _ in range(3)]
+        assert codes == [404, 404, 429]
+
+        response = client.post(url.format("busy"), json={"status": "online"})
+        assert response.headers["Retry-After"] == "60"
+        assert response.json() == {"detail": "Rate limit exceeded"}
+        assert client.post(url.format("quiet"), json={"status": "online"}).status_code == 404
+
+    def test_users_have_separate_buckets(self, client, limits, headers_for):
+        limits("GET /api/v1/bots user=1/m:1")
+        alice, bob = headers_for("00000000-0000-0000-0000-0000000000a1"), headers_for("00000000-0000-0000-0000-0000000000b2")
+        assert client.get("/api/v1/bots", headers=alice).status_code == 200
+        assert client.get("/api/v1/bots", headers=alice).status_code == 429
+        assert client.get("/api/v1/bots", headers=bob).status_code == 200
+        # Anonymous requests fall back to the client address
+        assert client.get("/api/v1/bots").status_code == 200
+        assert client.get("/api/v1/bots").status_code == 429
+        assert client.get("/health").status_code == 200
+
+    def test_tokens_are_taken_off_the_event_loop(self, client, limits, monkeypatch):
+        """A shm or redis backend blocks while it waits, so the check must not run on the loop thread."""
+        limits("GET /api/v1/bots ip=10/s")
+        on_loop = []
+        take_token = LocalStateBackend.take_token
+
+        def record_loop(self, *args):
+            try:
+                asyncio.get_running_loop()
+                on_loop.append(True)
+            except RuntimeError:
+                on_loop.append(False)
+            return take_token(self, *args)
+
+        monkeypatch.setattr(LocalStateBackend, "take_token", record_loop)
+        assert client.get("/api/v1/bots").status_code == 200
+        assert on_loop == [False]
+
+    def test_disabled(self, client, limits, monkeypatch):
+        limits("GET /api/v1/bots ip=1/m:1")
+        monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+        assert all(client.get("/api/v1/bots").status_code == 200 for _ in range(3))
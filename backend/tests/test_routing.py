@@ -0,0 +1,134 @@
+import random
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import pytest
+
+from app.models.bot import Bot
+from app.models.task import Task
+from app.services.routing import (
+    BotIndex,
+    LeastLoadedPolicy,
+    PowerOfTwoPolicy,
+    RoutingPolicy,
+    StickyPolicy,
+    TaskRouter,
+    get_policy,
+)
+from app.services.tasks import lease_tasks
+
+
+class TestBotIndex:
+    """Tests for the in-memory routing index and policies."""
+
+    def test_capability_filter_and_offline_removal(self):
+        index = BotIndex(ttl=60)
+        a, b = uuid4(), uuid4()
+        index.update(a, "online", {"translate": True, "search": True})
+        index.update(b, "online", ["translate"])
+
+        assert {e.bot_uuid for e in index.candidates(["translate"])} == {a, b}
+        assert {e.bot_uuid for e in index.candidates(["translate", "search"])} == {a}
+        assert index.candidates(["draw"]) == []
+
+        # Capabilities can change with a heartbeat; non-online bots leave the index
+        index.update(a, "online", {"translate": True})
+        assert index.candidates(["search"]) == []
+        index.update(b, "busy", ["translate"])
+        assert [e.bot_uuid for e in index.candidates()] == [a]
+
+    def test_stale_bots_are_skipped_and_pruned(self):
+        index = BotIndex(ttl=60)
+        bot = uuid4()
+        index.update(bot, "online", {})
+        index._bots[bot].seen_at -= 120
+        assert index.candidates() == []
+        assert index.prune() == 1
+        assert len(index) == 0
+
+    def test_least_loaded_counts_assigned_tasks(self):
+        """Routed tasks count as load until the next heartbeat."""
+        index = BotIndex(ttl=60)
+        a, b = uuid4(), uuid4()
+        index.update(a, "online", {}, current_load=0.10, active_tasks=0)
+        index.update(b, "online", {}, current_load=0.25, active_tasks=0)
+        router = TaskRouter(index, LeastLoadedPolicy())
+
+        assert [router.route() for _ in range(4)] == [a, a, b, a]
+        assert router.route(["missing"]) is None
+
+    def test_power_of_two_prefers_less_loaded_of_sample(self):
+        index = BotIndex(ttl=60)
+        bots = [uuid4() for _ in range(5)]
+        for n, bot in enumerate(bots):
+            index.update(bot, "online", {}, current_load=n / 10)
+        policy = PowerOfTwoPolicy(rng=random.Random(0))
+        busiest = bots[-1]
+        assert all(policy.choose(index.candidates()).bot_uuid != busiest for _ in range(50))
+
+    def test_sticky_keeps_requester_until_overloaded(self):
+        index = BotIndex(ttl=60)
+        a, b = uuid4(), uuid4()
+        index.update(a, "online", {}, current_load=0.3)
+        index.update(b, "online", {}, current_load=0.5)
+        policy = StickyPolicy(max_score=0.8)
+        requester = uuid4()
+
+        assert policy.choose(index.candidates(), requester).bot_uuid == a
+        index.update(a, "online", {}, current_load=0.6)
+        assert policy.choose(index.candidates(), requester).bot_uuid == a
+        index.update(a, "online", {}, current_load=0.9)
+        assert policy.choose(index.candidates(), requester).bot_uuid == b
+
+    def test_unknown_policy(self):
+        with pytest.raises(ValueError):
+            get_policy("round_robin")
+
+    def test_policy_must_implement_choose(self):
+        class Incomplete(RoutingPolicy):
+            name = "incomplete"
+
+        with pytest.raises(TypeError):
+            Incomplete()
+
+
+@pytest.fixture
+def bots(client, auth_headers, owner_id):
+    for bot_id in ("route-bot-1", "route-bot-2"):
+        client.post(
+            "/api/v1/bots/register",
+            json={"bot_id": bot_id, "bot_name": bot_id, "owner_id": owner_id, "capabilities": {"translate": True}},
+            headers=auth_headers
+        )
+
+
+class TestTaskRouting:
+    """Tests for routing submitted tasks through heartbeat load signals."""
+
+    def test_submit_routes_to_least_loaded_bot(self, client, db, auth_headers, owner_headers, bots):
+        client.post("/api/v1/bots/route-bot-1/heartbeat", json={"status": "online", "current_load": 0.9})
+        client.post("/api/v1/bots/route-bot-2/heartbeat", json={"status": "online", "current_load": 0.1})
+        bot2 = db.query(Bot).filter(Bot.bot_id == "route-bot-2").one()
+
+        task = client.post(
+            "/api/v1/tasks",
+            json={"title": "t", "required_capabilities": ["translate"]},
+            headers=auth_headers
+        ).json()
+        assert task["assigned_bot_id"] == str(bot2.id)
+
+        # Only the chosen bot may lease the routed task until the hand-off delay passes
+        response = client.post("/api/v1/bots/route-bot-1/heartbeat", json={"status": "online", "max_tasks": 1},
+                               headers=owner_headers)
+        assert response.json()["pending_tasks"] == []
+        bot1 = db.query(Bot).filter(Bot.bot_id == "route-bot-1").one()
+        leased = lease_tasks(db, bot1, 1, now=datetime.utcnow() + timedelta(minutes=5))
+        assert [t.task_id for t in leased] == [task["task_id"]]
+
+    def test_submit_without_indexed_bots_is_unassigned(self, client, db, auth_headers, owner_headers, bots):
+        task = client.post("/api/v1/tasks", json={"title": "t"}, headers=auth_headers).json()
+        assert task["assigned_bot_id"] is None
+        response = client.post("/api/v1/bots/route-bot-1/heartbeat", json={"status": "online", "max_tasks": 1},
+                               headers=owner_headers)
+        assert [t["task_id"] for t in response.json()["pending_tasks"]] == [task["task_id"]]
+        assert db.query(Task).one().assigned_bot_id is not None
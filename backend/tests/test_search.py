@@ -0,0 +1,163 @@
+import sys
+from uuid import uuid4
+
+import pytest
+
+from app.services.bot_search import BotDocument, BotSearchIndex, FacetIndex, _bits, _slots
+
+OWNER_A = "00000000-0000-0000-0000-0000000000aa"
+OWNER_B = "00000000-0000-0000-0000-0000000000bb"
+
+
+def doc(name, status="online", owner=OWNER_A, version="1.0", capabilities=()):
+    return BotDocument(uuid4(), name.lower(), status, owner, version, frozenset(capabilities))
+
+
+@pytest.fixture
+def index():
+    index = FacetIndex()
+    for document in [
+        doc("Translator", capabilities={"translate"}),
+        doc("Translator Pro", status="busy", version="2.0", capabilities={"translate", "search"}),
+        doc("Searcher", status="offline", owner=OWNER_B, capabilities={"search"}),
+        doc("Helper", owner=None, version="unknown"),
+    ]:
+        index.upsert(document)
+    return index
+
+
+class TestFacetIndex:
+    """Tests for the in-memory bitmap facet index."""
+
+    def test_bit_helpers(self):
+        assert list(_slots(_bits([0, 3, 70]))) == [0, 3, 70]
+        assert list(_slots(0)) == []
+
+    def test_facets_ignore_their_own_filter(self, index):
+        result = index.search(filters={"status": "online"})
+        assert result.total == 2
+        assert dict(result.facets["status"]) == {"online": 2, "busy": 1, "offline": 1}
+        assert dict(result.facets["owner"]) == {OWNER_A: 1}
+        assert dict(result.facets["capability"]) == {"translate": 1}
+
+    def test_text_and_capabilities_narrow_every_facet(self, index):
+        result = index.search(query="TRANSLATOR", capabilities=["search"])
+        assert result.total == 1
+        assert dict(result.facets["status"]) == {"busy": 1}
+        assert dict(result.facets["version"]) == {"2.0": 1}
+
+    def test_pages_in_registration_order(self, index):
+        everything = index.search(limit=10).bot_uuids
+        assert index.search(offset=1, limit=2).bot_uuids == everything[1:3]
+
+    def test_updates_and_removals(self, index):
+        first, second = index.search(limit=2).bot_uuids
+        index.upsert(doc("Renamed", status="error")._replace(bot_uuid=first))
+        index.remove(second)
+
+        assert index.search(query="translator").total == 0
+        assert index.search(query="renamed").bot_uuids == [first]
+        result = index.search()
+        assert result.total == 3
+        assert dict(result.facets["status"]) == {"error": 1, "offline": 1, "online": 1}
+        assert "busy" not in index.postings["status"]
+
+    def test_bulk_build_matches_incremental_updates(self, index):
+        built = FacetIndex.build(doc for doc in index.documents)
+        assert built.postings == index.postings
+        assert built.search(query="er", filters={"owner": OWNER_A}) == index.search(query="er", filters={"owner": OWNER_A})
+
+    def test_many_valued_facets_are_stored_as_slot_arrays(self, monkeypatch, index):
+        monkeypatch.setattr("app.services.bot_search.BITSET_FACET_MAX_VALUES", 2)
+        built = FacetIndex.build(index.documents)
+        assert "version" in built.sparse and "status" in built.sparse
+        assert built.search(facet_size=1).facets["status"] == [("online", 2)]
+        assert built.search(filters={"version": "2.0"}).total == 1
+
+        # Switches back to bitsets once most values are gone, and out again as they return
+        for bot_uuid in built.search(limit=3).bot_uuids:
+            built.remove(bot_uuid)
+        assert "status" not in built.sparse
+        for doc in index.documents[:3]:
+            built.upsert(doc)
+        assert "status" in built.sparse
+        rebuilt, original = built.search(), index.search()
+        assert sorted(rebuilt.bot_uuids) == sorted(original.bot_uuids)
+        assert {f: dict(c) for f, c in rebuilt.facets.items()} == {f: dict(c) for f, c in original.facets.items()}
+
+    def test_high_cardinality_postings_stay_small(self):
+        bots, owners = 20000, 10000
+        built = FacetIndex.build(
+            doc(f"bot {i}", owner=f"owner-{i % owners}", capabilities={f"cap-{i % 7}"}) for i in range(bots)
+        )
+        assert "owner" in built.sparse
+        owner_bytes = sum(sys.getsizeof(posting) for posting in built.postings["owner"].values())
+        # As bitsets every owner's posting would be ~bots/8 bytes wide: ~25 MB here
+        assert owner_bytes < 2_000_000
+        result = built.search(filters={"owner": "owner-3"})
+        assert result.total == 2
+        assert dict(result.facets["capability"]) == {"cap-3": 1, "cap-0": 1}
+        assert dict(built.search(capabilities=["cap-3"]).facets["owner"])["owner-3"] == 1
+
+
+class TestBotSearchEndpoint:
+    """Tests for the faceted bot search endpoint."""
+
+    @pytest.fixture
+    def bots(self, client, auth_headers):
+        for bot_id, owner, capabilities in [
+            ("search-1", OWNER_A, {"translate": True}),
+            ("search-2", OWNER_A, {"translate": True, "search": True}),
+            ("search-3", OWNER_B, {"search": True, "disabled": False}),
+        ]:
+            client.post(
+                "/api/v1/bots/register",
+                json={"bot_id": bot_id, "bot_name": f"Bot {bot_id}", "owner_id": owner, "capabilities": capabilities},
+                headers=auth_headers
+            )
+
+    def test_search_with_facets(self, client, bots):
+        client.post("/api/v1/bots/search-2/heartbeat", json={"status": "online"})
+
+        data = client.get("/api/v1/bots/search", params={"status": "offline", "capability": "search"}).json()
+        assert [bot["bot_id"] for bot in data["items"]] == ["search-3"]
+        assert data["total"] == 1
+        facets = {facet: {c["value"]: c["count"] for c in counts} for facet, counts in data["facets"].items()}
+        assert facets["status"] == {"offline": 1, "online": 1}
+        assert facets["owner"] == {OWNER_B: 1}
+        assert facets["capability"] == {"search": 1}
+
+    def test_index_follows_changes(self, client, bots, auth_headers, query_budget):
+        assert client.get("/api/v1/bots/search", params={"q": "bot"}).json()["total"] == 3
+
+        client.patch("/api/v1/bots/search-1", json={"bot_name": "Renamed"}, headers=auth_headers)
+        client.delete("/api/v1/bots/search-3", headers=auth_headers)
+
+        response = client.get("/api/v1/bots/search", params={"q": "bot", "page_size": 1})
+        # Only the page is read from the database
+        query_budget(response, 1)
+        data = response.json()
+        assert data["total"] == 1
+        assert data["pages"] == 1
+        assert [bot["bot_id"] for bot in data["items"]] == ["search-2"]
+
+    def test_pagination(self, client, bots):
+        data = client.get("/api/v1/bots/search", params={"page": 2, "page_size": 2}).json()
+        assert data["total"] == 3
+        assert data["pages"] == 2
+        assert [bot["bot_id"] for bot in data["items"]] == ["search-3"]
+
+    def test_changes_during_rebuild_reach_the_new_index(self, db, bots, monkeypatch):
+        search_index = BotSearchIndex()
+        search_index.rebuild(db)
+        late = doc("Late arrival")
+        build = FacetIndex.build.__func__
+
+        def build_then_commit(cls, documents):
+            index = build(cls, documents)
+            search_index.apply([late], set())
+            return index
+
+        monkeypatch.setattr(FacetIndex, "build", classmethod(build_then_commit))
+        assert search_index.rebuild(db) == 4
+        assert search_index.search(db, query="late").bot_uuids == [late.bot_uuid]
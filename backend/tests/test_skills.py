@@ -0,0 +1,186 @@
+import threading
+from datetime import date, timedelta
+from uuid import uuid4
+
+import pytest
+
+from app.models.skill import Skill, SkillDailyStats
+from app.services.leaderboard import LeaderboardEngine, SortedRanking, leaderboard
+from app.services.skills import SkillCounters, record_download, rate_skill, skill_counters
+
+
+def engine_with_skills(*names, today):
+    engine = LeaderboardEngine(min_ratings=2)
+    engine._reset_state(today)
+    engine._loaded = True
+    skills = []
+    for name in names:
+        skill = uuid4()
+        engine.add_skill(skill, f"skill_{name}", name, "bot")
+        skills.append(skill)
+    return engine, skills
+
+
+class TestLeaderboardEngine:
+    """Tests for windowed counters and sorted rankings."""
+
+    def test_sorted_ranking_updates_in_place(self):
+        ranking = SortedRanking()
+        a, b, c = uuid4(), uuid4(), uuid4()
+        ranking.set(a, 5)
+        ranking.set(b, 3)
+        ranking.set(c, 4)
+        assert [s for s, _ in ranking.top(2)] == [a, c]
+        ranking.set(b, 9)
+        ranking.set(a, 0)
+        assert ranking.top(10) == [(b, 9), (c, 4)]
+
+    def test_windows_roll_over_days(self):
+        today = date(2026, 10, 19)
+        engine, (a, b) = engine_with_skills("a", "b", today=today)
+        engine.record(a, downloads=5, day=today - timedelta(days=6))
+        engine.record(b, downloads=3, day=today)
+
+        assert [i["name"] for i in engine.top("day", "downloads", 10, today=today)] == ["b"]
+        assert [i["name"] for i in engine.top("week", "downloads", 10, today=today)] == ["a", "b"]
+
+        # One day later a's downloads leave the weekly window but stay in month and all-time
+        tomorrow = today + timedelta(days=1)
+        assert engine.top("day", "downloads", 10, today=tomorrow) == []
+        assert [i["name"] for i in engine.top("week", "downloads", 10, today=tomorrow)] == ["b"]
+        month = engine.top("month", "downloads", 10, today=tomorrow)
+        assert [(i["name"], i["downloads"]) for i in month] == [("a", 5), ("b", 3)]
+        assert [i["downloads"] for i in engine.top("all", "downloads", 10, today=tomorrow)] == [5, 3]
+
+    def test_rating_requires_min_ratings(self):
+        today = date(2026, 10, 19)
+        engine, (a, b) = engine_with_skills("a", "b", today=today)
+        engine.record(a, rating_sum=5, rating_count=1, day=today)
+        engine.record(b, rating_sum=7, rating_count=2, day=today)
+        assert [(i["name"], i["rating"]) for i in engine.top("week", "rating", 10, today=today)] == [("b", 3.5)]
+        engine.record(a, rating_sum=4, rating_count=1, day=today)
+        assert [i["name"] for i in engine.top("week", "rating", 10, today=today)] == ["a", "b"]
+
+
+@pytest.fixture
+def skills(client, owner_id, owner_headers):
+    client.post(
+        "/api/v1/bots/register",
+        json={"bot_id": "skill-bot", "bot_name": "小白", "owner_id": owner_id},
+        headers=owner_headers
+    )
+    created = []
+    for name in ("ECS 管理", "文档处理", "OSS 上传"):
+        response = client.post(
+            "/api/v1/skills",
+            json={"name": name, "author_bot_id": "skill-bot", "tags": ["云资源"], "content": {"steps": [name]}},
+            headers=owner_headers
+        )
+        assert response.status_code == 201
+        created.append(response.json()["skill_id"])
+    return created
+
+
+class TestSkillsAPI:
+    """Tests for the skills API and leaderboard endpoint."""
+
+    def test_publish_requires_bot_owner(self, client, auth_headers, skills):
+        response = client.post(
+            "/api/v1/skills",
+            json={"name": "x", "author_bot_id": "skill-bot"},
+            headers=auth_headers
+        )
+        assert response.status_code == 403
+
+    def test_download_and_leaderboard(self, client, skills):
+        ecs, docs, oss = skills
+        for skill_id, count in ((ecs, 1), (docs, 3), (oss, 2)):
+            for _ in range(count):
+                response = client.post(f"/api/v1/skills/{skill_id}/download")
+                assert response.status_code == 200
+        assert response.json()["content"] == {"steps": ["OSS 上传"]}
+        assert client.get(f"/api/v1/skills/{docs}").json()["downloads"] == 3
+
+        data = client.get("/api/v1/skills/leaderboard?period=week&metric=downloads&top=2").json()
+        assert [(i["rank"], i["skill_id"], i["downloads"]) for i in data["items"]] == [(1, docs, 3), (2, oss, 2)]
+        assert data["items"][0]["author"] == "小白"
+
+    def test_ratings(self, client, auth_headers, skills):
+        ecs, docs, _ = skills
+        for skill_id, ratings in ((ecs, [5, 4, 3]), (docs, [5, 5, 5])):
+            for rating in ratings:
+                response = client.post(f"/api/v1/skills/{skill_id}/ratings", json={"rating": rating}, headers=auth_headers)
+        assert response.json()["rating"] == 5.0
+        assert response.json()["rating_count"] == 3
+
+        data = client.get("/api/v1/skills/leaderboard?period=all&metric=rating").json()
+        assert [(i["skill_id"], i["rating"]) for i in data["items"]] == [(docs, 5.0), (ecs, 4.0)]
+
+    def test_leaderboard_loads_from_database(self, client, skills):
+        """A fresh engine flushes buffered counters and rebuilds its windows from daily stats."""
+        client.post(f"/api/v1/skills/{skills[1]}/download")
+        leaderboard.reset()
+        data = client.get("/api/v1/skills/leaderboard?period=day").json()
+        assert [i["skill_id"] for i in data["items"]] == [skills[1]]
+
+
+class TestSkillCounters:
+    """Tests for buffered download and rating counters."""
+
+    def test_counts_are_buffered_until_flush(self, client, db, auth_headers, skills):
+        skill_id = skills[0]
+        client.post(f"/api/v1/skills/{skill_id}/download")
+        client.post(f"/api/v1/skills/{skill_id}/ratings", json={"rating": 4}, headers=auth_headers)
+
+        row = db.query(Skill).filter(Skill.skill_id == skill_id).one()
+        assert (row.downloads, row.rating_count) == (0, 0)
+        # Responses already include the buffered counts
+        data = client.get(f"/api/v1/skills/{skill_id}").json()
+        assert (data["downloads"], data["rating"], data["rating_count"]) == (1, 4.0, 1)
+
+        assert skill_counters.flush(db) == 1
+        db.expire_all()
+        assert (row.downloads, row.rating_sum, row.rating_count, float(row.rating)) == (1, 4, 1, 4.0)
+        stats = db.query(SkillDailyStats).filter(SkillDailyStats.skill_id == row.id).one()
+        assert (stats.downloads, stats.rating_sum, stats.rating_count) == (1, 4, 1)
+
+    def test_concurrent_increments_are_exact(self, client, db, skills):
+        skill = db.query(Skill).filter(Skill.skill_id == skills[0]).one()
+
+        def download(n):
+            for _ in range(n):
+                record_download(skill)
+                rate_skill(skill, 3 + n % 3)
+
+        threads = [threading.Thread(target=download, args=(n,)) for n in range(1, 9)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        skill_counters.flush(db)
+        record_download(skill)
+        skill_counters.flush(db)
+
+        db.expire_all()
+        expected_sum = sum(n * (3 + n % 3) for n in range(1, 9))
+        assert skill.downloads == sum(range(1, 9)) + 1
+        assert skill.rating_count == sum(range(1, 9))
+        assert skill.rating_sum == expected_sum
+        assert float(skill.rating) == round(expected_sum / sum(range(1, 9)), 2)
+
+    def test_failed_flush_keeps_counts(self, client, db, skills, monkeypatch):
+        skill = db.query(Skill).filter(Skill.skill_id == skills[0]).one()
+        record_download(skill)
+
+        def fail(*args):
+            raise RuntimeError("database unavailable")
+
+        monkeypatch.setattr(SkillCounters, "_upsert_daily", staticmethod(fail))
+        with pytest.raises(RuntimeError):
+            skill_counters.flush(db)
+        monkeypatch.undo()
+
+        assert skill_counters.pending(skill.id) == [1, 0, 0]
+        skill_counters.flush(db)
+        db.expire_all()
+        assert skill.downloads == 1
@@ -0,0 +1,81 @@
+import os
+import subprocess
+import sys
+import time
+
+from sqlalchemy import text
+
+from app.config import settings
+from app.core.readiness import Readiness, code_heads
+from app.database import engine
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Importing app.main must stay well under this; heavy libraries are imported on first use
+IMPORT_BUDGET_SECONDS = 3.0
+DEFERRED_MODULES = ("jose", "passlib", "requests", "httpx", "alembic")
+
+
+def test_import_time_budget():
+    script = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        "import app.main\n"
+        "print(time.perf_counter() - start)\n"
+        f"print(','.join(m for m in {DEFERRED_MODULES!r} if m in sys.modules))\n"
+    )
+    env = {**os.environ, "DATABASE_URL": "sqlite://", "BACKGROUND_WORKERS_ENABLED": "false"}
+    result = subprocess.run(
+        [sys.executable, "-c", script], cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    elapsed, imported = (result.stdout.split("\n") + [""])[:2]
+    assert float(elapsed) < IMPORT_BUDGET_SECONDS
+    assert imported == ""
+
+
+class TestProbes:
+    """Tests for the liveness and readiness probes."""
+
+    def test_livez(self, client):
+        response = client.get("/livez")
+        assert response.status_code == 200
+        assert response.json() == {"status": "alive"}
+
+    def test_readyz_after_startup(self, client):
+        deadline = time.monotonic() + 5
+        response = client.get("/readyz")
+        while response.status_code != 200 and time.monotonic() < deadline:
+            time.sleep(0.05)
+            response = client.get("/readyz")
+        assert response.status_code == 200
+        assert response.json()["checks"]["database"] == "ok"
+
+    def test_not_ready_until_prepared(self, client):
+        state = Readiness(engine)
+        assert state.check()["status"] == "not_ready"
+        assert state.prepare()
+        assert state.check()["status"] == "ready"
+
+    def test_schema_revision_check(self, client, monkeypatch):
+        monkeypatch.setattr(settings, "SCHEMA_CHECK", "strict")
+        state = Readiness(engine)
+        state.prepare()
+        # Test tables come from create_all, so there is no alembic_version
+        result = state.check()
+        assert result["status"] == "not_ready"
+        assert "no revision" in result["checks"]["schema"]
+
+        with engine.begin() as connection:
+            connection.execute(text("CREATE TABLE alembic_version (version_num VARCHAR(32) NOT NULL)"))
+            for head in code_heads():
+                connection.execute(text("INSERT INTO alembic_version VALUES (:v)"), {"v": head})
+        try:
+            state = Readiness(engine)
+            state.prepare()
+            assert state.check() == {
+                "status": "ready",
+                "checks": {"pool_warm": True, "schema": "ok", "database": "ok"},
+            }
+        finally:
+            with engine.begin() as connection:
+                connection.execute(text("DROP TABLE alembic_version"))
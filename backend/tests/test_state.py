@@ -0,0 +1,198 @@
+import json
+import multiprocessing
+import threading
+import time
+from uuid import uuid4
+
+import pytest
+
+from app.core.state import Channel, LocalStateBackend, SharedMemoryStateBackend, set_state
+from app.services.bot_stats import BotStatsCache
+from app.services.permissions import PermissionChangeListener, PermissionEngine
+from app.services.presence import NAMESPACE, record_heartbeat, sync_presence
+from app.services.routing import bot_index
+from app.database import engine
+
+
+@pytest.fixture(params=["local", "shm"])
+def backend(request, tmp_path):
+    if request.param == "local":
+        state = LocalStateBackend()
+    else:
+        state = SharedMemoryStateBackend(str(tmp_path / "state.db"))
+    yield state
+    state.close()
+
+
+@pytest.fixture
+def shared_state(tmp_path):
+    """Install a shared-memory backend as the process state, as in a multi-worker deployment."""
+    state = SharedMemoryStateBackend(str(tmp_path / "state.db"))
+    set_state(state)
+    yield state
+    set_state(None)
+    state.close()
+    bot_index.clear()
+
+
+def _increment(path, times):
+    state = SharedMemoryStateBackend(path)
+    for _ in range(times):
+        state.incr("hits")
+    state.close()
+
+
+class TestStateBackends:
+    """Tests for the local and shared-memory state backends."""
+
+    def test_values_expire(self, backend):
+        backend.set("a", "1")
+        backend.set("b", "2", ttl=0.05)
+        assert (backend.get("a"), backend.get("b")) == ("1", "2")
+        time.sleep(0.06)
+        assert backend.get("b") is None
+        backend.delete("a")
+        assert backend.get("a") is None
+
+    def test_counters_start_a_new_window_after_expiry(self, backend):
+        assert backend.incr("window", ttl=0.05) == 1
+        assert backend.incr("window", 2, ttl=0.05) == 3
+        time.sleep(0.06)
+        assert backend.incr("window", ttl=0.05) == 1
+
+    def test_fields_expire_individually(self, backend):
+        backend.put_field("ns", "a", "1", ttl=60)
+        backend.put_field("ns", "b", "2", ttl=0.05)
+        time.sleep(0.06)
+        assert backend.fields("ns") == {"a": "1"}
+        backend.delete_field("ns", "a")
+        assert backend.fields("ns") == {}
+
+    def test_append_field_numbers_fields_by_counter(self, backend):
+        assert backend.append_field("seq", "log", "a", ttl=60) == 1
+        assert backend.append_field("seq", "log", "b", ttl=60) == 2
+        assert backend.get("seq") == "2"
+        assert backend.fields("log") == {"1": "a", "2": "b"}
+
+    def test_prune_deletes_expired_entries(self, backend):
+        backend.set("kept", "1")
+        backend.put_field("ns", "kept", "1", ttl=60)
+        for i in range(50):
+            backend.set(f"gone:{i}", "x", ttl=0.01)
+            backend.incr(f"window:{i}", ttl=0.01)
+            backend.put_field("ns", f"gone:{i}", "x", ttl=0.01)
+        time.sleep(0.02)
+
+        assert backend.prune() == 150
+        assert backend.prune() == 0
+        assert backend.get("kept") == "1"
+        assert backend.fields("ns") == {"kept": "1"}
+        if isinstance(backend, SharedMemoryStateBackend):
+            conn = backend._conn()
+            assert conn.execute("SELECT count(*) FROM kv").fetchone()[0] == 1
+
+    def test_token_bucket(self, backend):
+        assert [backend.take_token("bucket", rate=10, burst=3) for _ in range(3)] == [0, 0, 0]
+        retry_after = backend.take_token("bucket", rate=10, burst=3)
+        assert 0 < retry_after <= 0.1
+        time.sleep(0.11)
+        assert backend.take_token("bucket", rate=10, burst=3) == 0
+        assert backend.take_token("other", rate=10, burst=3) == 0
+
+    def test_shared_memory_counter_is_atomic_across_processes(self, tmp_path):
+        path = str(tmp_path / "state.db")
+        SharedMemoryStateBackend(path).close()
+        processes = [multiprocessing.Process(target=_increment, args=(path, 200)) for _ in range(3)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        assert SharedMemoryStateBackend(path).get("hits") == "600"
+
+
+class TestCrossWorkerState:
+    """Tests for presence and cache invalidation through shared state."""
+
+    def test_channel_delivers_to_other_subscribers(self, tmp_path):
+        path = str(tmp_path / "state.db")
+        publisher = Channel("test", SharedMemoryStateBackend(path))
+        subscriber = Channel("test", SharedMemoryStateBackend(path), retention=60)
+        assert subscriber.poll() == []
+        publisher.publish(["a"])
+        publisher.publish(["b"])
+        assert subscriber.poll() == [["a"], ["b"]]
+        assert subscriber.poll() == []
+
+    def test_channel_reports_missed_messages(self, tmp_path):
+        backend = SharedMemoryStateBackend(str(tmp_path / "state.db"))
+        publisher = Channel("test", backend, retention=0.05)
+        subscriber = Channel("test", backend)
+        subscriber.poll()
+        publisher.publish(["a"])
+        time.sleep(0.06)
+        assert subscriber.poll() is None
+
+    def test_polling_during_publishes_never_sees_a_gap(self, tmp_path):
+        path = str(tmp_path / "state.db")
+        publisher = Channel("test", SharedMemoryStateBackend(path))
+        subscriber = Channel("test", SharedMemoryStateBackend(path), retention=60)
+        subscriber.poll()
+
+        def publish():
+            for i in range(300):
+                publisher.publish(i)
+
+        thread = threading.Thread(target=publish)
+        thread.start()
+        received = []
+        deadline = time.monotonic() + 10
+        while len(received) < 300:
+            assert time.monotonic() < deadline
+            messages = subscriber.poll()
+            assert messages is not None
+            received.extend(messages)
+        thread.join()
+        assert received == list(range(300))
+
+    def test_local_channel_is_a_no_op(self):
+        channel = Channel("test", LocalStateBackend())
+        channel.publish(["a"])
+        assert channel.poll() == []
+
+    def test_permission_changes_reach_other_workers(self, shared_state):
+        other_worker = PermissionEngine(max_entries=10, ttl=60)
+        listener = PermissionChangeListener(engine, other_worker, Channel("permissions", shared_state))
+        assert listener.poll() == 0
+        bot_uuid = uuid4()
+        Channel("permissions", shared_state).publish([str(bot_uuid)])
+        assert listener.poll() == 1
+        assert other_worker._version(bot_uuid) == (0, 1)
+
+    def test_presence_is_shared(self, shared_state):
+        seen = uuid4()
+        record_heartbeat(seen, "online", {"translate": True}, 0.5, 1)
+        # A heartbeat received by another worker
+        elsewhere = uuid4()
+        shared_state.put_field(NAMESPACE, str(elsewhere), json.dumps({
+            "capabilities": ["search"], "current_load": 0.1, "active_tasks": 0, "seen_at": time.time(),
+        }), ttl=60)
+
+        assert sync_presence() == 2
+        assert [c.bot_uuid for c in bot_index.candidates(["search"])] == [elsewhere]
+
+        record_heartbeat(seen, "offline", {"translate": True})
+        shared_state.delete_field(NAMESPACE, str(elsewhere))
+        assert sync_presence() == 0
+        assert len(bot_index) == 0
+
+    def test_bot_stats_reach_other_workers(self, shared_state, client, db, auth_headers):
+        other_worker = BotStatsCache(ttl=60, channel=Channel("bot-stats", shared_state))
+        assert other_worker.snapshot(db, top_owners=10)["total"] == 0
+
+        bot = {"bot_id": "shared", "bot_name": "shared", "owner_id": str(uuid4())}
+        client.post("/api/v1/bots/register", json=bot, headers=auth_headers)
+        client.post("/api/v1/bots/shared/heartbeat", json={"status": "online"})
+
+        snapshot = other_worker.snapshot(db, top_owners=10)
+        assert snapshot["total"] == 1
+        assert snapshot["by_status"] == {"online": 1}
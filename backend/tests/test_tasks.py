@@ -0,0 +1,180 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.task import PRIORITY_RANK, Task, TaskPriority, TaskStatus
+from app.services.tasks import LEASE_CANDIDATE_FACTOR, generate_task_id, requeue_expired
+
+
+@pytest.fixture
+def bots(client, auth_headers, owner_id):
+    """Two online-capable bots with different capabilities."""
+    for bot_id, capabilities in [
+        ("task-bot-1", {"translate": True}),
+        ("task-bot-2", {"translate": True, "search": True}),
+    ]:
+        client.post(
+            "/api/v1/bots/register",
+            json={"bot_id": bot_id, "bot_name": bot_id, "owner_id": owner_id, "capabilities": capabilities},
+            headers=auth_headers
+        )
+
+
+def submit(client, auth_headers, **fields):
+    response = client.post("/api/v1/tasks", json={"title": "t", **fields}, headers=auth_headers)
+    assert response.status_code == 201
+    return response.json()
+
+
+@pytest.fixture
+def heartbeat(client, owner_headers):
+    """Send a heartbeat as the bot owner, leasing up to max_tasks tasks."""
+    def post(bot_id, max_tasks=0, status="online"):
+        response = client.post(
+            f"/api/v1/bots/{bot_id}/heartbeat",
+            json={"status": status, "max_tasks": max_tasks},
+            headers=owner_headers
+        )
+        assert response.status_code == 200
+        return response.json()
+
+    return post
+
+
+class TestTasks:
+    """Tests for task submission, leasing and completion."""
+
+    def test_heartbeat_leases_by_priority(self, client, auth_headers, bots, heartbeat):
+        """Pending tasks come back on the heartbeat, highest priority first."""
+        low = submit(client, auth_headers, priority="low")
+        urgent = submit(client, auth_headers, priority="urgent")
+        normal = submit(client, auth_headers)
+
+        data = heartbeat("task-bot-1", max_tasks=2)
+        assert [t["task_id"] for t in data["pending_tasks"]] == [urgent["task_id"], normal["task_id"]]
+        assert data["pending_tasks"][0]["attempts"] == 1
+
+        task = client.get(f"/api/v1/tasks/{urgent['task_id']}").json()
+        assert task["status"] == "running"
+        assert task["lease_expires_at"] is not None
+
+        # Already leased tasks are not handed out twice
+        data = heartbeat("task-bot-2", max_tasks=5)
+        assert [t["task_id"] for t in data["pending_tasks"]] == [low["task_id"]]
+
+    def test_heartbeat_without_max_tasks_leases_nothing(self, client, auth_headers, bots, heartbeat):
+        submit(client, auth_headers)
+        assert heartbeat("task-bot-1")["pending_tasks"] == []
+        assert heartbeat("task-bot-1", max_tasks=3, status="busy")["pending_tasks"] == []
+
+    def test_capabilities_and_target_bot(self, client, auth_headers, owner_headers, bots, heartbeat):
+        """Bots only lease tasks they can run and tasks pinned to them."""
+        search = submit(client, auth_headers, required_capabilities=["search"])
+        pinned = submit(client, owner_headers, target_bot_id="task-bot-2")
+
+        assert heartbeat("task-bot-1", max_tasks=5)["pending_tasks"] == []
+        leased = heartbeat("task-bot-2", max_tasks=5)["pending_tasks"]
+        assert {t["task_id"] for t in leased} == {search["task_id"], pinned["task_id"]}
+
+    def test_complete_requires_lease_holder(self, client, auth_headers, bots, owner_headers):
+        task = submit(client, auth_headers)
+        client.post("/api/v1/tasks/lease", json={"bot_id": "task-bot-1"}, headers=owner_headers)
+
+        response = client.post(
+            f"/api/v1/tasks/{task['task_id']}/complete",
+            json={"bot_id": "task-bot-2", "result": {}},
+            headers=owner_headers
+        )
+        assert response.status_code == 409
+
+        response = client.post(
+            f"/api/v1/tasks/{task['task_id']}/complete",
+            json={"bot_id": "task-bot-1", "result": {"answer": 42}},
+            headers=owner_headers
+        )
+        assert response.status_code == 200
+        assert response.json()["status"] == "completed"
+        assert response.json()["result"] == {"answer": 42}
+
+    def test_cancel(self, client, auth_headers, bots, heartbeat):
+        task = submit(client, auth_headers)
+        response = client.post(f"/api/v1/tasks/{task['task_id']}/cancel", headers=auth_headers)
+        assert response.json()["status"] == "cancelled"
+
+        response = client.post(f"/api/v1/tasks/{task['task_id']}/cancel", headers=auth_headers)
+        assert response.status_code == 409
+        assert heartbeat("task-bot-1", max_tasks=1)["pending_tasks"] == []
+
+    def test_expired_lease_is_requeued_then_failed(self, client, db, auth_headers, bots, heartbeat):
+        """Expired leases go back to the queue until max_attempts is used up."""
+        task = submit(client, auth_headers, max_attempts=2)
+        later = datetime.utcnow() + timedelta(days=1)
+
+        for attempt in (1, 2):
+            leased = heartbeat("task-bot-1", max_tasks=1)["pending_tasks"]
+            assert [t["attempts"] for t in leased] == [attempt]
+            assert requeue_expired(db, now=later) == 1
+            db.expire_all()
+
+        row = db.query(Task).filter(Task.task_id == task["task_id"]).one()
+        assert row.status == TaskStatus.FAILED
+        assert row.error == "Lease expired"
+
+    def test_heartbeat_renews_leases(self, client, db, auth_headers, bots, heartbeat):
+        task = submit(client, auth_headers)
+        heartbeat("task-bot-1", max_tasks=1)
+        row = db.query(Task).filter(Task.task_id == task["task_id"]).one()
+        first_expiry = row.lease_expires_at
+
+        row.lease_expires_at = first_expiry - timedelta(minutes=10)
+        db.commit()
+        heartbeat("task-bot-1")
+        db.expire_all()
+        assert row.lease_expires_at >= first_expiry
+
+    def test_tasks_the_bot_cannot_run_do_not_starve_it(self, client, db, auth_headers, bots, heartbeat):
+        """A queue head of tasks needing other capabilities is scanned past, not leased or kept."""
+        for _ in range(LEASE_CANDIDATE_FACTOR * 3):
+            db.add(Task(
+                task_id=generate_task_id(), title="search", required_capabilities=["search", "ocr"],
+                priority=TaskPriority.URGENT, priority_rank=PRIORITY_RANK[TaskPriority.URGENT],
+            ))
+        db.commit()
+        runnable = submit(client, auth_headers, required_capabilities=["translate"])
+
+        leased = heartbeat("task-bot-1", max_tasks=1)["pending_tasks"]
+        assert [t["task_id"] for t in leased] == [runnable["task_id"]]
+        assert db.query(Task).filter(Task.status == TaskStatus.PENDING).count() == LEASE_CANDIDATE_FACTOR * 3
+
+    def test_lease_scan_is_bounded(self, client, db, auth_headers, bots, monkeypatch, heartbeat):
+        """A long queue of tasks the bot cannot run is not scanned to the end on every heartbeat."""
+        monkeypatch.setattr("app.services.tasks.settings.TASK_LEASE_MAX_SCAN", LEASE_CANDIDATE_FACTOR * 2)
+        for _ in range(LEASE_CANDIDATE_FACTOR * 3):
+            db.add(Task(
+                task_id=generate_task_id(), title="search", required_capabilities=["search", "ocr"],
+                priority=TaskPriority.URGENT, priority_rank=PRIORITY_RANK[TaskPriority.URGENT],
+            ))
+        db.commit()
+        submit(client, auth_headers, required_capabilities=["translate"])
+
+        assert heartbeat("task-bot-1", max_tasks=1)["pending_tasks"] == []
+
+    def test_only_the_owner_can_lease_or_complete(self, client, auth_headers, bots, heartbeat):
+        task = submit(client, auth_headers)
+        response = client.post(
+            "/api/v1/bots/task-bot-1/heartbeat", json={"status": "online", "max_tasks": 1}, headers=auth_headers
+        )
+        assert response.status_code == 403
+        # Plain liveness heartbeats stay open
+        assert client.post("/api/v1/bots/task-bot-1/heartbeat", json={"status": "online"}).status_code == 200
+        assert client.post("/api/v1/tasks/lease", json={"bot_id": "task-bot-1"}).status_code == 401
+        response = client.post("/api/v1/tasks/lease", json={"bot_id": "task-bot-1"}, headers=auth_headers)
+        assert response.status_code == 403
+
+        heartbeat("task-bot-1", max_tasks=1)
+        response = client.post(
+            f"/api/v1/tasks/{task['task_id']}/complete",
+            json={"bot_id": "task-bot-1", "result": {}},
+            headers=auth_headers
+        )
+        assert response.status_code == 403
@@ -0,0 +1,188 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from app.models.bot import Bot
+from app.models.status_history import BotStatusRun
+from app.services.activities import activity_ingestor
+from app.services.status_history import record_status, status_history, uptime_report
+
+T0 = datetime(2026, 10, 1)
+
+
+@pytest.fixture
+def bots(client, db, auth_headers, owner_id):
+    """Two bots of the same owner and one of another owner, all created at T0."""
+    created = []
+    for bot_id, owner in [
+        ("uptime-bot-1", owner_id),
+        ("uptime-bot-2", owner_id),
+        ("uptime-bot-3", "00000000-0000-0000-0000-0000000000bb"),
+    ]:
+        client.post(
+            "/api/v1/bots/register",
+            json={"bot_id": bot_id, "bot_name": bot_id, "owner_id": owner},
+            headers=auth_headers
+        )
+        created.append(bot_id)
+    for bot in db.scalars(select(Bot)):
+        bot.created_at = T0
+    db.commit()
+    yield {bot.bot_id: bot for bot in db.scalars(select(Bot))}
+    for bot_id in created:
+        activity_ingestor.forget_bot(bot_id)
+
+
+def beat(db, bot, status, seconds):
+    """A heartbeat at T0 + seconds, applied the way the heartbeat endpoint does."""
+    at = T0 + timedelta(seconds=seconds)
+    record_status(db, bot, status, at)
+    bot.status = status
+    bot.last_heartbeat_at = at
+    db.commit()
+
+
+def runs(db, bot):
+    return [
+        (run.status, run.started_at, run.last_seen_at, run.ended_at)
+        for run in db.scalars(
+            select(BotStatusRun).where(BotStatusRun.bot_id == bot.id).order_by(BotStatusRun.started_at)
+        )
+    ]
+
+
+class TestStatusHistory:
+    """Tests for run-length encoded status history."""
+
+    def test_heartbeats_extend_the_current_run(self, client, db, bots):
+        for _ in range(3):
+            assert client.post("/api/v1/bots/uptime-bot-1/heartbeat", json={"status": "online"}).status_code == 200
+        client.post("/api/v1/bots/uptime-bot-1/heartbeat", json={"status": "busy"})
+
+        history = runs(db, bots["uptime-bot-1"])
+        assert [(status, ended_at is None) for status, _, _, ended_at in history] == [
+            ("online", False), ("busy", True)
+        ]
+        online, busy = history
+        assert online[3] == busy[1]
+        assert online[1] < online[2]
+
+    def test_transitions_and_gaps(self, db, bots, monkeypatch):
+        monkeypatch.setattr("app.services.status_history.settings.STATUS_HISTORY_MAX_GAP", 60.0)
+        bot = bots["uptime-bot-1"]
+        beat(db, bot, "online", 0)
+        beat(db, bot, "online", 30)
+        beat(db, bot, "offline", 60)
+        beat(db, bot, "offline", 500)  # silent for longer than the gap
+
+        at = lambda seconds: T0 + timedelta(seconds=seconds)
+        assert runs(db, bot) == [
+            ("online", at(0), at(30), at(60)),
+            ("offline", at(60), at(60), at(120)),
+            ("offline", at(500), at(500), None),
+        ]
+
+    def test_history_clips_ongoing_runs(self, db, bots, monkeypatch):
+        monkeypatch.setattr("app.services.status_history.settings.STATUS_HISTORY_MAX_GAP", 60.0)
+        bot = bots["uptime-bot-1"]
+        beat(db, bot, "online", 0)
+        beat(db, bot, "busy", 100)
+
+        history = status_history(db, bot.id, T0, T0 + timedelta(hours=1), 10, now=T0 + timedelta(hours=1))
+        assert [run["status"] for run in history] == ["online", "busy"]
+        assert history[1]["ended_at"] == T0 + timedelta(seconds=160)
+
+
+class TestUptime:
+    """Tests for interval arithmetic over status runs and the uptime endpoints."""
+
+    @pytest.fixture
+    def fleet(self, db, bots, monkeypatch):
+        """
+        Within the first hour after T0 (gap 60s):
+
+        - bot 1: online 0-1800, error 1800-2700, silent afterwards (2700 + 60)
+        - bot 2: busy 600-3600 (heartbeat every 30s)
+        - bot 3: never reported
+        """
+        monkeypatch.setattr("app.services.status_history.settings.STATUS_HISTORY_MAX_GAP", 60.0)
+        for seconds in range(0, 1800, 30):
+            beat(db, bots["uptime-bot-1"], "online", seconds)
+        for seconds in range(1800, 2701, 30):
+            beat(db, bots["uptime-bot-1"], "error", seconds)
+        for seconds in range(600, 3601, 30):
+            beat(db, bots["uptime-bot-2"], "busy", seconds)
+        return bots
+
+    def test_bot_uptime(self, db, fleet):
+        report = uptime_report(
+            db, T0, T0 + timedelta(hours=1), bot_uuid=fleet["uptime-bot-1"].id, now=T0 + timedelta(hours=2)
+        )
+        assert report["bots"] == 1
+        assert report["window_seconds"] == pytest.approx(3600, abs=0.01)
+        assert report["status_seconds"] == {
+            "online": pytest.approx(1800, abs=0.01), "error": pytest.approx(960, abs=0.01)
+        }
+        assert report["unknown_seconds"] == pytest.approx(840, abs=0.01)
+        assert report["uptime"] == pytest.approx(0.5)
+        assert report["availability"] == pytest.approx(1800 / 2760)
+
+    def test_window_clips_runs(self, db, fleet):
+        report = uptime_report(
+            db, T0 + timedelta(minutes=20), T0 + timedelta(minutes=40),
+            bot_uuid=fleet["uptime-bot-1"].id, now=T0 + timedelta(hours=2)
+        )
+        assert report["status_seconds"]["online"] == pytest.approx(600, abs=0.01)
+        assert report["status_seconds"]["error"] == pytest.approx(600, abs=0.01)
+
+    def test_ongoing_run_stops_at_now(self, db, fleet):
+        now = T0 + timedelta(seconds=3610)
+        report = uptime_report(db, T0, T0 + timedelta(hours=2), bot_uuid=fleet["uptime-bot-2"].id, now=now)
+        assert report["end"] == now
+        assert report["status_seconds"] == {"busy": pytest.approx(3010, abs=0.01)}
+
+    def test_owner_and_fleet(self, db, fleet):
+        end, now = T0 + timedelta(hours=1), T0 + timedelta(hours=2)
+        owner = uptime_report(db, T0, end, owner_id=fleet["uptime-bot-1"].owner_id, now=now)
+        assert owner["bots"] == 2
+        assert owner["up_seconds"] == pytest.approx(1800 + 3000, abs=0.01)
+        assert owner["uptime"] == pytest.approx(4800 / 7200)
+
+        fleet_report = uptime_report(db, T0, end, now=now)
+        assert fleet_report["bots"] == 3
+        assert fleet_report["window_seconds"] == pytest.approx(3 * 3600, abs=0.01)
+        assert fleet_report["unknown_seconds"] == pytest.approx(840 + 600 + 3600, abs=0.01)
+
+    def test_endpoints(self, client, owner_id, fleet):
+        params = {"start": T0.isoformat(), "end": (T0 + timedelta(hours=1)).isoformat()}
+
+        data = client.get("/api/v1/uptime/bots/uptime-bot-2", params=params).json()
+        assert data["scope"] == "bot"
+        assert data["uptime"] == pytest.approx(3000 / 3600)
+
+        data = client.get(f"/api/v1/uptime/owners/{owner_id}", params=params).json()
+        assert data["bots"] == 2
+
+        data = client.get("/api/v1/uptime/fleet", params=params).json()
+        assert data["scope"] == "fleet"
+        assert data["bots"] == 3
+
+        data = client.get("/api/v1/uptime/bots/uptime-bot-1/history", params=params).json()
+        assert [run["status"] for run in data["runs"]] == ["online", "error"]
+
+        assert client.get("/api/v1/uptime/bots/missing", params=params).status_code == 404
+
+    def test_endpoints_accept_timezone_aware_timestamps(self, client, fleet):
+        # 03:00+02:00 is T0 + 1h in UTC
+        params = {"start": f"{T0.isoformat()}Z", "end": (T0 + timedelta(hours=3)).isoformat() + "+02:00"}
+
+        data = client.get("/api/v1/uptime/bots/uptime-bot-2", params=params).json()
+        assert data["uptime"] == pytest.approx(3000 / 3600)
+        assert client.get("/api/v1/uptime/fleet", params=params).json()["bots"] == 3
+        response = client.get("/api/v1/uptime/bots/uptime-bot-1/history", params=params)
+        assert response.status_code == 200
+        assert [run["status"] for run in response.json()["runs"]] == ["online", "error"]
+        # Only one bound given, compared against the naive default
+        assert client.get("/api/v1/uptime/fleet", params={"end": params["end"]}).status_code == 200
+        assert client.get("/api/v1/uptime/fleet", params={"start": params["end"], "end": params["start"]}).status_code == 400
@@ -0,0 +1,158 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from app.models.activity import BotActivity, BotActivityRollup
+from app.services.activities import activity_ingestor
+from app.services import rollups
+from app.services.rollups import aggregate, apply_batch, reconcile
+
+
+@pytest.fixture
+def bots(client, auth_headers, owner_id, monkeypatch):
+    """Two bots of the same owner and one of another owner."""
+    # The events below use fixed dates, however long ago they are
+    monkeypatch.setattr("app.services.activities.settings.ACTIVITY_MAX_AGE_DAYS", 100_000)
+    created = []
+    for bot_id, owner in [
+        ("usage-bot-1", owner_id),
+        ("usage-bot-2", owner_id),
+        ("usage-bot-3", "00000000-0000-0000-0000-0000000000bb"),
+    ]:
+        response = client.post(
+            "/api/v1/bots/register",
+            json={"bot_id": bot_id, "bot_name": bot_id, "owner_id": owner},
+            headers=auth_headers
+        )
+        created.append(response.json())
+    yield created
+    for bot in created:
+        activity_ingestor.forget_bot(bot["bot_id"])
+
+
+def ingest(client, db, bot_id, created_at, count, tokens):
+    response = client.post(
+        f"/api/v1/bots/{bot_id}/activities",
+        json={"activities": [
+            {"activity_type": "task", "tokens_used": tokens, "created_at": created_at.isoformat()}
+        ] * count}
+    )
+    assert response.status_code == 202
+    activity_ingestor.flush(db)
+
+
+class TestRollups:
+    """Tests for incremental rollups and the usage endpoints."""
+
+    def test_aggregate_batches_per_bucket(self):
+        t = datetime(2026, 10, 1, 10, 15)
+        rows = [
+            {"bot_id": "a", "created_at": t, "tokens_used": 5},
+            {"bot_id": "a", "created_at": t + timedelta(hours=1), "tokens_used": 7},
+        ]
+        deltas = aggregate(rows)
+        assert deltas[("a", "hour", datetime(2026, 10, 1, 10))] == [1, 5]
+        assert deltas[("a", "hour", datetime(2026, 10, 1, 11))] == [1, 7]
+        assert deltas[("a", "day", datetime(2026, 10, 1))] == [2, 12]
+
+    def test_flush_maintains_rollups(self, client, db, bots):
+        """Flushing raw events upserts hour and day rollups additively."""
+        t = datetime(2026, 10, 1, 10, 15)
+        ingest(client, db, "usage-bot-1", t, 3, 10)
+        ingest(client, db, "usage-bot-1", t + timedelta(minutes=5), 2, 1)
+
+        rollups = {
+            (r.granularity, r.bucket_start): (r.activity_count, r.tokens_used)
+            for r in db.scalars(select(BotActivityRollup))
+        }
+        assert rollups[("hour", datetime(2026, 10, 1, 10))] == (5, 32)
+        assert rollups[("day", datetime(2026, 10, 1))] == (5, 32)
+
+    def test_usage_endpoints(self, client, db, owner_id, bots):
+        """Bot, owner and fleet series are served from the rollups."""
+        t = datetime(2026, 10, 1, 10, 15)
+        ingest(client, db, "usage-bot-1", t, 2, 10)
+        ingest(client, db, "usage-bot-2", t + timedelta(hours=1), 1, 5)
+        ingest(client, db, "usage-bot-3", t, 4, 1)
+        params = {"start": "2026-10-01T00:00:00", "end": "2026-10-02T00:00:00"}
+
+        data = client.get("/api/v1/usage/bots/usage-bot-1", params=params).json()
+        assert data["total_activities"] == 2
+        assert data["points"][0]["bucket_start"] == "2026-10-01T10:00:00"
+
+        data = client.get(f"/api/v1/usage/owners/{owner_id}", params=params).json()
+        assert [p["activity_count"] for p in data["points"]] == [2, 1]
+        assert data["total_tokens"] == 25
+
+        data = client.get("/api/v1/usage/fleet", params={**params, "granularity": "day"}).json()
+        assert data["points"] == [
+            {"bucket_start": "2026-10-01T00:00:00", "activity_count": 7, "tokens_used": 29}
+        ]
+
+    def test_usage_accepts_timezone_aware_timestamps(self, client, db, bots):
+        ingest(client, db, "usage-bot-1", datetime(2026, 10, 1, 10, 15), 2, 10)
+        # 2026-10-01T12:00:00+02:00 is 10:00 UTC
+        params = {"start": "2026-10-01T12:00:00+02:00", "end": "2026-10-01T11:00:00Z"}
+
+        data = client.get("/api/v1/usage/bots/usage-bot-1", params=params).json()
+        assert data["points"] == [
+            {"bucket_start": "2026-10-01T10:00:00", "activity_count": 2, "tokens_used": 20}
+        ]
+        assert client.get("/api/v1/usage/fleet", params=params).json()["total_activities"] == 2
+        assert client.get("/api/v1/usage/fleet", params={"end": params["end"]}).status_code == 200
+
+    def test_usage_validates_range(self, client, bots):
+        response = client.get(
+            "/api/v1/usage/fleet",
+            params={"start": "2026-01-01T00:00:00", "end": "2026-12-01T00:00:00"}
+        )
+        assert response.status_code == 400
+        assert client.get("/api/v1/usage/bots/missing").status_code == 404
+
+    def test_reconcile_picks_up_late_events(self, client, db, bots):
+        """Events written around the buffer are folded in by the catch-up job."""
+        t = datetime(2026, 10, 1, 10, 15)
+        ingest(client, db, "usage-bot-1", t, 1, 10)
+        bot_uuid = activity_ingestor.resolve_bot(db, "usage-bot-1")
+        db.add(BotActivity(bot_id=bot_uuid, activity_type="task", tokens_used=3, created_at=t))
+        db.commit()
+
+        reconcile(db, datetime(2026, 10, 1, 0), datetime(2026, 10, 1, 12))
+        db.commit()
+
+        params = {"start": "2026-10-01T00:00:00", "end": "2026-10-02T00:00:00"}
+        for granularity in ("hour", "day"):
+            data = client.get(
+                "/api/v1/usage/bots/usage-bot-1",
+                params={**params, "granularity": granularity}
+            ).json()
+            assert data["total_activities"] == 2
+            assert data["total_tokens"] == 13
+
+    def test_reconcile_keeps_concurrent_increments(self, client, db, bots, monkeypatch):
+        """A flush that lands after the raw logs were read is added on top, not overwritten."""
+        t = datetime(2026, 10, 1, 10, 15)
+        ingest(client, db, "usage-bot-1", t, 1, 10)
+        bot_uuid = activity_ingestor.resolve_bot(db, "usage-bot-1")
+        upsert_rollups = rollups.upsert_rollups
+
+        def flush_first(*args, **kwargs):
+            if not flushed:
+                flushed.append(True)
+                db.add(BotActivity(bot_id=bot_uuid, activity_type="task", tokens_used=5, created_at=t))
+                apply_batch(db, [{"bot_id": bot_uuid, "created_at": t, "tokens_used": 5}])
+            upsert_rollups(*args, **kwargs)
+
+        flushed = []
+        monkeypatch.setattr(rollups, "upsert_rollups", flush_first)
+        reconcile(db, datetime(2026, 10, 1, 0), datetime(2026, 10, 1, 12))
+        db.commit()
+
+        counts = {
+            granularity: (count, tokens)
+            for granularity, count, tokens in db.execute(
+                select(BotActivityRollup.granularity, BotActivityRollup.activity_count, BotActivityRollup.tokens_used)
+            )
+        }
+        assert counts == {"hour": (2, 15), "day": (2, 15)}
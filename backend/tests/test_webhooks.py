@@ -0,0 +1,264 @@
+import asyncio
+import json
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.models.webhook import WebhookDelivery, DeliveryStatus
+from app.services.webhooks import (
+    CircuitBreaker,
+    WebhookDispatcher,
+    backoff_delay,
+    check_endpoint,
+    lease_seconds,
+    sign,
+)
+
+
+class StandInEndpoint:
+    """A local HTTP server standing in for bot webhook endpoints."""
+
+    def __init__(self):
+        self.requests = []
+        self.statuses = []
+        endpoint = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                endpoint.requests.append((dict(self.headers), body))
+                status = endpoint.statuses.pop(0) if endpoint.statuses else 200
+                self.send_response(status)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/webhook"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def endpoint(monkeypatch):
+    # The stand-in listens on loopback over plain http
+    monkeypatch.setattr("app.services.webhooks.settings.WEBHOOK_ALLOW_PRIVATE_ENDPOINTS", True)
+    stand_in = StandInEndpoint()
+    yield stand_in
+    stand_in.close()
+
+
+@pytest.fixture
+def bot(client, owner_id, owner_headers, endpoint):
+    client.post(
+        "/api/v1/bots/register",
+        json={"bot_id": "hook-bot", "bot_name": "hook-bot", "owner_id": owner_id, "endpoint": endpoint.url},
+        headers=owner_headers
+    )
+    response = client.post("/api/v1/bots/hook-bot/webhook-secret", headers=owner_headers)
+    return response.json()["webhook_secret"]
+
+
+def dispatch(dispatcher=None):
+    """Run one dispatch cycle and close the client inside the same event loop."""
+    dispatcher = dispatcher or WebhookDispatcher()
+
+    async def run():
+        try:
+            return await dispatcher.dispatch_due()
+        finally:
+            await dispatcher.aclose()
+
+    return asyncio.run(run())
+
+
+def submit_task(client, owner_headers):
+    return client.post(
+        "/api/v1/tasks",
+        json={"title": "ping", "target_bot_id": "hook-bot"},
+        headers=owner_headers
+    ).json()
+
+
+class TestWebhookPrimitives:
+    """Tests for signatures, backoff and the circuit breaker."""
+
+    def test_signature_covers_timestamp_and_body(self):
+        signature = sign("secret", "1700000000", b'{"a":1}')
+        assert signature.startswith("sha256=")
+        assert signature != sign("secret", "1700000001", b'{"a":1}')
+        assert signature != sign("other", "1700000000", b'{"a":1}')
+
+    def test_backoff_grows_with_jitter(self):
+        first = [backoff_delay(1) for _ in range(20)]
+        fourth = [backoff_delay(4) for _ in range(20)]
+        assert max(first) <= 5 and min(first) >= 2.5
+        assert max(fourth) <= 40 and min(fourth) >= 20
+        assert len(set(fourth)) > 1
+
+    def test_breaker_opens_and_probes_once(self):
+        breaker = CircuitBreaker(threshold=2, cooldown=10)
+        breaker.record_failure(0)
+        assert breaker.allow(0)
+        breaker.record_failure(0)
+        assert not breaker.allow(5)
+        # After the cooldown only one probe goes through
+        assert breaker.allow(11)
+        assert not breaker.allow(11)
+        breaker.record_success()
+        assert breaker.allow(11)
+
+    def test_lease_covers_every_round_of_requests(self, monkeypatch):
+        monkeypatch.setattr("app.services.webhooks.settings.WEBHOOK_TIMEOUT", 10)
+        monkeypatch.setattr("app.services.webhooks.settings.WEBHOOK_ENDPOINT_CONCURRENCY", 4)
+        monkeypatch.setattr("app.services.webhooks.settings.WEBHOOK_MAX_CONNECTIONS", 100)
+        assert lease_seconds(1, 1) == 20
+        # 200 jobs to one endpoint run in 50 rounds of 4
+        assert lease_seconds(200, 200) == 510
+        # Spread over many endpoints the connection pool is the limit
+        assert lease_seconds(2, 200) == 30
+
+    @pytest.mark.parametrize("url", [
+        "http://example.com/hook",
+        "https://127.0.0.1/hook",
+        "https://10.1.2.3/hook",
+        "https://169.254.169.254/latest/meta-data",
+        "https://[::1]:8443/hook",
+        "https://[fd00::1]/hook",
+    ])
+    def test_endpoints_must_be_public_https(self, url):
+        outcome, error = asyncio.run(check_endpoint(url))
+        assert outcome == "dead"
+        assert asyncio.run(check_endpoint("https://93.184.216.34/hook")) is None
+
+
+class TestWebhookDelivery:
+    """Tests for persisted, signed deliveries to a stand-in endpoint."""
+
+    def test_task_assigned_is_delivered_and_signed(self, client, db, owner_headers, endpoint, bot):
+        task = submit_task(client, owner_headers)
+        assert dispatch() == 1
+
+        headers, body = endpoint.requests[0]
+        assert headers["X-BotHub-Event"] == "task.assigned"
+        assert headers["X-BotHub-Signature"] == sign(bot, headers["X-BotHub-Timestamp"], body)
+        payload = json.loads(body)
+        assert payload["bot_id"] == "hook-bot"
+        assert payload["data"]["task_id"] == task["task_id"]
+
+        delivery = db.query(WebhookDelivery).one()
+        assert delivery.status == DeliveryStatus.DELIVERED
+        assert delivery.attempts == 1
+        assert dispatch() == 0
+
+    def test_failure_is_retried_with_backoff(self, client, db, owner_headers, endpoint, bot):
+        endpoint.statuses = [503]
+        submit_task(client, owner_headers)
+        dispatch()
+
+        delivery = db.query(WebhookDelivery).one()
+        assert delivery.status == DeliveryStatus.PENDING
+        assert delivery.attempts == 1
+        assert delivery.last_status_code == 503
+        assert delivery.next_attempt_at > datetime.utcnow()
+        # Not due yet
+        assert dispatch() == 0
+
+        delivery.next_attempt_at = datetime.utcnow() - timedelta(seconds=1)
+        db.commit()
+        dispatch()
+        db.expire_all()
+        assert delivery.status == DeliveryStatus.DELIVERED
+        assert delivery.attempts == 2
+
+    def test_breaker_defers_without_calling_endpoint(self, client, db, owner_headers, endpoint, bot, monkeypatch):
+        monkeypatch.setattr("app.services.webhooks.settings.WEBHOOK_BREAKER_THRESHOLD", 1)
+        monkeypatch.setattr("app.services.webhooks.settings.WEBHOOK_ENDPOINT_CONCURRENCY", 1)
+        endpoint.statuses = [500]
+        submit_task(client, owner_headers)
+        submit_task(client, owner_headers)
+
+        assert dispatch() == 2
+        # The first failure opens the breaker; the second delivery is deferred, not attempted
+        assert len(endpoint.requests) == 1
+        attempts = sorted(d.attempts for d in db.query(WebhookDelivery))
+        assert attempts == [0, 1]
+
+    def test_claim_lease_grows_with_the_endpoint_backlog(self, client, db, owner_headers, endpoint, bot, monkeypatch):
+        monkeypatch.setattr("app.services.webhooks.settings.WEBHOOK_TIMEOUT", 10)
+        monkeypatch.setattr("app.services.webhooks.settings.WEBHOOK_ENDPOINT_CONCURRENCY", 2)
+        for _ in range(5):
+            submit_task(client, owner_headers)
+
+        before = datetime.utcnow()
+        assert len(WebhookDispatcher()._claim_due()) == 5
+        db.expire_all()
+        # 5 jobs at 2 at a time take 3 rounds, plus one timeout of slack
+        for delivery in db.query(WebhookDelivery):
+            assert delivery.next_attempt_at >= before + timedelta(seconds=40)
+
+    def test_whole_batch_shares_the_longest_lease(
+        self, client, db, owner_id, owner_headers, endpoint, bot, monkeypatch
+    ):
+        """Results are recorded after the whole batch, so a fast endpoint must not lose its lease first."""
+        monkeypatch.setattr("app.services.webhooks.settings.WEBHOOK_TIMEOUT", 10)
+        monkeypatch.setattr("app.services.webhooks.settings.WEBHOOK_ENDPOINT_CONCURRENCY", 2)
+        client.post(
+            "/api/v1/bots/register",
+            json={"bot_id": "quiet-bot", "bot_name": "quiet-bot", "owner_id": owner_id,
+                  "endpoint": endpoint.url + "/quiet"},
+            headers=owner_headers
+        )
+        client.post("/api/v1/tasks", json={"title": "once", "target_bot_id": "quiet-bot"}, headers=owner_headers)
+        for _ in range(5):
+            submit_task(client, owner_headers)
+
+        before = datetime.utcnow()
+        WebhookDispatcher()._claim_due()
+        db.expire_all()
+        leases = {d.next_attempt_at for d in db.query(WebhookDelivery)}
+        assert len(leases) == 1
+        assert leases.pop() >= before + timedelta(seconds=40)
+
+    def test_private_endpoints_are_not_called(self, client, db, owner_headers, endpoint, bot, monkeypatch):
+        monkeypatch.setattr("app.services.webhooks.settings.WEBHOOK_ALLOW_PRIVATE_ENDPOINTS", False)
+        submit_task(client, owner_headers)
+        dispatch()
+
+        assert endpoint.requests == []
+        delivery = db.query(WebhookDelivery).one()
+        assert delivery.status == DeliveryStatus.DEAD
+        assert delivery.last_error == "Endpoint must be an https URL"
+
+    def test_gives_up_after_max_attempts(self, client, db, owner_headers, endpoint, bot, monkeypatch):
+        monkeypatch.setattr("app.services.webhooks.settings.WEBHOOK_MAX_ATTEMPTS", 1)
+        endpoint.statuses = [400]
+        submit_task(client, owner_headers)
+        dispatch()
+        delivery = db.query(WebhookDelivery).one()
+        assert delivery.status == DeliveryStatus.DEAD
+
+        response = client.post(
+            f"/api/v1/bots/hook-bot/webhook-deliveries/{delivery.event_id}/redeliver",
+            headers=owner_headers
+        )
+        assert response.json()["status"] == "pending"
+        dispatch()
+        db.expire_all()
+        assert delivery.status == DeliveryStatus.DELIVERED
+
+    def test_owner_only_management(self, client, auth_headers, owner_headers, bot):
+        assert client.post("/api/v1/bots/hook-bot/webhook-secret", headers=auth_headers).status_code == 403
+        submit_task(client, owner_headers)
+        response = client.get("/api/v1/bots/hook-bot/webhook-deliveries", headers=owner_headers)
+        assert [d["event_type"] for d in response.json()] == ["task.assigned"]
@@ -34,4 +34,8 @@ apiClient.interceptors.response.use(
   }
 );
 
+// Resolve backend-relative asset URLs (e.g. /api/v1/blobs/...) against the API host
+export const assetUrl = (url: string) =>
+  url.startsWith('/') ? `${API_BASE_URL}${url}` : url;
+
 export default apiClient;
@@ -1,5 +1,6 @@
 import React from 'react';
 import { Bot } from '../types/bot';
+import { assetUrl } from '../api/client';
 
 interface BotClaimCardProps {
   bot: Bot;
@@ -64,7 +65,7 @@ export function BotClaimCard({ bot, onClaim, onUploadAvatar }: BotClaimCardProps
         >
           {bot.avatar_url ? (
             <img
-              src={bot.avatar_url}
+              src={assetUrl(bot.avatar_url)}
               alt={bot.bot_name}
               className="w-16 h-16 rounded-full object-cover"
             />
@@ -1,34 +1,72 @@
-import { useQuery } from '@tanstack/react-query';
-import { useState } from 'react';
+import { keepPreviousData, useQuery } from '@tanstack/react-query';
+import { useEffect, useState } from 'react';
 import apiClient from '../api/client';
-import type { Bot } from '../types/bot';
+import type { BotSearchResponse } from '../types/bot';
 import BotCard from '../components/BotCard';
+import { cn } from '../utils/cn';
+
+const PAGE_SIZE = 24;
+
+const STATUS_LABELS: Record<string, string> = {
+  online: '在线',
+  offline: '离线',
+  busy: '忙碌',
+  error: '错误',
+  unclaimed: '未认领',
+  claimed: '已认领',
+};
 
 export default function BotHall() {
   const [searchTerm, setSearchTerm] = useState('');
+  const [query, setQuery] = useState('');
   const [statusFilter, setStatusFilter] = useState<string>('all');
+  const [capabilities, setCapabilities] = useState<string[]>([]);
+  const [page, setPage] = useState(1);
+
+  // 输入停顿后再搜索，避免每次按键都请求
+  useEffect(() => {
+    const timer = setTimeout(() => {
+      setQuery(searchTerm.trim());
+      setPage(1);
+    }, 300);
+    return () => clearTimeout(timer);
+  }, [searchTerm]);
 
-  const { data: bots, isLoading, error } = useQuery({
-    queryKey: ['bots'],
+  const { data, isLoading, error } = useQuery({
+    queryKey: ['bots', 'search', query, statusFilter, capabilities, page],
     queryFn: async () => {
-      const response = await apiClient.get<Bot[]>('/api/v1/bots');
+      const params = new URLSearchParams({ page: String(page), page_size: String(PAGE_SIZE) });
+      if (query) params.set('q', query);
+      if (statusFilter !== 'all') params.set('status', statusFilter);
+      capabilities.forEach((capability) => params.append('capability', capability));
+      const response = await apiClient.get<BotSearchResponse>('/api/v1/bots/search', { params });
       return response.data;
     },
+    placeholderData: keepPreviousData,
   });
 
-  const filteredBots = bots?.filter((bot) => {
-    const matchesSearch = bot.bot_name.toLowerCase().includes(searchTerm.toLowerCase()) ||
-      bot.description?.toLowerCase().includes(searchTerm.toLowerCase());
-    const matchesStatus = statusFilter === 'all' || bot.status === statusFilter;
-    return matchesSearch && matchesStatus;
-  });
+  const statusCounts = Object.fromEntries(
+    (data?.facets.status ?? []).map((facet) => [facet.value, facet.count])
+  );
+  const statusTotal = Object.values(statusCounts).reduce((sum, count) => sum + count, 0);
+
+  const toggleCapability = (capability: string) => {
+    setCapabilities((current) =>
+      current.includes(capability)
+        ? current.filter((item) => item !== capability)
+        : [...current, capability]
+    );
+    setPage(1);
+  };
 
   return (
     <div className="space-y-6">
       <div className="flex items-center justify-between">
         <div>
           <h1 className="text-3xl font-bold">机器人大厅</h1>
-          <p className="text-muted-foreground">浏览和管理所有注册的机器人</p>
+          <p className="text-muted-foreground">
+            浏览和管理所有注册的机器人{data ? `（共 ${data.total} 个）` : ''}
+          </p>
         </div>
         <button className="px-4 py-2 bg-primary text-primary-foreground rounded-md hover:bg-primary/90">
           + 注册新机器人
@@ -45,16 +83,51 @@ export default function BotHall() {
         />
         <select
           value={statusFilter}
-          onChange={(e) => setStatusFilter(e.target.value)}
+          onChange={(e) => {
+            setStatusFilter(e.target.value);
+            setPage(1);
+          }}
           className="px-4 py-2 border rounded-md focus:outline-none focus:ring-2 focus:ring-primary"
         >
-          <option value="all">所有状态</option>
-          <option value="online">在线</option>
-          <option value="offline">离线</option>
-          <option value="error">错误</option>
+          <option value="all">所有状态 ({statusTotal})</option>
+          {Object.entries(STATUS_LABELS).map(([value, label]) => (
+            <option key={value} value={value}>
+              {label} ({statusCounts[value] ?? 0})
+            </option>
+          ))}
         </select>
       </div>
 
+      {data && (data.facets.capability.length > 0 || capabilities.length > 0) && (
+        <div className="flex flex-wrap gap-2">
+          {capabilities
+            .filter((capability) => !data.facets.capability.some((facet) => facet.value === capability))
+            .map((capability) => (
+              <button
+                key={capability}
+                onClick={() => toggleCapability(capability)}
+                className="px-3 py-1 rounded-full text-sm border bg-primary text-primary-foreground"
+              >
+                {capability} (0)
+              </button>
+            ))}
+          {data.facets.capability.map((facet) => (
+            <button
+              key={facet.value}
+              onClick={() => toggleCapability(facet.value)}
+              className={cn(
+                'px-3 py-1 rounded-full text-sm border',
+                capabilities.includes(facet.value)
+                  ? 'bg-primary text-primary-foreground'
+                  : 'bg-secondary text-secondary-foreground hover:bg-secondary/80'
+              )}
+            >
+              {facet.value} ({facet.count})
+            </button>
+          ))}
+        </div>
+      )}
+
       {isLoading && (
         <div className="text-center py-12">
           <p className="text-muted-foreground">加载中...</p>
@@ -67,17 +140,39 @@ export default function BotHall() {
         </div>
       )}
 
-      {filteredBots && filteredBots.length === 0 && (
+      {data && data.items.length === 0 && (
         <div className="text-center py-12">
           <p className="text-muted-foreground">暂无机器人</p>
         </div>
       )}
 
       <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6">
-        {filteredBots?.map((bot) => (
+        {data?.items.map((bot) => (
           <BotCard key={bot.id} bot={bot} />
         ))}
       </div>
+
+      {data && data.pages > 1 && (
+        <div className="flex items-center justify-center gap-4">
+          <button
+            onClick={() => setPage((current) => current - 1)}
+            disabled={page <= 1}
+            className="px-4 py-2 border rounded-md disabled:opacity-50"
+          >
+            上一页
+          </button>
+          <span className="text-sm text-muted-foreground">
+            {page} / {data.pages}
+          </span>
+          <button
+            onClick={() => setPage((current) => current + 1)}
+            disabled={page >= data.pages}
+            className="px-4 py-2 border rounded-md disabled:opacity-50"
+          >
+            下一页
+          </button>
+        </div>
+      )}
     </div>
   );
 }
@@ -1,6 +1,6 @@
 import React, { useEffect, useState } from 'react';
 import { useSearchParams, useNavigate } from 'react-router-dom';
-import { apiClient } from '../api/client';
+import { apiClient, assetUrl } from '../api/client';
 
 export function ClaimBotPage() {
   const [searchParams] = useSearchParams();
@@ -78,7 +78,7 @@ export function ClaimBotPage() {
             <div className="flex items-center gap-3">
               {bot.avatar_url ? (
                 <img
-                  src={bot.avatar_url}
+                  src={assetUrl(bot.avatar_url)}
                   alt={bot.bot_name}
                   className="w-12 h-12 rounded-full"
                 />
@@ -27,3 +27,17 @@ export interface BotHeartbeat {
   bot_id: string;
   status: 'online' | 'offline' | 'error';
 }
+
+export interface FacetCount {
+  value: string;
+  count: number;
+}
+
+export interface BotSearchResponse {
+  items: Bot[];
+  total: number;
+  page: number;
+  page_size: number;
+  pages: number;
+  facets: Record<'status' | 'owner' | 'version' | 'capability', FacetCount[]>;
+}